@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark: import time of plan_sim.main, and the one-off cost of initializing the vector store.
+
+Each measurement runs in a fresh interpreter so module caches do not hide the
+cost. A placeholder OPENAI_API_KEY is set and the vector store uses a fake
+embedding backend with an in-memory Qdrant, so no network access is needed.
+
+Usage:
+    python benchmarks/bench_import.py [--repeats 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parents[1]
+
+IMPORT_ONLY = """
+import time
+start = time.perf_counter()
+import plan_sim.main
+elapsed = time.perf_counter() - start
+heavy = [m for m in ("qdrant_client", "langchain_qdrant", "langchain_openai") if m in sys.modules]
+print(elapsed, ",".join(heavy) or "-")
+"""
+
+IMPORT_AND_INIT = """
+import time
+start = time.perf_counter()
+import plan_sim.main
+from plan_sim import vector_store
+from langchain_core.embeddings import DeterministicFakeEmbedding
+vector_store.set_embedding_backend(DeterministicFakeEmbedding(size=vector_store.OPENAI_EMBEDDING_DIM))
+vector_store.get_vector_store()
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(m for m in ("qdrant_client", "langchain_qdrant") if m in sys.modules))
+"""
+
+
+def run(snippet: str, repeats: int):
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark-placeholder-key"), "QDRANT_PATH": ":memory:"}
+    timings, heavy = [], ""
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-c", "import sys\n" + snippet],
+            cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        elapsed, heavy = out.split(" ", 1)
+        timings.append(float(elapsed))
+    return statistics.median(timings), heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per measurement.")
+    args = parser.parse_args()
+
+    for label, snippet in [("import plan_sim.main", IMPORT_ONLY), ("import + vector store init", IMPORT_AND_INIT)]:
+        median, heavy = run(snippet, args.repeats)
+        print(f"{label:<28} median {median * 1000:8.1f} ms   (heavy modules loaded: {heavy})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-step novelty check latency, filtered Qdrant search vs. the in-memory NoveltyIndex.
+
+For each size, N random ideas are stored at the queried step (plus the same
+number spread over other steps, so the Qdrant step filter has work to do) in
+an in-memory Qdrant collection and in a NoveltyIndex. The median latency of a
+single novelty check is reported for both paths. No embedding model or network
+access is used. Local-mode Qdrant is a brute-force Python scan that keeps its
+own copy of every vector, and qdrant_client itself advises against it above
+20k points, so sizes above --qdrant-max only time the index.
+
+Usage:
+    python benchmarks/bench_novelty.py [--sizes 10 1000 100000] [--dim 1536] [--queries 50] [--qdrant-max 20000]
+"""
+import argparse
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parents[1]))
+
+from qdrant_client import QdrantClient, models
+
+from plan_sim.vector_store import NoveltyIndex
+
+STEP = 1
+OTHER_STEPS = 10
+UPSERT_BATCH = 1000
+
+
+def build_qdrant(vectors: np.ndarray, steps: np.ndarray, dim: int) -> QdrantClient:
+    client = QdrantClient(location=":memory:")
+    client.create_collection("ideas", vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE))
+    for start in range(0, len(vectors), UPSERT_BATCH):
+        batch = slice(start, start + UPSERT_BATCH)
+        client.upsert("ideas", points=models.Batch(
+            ids=[uuid.uuid4().hex for _ in range(len(vectors[batch]))],
+            vectors=vectors[batch].tolist(),
+            payloads=[{"metadata": {"step": int(step)}} for step in steps[batch]],
+        ))
+    return client
+
+
+def median_ms(check, queries: np.ndarray) -> float:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        check(query)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000], help="Ideas stored at the queried step.")
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding dimension.")
+    parser.add_argument("--queries", type=int, default=50, help="Novelty checks timed per size.")
+    parser.add_argument("--qdrant-max", type=int, default=20000, help="Largest size also timed against local Qdrant.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    step_filter = models.Filter(must=[models.FieldCondition(key="metadata.step", match=models.MatchValue(value=STEP))])
+    print(f"{'ideas/step':>10} {'qdrant ms':>10} {'index ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        vectors = rng.normal(size=(2 * size, args.dim)).astype(np.float32)
+        steps = np.concatenate([np.full(size, STEP), rng.integers(STEP + 1, STEP + 1 + OTHER_STEPS, size)])
+        queries = rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+
+        index = NoveltyIndex(args.dim)
+        index.add(STEP, vectors[:size])
+        for step in range(STEP + 1, STEP + 1 + OTHER_STEPS):
+            if (steps == step).any():
+                index.add(step, vectors[steps == step])
+        index_ms = median_ms(lambda q: index.max_similarity(STEP, q), queries)
+
+        if size > args.qdrant_max:
+            print(f"{size:>10} {'-':>10} {index_ms:>10.3f} {'-':>8}")
+            continue
+        client = build_qdrant(vectors, steps, args.dim)
+        qdrant_ms = median_ms(
+            lambda q: client.query_points("ideas", query=q.tolist(), query_filter=step_filter, limit=1),
+            queries,
+        )
+        client.close()
+        print(f"{size:>10} {qdrant_ms:>10.3f} {index_ms:>10.3f} {qdrant_ms / index_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of growing Plan state over a long plan.
+
+1. Reducers only: applies N and 10*N steps of updates (one step, one
+   outcome, three truths per step) with list concatenation (the old
+   `safe_append`) and with the structure-sharing AppendLog reducers.
+2. Full graph: drives an N-step synthetic plan through the compiled LangGraph
+   with a stubbed LLM (every check says "keep going", summarization is
+   disabled so the history keeps growing), an in-memory Qdrant and local
+   fake embeddings. Reports the mean wall time per plan step over the first
+   and last 100 steps; flat numbers mean per-step cost does not grow with
+   the history.
+
+Usage:
+    python benchmarks/bench_reducers.py [--steps 1000]
+"""
+import argparse
+import itertools
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parents[1]))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-placeholder-key") # Never used: the LLM is stubbed
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from plan_sim import nodes, vector_store
+from plan_sim.states import Assumptions, InputState, NextStep, Outcome, Plan, safe_append
+
+NODES_PER_STEP = 5 # generate_next_idea, decider, outcome, goal/abandon check, summarize_assumptions
+
+
+def list_append(existing, new):
+    return existing + (new if isinstance(new, list) else [new])
+
+
+def run_reducers(reducer, steps: int) -> float:
+    step = NextStep(idea="idea", assumptions=[])
+    outcome = [Outcome(new_truths=[], new_vulnerabilities=[], cost_increment=0, time_increment=0)]
+    new_truths = [f"truth {i}" for i in range(3)]
+    start = time.perf_counter()
+    plan_steps, outcomes, truths = [], [], []
+    for _ in range(steps):
+        plan_steps = reducer(plan_steps, step)
+        outcomes = reducer(outcomes, outcome)
+        truths = reducer(truths, new_truths)
+    return time.perf_counter() - start
+
+
+def stub_llm():
+    counter = itertools.count()
+
+    def invoke_structured_llm(model_name, temperature, prompt, output_model, model_kwargs=None):
+        n = next(counter)
+        if output_model is NextStep:
+            return NextStep(idea=f"Synthetic step {n}", assumptions=["Tools are available"])
+        if output_model is Outcome:
+            return Outcome(new_truths=[f"Truth {n}.{i}" for i in range(3)], new_vulnerabilities=[f"Risk {n}"],
+                           cost_increment=1, time_increment=0.01)
+        if output_model is nodes.Decider:
+            return nodes.Decider(reason="synthetic", decision="success" if n % 2 else "failure")
+        if output_model is nodes.GoalChecker:
+            return nodes.GoalChecker(achieved="no")
+        if output_model is nodes.AbandonChecker:
+            return nodes.AbandonChecker(abandon="press on")
+        raise ValueError(f"Unexpected output model {output_model.__name__}")
+
+    return invoke_structured_llm
+
+
+def run_graph(steps: int) -> list[float]:
+    from plan_sim.main import graph
+
+    nodes.invoke_structured_llm = stub_llm()
+    nodes.MIN_ASSUMPTIONS_FOR_SUMMARY = float("inf")
+    vector_store.QDRANT_PATH = ":memory:"
+    vector_store.set_embedding_backend(DeterministicFakeEmbedding(size=64), embedding_dim=64)
+
+    goal = InputState(goal="Finish a synthetic project", assumptions=Assumptions(ground_truth=["Start"], vulnerabilities=[]))
+    plan = Plan(plan_id="bench", goal_state=goal, input_state=[goal],
+                cumulative_assumptions=Assumptions(ground_truth=[], vulnerabilities=[]),
+                metric_count_1=10.0 * steps, metric_count_2=1.0 * steps)
+    step_times, last = [], time.perf_counter()
+    config = {"recursion_limit": NODES_PER_STEP * steps + 10}
+    for update in graph.stream(plan.model_dump(), config=config):
+        if "summarize_assumptions" in update:
+            now = time.perf_counter()
+            step_times.append(now - last)
+            last = now
+            if len(step_times) == steps:
+                break
+    vector_store.reset_vector_store()
+    return step_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=1000, help="Plan steps to simulate.")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    for steps in (args.steps, 10 * args.steps):
+        for label, reducer in [("list concatenation", list_append), ("AppendLog", safe_append)]:
+            print(f"reducers, {label:<18} {steps:>6} steps in {run_reducers(reducer, steps) * 1000:9.1f} ms")
+
+    step_times = run_graph(args.steps)
+    window = min(100, len(step_times))
+    first = sum(step_times[:window]) / window * 1000
+    final = sum(step_times[-window:]) / window * 1000
+    print(f"graph, {len(step_times)} steps in {sum(step_times):.1f} s: "
+          f"first {window} steps {first:.2f} ms/step, last {window} steps {final:.2f} ms/step")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,9 @@ class Config:
     subtopic: Optional[str] = None
     thinking_model: str = "gpt-4o-mini"
     sm_model: Optional[str] = None
+    idea_candidates: int = 1 # >1: request this many ideas in one call and keep the most novel
+    novelty_namespace: Optional[str] = None # Ideas are only de-duplicated against ideas from the same namespace
+    prompt_token_budget: int = 6000 # Oldest context items are dropped from any prompt larger than this
     
 
     @classmethod
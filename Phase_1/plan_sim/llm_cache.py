@@ -0,0 +1,173 @@
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Type
+from pydantic import BaseModel
+
+# Constants
+LLM_CACHE_MODES = ("passthrough", "record", "replay")
+DEFAULT_LLM_CACHE_PATH = Path(__file__).parent.parent / ".cache" / "llm_responses.sqlite"
+
+class LLMCacheMiss(LookupError):
+    """Raised in replay mode when a prompt has no recorded response."""
+
+# --- Sampling Scope ---
+# (label, prompt key -> occurrences) of the trajectory running in this context;
+# None outside `sampling_scope`, where the cache's process-wide counters are used.
+_sampling_scope: contextvars.ContextVar[Optional[tuple[str, dict[str, int]]]] = contextvars.ContextVar(
+    "llm_cache_sampling_scope", default=None
+)
+
+@contextmanager
+def sampling_scope(label: str = ""):
+    """Numbers sampled (temperature > 0) calls from zero for one trajectory.
+
+    Wrap each graph run in one, so that a trajectory replays its own recorded
+    samples however many runs came before it in the process. Runs that may
+    overlap (e.g. concurrent rollouts) need distinct, reproducible labels such
+    as the rollout index: each label records and replays its own samples, so
+    thread interleaving does not decide which sample a run gets.
+    """
+    token = _sampling_scope.set((label, {}))
+    try:
+        yield
+    finally:
+        _sampling_scope.reset(token)
+# --- End Sampling Scope ---
+
+class LLMResponseCache:
+    """SQLite-backed prompt-hash -> structured-output cache for record/replay.
+
+    Modes:
+        passthrough: The cache is neither read nor written.
+        record: Recorded responses are returned; misses call the LLM and are stored.
+        replay: Only recorded responses are returned; a miss raises `LLMCacheMiss`,
+            so no API call (or API key) is ever needed.
+
+    Calls with temperature > 0 are sampled, so the same prompt may legitimately
+    be sent several times in one run (e.g. idea retries). For those, the n-th
+    occurrence of a prompt in the current `sampling_scope` (or, outside one,
+    in this process) maps to the n-th recorded response, which replays the
+    recorded trajectory exactly. Temperature 0 calls share one entry per prompt.
+    """
+
+    def __init__(self, db_path: str | Path, mode: str = "record"):
+        if mode not in LLM_CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode '{mode}'; expected one of {LLM_CACHE_MODES}.")
+        self.mode = mode
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._occurrences: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        if mode != "passthrough":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                " cache_key TEXT PRIMARY KEY, model_name TEXT NOT NULL, output_model TEXT NOT NULL, response TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def prompt_key(model_name: str, temperature: float, prompt: str, output_model: Type[BaseModel], model_kwargs: dict | None) -> str:
+        """Hash of everything that determines the response, including the output schema."""
+        payload = json.dumps({
+            "model": model_name,
+            "temperature": float(temperature),
+            "model_kwargs": model_kwargs or {},
+            "schema": output_model.model_json_schema(),
+            "prompt": prompt,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def entry_key(self, model_name: str, temperature: float, prompt: str, output_model: Type[BaseModel], model_kwargs: dict | None) -> str:
+        """Cache key for this call; sampled calls also carry their scope label and occurrence number."""
+        key = self.prompt_key(model_name, temperature, prompt, output_model, model_kwargs)
+        if temperature > 0:
+            label, occurrences = _sampling_scope.get() or ("", self._occurrences)
+            with self._lock:
+                occurrence = occurrences.get(key, 0)
+                occurrences[key] = occurrence + 1
+            key = f"{key}:{label}:{occurrence}" if label else f"{key}:{occurrence}"
+        return key
+
+    def get(self, key: str, output_model: Type[BaseModel]) -> Optional[BaseModel]:
+        """Returns the recorded response for `key`, or None (raises `LLMCacheMiss` in replay mode)."""
+        with self._lock:
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT response FROM llm_responses WHERE cache_key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None:
+            if self.mode == "replay":
+                raise LLMCacheMiss(
+                    f"No recorded {output_model.__name__} response for prompt key {key} in {self.db_path}. "
+                    "Re-record with LLM_CACHE_MODE=record."
+                )
+            return None
+        return output_model.model_validate_json(row[0])
+
+    def put(self, key: str, model_name: str, response: BaseModel):
+        """Stores a response (record mode only)."""
+        if self.mode != "record":
+            return
+        with self._lock:
+            if self._db is None: # Closed by configure_llm_cache
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_responses (cache_key, model_name, output_model, response) VALUES (?, ?, ?, ?)",
+                (key, model_name, type(response).__name__, response.model_dump_json())
+            )
+            self._db.commit()
+
+    def reset_occurrences(self):
+        """Resets the process-wide occurrence counters used outside `sampling_scope`."""
+        with self._lock:
+            self._occurrences.clear()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+# --- Shared Cache ---
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+def _cache_from_settings(mode: Optional[str], db_path: Optional[str | Path]) -> LLMResponseCache:
+    mode = mode or os.getenv("LLM_CACHE_MODE") or "passthrough"
+    db_path = db_path or os.getenv("LLM_CACHE_PATH") or DEFAULT_LLM_CACHE_PATH
+    logging.info(f"LLM response cache mode: {mode}" + (f" ({db_path})" if mode != "passthrough" else ""))
+    return LLMResponseCache(db_path, mode)
+
+def configure_llm_cache(mode: Optional[str] = None, db_path: Optional[str | Path] = None) -> LLMResponseCache:
+    """Replaces the shared cache. Arguments default to LLM_CACHE_MODE / LLM_CACHE_PATH."""
+    global _llm_cache
+    cache = _cache_from_settings(mode, db_path)
+    with _llm_cache_lock:
+        previous, _llm_cache = _llm_cache, cache
+    if previous is not None:
+        previous.close()
+    return cache
+
+def get_llm_cache() -> LLMResponseCache:
+    """Returns the shared cache, configured from the environment on first use."""
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = _cache_from_settings(None, None)
+    return _llm_cache
+# --- End Shared Cache ---
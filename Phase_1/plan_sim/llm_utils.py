@@ -1,26 +1,209 @@
+import json
 import logging
-from typing import Type, TypeVar
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Optional, Type, TypeVar
 from pydantic import BaseModel
-from langchain_openai import ChatOpenAI
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from plan_sim.llm_cache import get_llm_cache
+
+if TYPE_CHECKING:
+    import httpx
+    from langchain_core.rate_limiters import BaseRateLimiter
+    from langchain_core.runnables import Runnable
 
 # Type variable for structured output models
 T = TypeVar('T', bound=BaseModel)
 
-def invoke_structured_llm(model_name: str, temperature: float, prompt: str, output_model: Type[T], model_kwargs: dict | None = None) -> T:
-    """Invokes an OpenAI model with structured output parsing."""
-    model = ChatOpenAI(
-        model=model_name,
-        temperature=temperature,
-        model_kwargs=model_kwargs or {}
+# Constants
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "4")) # Total tries per call, including the first
+LLM_RETRY_INITIAL_WAIT = 1.0 # Seconds before the first retry; doubles (with jitter) after that
+LLM_RETRY_MAX_WAIT = 30.0
+LLM_RETRY_JITTER = 1.0 # Max random seconds added to each wait
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0")) # 0 = unlimited
+
+# --- Shared Clients ---
+# One httpx client (connection pool) is shared by every ChatOpenAI instance, and
+# one structured-output runnable is built per (model, temperature, kwargs, schema).
+_http_client: Optional["httpx.Client"] = None
+_structured_llms: dict[tuple, "Runnable"] = {}
+_clients_lock = threading.Lock()
+
+def _get_http_client() -> "httpx.Client":
+    global _http_client
+    if _http_client is None:
+        with _clients_lock:
+            if _http_client is None:
+                import httpx
+                _http_client = httpx.Client(
+                    limits=httpx.Limits(max_connections=LLM_HTTP_MAX_CONNECTIONS, max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS),
+                    timeout=LLM_REQUEST_TIMEOUT
+                )
+    return _http_client
+
+def _runnable_key(model_name: str, temperature: float, output_model: Type[BaseModel], model_kwargs: dict | None) -> tuple:
+    return (model_name, float(temperature), json.dumps(model_kwargs or {}, sort_keys=True, default=str), output_model)
+
+def get_structured_llm(model_name: str, temperature: float, output_model: Type[T], model_kwargs: dict | None = None) -> "Runnable":
+    """Returns a cached ChatOpenAI structured-output runnable for these settings.
+
+    The runnable is built with `include_raw=True`, so invoking it returns a dict
+    with the raw AIMessage (for token usage) alongside the parsed model. Retries
+    are handled by `invoke_structured_llm`, so the OpenAI client's own retries
+    are disabled.
+    """
+    key = _runnable_key(model_name, temperature, output_model, model_kwargs)
+    runnable = _structured_llms.get(key)
+    if runnable is None:
+        http_client = _get_http_client()
+        with _clients_lock:
+            runnable = _structured_llms.get(key)
+            if runnable is None:
+                from langchain_openai import ChatOpenAI # Deferred: keeps importing plan_sim cheap
+                model = ChatOpenAI(
+                    model=model_name,
+                    temperature=temperature,
+                    model_kwargs=model_kwargs or {},
+                    http_client=http_client,
+                    max_retries=0
+                )
+                runnable = _structured_llms[key] = model.with_structured_output(output_model, include_raw=True)
+                logging.debug(f"Created structured LLM for {model_name} -> {output_model.__name__}")
+    return runnable
+
+def reset_llm_clients():
+    """Drops cached runnables and closes the shared HTTP client."""
+    global _http_client
+    with _clients_lock:
+        _structured_llms.clear()
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
+# --- End Shared Clients ---
+
+# --- Rate Limiting ---
+# One limiter is shared by every thread, so concurrent rollouts together stay
+# under the API's request rate. Cache hits do not count against it.
+_rate_limiter: Optional["BaseRateLimiter"] = None
+_rate_limiter_configured = False
+
+def set_llm_rate_limit(requests_per_minute: Optional[float]):
+    """Caps outgoing LLM requests across all threads; None or 0 removes the cap."""
+    global _rate_limiter, _rate_limiter_configured
+    limiter = None
+    if requests_per_minute:
+        from langchain_core.rate_limiters import InMemoryRateLimiter
+        limiter = InMemoryRateLimiter(
+            requests_per_second=requests_per_minute / 60,
+            check_every_n_seconds=0.05,
+            max_bucket_size=max(1.0, requests_per_minute / 60) # Allow up to one second of burst
+        )
+    with _clients_lock:
+        _rate_limiter = limiter
+        _rate_limiter_configured = True
+
+def _get_rate_limiter() -> Optional["BaseRateLimiter"]:
+    if not _rate_limiter_configured:
+        set_llm_rate_limit(LLM_REQUESTS_PER_MINUTE)
+    return _rate_limiter
+# --- End Rate Limiting ---
+
+# --- Retry Policy ---
+def _is_retryable(exc: BaseException) -> bool:
+    """Transient OpenAI failures: connection errors, timeouts, rate limits and 5xx responses."""
+    import openai
+    return isinstance(exc, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError))
+
+def _log_retry(retry_state):
+    logging.warning(
+        f"LLM call failed ({retry_state.outcome.exception()!r}); "
+        f"retrying in {retry_state.next_action.sleep:.1f}s (attempt {retry_state.attempt_number}/{LLM_MAX_ATTEMPTS})."
+    )
+
+def _retrying() -> Retrying:
+    return Retrying(
+        stop=stop_after_attempt(LLM_MAX_ATTEMPTS),
+        wait=wait_exponential_jitter(initial=LLM_RETRY_INITIAL_WAIT, max=LLM_RETRY_MAX_WAIT, jitter=LLM_RETRY_JITTER),
+        retry=retry_if_exception(_is_retryable),
+        before_sleep=_log_retry,
+        reraise=True
     )
-    structured_llm = model.with_structured_output(output_model)
+# --- End Retry Policy ---
+
+# --- Instrumentation ---
+# Aggregated per output model name: calls, retries, latency and token counts.
+_call_stats: dict[str, dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+def _record_call(output_model: Type[BaseModel], latency: float, attempts: int, usage: dict[str, Any] | None):
+    usage = usage or {}
+    with _stats_lock:
+        stats = _call_stats.setdefault(output_model.__name__, {
+            "calls": 0, "retries": 0, "latency_s": 0.0, "input_tokens": 0, "output_tokens": 0
+        })
+        stats["calls"] += 1
+        stats["retries"] += attempts - 1
+        stats["latency_s"] += latency
+        stats["input_tokens"] += usage.get("input_tokens", 0)
+        stats["output_tokens"] += usage.get("output_tokens", 0)
+
+def get_llm_call_stats() -> dict[str, dict[str, float]]:
+    """Returns a copy of the per-output-model call statistics."""
+    with _stats_lock:
+        return {name: dict(stats) for name, stats in _call_stats.items()}
+
+def reset_llm_call_stats():
+    with _stats_lock:
+        _call_stats.clear()
+# --- End Instrumentation ---
+
+def invoke_structured_llm(model_name: str, temperature: float, prompt: str, output_model: Type[T], model_kwargs: dict | None = None) -> T:
+    """Invokes an OpenAI model with structured output parsing.
+
+    Responses are served from / recorded to the LLM response cache according to
+    LLM_CACHE_MODE (see `plan_sim.llm_cache`). Requests (including retries)
+    wait for the shared rate limiter (see `set_llm_rate_limit`). Transient API
+    errors are retried with exponential backoff; latency, retries and token
+    usage are recorded (see `get_llm_call_stats`).
+    """
+    llm_cache = get_llm_cache()
+    cache_key = None
+    if llm_cache.mode != "passthrough":
+        cache_key = llm_cache.entry_key(model_name, temperature, prompt, output_model, model_kwargs)
+        cached = llm_cache.get(cache_key, output_model) # Raises LLMCacheMiss in replay mode
+        if cached is not None:
+            logging.debug(f"Replayed cached {output_model.__name__} response for {model_name}.")
+            return cached
+
+    structured_llm = get_structured_llm(model_name, temperature, output_model, model_kwargs)
+    rate_limiter = _get_rate_limiter()
+    attempts = 0
+    start = time.perf_counter()
     try:
-        # TODO: Add retry logic here using tenacity if needed
         logging.debug(f"Invoking {model_name} with structured output {output_model.__name__}")
-        result = structured_llm.invoke(prompt)
-        logging.debug(f"Successfully received structured output from {model_name}.")
+        for attempt in _retrying():
+            with attempt:
+                attempts = attempt.retry_state.attempt_number
+                if rate_limiter is not None:
+                    rate_limiter.acquire(blocking=True)
+                response = structured_llm.invoke(prompt)
+        if response.get("parsing_error") is not None:
+            raise response["parsing_error"]
+        result = response["parsed"]
+        usage = getattr(response.get("raw"), "usage_metadata", None)
+        latency = time.perf_counter() - start
+        _record_call(output_model, latency, attempts, usage)
+        if cache_key is not None:
+            llm_cache.put(cache_key, model_name, result)
+        logging.debug(
+            f"Successfully received structured output from {model_name} in {latency:.2f}s "
+            f"({attempts} attempt(s), tokens: {usage or 'n/a'})."
+        )
         return result
     except Exception as e:
         logging.error(f"Error invoking LLM {model_name} for structured output {output_model.__name__}: {e}", exc_info=True)
         # Re-raise the exception to be handled by the calling node/graph logic
-        raise e 
\ No newline at end of file
+        raise e
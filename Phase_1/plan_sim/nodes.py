@@ -1,15 +1,16 @@
 import logging
-from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
 from plan_sim.config import Config
-from plan_sim.states import InputState, NextStep, Assumptions, Plan, Outcome
+from plan_sim.states import InputState, NextStep, NextStepCandidates, Assumptions, Plan, Outcome, PromptUsage
 from plan_sim.prompts import (GENERATE_IDEA, DECIDE_RESULT, PREDICT_OUTCOME_WORKS,
-                              GOAL_STATE_CHECK, PREDICT_OUTCOME_FAILS, ABANDON_STATE_CHECK, SUMMARY_PROMPT)
+                              GOAL_STATE_CHECK, PREDICT_OUTCOME_FAILS, ABANDON_STATE_CHECK, SUMMARY_PROMPT,
+                              GENERATE_IDEA_CANDIDATES, SUMMARY_DELTA_PROMPT, SUMMARY_MAX_ITEMS)
 from typing import Literal
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END
-from plan_sim.vector_store import is_idea_novel, store_idea
+from plan_sim.vector_store import embed_idea, embed_ideas, is_vector_novel, select_novel_candidate, store_idea_vector
 from plan_sim.llm_utils import invoke_structured_llm
+from plan_sim.prompt_budget import fit_prompt
 
 # --- Logging Setup ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,7 +20,8 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 MAX_IDEA_RETRIES = 5
 RECENT_STEPS_CONTEXT = 3
 RECENT_TRUTHS_CONTEXT = 2
-MIN_ASSUMPTIONS_FOR_SUMMARY = 3 # Summarize if > 2 truths or > 2 vulnerabilities
+MIN_ASSUMPTIONS_FOR_SUMMARY = 3 # Summarize once > 2 truths or > 2 vulnerabilities were added since the last summary
+SUMMARY_CORE_MAX_ITEMS = 12 # Per list; a larger summarized core is compacted
 
 def _get_current_assumptions(state: Plan) -> Assumptions:
     """Extracts the most current cumulative or initial assumptions from the state."""
@@ -30,6 +32,13 @@ def _get_current_assumptions(state: Plan) -> Assumptions:
     else:
         return Assumptions(ground_truth=[], vulnerabilities=[])
 
+def _format_prompt(template: str, configurable: Config, trimmable: dict | None = None, **fields) -> tuple[str, int]:
+    """Formats a prompt within the configured token budget (see `fit_prompt`)."""
+    return fit_prompt(template, int(configurable.prompt_token_budget), configurable.thinking_model, trimmable, **fields)
+
+def _bullets(items) -> list[str]:
+    return [f"- {item}" for item in items]
+
 def _get_recent_context(state: Plan) -> tuple[list[str], str, str]:
     """Extracts recent steps and truths for context in checks."""
     # Get last N steps
@@ -48,52 +57,26 @@ def _get_recent_context(state: Plan) -> tuple[list[str], str, str]:
     
     return recent_steps_data, steps_str, truths_str
 
-def generate_next_idea(State: Plan, config: RunnableConfig) -> Plan:
-    """
-    Generate next idea using OpenAI API and check for novelty using vector store.
-    Retries up to MAX_IDEA_RETRIES times if similar ideas are generated.
-    """
-    configurable = Config.from_runnable_config(config)
-    input_state = State.input_state[-1]
-    
-    # Initialize/get cumulative_assumptions - Use helper
-    cumulative_assumptions = _get_current_assumptions(State) 
-    
-    ground_truth = cumulative_assumptions.ground_truth
-    vulnerabilities = cumulative_assumptions.vulnerabilities
-    
-    # Compile list of previous ideas for prompt context
-    previous_ideas = [step.idea for step in State.steps] if State.steps else []
-    ideas_str = "\n".join(f"- {idea}" for idea in previous_ideas)
-    
-    # Format the prompt
-    formatted_prompt = GENERATE_IDEA.format(
-        topic=configurable.topic,
-        ground_truth=", ".join(ground_truth),
-        vulnerabilities=", ".join(vulnerabilities),
-        ideas=ideas_str,
-        goal=input_state.goal,
-        metric_count_1=State.metric_count_1,
-        metric_count_2=State.metric_count_2
-    )
-    
+def _generate_idea_with_retries(formatted_prompt: str, model_name: str, step_number: int, namespace: str | None = None) -> tuple[NextStep, list[float], bool]:
+    """Generates one idea per LLM call until a novel one is found or MAX_IDEA_RETRIES is hit."""
     retries = 0
     next_step = None 
+    idea_vector = None
     idea_is_novel = False
 
     while retries < MAX_IDEA_RETRIES:
         # Use llm_utils function
         next_step = invoke_structured_llm(
-            model_name=configurable.thinking_model,
+            model_name=model_name,
             temperature=0.8,
             prompt=formatted_prompt,
             output_model=NextStep,
             model_kwargs={"top_p": 0.1}
         )
-        step_number = len(State.steps) + 1
         
-        # Use vector_store function
-        idea_is_novel = is_idea_novel(next_step.idea, step_number) # Use default threshold
+        # Embed once: the same vector is used for the novelty check and for storage
+        idea_vector = embed_idea(next_step.idea)
+        idea_is_novel = is_vector_novel(idea_vector, step_number, namespace=namespace) # Use default threshold
         if idea_is_novel:
             logging.info(f"Generated novel idea for step {step_number}.")
             break 
@@ -107,13 +90,79 @@ def generate_next_idea(State: Plan, config: RunnableConfig) -> Plan:
     if next_step is None: 
         logging.error("Failed to generate any idea after max retries.")
         raise ValueError("Failed to generate any idea.") 
+    return next_step, idea_vector, idea_is_novel
+
+def _generate_idea_candidates(formatted_prompt: str, model_name: str, step_number: int, num_candidates: int, namespace: str | None = None) -> tuple[NextStep, list[float], bool]:
+    """Requests several ideas in one LLM call, embeds them in one batch and keeps the most novel.
+
+    `formatted_prompt` must already include the GENERATE_IDEA_CANDIDATES suffix.
+    """
+    response = invoke_structured_llm(
+        model_name=model_name,
+        temperature=0.8,
+        prompt=formatted_prompt,
+        output_model=NextStepCandidates,
+        model_kwargs={"top_p": 0.1}
+    )
+    candidates = response.candidates[:num_candidates]
+    if not candidates:
+        logging.error("LLM returned no idea candidates.")
+        raise ValueError("Failed to generate any idea.")
+
+    candidate_vectors = embed_ideas([candidate.idea for candidate in candidates])
+    chosen, num_usable = select_novel_candidate(candidate_vectors, step_number, namespace=namespace)
+    logging.info(f"{num_usable}/{len(candidates)} idea candidates for step {step_number} are novel and distinct.")
+    if not num_usable:
+        logging.warning(f"No novel candidate for step {step_number}. Proceeding with the least similar one.")
+    return candidates[chosen], candidate_vectors[chosen], num_usable > 0
+
+def generate_next_idea(State: Plan, config: RunnableConfig) -> Plan:
+    """
+    Generate next idea using OpenAI API and check for novelty using vector store.
+    Retries up to MAX_IDEA_RETRIES times if similar ideas are generated, or, when
+    the `idea_candidates` config is above 1, generates that many candidates in a
+    single call and keeps the most novel one.
+    """
+    configurable = Config.from_runnable_config(config)
+    input_state = State.input_state[-1]
+    
+    # Initialize/get cumulative_assumptions - Use helper
+    cumulative_assumptions = _get_current_assumptions(State) 
+    
+    ground_truth = cumulative_assumptions.ground_truth
+    vulnerabilities = cumulative_assumptions.vulnerabilities
+    
+    # Compile list of previous ideas for prompt context
+    previous_ideas = _bullets(step.idea for step in State.steps)
+    
+    step_number = len(State.steps) + 1
+    num_candidates = int(configurable.idea_candidates)
+    # Format the prompt; the oldest ideas and assumptions are dropped if it exceeds the token budget
+    formatted_prompt, prompt_tokens = _format_prompt(
+        GENERATE_IDEA + GENERATE_IDEA_CANDIDATES if num_candidates > 1 else GENERATE_IDEA,
+        configurable,
+        trimmable={"ideas": (previous_ideas, "\n"), "ground_truth": (ground_truth, ", "), "vulnerabilities": (vulnerabilities, ", ")},
+        topic=configurable.topic,
+        goal=input_state.goal,
+        metric_count_1=State.metric_count_1,
+        metric_count_2=State.metric_count_2,
+        num_candidates=num_candidates
+    )
+    
+    if num_candidates > 1:
+        next_step, idea_vector, idea_is_novel = _generate_idea_candidates(
+            formatted_prompt, configurable.thinking_model, step_number, num_candidates, configurable.novelty_namespace
+        )
+    else:
+        next_step, idea_vector, idea_is_novel = _generate_idea_with_retries(
+            formatted_prompt, configurable.thinking_model, step_number, configurable.novelty_namespace
+        )
 
     # Store the final idea in Qdrant using vector_store function
     # Only store if novel, or if max retries reached (log warning in that case)
-    step_number = len(State.steps) + 1 # Recalculate in case needed
-    store_idea(next_step.idea, step_number)
+    store_idea_vector(next_step.idea, idea_vector, step_number, configurable.novelty_namespace)
     if not idea_is_novel: 
-        logging.warning(f"Stored idea for step {step_number} might be similar to existing ones (max retries hit)." )
+        logging.warning(f"Stored idea for step {step_number} might be similar to existing ones (no novel idea found)." )
    
     # Return the updated state
     # Return cumulative_assumptions only if it was potentially updated (though this node doesn't seem to update it)
@@ -122,7 +171,8 @@ def generate_next_idea(State: Plan, config: RunnableConfig) -> Plan:
 
     return {
         "steps": next_step, 
-        "cumulative_assumptions": current_cumulative # Return the one used/initialized
+        "cumulative_assumptions": current_cumulative, # Return the one used/initialized
+        "prompt_tokens": PromptUsage(step=step_number, node="generate_next_idea", tokens=prompt_tokens)
     }
 
 class Decider(BaseModel):
@@ -136,9 +186,11 @@ def decider(State: Plan, config: RunnableConfig) -> Plan:
     current_assumptions = _get_current_assumptions(State)
     current_truths = current_assumptions.ground_truth
     
-    formatted_prompt = DECIDE_RESULT.format(
+    formatted_prompt, prompt_tokens = _format_prompt(
+        DECIDE_RESULT,
+        configurable,
+        trimmable={"ground_truth": (current_truths, ", ")},
         topic=configurable.topic,
-        ground_truth=", ".join(current_truths), # Use current_truths
         metric_count_1=State.metric_count_1,
         metric_count_2=State.metric_count_2,
         next_step=State.steps[-1].model_dump()
@@ -150,7 +202,8 @@ def decider(State: Plan, config: RunnableConfig) -> Plan:
         prompt=formatted_prompt,
         output_model=Decider
     )
-    return {"step_results": [decision_output.decision]}
+    return {"step_results": [decision_output.decision],
+            "prompt_tokens": PromptUsage(step=len(State.steps), node="decider", tokens=prompt_tokens)}
 
 def route_result(state: Plan) -> Literal["generate_good_outcome", "generate_bad_outcome"]:
     last_result = state.step_results[-1] 
@@ -166,10 +219,11 @@ def generate_good_outcome(state: Plan, config: RunnableConfig) -> Plan:
     current_truths = current_assumptions.ground_truth
     current_vulnerabilities = current_assumptions.vulnerabilities
     
-    formatted_prompt = PREDICT_OUTCOME_WORKS.format(
+    formatted_prompt, prompt_tokens = _format_prompt(
+        PREDICT_OUTCOME_WORKS,
+        configurable,
+        trimmable={"ground_truth": (current_truths, ", "), "vulnerabilities": (current_vulnerabilities, ", ")},
         topic=configurable.topic,
-        ground_truth=", ".join(current_truths), 
-        vulnerabilities=", ".join(current_vulnerabilities), 
         idea=state.steps[-1].idea,
         assumptions=", ".join(state.steps[-1].assumptions),
         metric_count_1=state.metric_count_1,
@@ -185,13 +239,14 @@ def generate_good_outcome(state: Plan, config: RunnableConfig) -> Plan:
     updated_truths = current_truths + outcome.new_truths
     updated_vulnerabilities = current_vulnerabilities + outcome.new_vulnerabilities
 
-    return {"outcomes": state.outcomes + [outcome] if state.outcomes else [outcome],
+    return {"outcomes": outcome, # Appended by the safe_append reducer
             "cumulative_assumptions": Assumptions(
                 ground_truth=updated_truths,
                 vulnerabilities=updated_vulnerabilities
             ),
             "metric_count_1": state.metric_count_1 - outcome.cost_increment,
-            "metric_count_2": state.metric_count_2 - outcome.time_increment
+            "metric_count_2": state.metric_count_2 - outcome.time_increment,
+            "prompt_tokens": PromptUsage(step=len(state.steps), node="generate_good_outcome", tokens=prompt_tokens)
             }
 
 def generate_bad_outcome(state: Plan, config: RunnableConfig) -> Plan:
@@ -202,10 +257,11 @@ def generate_bad_outcome(state: Plan, config: RunnableConfig) -> Plan:
     current_truths = current_assumptions.ground_truth
     current_vulnerabilities = current_assumptions.vulnerabilities
     
-    formatted_prompt = PREDICT_OUTCOME_FAILS.format(
+    formatted_prompt, prompt_tokens = _format_prompt(
+        PREDICT_OUTCOME_FAILS,
+        configurable,
+        trimmable={"ground_truth": (current_truths, ", "), "vulnerabilities": (current_vulnerabilities, ", ")},
         topic=configurable.topic,
-        ground_truth=", ".join(current_truths), 
-        vulnerabilities=", ".join(current_vulnerabilities), 
         idea=state.steps[-1].idea,
         assumptions=", ".join(state.steps[-1].assumptions),
         metric_count_1=state.metric_count_1,
@@ -221,13 +277,14 @@ def generate_bad_outcome(state: Plan, config: RunnableConfig) -> Plan:
     updated_truths = current_truths + outcome.new_truths
     updated_vulnerabilities = current_vulnerabilities + outcome.new_vulnerabilities
 
-    return {"outcomes": state.outcomes + [outcome] if state.outcomes else [outcome],
+    return {"outcomes": outcome, # Appended by the safe_append reducer
             "cumulative_assumptions": Assumptions(
                  ground_truth=updated_truths,
                  vulnerabilities=updated_vulnerabilities
             ),
             "metric_count_1": state.metric_count_1 - outcome.cost_increment,
-            "metric_count_2": state.metric_count_2 - outcome.time_increment
+            "metric_count_2": state.metric_count_2 - outcome.time_increment,
+            "prompt_tokens": PromptUsage(step=len(state.steps), node="generate_bad_outcome", tokens=prompt_tokens)
             }
 
 class GoalChecker(BaseModel):
@@ -240,7 +297,9 @@ def goal_check(State: Plan, config: RunnableConfig) -> Plan:
     _, steps_str, truths_str = _get_recent_context(State)
     goal_assumptions_str = ", ".join(State.goal_state.assumptions.ground_truth)
     
-    formatted_prompt = GOAL_STATE_CHECK.format(
+    formatted_prompt, prompt_tokens = _format_prompt(
+        GOAL_STATE_CHECK,
+        configurable,
         steps=steps_str,
         truths=truths_str,
         goal=State.input_state[-1].goal, 
@@ -253,7 +312,8 @@ def goal_check(State: Plan, config: RunnableConfig) -> Plan:
         prompt=formatted_prompt,
         output_model=GoalChecker
     )
-    return {"step_results": [goal_status.achieved]}
+    return {"step_results": [goal_status.achieved],
+            "prompt_tokens": PromptUsage(step=len(State.steps), node="goal_check", tokens=prompt_tokens)}
 
 def route_goal_check(state: Plan) -> Literal["summarize_assumptions", END]:
     last_result = state.step_results[-1] 
@@ -271,7 +331,9 @@ def abandon_check(State: Plan, config: RunnableConfig) -> Plan:
     _, steps_str, truths_str = _get_recent_context(State)
     goal_assumptions_str = ", ".join(State.goal_state.assumptions.ground_truth)
     
-    formatted_prompt = ABANDON_STATE_CHECK.format(
+    formatted_prompt, prompt_tokens = _format_prompt(
+        ABANDON_STATE_CHECK,
+        configurable,
         steps=steps_str,
         truths=truths_str,
         goal=State.input_state[-1].goal, 
@@ -286,7 +348,8 @@ def abandon_check(State: Plan, config: RunnableConfig) -> Plan:
         prompt=formatted_prompt,
         output_model=AbandonChecker
     )
-    return {"step_results": [abandon_status.abandon]}
+    return {"step_results": [abandon_status.abandon],
+            "prompt_tokens": PromptUsage(step=len(State.steps), node="abandon_check", tokens=prompt_tokens)}
 
 def route_abandon_check(state: Plan) -> Literal["summarize_assumptions", END]:
     last_result = state.step_results[-1] 
@@ -294,33 +357,92 @@ def route_abandon_check(state: Plan) -> Literal["summarize_assumptions", END]:
         return "summarize_assumptions"
     return END
 
+def _log_step_prompt_tokens(state: Plan, step_number: int, usage: list[PromptUsage]):
+    """Logs the prompt tokens sent during this step (the records are at the end of the log)."""
+    tokens = sum(record.tokens for record in usage)
+    for index in range(len(state.prompt_tokens) - 1, -1, -1):
+        if state.prompt_tokens[index].step != step_number:
+            break
+        tokens += state.prompt_tokens[index].tokens
+    logging.info(f"Step {step_number} prompt tokens: {tokens}.")
+
 def summarize_assumptions(state: Plan, config: RunnableConfig) -> Plan:
-    """Summarizes cumulative assumptions if they are numerous enough."""
+    """Folds the assumptions added since the last summary into a rolling summary.
+
+    The cumulative assumptions are a summarized core (the first `summarized_truths`
+    / `summarized_vulnerabilities` items) followed by the unsummarized delta. Once
+    the delta is large enough, only the delta is condensed, with the core given
+    as read-only context, and appended to the core. A core that grows past
+    SUMMARY_CORE_MAX_ITEMS is compacted with a full summary.
+    """
     configurable = Config.from_runnable_config(config)
     # Use helper to get current assumptions
     current_assumptions = _get_current_assumptions(state)
-    ground_truth = current_assumptions.ground_truth
-    vulnerabilities = current_assumptions.vulnerabilities
+    core_truths = current_assumptions.ground_truth[:state.summarized_truths]
+    core_vulnerabilities = current_assumptions.vulnerabilities[:state.summarized_vulnerabilities]
+    new_truths = current_assumptions.ground_truth[state.summarized_truths:]
+    new_vulnerabilities = current_assumptions.vulnerabilities[state.summarized_vulnerabilities:]
+    step_number = len(state.steps)
 
-    if len(ground_truth) < MIN_ASSUMPTIONS_FOR_SUMMARY and len(vulnerabilities) < MIN_ASSUMPTIONS_FOR_SUMMARY:
+    if len(new_truths) < MIN_ASSUMPTIONS_FOR_SUMMARY and len(new_vulnerabilities) < MIN_ASSUMPTIONS_FOR_SUMMARY:
+        _log_step_prompt_tokens(state, step_number, [])
         return {"cumulative_assumptions": current_assumptions}
 
     last_step_idea = state.steps[-1].idea if state.steps else "No steps taken yet."
+    usage = []
 
-    formatted_prompt = SUMMARY_PROMPT.format(
+    formatted_prompt, prompt_tokens = _format_prompt(
+        SUMMARY_DELTA_PROMPT,
+        configurable,
+        trimmable={
+            "core_ground_truth": (_bullets(core_truths), "\n"),
+            "core_vulnerabilities": (_bullets(core_vulnerabilities), "\n"),
+            "ground_truth": (_bullets(new_truths), "\n"),
+            "vulnerabilities": (_bullets(new_vulnerabilities), "\n"),
+        },
         topic=configurable.topic,
-        ground_truth="\n".join(f"- {truth}" for truth in ground_truth),
-        vulnerabilities="\n".join(f"- {vuln}" for vuln in vulnerabilities),
         metric_count_1=state.metric_count_1, 
         metric_count_2=state.metric_count_2,
         last_steps=last_step_idea 
     )
+    usage.append(PromptUsage(step=step_number, node="summarize_assumptions", tokens=prompt_tokens))
     # Use llm_utils function
-    summarized_assumptions = invoke_structured_llm(
+    condensed = invoke_structured_llm(
         model_name=configurable.thinking_model,
         temperature=0,
         prompt=formatted_prompt,
         output_model=Assumptions 
     )
-    return {"cumulative_assumptions": summarized_assumptions}
-    
\ No newline at end of file
+    ground_truth = core_truths + list(condensed.ground_truth)
+    vulnerabilities = core_vulnerabilities + list(condensed.vulnerabilities)
+
+    if len(ground_truth) > SUMMARY_CORE_MAX_ITEMS or len(vulnerabilities) > SUMMARY_CORE_MAX_ITEMS:
+        logging.info(f"Summarized core has {len(ground_truth)} truths and {len(vulnerabilities)} vulnerabilities; compacting.")
+        formatted_prompt, prompt_tokens = _format_prompt(
+            SUMMARY_PROMPT + SUMMARY_MAX_ITEMS,
+            configurable,
+            trimmable={"ground_truth": (_bullets(ground_truth), "\n"), "vulnerabilities": (_bullets(vulnerabilities), "\n")},
+            topic=configurable.topic,
+            metric_count_1=state.metric_count_1, 
+            metric_count_2=state.metric_count_2,
+            last_steps=last_step_idea,
+            max_items=SUMMARY_CORE_MAX_ITEMS
+        )
+        usage.append(PromptUsage(step=step_number, node="summarize_assumptions", tokens=prompt_tokens))
+        compacted = invoke_structured_llm(
+            model_name=configurable.thinking_model,
+            temperature=0,
+            prompt=formatted_prompt,
+            output_model=Assumptions 
+        )
+        # Enforce the cap even if the model returns more
+        ground_truth = list(compacted.ground_truth)[-SUMMARY_CORE_MAX_ITEMS:]
+        vulnerabilities = list(compacted.vulnerabilities)[-SUMMARY_CORE_MAX_ITEMS:]
+
+    _log_step_prompt_tokens(state, step_number, usage)
+    return {
+        "cumulative_assumptions": Assumptions(ground_truth=ground_truth, vulnerabilities=vulnerabilities),
+        "summarized_truths": len(ground_truth),
+        "summarized_vulnerabilities": len(vulnerabilities),
+        "prompt_tokens": usage
+    }
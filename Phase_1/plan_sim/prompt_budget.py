@@ -0,0 +1,110 @@
+import logging
+import math
+import threading
+from functools import lru_cache
+from typing import Any, Iterable, Sequence
+
+# Constants
+FALLBACK_ENCODING = "o200k_base" # gpt-4o family
+CHARS_PER_TOKEN = 4 # Estimate used when no tokenizer is available
+TOKEN_COUNT_CACHE_SIZE = 8192 # Context items (ideas, truths) are re-counted every step
+
+# --- Tokenizer ---
+_encodings: dict[str, Any] = {}
+_encodings_lock = threading.Lock()
+
+def _get_encoding(model_name: str):
+    """Returns the tiktoken encoding for `model_name`, or None if it cannot be loaded (e.g. offline)."""
+    if model_name not in _encodings:
+        with _encodings_lock:
+            if model_name not in _encodings:
+                encoding = None
+                try:
+                    import tiktoken # Deferred: loading an encoding is slow
+                    try:
+                        encoding = tiktoken.encoding_for_model(model_name)
+                    except KeyError:
+                        encoding = tiktoken.get_encoding(FALLBACK_ENCODING)
+                except Exception as e:
+                    logging.warning(f"No tokenizer available for {model_name} ({e!r}); estimating {CHARS_PER_TOKEN} characters per token.")
+                _encodings[model_name] = encoding
+    return _encodings[model_name]
+
+def _count_tokens(text: str, model_name: str) -> int:
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+@lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)
+def count_tokens(text: str, model_name: str) -> int:
+    """Number of tokens in `text` for `model_name` (estimated if no tokenizer is available).
+
+    Memoized: meant for short context items, which recur in every step's prompts.
+    """
+    return _count_tokens(text, model_name)
+# --- End Tokenizer ---
+
+def fit_prompt(
+    template: str,
+    max_tokens: int,
+    model_name: str,
+    trimmable: dict[str, tuple[Sequence[str], str]] | None = None,
+    **fields: Any
+) -> tuple[str, int]:
+    """Formats `template`, dropping the oldest context items until it fits in `max_tokens`.
+
+    Args:
+        template: A prompt template from `plan_sim.prompts`.
+        max_tokens: Token budget for the formatted prompt.
+        model_name: Model whose tokenizer is used for counting.
+        trimmable: Template field -> (items, separator). Each field is rendered as
+            `separator.join(items)`; when over budget, the oldest item of the
+            field currently using the most tokens is dropped first.
+        **fields: The remaining template fields, always rendered in full.
+
+    Returns:
+        The formatted prompt and its token count. If the fixed part alone exceeds
+        the budget, the prompt is returned over budget with a warning.
+    """
+    trimmable = trimmable or {}
+    items = {name: list(values) for name, (values, _) in trimmable.items()}
+    separators = {name: separator for name, (_, separator) in trimmable.items()}
+    costs = {name: [count_tokens(item + separators[name], model_name) for item in values] for name, values in items.items()}
+    totals = {name: sum(field_costs) for name, field_costs in costs.items()}
+    first_kept = dict.fromkeys(items, 0)
+
+    def drop_oldest() -> bool:
+        name = max(totals, key=totals.get, default=None)
+        if name is None or first_kept[name] == len(items[name]):
+            return False
+        totals[name] -= costs[name][first_kept[name]]
+        first_kept[name] += 1
+        return True
+
+    def render() -> str:
+        return template.format(**fields, **{name: separators[name].join(values[first_kept[name]:]) for name, values in items.items()})
+
+    # Item counts are additive up to a token or two at the joins; the final count is exact
+    fixed_tokens = _count_tokens(template.format(**fields, **dict.fromkeys(items, "")), model_name)
+    while fixed_tokens + sum(totals.values()) > max_tokens and drop_oldest():
+        pass
+    prompt = render()
+    tokens = _count_tokens(prompt, model_name)
+    while tokens > max_tokens and drop_oldest():
+        prompt = render()
+        tokens = _count_tokens(prompt, model_name)
+
+    dropped = sum(first_kept.values())
+    if dropped:
+        logging.info(f"Prompt trimmed to {tokens}/{max_tokens} tokens by dropping the {dropped} oldest context item(s).")
+    if tokens > max_tokens:
+        logging.warning(f"Prompt uses {tokens} tokens, over the budget of {max_tokens}, with no context left to trim.")
+    return prompt, tokens
+
+def prompt_tokens_by_step(usage: Iterable) -> dict[int, int]:
+    """Totals `PromptUsage` records (e.g. `Plan.prompt_tokens`) per plan step."""
+    totals: dict[int, int] = {}
+    for record in usage:
+        totals[record.step] = totals.get(record.step, 0) + record.tokens
+    return totals
@@ -13,6 +13,39 @@ Given the concrete facts above and acknowledging that some factors remain uncert
 SUMMARY_PROMPT = """\nYou are an expert synthesizer tasked with distilling the planning context for a project in {topic}. Your goal is to produce a concise, fact-driven summary that eliminates redundancy and primes the system for generating unique, non-repetitive ideas.\nThe remaining budget and time are {metric_count_1} dollars and {metric_count_2} weeks.\nThe context is provided in two parts:\n- Ground Truths: Verified facts that are directly relevant to the plan.\n- Vulnerabilities: Potential weaknesses that could hinder success.\n\nInstructions:\n1. Consolidate and reframe the provided ground truths and vulnerabilities into a streamlined summary.\n2. Remove any overlapping or redundant details to ensure every point is distinct.\n3. Emphasize unique insights that will encourage innovative and novel idea generation.\n4. Ensure that the final summary is clear, comprehensive, and focused on actionable information.\n5. Eliminate elements that no longer apply to the current state of the plan, considering the last step taken.\n\nGROUND TRUTHS:\n{ground_truth}\n\nVULNERABILITIES:\n{vulnerabilities}\n\nLast step: {last_steps}\n\nPlease provide your final synthesized summary below.\n"""
 
 
+# Rolling summary: condenses only the assumptions added since the last summary
+SUMMARY_DELTA_PROMPT = """You are an expert synthesizer maintaining the planning context for a project in {topic}.
+The remaining budget and time are {metric_count_1} dollars and {metric_count_2} weeks.
+The context already contains this summarized core, which you must not repeat:
+
+SUMMARIZED GROUND TRUTHS:
+{core_ground_truth}
+
+SUMMARIZED VULNERABILITIES:
+{core_vulnerabilities}
+
+Since then, the last step ({last_steps}) added the following new elements:
+
+NEW GROUND TRUTHS:
+{ground_truth}
+
+NEW VULNERABILITIES:
+{vulnerabilities}
+
+Instructions:
+1. Condense the NEW elements into as few distinct, concrete points as possible.
+2. Drop new elements that are already covered by the summarized core.
+3. Keep every fact that matters for choosing the next step; do not invent anything.
+
+Return only the condensed new ground truths and vulnerabilities.
+"""
+
+# Appended to SUMMARY_PROMPT when the summarized core itself has grown too large
+SUMMARY_MAX_ITEMS = """
+Return at most {max_items} ground truths and at most {max_items} vulnerabilities, keeping the ones most relevant to the remaining work.
+"""
+
+
 # Goal state check prompt
 GOAL_STATE_CHECK = """You are evaluating the progress of a plan.
 
@@ -75,6 +108,13 @@ Idea: [Your actionable idea here]
 Assumptions: [A concise list of key assumptions here]
 """
 
+# Appended to GENERATE_IDEA when several candidates are requested in one call
+GENERATE_IDEA_CANDIDATES = """
+Instead of a single idea, propose {num_candidates} alternative candidates for the next step.
+Each candidate must satisfy every requirement above on its own, and the candidates must be clearly distinct from each other, not rewordings of one idea.
+Return each candidate with its own idea and its own list of assumptions.
+"""
+
 
 
 # Predict outcome prompt
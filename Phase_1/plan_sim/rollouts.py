@@ -0,0 +1,193 @@
+"""Monte-Carlo rollouts: many independent trajectories of the planning graph for one goal.
+
+Each rollout runs the compiled graph on its own copy of the initial plan, with its
+own `plan_id` and vector-store namespace, so ideas are only de-duplicated within
+a trajectory. Rollouts run concurrently on a thread pool (the work is dominated
+by waiting on the LLM API), and all of them share the rate limiter in
+`plan_sim.llm_utils`.
+
+Usage:
+    python -m plan_sim.rollouts --goal "Fix a leaky kitchen faucet." --topic Plumbing \\
+        --ground-truth "Basic plumbing tools are on hand." --rollouts 8 --budget 100 --time 1
+"""
+import argparse
+import logging
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
+from plan_sim.llm_cache import sampling_scope
+from plan_sim.states import Assumptions, InputState, Plan
+
+# Constants
+DEFAULT_RECURSION_LIMIT = 50
+GOAL_REACHED = "goal_reached"
+ABANDONED = "abandoned"
+STEP_LIMIT = "step_limit"
+ERROR = "error"
+
+@dataclass
+class RolloutResult:
+    """Outcome of one trajectory."""
+    plan_id: str
+    status: str # GOAL_REACHED, ABANDONED, STEP_LIMIT or ERROR
+    steps: int
+    metric_count_1: Optional[float]
+    metric_count_2: Optional[float]
+    elapsed_s: float
+    error: Optional[str] = None
+
+def _final_status(final_state: dict[str, Any]) -> str:
+    step_results = final_state.get("step_results") or []
+    if step_results and step_results[-1] == "yes":
+        return GOAL_REACHED
+    if step_results and step_results[-1] == "abandon":
+        return ABANDONED
+    return STEP_LIMIT
+
+def _run_one(graph, initial_plan: Plan, plan_id: str, index: int, configurable: dict[str, Any], recursion_limit: int) -> RolloutResult:
+    from langgraph.errors import GraphRecursionError
+    plan = initial_plan.model_copy(update={"plan_id": plan_id})
+    config = {
+        "recursion_limit": recursion_limit,
+        "configurable": {**configurable, "run_id": plan_id, "novelty_namespace": plan_id}
+    }
+    start = time.perf_counter()
+    last_state: dict[str, Any] = {}
+    try:
+        # Rollout i records and replays its own sampled responses, whatever the thread interleaving
+        with sampling_scope(f"rollout-{index}"):
+            # stream_mode="values" keeps the latest full state, even if the step limit is hit
+            for last_state in graph.stream(plan.model_dump(), config=config, stream_mode="values"):
+                pass
+        status, error = _final_status(last_state), None
+    except GraphRecursionError:
+        status, error = STEP_LIMIT, None
+    except Exception as e:
+        logging.error(f"Rollout {plan_id} failed: {e}", exc_info=True)
+        status, error = ERROR, str(e)
+    return RolloutResult(
+        plan_id=plan_id,
+        status=status,
+        steps=len(last_state.get("steps") or []),
+        metric_count_1=last_state.get("metric_count_1"),
+        metric_count_2=last_state.get("metric_count_2"),
+        elapsed_s=time.perf_counter() - start,
+        error=error
+    )
+
+def run_rollouts(
+    initial_plan: Plan,
+    num_rollouts: int,
+    configurable: Optional[dict[str, Any]] = None,
+    max_workers: Optional[int] = None,
+    recursion_limit: int = DEFAULT_RECURSION_LIMIT,
+    requests_per_minute: Optional[float] = None,
+) -> list[RolloutResult]:
+    """Runs independent trajectories of the planning graph concurrently.
+
+    Args:
+        initial_plan: Starting state; each rollout gets a copy with a fresh `plan_id`.
+        num_rollouts: Number of trajectories.
+        configurable: `Config` fields shared by all rollouts (topic, model, ...).
+        max_workers: Concurrent rollouts (default: all of them).
+        recursion_limit: LangGraph step limit per rollout.
+        requests_per_minute: If set, caps LLM requests across all rollouts.
+
+    Returns:
+        One `RolloutResult` per rollout, in submission order.
+    """
+    from plan_sim.main import graph # Deferred: importing the graph loads the API key
+    from plan_sim.llm_utils import set_llm_rate_limit
+    if requests_per_minute is not None:
+        set_llm_rate_limit(requests_per_minute)
+
+    run_prefix = uuid.uuid4().hex[:8]
+    plan_ids = [f"{initial_plan.plan_id}-{run_prefix}-{i}" for i in range(num_rollouts)]
+    with ThreadPoolExecutor(max_workers=max_workers or num_rollouts, thread_name_prefix="rollout") as executor:
+        futures = [
+            executor.submit(_run_one, graph, initial_plan, plan_id, index, configurable or {}, recursion_limit)
+            for index, plan_id in enumerate(plan_ids)
+        ]
+        return [future.result() for future in futures]
+
+def summarize_rollouts(results: list[RolloutResult], wall_time_s: Optional[float] = None) -> dict[str, Any]:
+    """Aggregates rollouts: success rate, remaining resources and steps to goal."""
+    def mean(values):
+        values = [v for v in values if v is not None]
+        return statistics.fmean(values) if values else None
+
+    successes = [r for r in results if r.status == GOAL_REACHED]
+    return {
+        "rollouts": len(results),
+        "success_rate": len(successes) / len(results) if results else 0.0,
+        "status_counts": {status: sum(r.status == status for r in results) for status in (GOAL_REACHED, ABANDONED, STEP_LIMIT, ERROR)},
+        "mean_metric_count_1": mean(r.metric_count_1 for r in results),
+        "mean_metric_count_2": mean(r.metric_count_2 for r in results),
+        "mean_steps_to_goal": mean(r.steps for r in successes),
+        "median_steps_to_goal": statistics.median([r.steps for r in successes]) if successes else None,
+        "sum_rollout_time_s": sum(r.elapsed_s for r in results),
+        "slowest_rollout_s": max((r.elapsed_s for r in results), default=0.0),
+        "wall_time_s": wall_time_s,
+    }
+
+def format_rollout_summary(results: list[RolloutResult], summary: dict[str, Any]) -> str:
+    """Markdown tables: one row per rollout, then the aggregate."""
+    def fmt(value, digits=2):
+        return "-" if value is None else f"{value:.{digits}f}"
+
+    lines = [
+        "| Rollout | Status | Steps | Remaining metric_count_1 | Remaining metric_count_2 | Time (s) |",
+        "|---|---|---|---|---|---|",
+    ]
+    for r in results:
+        lines.append(f"| {r.plan_id} | {r.status} | {r.steps} | {fmt(r.metric_count_1)} | {fmt(r.metric_count_2)} | {r.elapsed_s:.1f} |")
+    counts = ", ".join(f"{status}: {count}" for status, count in summary["status_counts"].items() if count)
+    lines += [
+        "",
+        "| Metric | Value |",
+        "|---|---|",
+        f"| Rollouts | {summary['rollouts']} ({counts}) |",
+        f"| Success rate | {summary['success_rate']:.0%} |",
+        f"| Mean remaining metric_count_1 | {fmt(summary['mean_metric_count_1'])} |",
+        f"| Mean remaining metric_count_2 | {fmt(summary['mean_metric_count_2'])} |",
+        f"| Steps to goal (mean / median) | {fmt(summary['mean_steps_to_goal'], 1)} / {fmt(summary['median_steps_to_goal'], 1)} |",
+        f"| Wall time / slowest rollout / sum (s) | {fmt(summary['wall_time_s'], 1)} / {summary['slowest_rollout_s']:.1f} / {summary['sum_rollout_time_s']:.1f} |",
+    ]
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--goal", required=True)
+    parser.add_argument("--topic", default="Plumbing")
+    parser.add_argument("--ground-truth", action="append", default=[], help="Initial ground truth (repeatable).")
+    parser.add_argument("--vulnerability", action="append", default=[], help="Initial vulnerability (repeatable).")
+    parser.add_argument("--budget", type=float, default=100.0, help="Initial metric_count_1 (dollars).")
+    parser.add_argument("--time", type=float, default=1.0, help="Initial metric_count_2 (weeks).")
+    parser.add_argument("--rollouts", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent rollouts (default: all).")
+    parser.add_argument("--recursion-limit", type=int, default=DEFAULT_RECURSION_LIMIT)
+    parser.add_argument("--rpm", type=float, default=None, help="Shared cap on LLM requests per minute.")
+    args = parser.parse_args()
+
+    initial_input = InputState(goal=args.goal, assumptions=Assumptions(ground_truth=args.ground_truth, vulnerabilities=args.vulnerability))
+    initial_plan = Plan(
+        plan_id="rollout",
+        goal_state=initial_input,
+        input_state=[initial_input],
+        cumulative_assumptions=Assumptions(ground_truth=[], vulnerabilities=[]),
+        metric_count_1=args.budget,
+        metric_count_2=args.time
+    )
+    start = time.perf_counter()
+    results = run_rollouts(
+        initial_plan, args.rollouts, configurable={"topic": args.topic}, max_workers=args.workers,
+        recursion_limit=args.recursion_limit, requests_per_minute=args.rpm
+    )
+    summary = summarize_rollouts(results, wall_time_s=time.perf_counter() - start)
+    print(format_rollout_summary(results, summary))
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,157 @@
-from pydantic import BaseModel, Field
-from typing import List, Literal, Optional, Annotated, Any
+import threading
+from collections.abc import Iterable, Sequence
+from itertools import islice
+from pydantic import BaseModel, Field, TypeAdapter
+from pydantic_core import core_schema
+from typing import Generic, List, Literal, Optional, Annotated, Any, TypeVar, get_args
 from plan_sim.config import Config
 from operator import add
 
-def safe_append(existing: list, new: Any) -> list:
+T = TypeVar("T")
+
+_append_lock = threading.Lock()
+
+class _Backing(list):
+    """Storage shared by AppendLog snapshots; `validated` counts items already checked by pydantic."""
+    __slots__ = ("validated",)
+
+    def __init__(self, items: Iterable = ()):
+        super().__init__(items)
+        self.validated = 0
+
+class AppendLog(Sequence[T], Generic[T]):
+    """Immutable, append-only sequence whose snapshots share one backing list.
+
+    A snapshot is a (backing list, length) pair. Extending the newest snapshot
+    appends to the shared backing list in place and returns a longer snapshot,
+    so each state update costs O(k) for k new items instead of copying the whole
+    history; older snapshots keep seeing only their first `length` items.
+    Extending an older snapshot (a branch) copies its prefix once.
+
+    Pydantic fields typed `AppendLog[X]` accept any list of X, or an AppendLog
+    without copying it; only items appended since the last validation of the
+    shared storage are validated (e.g. dicts coming from a LangGraph input).
+    They serialize to a plain list.
     """
-    Appends new item(s) to the existing list.
+    __slots__ = ("_items", "_length")
+
+    def __init__(self, items: Iterable[T] = ()):
+        self._items = _Backing(items)
+        self._length = len(self._items)
+
+    @classmethod
+    def _snapshot(cls, items: list, length: int) -> "AppendLog[T]":
+        snapshot = cls.__new__(cls)
+        snapshot._items = items
+        snapshot._length = length
+        return snapshot
+
+    @classmethod
+    def _from_validated(cls, items: list) -> "AppendLog[T]":
+        snapshot = cls(items)
+        snapshot._items.validated = snapshot._length
+        return snapshot
+
+    def extended(self, new_items: Iterable[T]) -> "AppendLog[T]":
+        """Returns a snapshot with `new_items` appended; this snapshot is unchanged."""
+        new_items = list(new_items)
+        with _append_lock:
+            if len(self._items) == self._length: # Newest snapshot: share the backing list
+                self._items.extend(new_items)
+                return self._snapshot(self._items, self._length + len(new_items))
+        return self._snapshot(_Backing(self._items[:self._length] + new_items), self._length + len(new_items))
+
+    def appended(self, item: T) -> "AppendLog[T]":
+        return self.extended((item,))
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._items[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("AppendLog index out of range")
+        return self._items[index]
+
+    def __iter__(self):
+        return islice(self._items, self._length)
+
+    def __add__(self, other: Iterable[T]) -> "AppendLog[T]":
+        return self.extended(other)
+
+    def __radd__(self, other: Iterable[T]) -> "AppendLog[T]":
+        return AppendLog(list(other) + list(self))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"AppendLog({list(self)!r})"
+
+    def __copy__(self) -> "AppendLog[T]":
+        return self # Snapshots are immutable
+
+    def __deepcopy__(self, memo) -> "AppendLog[T]":
+        from copy import deepcopy
+        return AppendLog(deepcopy(list(self), memo))
+
+    def __reduce__(self):
+        return (AppendLog, (list(self),))
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler) -> core_schema.CoreSchema:
+        args = get_args(source)
+        item_schema = handler.generate_schema(args[0]) if args else core_schema.any_schema()
+        from_list = core_schema.no_info_after_validator_function(cls._from_validated, core_schema.list_schema(item_schema))
+        item_adapter: list[TypeAdapter] = [] # Built on first use; the item type may not be complete yet
+
+        def validate_new_items(snapshot: "AppendLog") -> "AppendLog":
+            if not args:
+                return snapshot
+            with _append_lock:
+                items = snapshot._items
+                if items.validated < snapshot._length:
+                    if not item_adapter:
+                        item_adapter.append(TypeAdapter(args[0]))
+                    for i in range(items.validated, snapshot._length):
+                        items[i] = item_adapter[0].validate_python(items[i])
+                    items.validated = snapshot._length
+            return snapshot
+
+        from_snapshot = core_schema.no_info_after_validator_function(validate_new_items, core_schema.is_instance_schema(cls))
+        return core_schema.json_or_python_schema(
+            json_schema=from_list,
+            python_schema=core_schema.union_schema([from_snapshot, from_list], mode="left_to_right"),
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                list, return_schema=core_schema.list_schema(item_schema)
+            )
+        )
+
+def safe_append(existing: Sequence, new: Any) -> AppendLog:
+    """
+    Appends new item(s) to the existing sequence.
     
-    If `new` is a list, it concatenates it to the existing list.
-    If `new` is a single item, it wraps it in a list and appends.
+    If `new` is a list (or other sequence), its items are appended.
+    If `new` is a single item, it is appended on its own.
+    The result shares storage with `existing`, so appending costs O(len(new)).
     """
-    if isinstance(new, list):
-        return existing + new
+    if not isinstance(existing, AppendLog):
+        existing = AppendLog(existing or [])
+    if isinstance(new, (list, tuple, AppendLog)):
+        return existing.extended(new)
     else:
-        return existing + [new]
+        return existing.appended(new)
 
 class Assumptions(BaseModel):
-    ground_truth: Annotated[List[str], add]
-    vulnerabilities: Annotated[List[str], add]
+    ground_truth: Annotated[AppendLog[str], add]
+    vulnerabilities: Annotated[AppendLog[str], add]
 
 class Outcome(BaseModel):
     new_truths: List[str]
@@ -28,23 +162,36 @@ class NextStep(BaseModel):
     idea: str
     assumptions: List[str]
 
+class NextStepCandidates(BaseModel):
+    candidates: List[NextStep]
+
 
 class InputState(BaseModel):
     goal: str
     assumptions: Assumptions
+
+class PromptUsage(BaseModel):
+    """Tokens in one prompt sent by `node` during plan step `step`."""
+    step: int
+    node: str
+    tokens: int
           
 
 
 class Plan(BaseModel):
     plan_id: str
     goal_state: InputState
-    input_state: Annotated[List[InputState], safe_append] = Field(default_factory=list)
-    steps: Annotated[List[NextStep], safe_append] = Field(default_factory=list)
-    outcomes: Annotated[List[Outcome], safe_append] = Field(default_factory=list)
+    input_state: Annotated[AppendLog[InputState], safe_append] = Field(default_factory=AppendLog)
+    steps: Annotated[AppendLog[NextStep], safe_append] = Field(default_factory=AppendLog)
+    outcomes: Annotated[AppendLog[Outcome], safe_append] = Field(default_factory=AppendLog)
     step_results: Optional[List[str]] = None
     metric_count_1: Optional[float] = 0
     metric_count_2: Optional[float] = 0
     cumulative_assumptions: Optional[Assumptions] = []
+    # Leading items of cumulative_assumptions that are already summarized; the rest is the unsummarized delta
+    summarized_truths: int = 0
+    summarized_vulnerabilities: int = 0
+    prompt_tokens: Annotated[AppendLog[PromptUsage], safe_append] = Field(default_factory=AppendLog)
     final_outcome: Optional[Outcome] = None
     
 
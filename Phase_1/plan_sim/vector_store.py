@@ -1,86 +1,407 @@
 import logging
-from qdrant_client import QdrantClient, models
-from langchain_qdrant import QdrantVectorStore
-from langchain_openai import OpenAIEmbeddings
-from langchain_core.documents import Document
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Hashable, Optional, Union
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+if TYPE_CHECKING: # qdrant_client/langchain_qdrant take seconds to import; load them on first use
+    from qdrant_client import QdrantClient
+    from langchain_qdrant import QdrantVectorStore
 
 # Constants
-QDRANT_PATH = "qdrant_db"
+QDRANT_PATH = os.getenv("QDRANT_PATH", "qdrant_db") # ":memory:" keeps the store in-process
 QDRANT_COLLECTION = "ideas_collection"
 OPENAI_EMBEDDING_DIM = 1536 # Assuming this is standard for OpenAI embeddings
 IDEA_SIMILARITY_THRESHOLD = 0.8
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")) # Idea texts whose vectors are kept in memory
+NOVELTY_INDEX_INITIAL_CAPACITY = 16 # Rows allocated per step; doubled when full
+QDRANT_SCROLL_BATCH = 1024 # Points per page when loading the index on startup
+
+# --- In-Memory Novelty Index ---
+class NoveltyIndex:
+    """Per-step matrices of L2-normalized idea vectors for exact cosine novelty checks.
+
+    Matrices are keyed by step number, or by (namespace, step number) for ideas
+    stored in a namespace (see `_index_key`). Each step keeps one contiguous
+    float32 matrix (grown by doubling), so a novelty check is a single
+    matrix-vector product over that step's ideas instead of a filtered Qdrant
+    search. Cosine similarity equals the dot product of normalized vectors,
+    matching Qdrant's COSINE score.
+    """
+
+    def __init__(self, embedding_dim: int):
+        self.embedding_dim = embedding_dim
+        self._matrices: dict[Hashable, np.ndarray] = {}
+        self._counts: dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def _normalize(self, vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.embedding_dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def add(self, key: Hashable, vectors):
+        """Appends one vector or a (n, dim) batch of vectors under a step key."""
+        rows = self._normalize(vectors)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            matrix = self._matrices.get(key)
+            if matrix is None or count + len(rows) > len(matrix):
+                capacity = max(NOVELTY_INDEX_INITIAL_CAPACITY, 2 * (count + len(rows)))
+                grown = np.empty((capacity, self.embedding_dim), dtype=np.float32)
+                if count:
+                    grown[:count] = matrix[:count]
+                matrix = self._matrices[key] = grown
+            matrix[count:count + len(rows)] = rows
+            self._counts[key] = count + len(rows)
+
+    def similarities(self, key: Hashable, vector) -> np.ndarray:
+        """Cosine similarity of `vector` to every idea stored under the step key."""
+        # Rows below the stored count are never rewritten, so reading outside the lock is safe
+        return self.vectors(key) @ self._normalize(vector)[0]
+
+    def vectors(self, key: Hashable) -> np.ndarray:
+        """Read-only (count, dim) view of the normalized vectors stored under a step key."""
+        with self._lock:
+            count = self._counts.get(key, 0)
+            matrix = self._matrices.get(key)
+        if not count:
+            return np.empty((0, self.embedding_dim), dtype=np.float32)
+        view = matrix[:count]
+        view.flags.writeable = False
+        return view
+
+    def max_similarity(self, key: Hashable, vector) -> float:
+        """Highest cosine similarity to an idea under the step key, or -1.0 if there is none."""
+        scores = self.similarities(key, vector)
+        return float(scores.max()) if len(scores) else -1.0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(self._counts.values())
+
+def _index_key(step_number: int, namespace: Optional[str] = None) -> Hashable:
+    """Novelty index key: ideas are only compared within the same step and namespace."""
+    return step_number if namespace is None else (namespace, step_number)
+
+def _load_novelty_index(client: "QdrantClient", collection_name: str, embedding_dim: int) -> NoveltyIndex:
+    """Builds the index from the points already persisted in the collection."""
+    index = NoveltyIndex(embedding_dim)
+    by_step: dict[Hashable, list] = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=QDRANT_SCROLL_BATCH,
+            offset=offset,
+            with_payload=["metadata"],
+            with_vectors=True
+        )
+        for point in points:
+            metadata = (point.payload or {}).get("metadata") or {}
+            step_number = metadata.get("step")
+            vector = point.vector
+            if isinstance(vector, dict): # Named vectors
+                vector = next(iter(vector.values()), None)
+            if step_number is not None and vector is not None:
+                by_step.setdefault(_index_key(step_number, metadata.get("namespace")), []).append(vector)
+        if offset is None:
+            break
+    for key, vectors in by_step.items():
+        index.add(key, vectors)
+    logging.info(f"Loaded {len(index)} stored ideas across {len(by_step)} steps into the novelty index.")
+    return index
+# --- End In-Memory Novelty Index ---
+
+# --- Lazy Qdrant Initialization ---
+# Nothing is imported, opened or constructed at import time: the Qdrant client,
+# the collection and the embedding model are created on the first novelty check
+# or store, so importing plan_sim.nodes / plan_sim.main stays cheap and needs no
+# API key or network access.
 
-# --- Qdrant Client Initialization ---
-client = QdrantClient(path=QDRANT_PATH)
-try:
-    client.get_collection(QDRANT_COLLECTION)
-    logging.info(f"Connected to existing Qdrant collection: {QDRANT_COLLECTION}")
-except Exception: # Catch broader exception for collection not existing or other issues
-    logging.info(f"Creating Qdrant collection: {QDRANT_COLLECTION}")
+def _default_embedding_backend() -> Embeddings:
+    from langchain_openai import OpenAIEmbeddings # Deferred: slow import, needs OPENAI_API_KEY
+    return OpenAIEmbeddings()
+
+_embedding_factory: Callable[[], Embeddings] = _default_embedding_backend
+_embedding_dim: Optional[int] = OPENAI_EMBEDDING_DIM
+_collection_name: str = QDRANT_COLLECTION
+
+_client: Optional["QdrantClient"] = None
+_vector_store: Optional["QdrantVectorStore"] = None
+_store_lock = threading.Lock()
+
+# Per-step in-memory copy of the stored vectors; Qdrant is only written to
+_novelty_index: Optional["NoveltyIndex"] = None
+_write_executor: Optional[ThreadPoolExecutor] = None
+_pending_writes: set[Future] = set()
+_pending_writes_lock = threading.Lock()
+
+# Idea text -> embedding vector (LRU). Cleared whenever the backend changes.
+_embedding_cache: "OrderedDict[str, list[float]]" = OrderedDict()
+_embedding_cache_lock = threading.Lock()
+_embedding_cache_stats = {"hits": 0, "misses": 0}
+
+def set_embedding_backend(
+    backend: Union[Embeddings, Callable[[], Embeddings]],
+    embedding_dim: Optional[int] = None,
+    collection_name: Optional[str] = None,
+):
+    """Replaces the embedding model used for novelty checks and storage.
+
+    Args:
+        backend: A LangChain `Embeddings` instance, or a zero-argument factory
+            returning one (called lazily on first use).
+        embedding_dim: Vector size of the backend. If None, it is measured by
+            embedding a probe string when the collection is created.
+        collection_name: Qdrant collection to use. Defaults to
+            `QDRANT_COLLECTION` suffixed with the dimension for non-default sizes,
+            so different backends never share vectors of different sizes.
+    """
+    global _embedding_factory, _embedding_dim, _collection_name
+    with _store_lock:
+        _embedding_factory = backend if callable(backend) and not isinstance(backend, Embeddings) else (lambda: backend)
+        _embedding_dim = embedding_dim
+        _collection_name = collection_name or QDRANT_COLLECTION
+    reset_vector_store()
+
+def _ensure_collection(client: "QdrantClient", collection_name: str, embedding_dim: int):
+    """Creates the ideas collection if it does not exist yet."""
+    from qdrant_client import models
+    if client.collection_exists(collection_name):
+        logging.info(f"Connected to existing Qdrant collection: {collection_name}")
+        return
+    logging.info(f"Creating Qdrant collection: {collection_name}")
     try:
         client.create_collection(
-            collection_name=QDRANT_COLLECTION,
+            collection_name=collection_name,
             vectors_config=models.VectorParams(
-                size=OPENAI_EMBEDDING_DIM,
+                size=embedding_dim,
                 distance=models.Distance.COSINE
             )
         )
-        logging.info(f"Successfully created Qdrant collection: {QDRANT_COLLECTION}")
+        logging.info(f"Successfully created Qdrant collection: {collection_name}")
     except Exception as create_error:
-        logging.error(f"Failed to create Qdrant collection {QDRANT_COLLECTION}: {create_error}", exc_info=True)
-        # Depending on the application, might want to raise here or handle differently
+        logging.error(f"Failed to create Qdrant collection {collection_name}: {create_error}", exc_info=True)
         raise
 
-# Instantiate QdrantVectorStore
-# Ensure embeddings are configured (using OpenAIEmbeddings here)
-embeddings = OpenAIEmbeddings() 
-qdrant_vector_store = QdrantVectorStore(
-    client=client, 
-    collection_name=QDRANT_COLLECTION, 
-    embedding=embeddings
-)
-logging.info("QdrantVectorStore initialized.")
+def get_vector_store() -> "QdrantVectorStore":
+    """Returns the shared QdrantVectorStore, initializing it on first use (thread-safe)."""
+    global _client, _vector_store, _novelty_index
+    if _vector_store is None:
+        with _store_lock:
+            if _vector_store is None:
+                from qdrant_client import QdrantClient
+                from langchain_qdrant import QdrantVectorStore
+                embeddings = _embedding_factory()
+                embedding_dim = _embedding_dim or len(embeddings.embed_query("dimension probe"))
+                collection_name = _collection_name
+                if collection_name == QDRANT_COLLECTION and embedding_dim != OPENAI_EMBEDDING_DIM:
+                    collection_name = f"{QDRANT_COLLECTION}_{embedding_dim}"
+                client = QdrantClient(location=":memory:") if QDRANT_PATH == ":memory:" else QdrantClient(path=QDRANT_PATH)
+                _ensure_collection(client, collection_name, embedding_dim)
+                _novelty_index = _load_novelty_index(client, collection_name, embedding_dim)
+                _vector_store = QdrantVectorStore(
+                    client=client,
+                    collection_name=collection_name,
+                    embedding=embeddings
+                )
+                _client = client
+                logging.info("QdrantVectorStore initialized.")
+    return _vector_store
+
+def get_novelty_index() -> NoveltyIndex:
+    """Returns the in-memory novelty index, loading it from Qdrant on first use."""
+    get_vector_store()
+    return _novelty_index
+
+def reset_vector_store():
+    """Waits for pending writes and closes the Qdrant client; the store is re-created on next use."""
+    global _client, _vector_store, _novelty_index
+    flush_idea_writes()
+    with _store_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _vector_store = None
+        _novelty_index = None
+    clear_embedding_cache()
 # --- End Qdrant Initialization ---
 
-def is_idea_novel(idea_text: str, step_number: int, threshold: float = IDEA_SIMILARITY_THRESHOLD) -> bool:
-    """Check if an idea is novel by searching Qdrant for similar ideas at the same step."""
-    metadata_filter = models.Filter(
-        must=[
-            models.FieldCondition(
-                key="step",
-                match=models.MatchValue(value=step_number)
-            )
-        ]
-    )
+# --- Embedding Cache ---
+def embed_idea(idea_text: str) -> list[float]:
+    """Returns the embedding of an idea, calling the embedding model only on a cache miss."""
+    with _embedding_cache_lock:
+        vector = _embedding_cache.get(idea_text)
+        if vector is not None:
+            _embedding_cache.move_to_end(idea_text)
+            _embedding_cache_stats["hits"] += 1
+            return vector
+    vector = get_vector_store().embeddings.embed_query(idea_text)
+    with _embedding_cache_lock:
+        _embedding_cache_stats["misses"] += 1
+        _embedding_cache[idea_text] = vector
+        while len(_embedding_cache) > EMBEDDING_CACHE_SIZE:
+            _embedding_cache.popitem(last=False)
+    return vector
+
+def embed_ideas(idea_texts: list[str]) -> list[list[float]]:
+    """Batch version of `embed_idea`: all cache misses go to the embedding model in one call."""
+    vectors: dict[str, list[float]] = {}
+    with _embedding_cache_lock:
+        for text in idea_texts:
+            if text in _embedding_cache:
+                _embedding_cache.move_to_end(text)
+                _embedding_cache_stats["hits"] += 1
+                vectors[text] = _embedding_cache[text]
+    missing = list(dict.fromkeys(text for text in idea_texts if text not in vectors))
+    if missing:
+        embedded = get_vector_store().embeddings.embed_documents(missing)
+        with _embedding_cache_lock:
+            _embedding_cache_stats["misses"] += len(missing)
+            for text, vector in zip(missing, embedded):
+                vectors[text] = _embedding_cache[text] = vector
+            while len(_embedding_cache) > EMBEDDING_CACHE_SIZE:
+                _embedding_cache.popitem(last=False)
+    return [vectors[text] for text in idea_texts]
+
+def get_embedding_cache_stats() -> dict:
+    """Returns embedding cache hits/misses; misses equal calls to the embedding model."""
+    with _embedding_cache_lock:
+        return {**_embedding_cache_stats, "size": len(_embedding_cache)}
+
+def clear_embedding_cache():
+    """Drops all cached embeddings and resets the counters."""
+    with _embedding_cache_lock:
+        _embedding_cache.clear()
+        _embedding_cache_stats.update(hits=0, misses=0)
+# --- End Embedding Cache ---
+
+def is_vector_novel(idea_vector: list[float], step_number: int, threshold: float = IDEA_SIMILARITY_THRESHOLD, namespace: Optional[str] = None) -> bool:
+    """Check if an already-embedded idea is novel among the ideas stored for the same step (and namespace)."""
     try:
-        # Use the QdrantVectorStore instance for similarity search
-        similar_entries = qdrant_vector_store.similarity_search_with_score( # Use with_score for clarity
-            query=idea_text,
-            k=1, # Find the closest match
-            filter=metadata_filter
-        )
-        
-        # Check if any similar entry meets the threshold
-        if similar_entries and similar_entries[0][1] >= threshold: # Score is second element
-             logging.debug(f"Found similar idea for step {step_number} with score {similar_entries[0][1]} >= {threshold}.")
+        best_score = get_novelty_index().max_similarity(_index_key(step_number, namespace), idea_vector)
+
+        # Check if any stored idea meets the threshold
+        if best_score >= threshold:
+             logging.debug(f"Found similar idea for step {step_number} with score {best_score} >= {threshold}.")
              return False # Not novel
-        
+
         logging.debug(f"No sufficiently similar idea found for step {step_number}. Novelty confirmed.")
         return True # Novel
-        
+
     except Exception as e:
-        logging.error(f"Error during Qdrant similarity search for step {step_number}: {e}", exc_info=True)
+        logging.error(f"Error during novelty search for step {step_number}: {e}", exc_info=True)
         # Fail safe: assume not novel on error to avoid potential duplicates
         logging.warning(f"Assuming idea is not novel for step {step_number} due to search error.")
         return False
 
-def store_idea(idea_text: str, step_number: int):
+def select_novel_candidate(
+    candidate_vectors: list[list[float]],
+    step_number: int,
+    threshold: float = IDEA_SIMILARITY_THRESHOLD,
+    namespace: Optional[str] = None,
+) -> tuple[int, int]:
+    """Picks the most novel of several embedded candidate ideas for a step.
+
+    Every candidate is scored against the step's stored ideas and against the
+    other candidates in one vectorized pass. A candidate is novel if its
+    similarity to all stored ideas is below `threshold`, and distinct if it is
+    not a near-duplicate of an earlier candidate.
+
+    Returns:
+        (index of the chosen candidate, number of novel and distinct candidates).
+        The chosen candidate is the novel, distinct one least similar to the
+        stored ideas; if there is none, it is the least similar candidate overall.
+    """
+    index = get_novelty_index()
+    candidates = index._normalize(candidate_vectors)
+    existing = index.vectors(_index_key(step_number, namespace))
+    best_existing = (candidates @ existing.T).max(axis=1) if len(existing) else np.full(len(candidates), -1.0)
+    pairwise = np.tril(candidates @ candidates.T, k=-1) # Similarity to earlier candidates only
+    best_earlier = pairwise.max(axis=1) if len(candidates) > 1 else np.full(len(candidates), -1.0)
+    best_earlier[0] = -1.0
+    usable = (best_existing < threshold) & (best_earlier < threshold)
+    scores = np.where(usable, best_existing, np.inf)
+    chosen = int(np.argmin(scores)) if usable.any() else int(np.argmin(best_existing))
+    return chosen, int(usable.sum())
+
+def _get_write_executor() -> ThreadPoolExecutor:
+    global _write_executor
+    if _write_executor is None:
+        with _pending_writes_lock:
+            if _write_executor is None:
+                # One worker keeps Qdrant writes in submission order
+                _write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="qdrant-writer")
+    return _write_executor
+
+def _upsert_idea(store: "QdrantVectorStore", point, step_number: int):
+    try:
+        store.client.upsert(collection_name=store.collection_name, points=[point])
+        logging.debug(f"Persisted idea in Qdrant for step {step_number}.")
+    except Exception as e:
+        logging.error(f"Error storing idea in Qdrant for step {step_number}: {e}", exc_info=True)
+
+def store_idea_vector(idea_text: str, idea_vector: list[float], step_number: int, namespace: Optional[str] = None):
+    """Adds an already-embedded idea to the novelty index and persists it to Qdrant in the background.
+
+    Ideas stored with a `namespace` (e.g. one per rollout) are only compared
+    with ideas from the same namespace.
+
+    The idea is visible to novelty checks as soon as this returns; the Qdrant
+    upsert runs on a writer thread (see `flush_idea_writes`).
+    """
+    from qdrant_client import models
+    try:
+        store = get_vector_store()
+        get_novelty_index().add(_index_key(step_number, namespace), idea_vector)
+        metadata = {"step": step_number} if namespace is None else {"step": step_number, "namespace": namespace}
+        point = models.PointStruct(
+            id=uuid.uuid4().hex,
+            vector={store.vector_name: idea_vector} if store.vector_name else idea_vector,
+            # Same payload layout as QdrantVectorStore.add_documents
+            payload={store.content_payload_key: idea_text, store.metadata_payload_key: metadata}
+        )
+        executor = _get_write_executor()
+        with _pending_writes_lock: # Registered before the writer can complete it
+            future = executor.submit(_upsert_idea, store, point, step_number)
+            _pending_writes.add(future)
+        future.add_done_callback(_discard_pending_write)
+        logging.info(f"Stored idea for step {step_number}.")
+    except Exception as e:
+        logging.error(f"Error storing idea for step {step_number}: {e}", exc_info=True)
+        # Depending on requirements, might want to raise this error
+
+def _discard_pending_write(future: Future):
+    with _pending_writes_lock:
+        _pending_writes.discard(future)
+
+def flush_idea_writes(timeout: Optional[float] = None):
+    """Blocks until every idea stored so far has been written to Qdrant."""
+    with _pending_writes_lock:
+        pending = list(_pending_writes)
+    for future in pending:
+        future.result(timeout=timeout)
+
+def is_idea_novel(idea_text: str, step_number: int, threshold: float = IDEA_SIMILARITY_THRESHOLD, namespace: Optional[str] = None) -> bool:
+    """Check if an idea is novel by searching Qdrant for similar ideas at the same step."""
+    try:
+        idea_vector = embed_idea(idea_text)
+    except Exception as e:
+        logging.error(f"Error embedding idea for step {step_number}: {e}", exc_info=True)
+        logging.warning(f"Assuming idea is not novel for step {step_number} due to search error.")
+        return False
+    return is_vector_novel(idea_vector, step_number, threshold, namespace)
+
+def store_idea(idea_text: str, step_number: int, namespace: Optional[str] = None):
     """Stores the generated idea text in Qdrant with its step number."""
-    doc = Document(page_content=idea_text, metadata={"step": step_number})
     try:
-        # Use add_documents method of QdrantVectorStore
-        qdrant_vector_store.add_documents([doc])
-        logging.info(f"Stored idea in Qdrant for step {step_number}.")
+        idea_vector = embed_idea(idea_text) # Cached if the idea was just checked for novelty
     except Exception as e:
         logging.error(f"Error storing idea in Qdrant for step {step_number}: {e}", exc_info=True)
-        # Depending on requirements, might want to raise this error 
\ No newline at end of file
+        return
+    store_idea_vector(idea_text, idea_vector, step_number, namespace)
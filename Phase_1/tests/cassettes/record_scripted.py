@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Records tests/cassettes/graph_interaction.sqlite from a scripted LLM.
+
+The scripted client stands in for the OpenAI API: it answers every structured
+call of tests/test_graph_interaction.py from a fixed per-scenario script (step
+ideas, decisions, outcomes, goal/abandon checks), and summaries keep the two
+most recent truths and vulnerabilities. The test runs in record mode, so
+each prompt and its scripted response are stored exactly as a live recording
+would store them. The graph tests then replay the cassette offline.
+
+Re-run this after changing prompts, output models or the test scenarios. To
+record real model responses instead, delete the cassette and run
+`LLM_CACHE_MODE=record pytest tests/test_graph_interaction.py` with an API key.
+
+Usage:
+    python tests/cassettes/record_scripted.py
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+PHASE_1_DIR = Path(__file__).parents[2]
+CASSETTE_PATH = Path(__file__).parent / "graph_interaction.sqlite"
+sys.path.insert(0, str(PHASE_1_DIR))
+os.environ["LLM_CACHE_MODE"] = "record"
+os.environ.setdefault("OPENAI_API_KEY", "scripted-recording-placeholder-key") # Never used: the client is scripted
+
+from plan_sim import llm_utils, nodes
+from plan_sim.states import Assumptions, NextStep, NextStepCandidates, Outcome
+
+# Per test: (idea, decision, new truths, new vulnerabilities, cost, weeks) for each plan step.
+# The goal is reached on the last step, so each run ends before the test's recursion limit.
+SCENARIOS = {
+    "test_run_leaky_faucet_scenario": [
+        ("Shut off the water supply under the sink and remove the faucet handle to inspect the cartridge.", "success",
+         ["Water supply is off and the faucet is drained.", "The cartridge O-rings are worn."],
+         ["The handle set screw may be seized."], 5.0, 0.02),
+        ("Replace the worn O-rings and cartridge, reassemble the faucet and restore the water supply.", "success",
+         ["New cartridge and O-rings are installed.", "Faucet no longer drips with the water on."],
+         [], 25.0, 0.05),
+    ],
+    "test_run_frame_house_scenario": [
+        ("Snap chalk lines on the foundation and install pressure-treated sill plates with anchor bolts.", "success",
+         ["Sill plates are anchored and level.", "Wall layout is marked on the sill plates."],
+         ["Some anchor bolts are slightly out of position."], 1500.0, 0.5),
+        ("Frame and raise all exterior walls in one day with the full crew.", "failure",
+         ["Two exterior walls are framed and raised."],
+         ["Rain halted work with the remaining walls unframed.", "Stacked lumber got wet and may warp."], 800.0, 0.4),
+        ("Cover the lumber, finish the remaining exterior walls, then frame the interior walls and brace them plumb.", "success",
+         ["All exterior and interior walls are framed, plumb and braced.", "Headers are installed over door and window openings."],
+         ["A few studs show minor warping."], 4000.0, 1.5),
+        ("Set the roof trusses, sheath the walls and roof, and pass the framing inspection.", "success",
+         ["Roof trusses are set and sheathed.", "Framing inspection passed."],
+         [], 9000.0, 2.0),
+    ],
+}
+
+class ScriptedLLM:
+    """Plays the current scenario's script, one answer per structured call."""
+
+    def __init__(self):
+        self.start("")
+
+    def start(self, test_name: str):
+        self.script = SCENARIOS.get(test_name, [])
+        self.ideas = 0
+        self.decisions = 0
+        self.recent_truths: list[str] = []
+        self.recent_vulnerabilities: list[str] = []
+
+    def _step(self, index: int):
+        return self.script[min(index, len(self.script) - 1)]
+
+    def answer(self, output_model):
+        if output_model is NextStep:
+            self.ideas += 1
+            return NextStep(idea=self._step(self.ideas - 1)[0], assumptions=[])
+        if output_model is NextStepCandidates:
+            self.ideas += 1
+            return NextStepCandidates(candidates=[NextStep(idea=self._step(self.ideas - 1)[0], assumptions=[])])
+        if output_model is nodes.Decider:
+            self.decisions += 1
+            decision = self._step(self.decisions - 1)[1]
+            return nodes.Decider(reason=f"Scripted {decision}.", decision=decision)
+        if output_model is Outcome:
+            _, _, truths, vulnerabilities, cost, weeks = self._step(self.decisions - 1)
+            self.recent_truths += truths
+            self.recent_vulnerabilities += vulnerabilities
+            return Outcome(new_truths=truths, new_vulnerabilities=vulnerabilities, cost_increment=cost, time_increment=weeks)
+        if output_model is nodes.GoalChecker:
+            return nodes.GoalChecker(achieved="yes" if self.decisions >= len(self.script) else "no")
+        if output_model is nodes.AbandonChecker:
+            return nodes.AbandonChecker(abandon="press on")
+        if output_model is Assumptions:
+            summary = Assumptions(ground_truth=self.recent_truths[-2:], vulnerabilities=self.recent_vulnerabilities[-2:])
+            self.recent_truths, self.recent_vulnerabilities = [], []
+            return summary
+        raise ValueError(f"No scripted answer for output model {output_model.__name__}")
+
+class ScriptedRunnable:
+    """Stands in for the structured-output runnable built by `get_structured_llm`."""
+
+    def __init__(self, llm: ScriptedLLM, output_model):
+        self.llm = llm
+        self.output_model = output_model
+
+    def invoke(self, prompt):
+        return {"parsed": self.llm.answer(self.output_model), "raw": None, "parsing_error": None}
+
+class ScriptPlugin:
+    """Switches the scripted LLM to each test's scenario."""
+
+    def __init__(self, llm: ScriptedLLM):
+        self.llm = llm
+
+    def pytest_runtest_setup(self, item):
+        self.llm.start(item.name)
+
+def main():
+    llm = ScriptedLLM()
+    llm_utils.get_structured_llm = lambda model_name, temperature, output_model, model_kwargs=None: ScriptedRunnable(llm, output_model)
+    CASSETTE_PATH.unlink(missing_ok=True)
+    exit_code = pytest.main([str(PHASE_1_DIR / "tests" / "test_graph_interaction.py"), "-q", "-p", "no:cacheprovider"], plugins=[ScriptPlugin(llm)])
+    print(f"Recorded {CASSETTE_PATH}" if exit_code == 0 else f"Recording failed (pytest exit code {exit_code})")
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,35 @@
+import os
 import uuid
+from pathlib import Path
 from pprint import pprint
 import pytest # Uncommented pytest
 
+# LLM responses are replayed from a recorded cassette, so these tests run offline
+# and deterministically. The committed cassette holds scripted responses; re-record
+# it after changing prompts, output models or scenarios with:
+#   python tests/cassettes/record_scripted.py
+# or delete it and record real responses with an API key:
+#   LLM_CACHE_MODE=record pytest tests/test_graph_interaction.py
+CASSETTE_PATH = Path(__file__).parent / "cassettes" / "graph_interaction.sqlite"
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE") or ("replay" if CASSETTE_PATH.exists() else "record")
+if LLM_CACHE_MODE == "replay" and not CASSETTE_PATH.exists():
+    pytest.skip(f"No recorded LLM responses at {CASSETTE_PATH}; record them with LLM_CACHE_MODE=record.", allow_module_level=True)
+if LLM_CACHE_MODE != "replay":
+    from plan_sim.env_tool import load_api_key
+    try:
+        load_api_key()
+    except ValueError:
+        pytest.skip(f"No recorded LLM responses at {CASSETTE_PATH} and no OPENAI_API_KEY to record them.", allow_module_level=True)
+else:
+    os.environ["LLM_CACHE_MODE"] = "replay" # setup_environment() (run on import of plan_sim.main) then needs no key
+
 from plan_sim.main import graph
 from plan_sim.states import Plan, InputState, Assumptions
 from plan_sim.config import Config
 from plan_sim.env_tool import setup_environment
 from langchain_core.runnables import RunnableConfig
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from plan_sim import llm_cache, vector_store
 
 # Ensure environment variables (like API keys) are loaded
 # It's generally better practice to handle this with fixtures 
@@ -19,6 +42,16 @@ except Exception as e:
     print(f"Error during environment setup: {e}")
     # pytest.fail(f"Environment setup failed: {e}") # Fail test if setup fails
 
+@pytest.fixture(autouse=True)
+def recorded_llm(monkeypatch):
+    """Replays (or records) LLM responses; novelty uses a fresh in-memory store with local embeddings."""
+    llm_cache.configure_llm_cache(LLM_CACHE_MODE, CASSETTE_PATH)
+    monkeypatch.setattr(vector_store, "QDRANT_PATH", ":memory:")
+    vector_store.set_embedding_backend(DeterministicFakeEmbedding(size=vector_store.OPENAI_EMBEDDING_DIM))
+    yield
+    vector_store.set_embedding_backend(vector_store._default_embedding_backend, vector_store.OPENAI_EMBEDDING_DIM)
+    llm_cache.configure_llm_cache("passthrough")
+
 # Rename the function to follow pytest convention
 def test_run_leaky_faucet_scenario():
     """
@@ -71,13 +104,14 @@ def test_run_leaky_faucet_scenario():
         print("Starting graph stream...")
         final_state_update = None
         step_count = 0
-        for step_output in graph.stream(initial_plan.model_dump(), config=run_config):
-            step_count += 1
-            node_name = list(step_output.keys())[0]
-            node_output = step_output[node_name]
-            print(f"\n<<< Step {step_count} Output from Node: {node_name} >>>")
-            pprint(node_output, indent=2)
-            final_state_update = step_output # Keep track of the last message
+        with llm_cache.sampling_scope(): # Sampled calls are numbered from 0 for this run
+            for step_output in graph.stream(initial_plan.model_dump(), config=run_config):
+                step_count += 1
+                node_name = list(step_output.keys())[0]
+                node_output = step_output[node_name]
+                print(f"\n<<< Step {step_count} Output from Node: {node_name} >>>")
+                pprint(node_output, indent=2)
+                final_state_update = step_output # Keep track of the last message
 
         print(f"\n--- Graph Stream Finished after {step_count} steps ---")
 
@@ -154,13 +188,14 @@ def test_run_frame_house_scenario():
         print("Starting graph stream...")
         final_state_update = None
         step_count = 0
-        for step_output in graph.stream(initial_plan.model_dump(), config=run_config):
-            step_count += 1
-            node_name = list(step_output.keys())[0]
-            node_output = step_output[node_name]
-            print(f"\n<<< Step {step_count} Output from Node: {node_name} >>>")
-            pprint(node_output, indent=2)
-            final_state_update = step_output # Keep track of the last message
+        with llm_cache.sampling_scope(): # Sampled calls are numbered from 0 for this run
+            for step_output in graph.stream(initial_plan.model_dump(), config=run_config):
+                step_count += 1
+                node_name = list(step_output.keys())[0]
+                node_output = step_output[node_name]
+                print(f"\n<<< Step {step_count} Output from Node: {node_name} >>>")
+                pprint(node_output, indent=2)
+                final_state_update = step_output # Keep track of the last message
 
         print(f"\n--- Graph Stream Finished after {step_count} steps ---")
 
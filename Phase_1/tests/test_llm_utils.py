@@ -0,0 +1,132 @@
+import time
+
+import httpx
+import openai
+import pytest
+from langchain_core.messages import AIMessage
+
+from plan_sim import llm_cache, llm_utils
+from plan_sim.states import NextStep
+
+
+class FakeStructuredLLM:
+    """Fails with the given exceptions first, then returns a parsed NextStep."""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        raw = AIMessage(content="", usage_metadata={"input_tokens": 120, "output_tokens": 30, "total_tokens": 150})
+        return {"raw": raw, "parsed": NextStep(idea="Check the valve", assumptions=[]), "parsing_error": None}
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    monkeypatch.setattr(llm_utils, "LLM_RETRY_INITIAL_WAIT", 0)
+    monkeypatch.setattr(llm_utils, "LLM_RETRY_JITTER", 0)
+    llm_utils.reset_llm_call_stats()
+    llm_cache.configure_llm_cache("passthrough")
+
+    def install(failures=()):
+        llm = FakeStructuredLLM(failures)
+        monkeypatch.setattr(llm_utils, "get_structured_llm", lambda *args, **kwargs: llm)
+        return llm
+
+    return install
+
+
+def connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+
+def test_structured_llm_is_memoized(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    llm_utils.reset_llm_clients()
+    first = llm_utils.get_structured_llm("gpt-4o-mini", 0, NextStep, {"top_p": 0.1})
+    assert llm_utils.get_structured_llm("gpt-4o-mini", 0.0, NextStep, {"top_p": 0.1}) is first
+    assert llm_utils.get_structured_llm("gpt-4o-mini", 0.8, NextStep, {"top_p": 0.1}) is not first
+    llm_utils.reset_llm_clients()
+
+
+def test_transient_errors_are_retried_and_recorded(fake_llm):
+    llm = fake_llm([connection_error(), connection_error()])
+    result = llm_utils.invoke_structured_llm("gpt-4o-mini", 0, "prompt", NextStep)
+    assert result.idea == "Check the valve"
+    assert llm.calls == 3
+    stats = llm_utils.get_llm_call_stats()["NextStep"]
+    assert (stats["calls"], stats["retries"], stats["input_tokens"], stats["output_tokens"]) == (1, 2, 120, 30)
+
+
+def test_gives_up_after_max_attempts(fake_llm):
+    llm = fake_llm([connection_error()] * llm_utils.LLM_MAX_ATTEMPTS)
+    with pytest.raises(openai.APIConnectionError):
+        llm_utils.invoke_structured_llm("gpt-4o-mini", 0, "prompt", NextStep)
+    assert llm.calls == llm_utils.LLM_MAX_ATTEMPTS
+
+
+def test_non_transient_errors_are_not_retried(fake_llm):
+    llm = fake_llm([ValueError("bad schema")])
+    with pytest.raises(ValueError):
+        llm_utils.invoke_structured_llm("gpt-4o-mini", 0, "prompt", NextStep)
+    assert llm.calls == 1
+
+
+def test_record_then_replay_without_llm(fake_llm, tmp_path):
+    db_path = tmp_path / "llm.sqlite"
+    llm = fake_llm()
+    llm_cache.configure_llm_cache("record", db_path)
+    recorded = llm_utils.invoke_structured_llm("gpt-4o-mini", 0, "prompt", NextStep)
+    llm_utils.invoke_structured_llm("gpt-4o-mini", 0, "prompt", NextStep)
+    assert llm.calls == 1
+
+    replay = llm_cache.configure_llm_cache("replay", db_path)
+    assert llm_utils.invoke_structured_llm("gpt-4o-mini", 0, "prompt", NextStep) == recorded
+    assert llm.calls == 1
+    with pytest.raises(llm_cache.LLMCacheMiss):
+        llm_utils.invoke_structured_llm("gpt-4o-mini", 0, "another prompt", NextStep)
+    assert (replay.hits, replay.misses) == (1, 1)
+    llm_cache.configure_llm_cache("passthrough")
+
+
+def test_sampled_calls_replay_in_order(tmp_path):
+    cache = llm_cache.LLMResponseCache(tmp_path / "llm.sqlite", "record")
+    for idea in ["first", "second"]:
+        key = cache.entry_key("gpt-4o-mini", 0.8, "prompt", NextStep, None)
+        cache.put(key, "gpt-4o-mini", NextStep(idea=idea, assumptions=[]))
+
+    cache.reset_occurrences()
+    replayed = [cache.get(cache.entry_key("gpt-4o-mini", 0.8, "prompt", NextStep, None), NextStep).idea for _ in range(2)]
+    assert replayed == ["first", "second"]
+
+
+def test_sampling_scope_replays_each_trajectory_from_the_start(tmp_path):
+    def trajectory(cache):
+        return [cache.entry_key("gpt-4o-mini", 0.8, "prompt", NextStep, None) for _ in range(2)]
+
+    cache = llm_cache.LLMResponseCache(tmp_path / "llm.sqlite", "record")
+    with llm_cache.sampling_scope():
+        recorded = trajectory(cache)
+    with llm_cache.sampling_scope():
+        assert trajectory(cache) == recorded  # A second run in the same process starts again at occurrence 0
+    with llm_cache.sampling_scope("rollout-1"):
+        labelled = trajectory(cache)
+    assert labelled[0].endswith(":rollout-1:0") and set(labelled).isdisjoint(recorded)
+    assert trajectory(cache) == recorded  # Outside a scope: the process-wide counters, untouched by the scopes
+
+
+def test_rate_limit_spaces_out_requests(fake_llm):
+    llm = fake_llm()
+    llm_utils.set_llm_rate_limit(1200) # 20 requests/s
+    try:
+        start = time.perf_counter()
+        for _ in range(3):
+            llm_utils.invoke_structured_llm("gpt-4o-mini", 0, "prompt", NextStep)
+        elapsed = time.perf_counter() - start
+    finally:
+        llm_utils.set_llm_rate_limit(None)
+    assert llm.calls == 3
+    assert elapsed >= 0.1 # The bucket starts empty: three tokens take ~0.15s to accrue
@@ -0,0 +1,119 @@
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from plan_sim import nodes, prompt_budget, vector_store
+from plan_sim.states import Assumptions, InputState, NextStep, NextStepCandidates, Plan
+
+
+@pytest.fixture
+def fake_store(monkeypatch):
+    monkeypatch.setattr(vector_store, "QDRANT_PATH", ":memory:")
+    vector_store.set_embedding_backend(DeterministicFakeEmbedding(size=16), embedding_dim=16)
+    yield vector_store
+    vector_store.set_embedding_backend(vector_store._default_embedding_backend, vector_store.OPENAI_EMBEDDING_DIM)
+
+
+def make_plan():
+    goal = InputState(goal="Fix a leaking tap", assumptions=Assumptions(ground_truth=["Tap drips"], vulnerabilities=[]))
+    return Plan(plan_id="p1", goal_state=goal, input_state=[goal], metric_count_1=100, metric_count_2=2)
+
+
+def test_batch_mode_makes_one_llm_call_and_keeps_a_novel_candidate(fake_store, monkeypatch):
+    fake_store.store_idea("Shut off the water supply", 1)
+    calls = []
+
+    def fake_llm(model_name, temperature, prompt, output_model, model_kwargs=None):
+        calls.append(output_model)
+        return NextStepCandidates(candidates=[
+            NextStep(idea="Shut off the water supply", assumptions=[]),
+            NextStep(idea="Replace the worn washer", assumptions=["Washer is the cause"]),
+        ])
+
+    monkeypatch.setattr(nodes, "invoke_structured_llm", fake_llm)
+    result = nodes.generate_next_idea(make_plan(), {"configurable": {"idea_candidates": 3}})
+
+    assert calls == [NextStepCandidates]
+    assert result["steps"].idea == "Replace the worn washer"
+    assert len(fake_store.get_novelty_index().vectors(1)) == 2
+
+
+@pytest.fixture
+def char_tokenizer(monkeypatch):
+    """Counts tokens as characters / 4, so budgets do not depend on a downloaded tokenizer."""
+    monkeypatch.setitem(prompt_budget._encodings, "gpt-4o-mini", None)
+    prompt_budget.count_tokens.cache_clear()
+    yield
+    prompt_budget.count_tokens.cache_clear()
+
+
+def test_idea_prompt_stays_within_token_budget(fake_store, char_tokenizer, monkeypatch):
+    prompts = []
+
+    def fake_llm(model_name, temperature, prompt, output_model, model_kwargs=None):
+        prompts.append(prompt)
+        return NextStep(idea="Replace the cartridge", assumptions=[])
+
+    monkeypatch.setattr(nodes, "invoke_structured_llm", fake_llm)
+    plan = make_plan().model_copy(update={"steps": [NextStep(idea=f"Earlier idea {i}", assumptions=[]) for i in range(500)]})
+    result = nodes.generate_next_idea(plan, {"configurable": {"prompt_token_budget": 1000}})
+
+    assert result["prompt_tokens"].tokens <= 1000
+    assert result["prompt_tokens"].step == 501
+    assert "- Earlier idea 499" in prompts[0]
+    assert "- Earlier idea 0\n" not in prompts[0]
+
+
+def summarizing_plan(core, delta):
+    plan = make_plan()
+    return plan.model_copy(update={
+        "steps": [NextStep(idea="Replace the worn washer", assumptions=[])],
+        "cumulative_assumptions": Assumptions(ground_truth=core + delta, vulnerabilities=[]),
+        "summarized_truths": len(core),
+    })
+
+
+def test_summarize_assumptions_condenses_only_the_delta(char_tokenizer, monkeypatch):
+    prompts = []
+
+    def fake_llm(model_name, temperature, prompt, output_model, model_kwargs=None):
+        prompts.append(prompt)
+        return Assumptions(ground_truth=["Washer replaced; drip stopped"], vulnerabilities=[])
+
+    monkeypatch.setattr(nodes, "invoke_structured_llm", fake_llm)
+    core = ["Water supply is off", "Tap is a compression tap"]
+    delta = ["Old washer was cracked", "New washer fits", "Drip stopped"]
+    result = nodes.summarize_assumptions(summarizing_plan(core, delta), {})
+
+    assert len(prompts) == 1
+    summarized, new = prompts[0].split("NEW GROUND TRUTHS:")
+    assert "- Water supply is off" in summarized and "- Old washer was cracked" in new
+    assert list(result["cumulative_assumptions"].ground_truth) == core + ["Washer replaced; drip stopped"]
+    assert result["summarized_truths"] == 3
+    assert [usage.node for usage in result["prompt_tokens"]] == ["summarize_assumptions"]
+
+
+def test_summarize_assumptions_skips_small_delta(monkeypatch):
+    monkeypatch.setattr(nodes, "invoke_structured_llm", lambda *args, **kwargs: pytest.fail("unexpected LLM call"))
+    plan = summarizing_plan([f"Fact {i}" for i in range(10)], ["New fact"])
+    assert nodes.summarize_assumptions(plan, {}) == {"cumulative_assumptions": plan.cumulative_assumptions}
+
+
+def test_summarize_assumptions_compacts_a_large_core(char_tokenizer, monkeypatch):
+    responses = [
+        Assumptions(ground_truth=["Condensed 1", "Condensed 2"], vulnerabilities=[]),
+        Assumptions(ground_truth=[f"Compacted {i}" for i in range(20)], vulnerabilities=[]),
+    ]
+    prompts = []
+
+    def fake_llm(model_name, temperature, prompt, output_model, model_kwargs=None):
+        prompts.append(prompt)
+        return responses[len(prompts) - 1]
+
+    monkeypatch.setattr(nodes, "invoke_structured_llm", fake_llm)
+    core = [f"Fact {i}" for i in range(nodes.SUMMARY_CORE_MAX_ITEMS)]
+    result = nodes.summarize_assumptions(summarizing_plan(core, ["A", "B", "C"]), {})
+
+    assert len(prompts) == 2
+    assert f"at most {nodes.SUMMARY_CORE_MAX_ITEMS} ground truths" in prompts[1]
+    assert len(result["cumulative_assumptions"].ground_truth) == nodes.SUMMARY_CORE_MAX_ITEMS
+    assert result["summarized_truths"] == nodes.SUMMARY_CORE_MAX_ITEMS
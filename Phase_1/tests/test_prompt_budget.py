@@ -0,0 +1,48 @@
+import logging
+
+import pytest
+
+from plan_sim import prompt_budget
+from plan_sim.prompt_budget import fit_prompt, prompt_tokens_by_step
+from plan_sim.states import PromptUsage
+
+MODEL = "test-model"
+TEMPLATE = "Goal: {goal}\nIdeas:\n{ideas}\nFacts: {facts}\n"
+
+
+@pytest.fixture(autouse=True)
+def char_tokenizer(monkeypatch):
+    """Counts tokens as characters / 4."""
+    monkeypatch.setitem(prompt_budget._encodings, MODEL, None)
+    prompt_budget.count_tokens.cache_clear()
+    yield
+    prompt_budget.count_tokens.cache_clear()
+
+
+def test_prompt_under_budget_is_unchanged():
+    prompt, tokens = fit_prompt(TEMPLATE, 1000, MODEL, {"ideas": (["- a", "- b"], "\n"), "facts": (["x"], ", ")}, goal="g")
+    assert prompt == TEMPLATE.format(goal="g", ideas="- a\n- b", facts="x")
+    assert tokens == prompt_budget.count_tokens(prompt, MODEL)
+
+
+def test_oldest_items_of_the_largest_field_are_dropped_first():
+    ideas = [f"- idea number {i}" for i in range(100)]
+    prompt, tokens = fit_prompt(TEMPLATE, 100, MODEL, {"ideas": (ideas, "\n"), "facts": (["short fact"], ", ")}, goal="g")
+    assert tokens <= 100
+    assert "- idea number 99" in prompt
+    assert "- idea number 0\n" not in prompt
+    assert "short fact" in prompt
+
+
+def test_fixed_part_over_budget_is_returned_with_a_warning(caplog):
+    with caplog.at_level(logging.WARNING):
+        prompt, tokens = fit_prompt(TEMPLATE, 5, MODEL, {"ideas": (["- a"], "\n"), "facts": ([], ", ")}, goal="g" * 100)
+    assert tokens > 5
+    assert "- a" not in prompt
+    assert "over the budget" in caplog.text
+
+
+def test_prompt_tokens_by_step():
+    usage = [PromptUsage(step=1, node="decider", tokens=10), PromptUsage(step=1, node="goal_check", tokens=5),
+             PromptUsage(step=2, node="decider", tokens=7)]
+    assert prompt_tokens_by_step(usage) == {1: 15, 2: 7}
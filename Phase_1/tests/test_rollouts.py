@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from plan_sim import llm_cache, llm_utils, nodes, rollouts, vector_store
+from plan_sim.states import Assumptions, InputState, NextStep, Outcome, Plan
+
+LLM_LATENCY_S = 0.05
+
+
+@pytest.fixture
+def stubbed_graph(monkeypatch):
+    """In-memory Qdrant, fake embeddings and a slow stub LLM that always proposes the same idea."""
+    if not os.getenv("OPENAI_API_KEY"):
+        monkeypatch.setenv("OPENAI_API_KEY", "test-placeholder-key") # Never used: the LLM is stubbed
+    monkeypatch.setattr(vector_store, "QDRANT_PATH", ":memory:")
+    vector_store.set_embedding_backend(DeterministicFakeEmbedding(size=16), embedding_dim=16)
+    llm_cache.configure_llm_cache("passthrough")
+    calls = []
+    calls_lock = threading.Lock()
+
+    def fake_llm(model_name, temperature, prompt, output_model, model_kwargs=None):
+        with calls_lock:
+            calls.append(output_model)
+        time.sleep(LLM_LATENCY_S)
+        if output_model is NextStep:
+            return NextStep(idea="Tighten the packing nut", assumptions=["A wrench is available"])
+        if output_model is Outcome:
+            return Outcome(new_truths=["The nut is tight"], new_vulnerabilities=[], cost_increment=5, time_increment=0.1)
+        if output_model is nodes.Decider:
+            return nodes.Decider(reason="stub", decision="success")
+        if output_model is nodes.GoalChecker:
+            return nodes.GoalChecker(achieved="yes")
+        raise ValueError(f"Unexpected output model {output_model.__name__}")
+
+    monkeypatch.setattr(nodes, "invoke_structured_llm", fake_llm)
+    yield calls
+    vector_store.reset_vector_store()
+    vector_store.set_embedding_backend(vector_store._default_embedding_backend, vector_store.OPENAI_EMBEDDING_DIM)
+
+
+def make_plan():
+    goal = InputState(goal="Fix a leaking tap", assumptions=Assumptions(ground_truth=["Tap drips"], vulnerabilities=[]))
+    return Plan(plan_id="tap", goal_state=goal, input_state=[goal],
+                cumulative_assumptions=Assumptions(ground_truth=[], vulnerabilities=[]),
+                metric_count_1=100, metric_count_2=2)
+
+
+def test_rollouts_run_concurrently_in_separate_namespaces(stubbed_graph):
+    start = time.perf_counter()
+    results = rollouts.run_rollouts(make_plan(), 4)
+    wall_time = time.perf_counter() - start
+
+    assert [r.status for r in results] == [rollouts.GOAL_REACHED] * 4
+    assert len({r.plan_id for r in results}) == 4
+    assert all(r.steps == 1 and r.metric_count_1 == 95 for r in results)
+    # The same idea is novel in every rollout: one generation call each, no retries
+    assert stubbed_graph.count(NextStep) == 4
+    index = vector_store.get_novelty_index()
+    assert all(len(index.vectors(vector_store._index_key(1, r.plan_id))) == 1 for r in results)
+    assert wall_time < sum(r.elapsed_s for r in results)
+
+
+def test_rollouts_replay_their_own_recorded_samples(stubbed_graph, monkeypatch, tmp_path):
+    # Route calls through the real cache, with a structured LLM that samples a new idea per call
+    monkeypatch.setattr(nodes, "invoke_structured_llm", llm_utils.invoke_structured_llm)
+    live_calls = []
+
+    class SampledLLM:
+        def __init__(self, output_model):
+            self.output_model = output_model
+
+        def invoke(self, prompt):
+            live_calls.append(self.output_model)
+            if self.output_model is NextStep:
+                parsed = NextStep(idea=f"Sampled idea {len(live_calls)}", assumptions=[])
+            elif self.output_model is Outcome:
+                parsed = Outcome(new_truths=["The nut is tight"], new_vulnerabilities=[], cost_increment=5, time_increment=0.1)
+            elif self.output_model is nodes.Decider:
+                parsed = nodes.Decider(reason="stub", decision="success")
+            else:
+                parsed = nodes.GoalChecker(achieved="yes")
+            return {"raw": None, "parsed": parsed, "parsing_error": None}
+
+    monkeypatch.setattr(llm_utils, "get_structured_llm", lambda model_name, temperature, output_model, model_kwargs=None: SampledLLM(output_model))
+    db_path = tmp_path / "llm.sqlite"
+    try:
+        llm_cache.configure_llm_cache("record", db_path)
+        recorded = rollouts.run_rollouts(make_plan(), 2, max_workers=2)
+        assert live_calls.count(NextStep) == 2  # Same prompt, but each rollout records its own sample
+
+        live_calls.clear()
+        replay = llm_cache.configure_llm_cache("replay", db_path)
+        for _ in range(2):  # Replaying twice in one process starts each rollout from its first sample
+            replayed = rollouts.run_rollouts(make_plan(), 2, max_workers=2)
+            assert [r.status for r in replayed] == [r.status for r in recorded] == [rollouts.GOAL_REACHED] * 2
+        assert live_calls == [] and replay.misses == 0
+    finally:
+        llm_cache.configure_llm_cache("passthrough")
+
+
+def test_summarize_rollouts():
+    results = [
+        rollouts.RolloutResult("a", rollouts.GOAL_REACHED, 3, 40.0, 1.0, 2.0),
+        rollouts.RolloutResult("b", rollouts.GOAL_REACHED, 5, 20.0, 0.5, 3.0),
+        rollouts.RolloutResult("c", rollouts.ABANDONED, 7, 0.0, 0.0, 4.0),
+        rollouts.RolloutResult("d", rollouts.ERROR, 0, None, None, 1.0, error="boom"),
+    ]
+    summary = rollouts.summarize_rollouts(results, wall_time_s=4.5)
+
+    assert summary["success_rate"] == 0.5
+    assert summary["status_counts"] == {"goal_reached": 2, "abandoned": 1, "step_limit": 0, "error": 1}
+    assert summary["mean_metric_count_1"] == 20.0
+    assert summary["mean_steps_to_goal"] == 4.0
+    assert summary["sum_rollout_time_s"] == 10.0
+    table = rollouts.format_rollout_summary(results, summary)
+    assert "| Success rate | 50% |" in table
+    assert "| d | error | 0 | - | - | 1.0 |" in table
@@ -0,0 +1,45 @@
+import copy
+import pickle
+
+from plan_sim.states import AppendLog, Assumptions, InputState, NextStep, Plan, safe_append
+
+
+def make_plan(**fields):
+    goal = InputState(goal="Fix a leaking tap", assumptions=Assumptions(ground_truth=["Tap drips"], vulnerabilities=[]))
+    empty = Assumptions(ground_truth=[], vulnerabilities=[])
+    return Plan(plan_id="p1", goal_state=goal, cumulative_assumptions=empty, **fields)
+
+
+def test_snapshots_share_storage_but_stay_immutable():
+    first = safe_append(AppendLog(), "a")
+    second = safe_append(first, ["b", "c"])
+    assert second._items is first._items
+    assert list(first) == ["a"] and list(second) == ["a", "b", "c"]
+
+    branch = safe_append(first, "x")  # Extending an older snapshot copies its prefix
+    assert list(branch) == ["a", "x"] and list(second) == ["a", "b", "c"]
+    assert second[-1] == "c" and second[1:] == ["b", "c"]
+    assert second == ["a", "b", "c"]
+
+
+def test_pydantic_validates_only_new_items_and_serializes_to_lists():
+    plan = make_plan(steps=[{"idea": "Shut off water", "assumptions": []}])
+    assert isinstance(plan.steps, AppendLog) and isinstance(plan.steps[0], NextStep)
+
+    grown = safe_append(plan.steps, {"idea": "Replace washer", "assumptions": ["Washer is worn"]})
+    revalidated = make_plan(steps=grown)
+    assert revalidated.steps is grown  # Not copied
+    assert isinstance(revalidated.steps[1], NextStep)
+
+    dumped = revalidated.model_dump()
+    assert dumped["steps"] == [{"idea": "Shut off water", "assumptions": []},
+                               {"idea": "Replace washer", "assumptions": ["Washer is worn"]}]
+    assert Plan.model_validate_json(revalidated.model_dump_json()).steps == revalidated.steps
+
+
+def test_assumption_lists_concatenate_without_copying():
+    assumptions = Assumptions(ground_truth=["a"], vulnerabilities=[])
+    updated = assumptions.ground_truth + ["b"]
+    assert isinstance(updated, AppendLog) and updated._items is assumptions.ground_truth._items
+    assert pickle.loads(pickle.dumps(updated)) == ["a", "b"]
+    assert copy.deepcopy(updated) == updated
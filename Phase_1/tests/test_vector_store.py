@@ -0,0 +1,97 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from plan_sim import vector_store
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return super().embed_query(text)
+
+
+@pytest.fixture
+def fake_store(monkeypatch):
+    """In-memory Qdrant with a deterministic local embedding backend."""
+    monkeypatch.setattr(vector_store, "QDRANT_PATH", ":memory:")
+    vector_store.set_embedding_backend(CountingEmbedding(size=16), embedding_dim=16)
+    yield vector_store
+    vector_store.set_embedding_backend(vector_store._default_embedding_backend, vector_store.OPENAI_EMBEDDING_DIM)
+
+
+def test_import_does_not_initialize_store():
+    code = (
+        "import sys, plan_sim.vector_store as vs\n"
+        "assert vs._vector_store is None\n"
+        "assert not {'qdrant_client', 'langchain_qdrant', 'langchain_openai'} & set(sys.modules)\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_novelty_is_checked_per_step(fake_store):
+    assert fake_store.is_idea_novel("Shut off the water supply", 1)
+    fake_store.store_idea("Shut off the water supply", 1)
+    assert not fake_store.is_idea_novel("Shut off the water supply", 1)
+    assert fake_store.is_idea_novel("Shut off the water supply", 2)
+    assert fake_store.is_idea_novel("Replace the cartridge", 1)
+
+
+def test_store_initialized_once(fake_store):
+    assert fake_store.get_vector_store() is fake_store.get_vector_store()
+
+
+def test_check_then_store_embeds_once(fake_store):
+    embeddings = fake_store.get_vector_store().embeddings
+    assert fake_store.is_idea_novel("Turn off the main valve", 1)
+    fake_store.store_idea("Turn off the main valve", 1)
+    assert embeddings.calls == 1
+    assert not fake_store.is_idea_novel("Turn off the main valve", 1)
+    assert fake_store.get_embedding_cache_stats()["misses"] == 1
+
+    fake_store.flush_idea_writes()
+    store = fake_store.get_vector_store()
+    stored, _ = store.client.scroll(store.collection_name)
+    assert [p.payload for p in stored] == [{"page_content": "Turn off the main valve", "metadata": {"step": 1}}]
+
+
+def test_index_matches_brute_force_cosine():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(40, 8))
+    index = vector_store.NoveltyIndex(8)
+    for vector in vectors[:25]:  # Forces several capacity doublings
+        index.add(3, vector)
+    index.add(3, vectors[25:])
+    query = rng.normal(size=8)
+    expected = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    np.testing.assert_allclose(index.similarities(3, query), expected, atol=1e-6)
+    assert index.max_similarity(4, query) == -1.0
+
+
+def test_index_reloaded_from_qdrant_on_startup(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_store, "QDRANT_PATH", str(tmp_path / "qdrant"))
+    vector_store.set_embedding_backend(CountingEmbedding(size=16), embedding_dim=16)
+    try:
+        vector_store.store_idea("Drain the pipes", 2)
+        vector_store.reset_vector_store()  # Flushes pending writes, closes the client
+        assert vector_store._novelty_index is None
+
+        assert not vector_store.is_idea_novel("Drain the pipes", 2)
+        assert len(vector_store.get_novelty_index()) == 1
+    finally:
+        vector_store.set_embedding_backend(vector_store._default_embedding_backend, vector_store.OPENAI_EMBEDDING_DIM)
+
+
+def test_select_novel_candidate_skips_stored_and_duplicate_ideas(fake_store):
+    fake_store.store_idea("Shut off the water supply", 1)
+    texts = ["Shut off the water supply", "Replace the washer", "Replace the washer", "Call a plumber"]
+    vectors = fake_store.embed_ideas(texts)
+    chosen, num_usable = fake_store.select_novel_candidate(vectors, 1)
+    assert num_usable == 2  # The stored idea and the repeated washer candidate are excluded
+    assert texts[chosen] in {"Replace the washer", "Call a plumber"}
+    assert fake_store.get_embedding_cache_stats()["misses"] == 3  # One batch for the unseen texts
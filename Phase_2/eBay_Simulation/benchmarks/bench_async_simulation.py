@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark: conversations/sec for the async simulation path vs. thread-per-conversation.
+
+Runs many full simulation graphs concurrently against a fake LLM (fixed-latency
+runnables) and a local fake eBay Browse API server, so no API keys, network
+access or database are needed. The async mode multiplexes every conversation on
+one event loop via `arun_simulation`; the threads mode runs `run_simulation` on
+a thread pool of the same size.
+
+Usage:
+    python benchmarks/bench_async_simulation.py [--conversations 100] [--llm-latency 0.05]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parents[1]))
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+
+from core import agents, analysis, simulation
+import tools.ebay_api as ebay_api
+from tools.ebay_api import EbayAPI
+
+
+# --- Fake eBay Browse API ---
+
+def start_fake_ebay_server(latency: float):
+    """Starts a local HTTP server mimicking the eBay token, search and item endpoints."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, payload):
+            time.sleep(latency)
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._send_json({"access_token": "fake-token", "expires_in": 7200})
+
+        def do_GET(self):
+            if "/item_summary/search" in self.path:
+                self._send_json({"itemSummaries": [
+                    {"title": f"Trail Running Shoe {i}", "price": {"value": f"{40 + i}.99", "currency": "USD"},
+                     "condition": "New", "itemId": f"v1|10{i}|0"}
+                    for i in range(5)
+                ]})
+            else:
+                self._send_json({"title": "Trail Running Shoe 0", "price": {"value": "40.99", "currency": "USD"},
+                                 "condition": "New", "description": "<p>Lightweight trail shoe.</p>"})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --- Fake LLM runnables ---
+
+def seller_reply(inputs):
+    messages = inputs["messages"]
+    if isinstance(messages[-1], ToolMessage):
+        return AIMessage(content="Here are a few options that might suit you.")
+    if not any(getattr(m, "tool_calls", None) for m in messages):
+        return AIMessage(content="", tool_calls=[
+            {"name": "ebay_search_tool", "args": {"query": "trail running shoes"}, "id": f"call_{len(messages)}"}
+        ])
+    return AIMessage(content="Could you tell me a little more about what you need?")
+
+
+def install_fakes(llm_latency: float, ebay_url: str):
+    """Replaces LLM runnables, eBay endpoints, environment loading and DB access with local fakes."""
+
+    def with_latency(fn):
+        def sync_fn(inputs):
+            time.sleep(llm_latency)
+            return fn(inputs)
+
+        async def async_fn(inputs):
+            await asyncio.sleep(llm_latency)
+            return fn(inputs)
+
+        return RunnableLambda(sync_fn, afunc=async_fn)
+
+    seller = with_latency(seller_reply)
+    buyer = with_latency(lambda inputs: AIMessage(content="I'm looking for something durable and comfortable."))
+    analyzer = with_latency(lambda inputs: analysis.SaleAnalysisOutput(sale_detected=False, confidence=0.2))
+
+    agents.get_seller_runnable = lambda prompt, *args, **kwargs: seller
+    agents.get_buyer_runnable = lambda prompt, *args, **kwargs: buyer
+    analysis.get_sale_analysis_runnable = lambda: analyzer
+
+    os.environ.update({"EBAY_CLIENT_ID": "fake", "EBAY_CLIENT_SECRET": "fake", "EBAY_USE_SANDBOX": "false", "EBAY_CACHE_PATH": ""})
+    EbayAPI.PRODUCTION_BASE_URL = f"{ebay_url}/buy/browse/v1"
+    EbayAPI.PRODUCTION_TOKEN_URL = f"{ebay_url}/identity/v1/oauth2/token"
+
+    simulation.load_environment = lambda: True
+    simulation.acquire_db_connection = lambda: None
+
+
+# --- Runners ---
+
+async def run_async(conversations: int):
+    return await asyncio.gather(*(simulation.arun_simulation(persona_id="topic_0") for _ in range(conversations)))
+
+
+def run_threads(conversations: int):
+    with ThreadPoolExecutor(max_workers=conversations) as executor:
+        return list(executor.map(lambda _: simulation.run_simulation(persona_id="topic_0"), range(conversations)))
+
+
+def timed(label: str, conversations: int, fn):
+    ebay_api._response_cache = None  # Each mode starts with a cold (memory-only) response cache
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        results = fn()
+        elapsed = time.perf_counter() - start
+    errors = sum(1 for r in results if "error" in r)
+    messages = sum(len(r.get("messages", [])) for r in results)
+    cache_hits = sum(r.get("ebay_cache_stats", {}).get("hits", 0) for r in results)
+    cache_lookups = cache_hits + sum(r.get("ebay_cache_stats", {}).get("misses", 0) for r in results)
+    print(f"{label:<8} {conversations:>5} conversations in {elapsed:7.2f}s -> {conversations / elapsed:8.1f} conv/s "
+          f"({messages} messages, {errors} errors, eBay cache hits {cache_hits}/{cache_lookups})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=100, help="Concurrent conversations per mode.")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Simulated seconds per LLM call.")
+    parser.add_argument("--ebay-latency", type=float, default=0.02, help="Simulated seconds per eBay request.")
+    parser.add_argument("--modes", nargs="+", default=["async", "threads"], choices=["async", "threads"])
+    args = parser.parse_args()
+
+    server = start_fake_ebay_server(args.ebay_latency)
+    install_fakes(args.llm_latency, f"http://127.0.0.1:{server.server_address[1]}")
+    print(f"Fake LLM latency {args.llm_latency * 1000:.0f} ms, fake eBay latency {args.ebay_latency * 1000:.0f} ms, "
+          f"max messages per conversation {simulation.MAX_MESSAGES}")
+
+    if "async" in args.modes:
+        timed("async", args.conversations, lambda: asyncio.run(run_async(args.conversations)))
+    if "threads" in args.modes:
+        timed("threads", args.conversations, lambda: run_threads(args.conversations))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark: simulation_logs insert throughput, per-message INSERTs vs. SimulationLogWriter.
+
+Needs a reachable PostgreSQL server configured through the usual DB_* variables
+(.env is loaded). Rows go to a session-local TEMP table named simulation_logs,
+which shadows the real table, so no data is left behind.
+
+Usage:
+    python benchmarks/bench_db_writer.py [--conversations 50] [--messages 20] [--batch-size 100]
+"""
+import argparse
+import contextlib
+import io
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parents[1]))
+
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage
+
+from utils.db import SimulationLogWriter, get_db_connection, log_message_to_db
+
+load_dotenv(Path(__file__).parents[1] / ".env")
+
+TEMP_TABLE_SQL = """
+    CREATE TEMP TABLE simulation_logs (
+        log_id SERIAL PRIMARY KEY,
+        simulation_id UUID NOT NULL,
+        persona_id VARCHAR(50) NOT NULL,
+        turn_number INT NOT NULL,
+        role VARCHAR(50) NOT NULL,
+        content TEXT,
+        tool_name VARCHAR(100),
+        tool_call_id VARCHAR(100),
+        timestamp TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def sample_messages(count: int):
+    return [
+        HumanMessage(content=f"Buyer message {i}: do you have this in a larger size?") if i % 2 == 0
+        else AIMessage(content=f"Seller message {i}: yes, sizes 8 through 12 are in stock.")
+        for i in range(count)
+    ]
+
+
+def per_message(conn, conversations: int, messages):
+    for _ in range(conversations):
+        simulation_id = str(uuid.uuid4())
+        for turn, msg in enumerate(messages):
+            log_message_to_db(conn, simulation_id, "topic_0", turn, msg)
+        conn.commit()
+
+
+def buffered(conn, conversations: int, messages, batch_size: int):
+    for _ in range(conversations):
+        simulation_id = str(uuid.uuid4())
+        with SimulationLogWriter(conn, batch_size=batch_size) as log_writer:
+            for turn, msg in enumerate(messages):
+                log_writer.add(simulation_id, "topic_0", turn, msg)
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=50, help="Simulated conversations per mode.")
+    parser.add_argument("--messages", type=int, default=20, help="Logged messages per conversation.")
+    parser.add_argument("--batch-size", type=int, default=100, help="SimulationLogWriter batch size.")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        conn = get_db_connection()
+    if conn is None:
+        sys.exit("Could not connect to PostgreSQL; check the DB_* settings in .env.")
+
+    with conn.cursor() as cur:
+        cur.execute(TEMP_TABLE_SQL)
+    conn.commit()
+
+    messages = sample_messages(args.messages)
+    total_rows = args.conversations * args.messages
+    modes = [
+        ("per-message", lambda: per_message(conn, args.conversations, messages)),
+        ("buffered", lambda: buffered(conn, args.conversations, messages, args.batch_size)),
+    ]
+    try:
+        for label, run in modes:
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            print(f"{label:<12} {total_rows:>7} rows in {elapsed:7.3f}s -> {total_rows / elapsed:10.0f} rows/s")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-turn LLM setup overhead with and without the client pool.
+
+Measures only the cost of preparing the seller/buyer runnables for a turn
+(client construction, tool binding, prompt building) - no model is invoked,
+so a placeholder GOOGLE_API_KEY is sufficient.
+
+Usage:
+    python benchmarks/bench_llm_pool.py [--turns 20] [--repeats 5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parents[1]))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder-key")
+
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from core import agents
+
+
+def unpooled_turn(seller_prompt: str, buyer_prompt: str):
+    """Replicates the previous per-turn setup: fresh clients, bind_tools, prompts."""
+    seller_llm = agents._create_llm(agents.DEFAULT_MODEL_NAME, agents.DEFAULT_TEMPERATURE)
+    seller_prompt_template = ChatPromptTemplate.from_messages(
+        [("system", seller_prompt), MessagesPlaceholder(variable_name="messages")]
+    )
+    seller_prompt_template | seller_llm.bind_tools(agents.seller_tools)
+    buyer_llm = agents._create_llm(agents.DEFAULT_MODEL_NAME, agents.DEFAULT_TEMPERATURE)
+    ChatPromptTemplate.from_template(f"{buyer_prompt}\n\nConversation History:\n{{messages}}") | buyer_llm
+
+
+def pooled_turn(seller_prompt: str, buyer_prompt: str):
+    """Per-turn setup using the process-wide pool."""
+    agents.get_seller_runnable(seller_prompt)
+    agents.get_buyer_runnable(buyer_prompt)
+
+
+def time_conversation(turn_fn, turns: int) -> float:
+    seller_prompt = agents.DEFAULT_SELLER_SYSTEM_PROMPT
+    buyer_prompt = "You are a price-conscious shopper looking for running shoes."
+    start = time.perf_counter()
+    # Silence the per-construction prints so they do not dominate timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(turns):
+            turn_fn(seller_prompt, buyer_prompt)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20, help="Turns per simulated conversation.")
+    parser.add_argument("--repeats", type=int, default=5, help="Conversations to time per mode.")
+    args = parser.parse_args()
+
+    unpooled = [time_conversation(unpooled_turn, args.turns) for _ in range(args.repeats)]
+    pooled = []
+    for _ in range(args.repeats):
+        agents.reset_llm_pool()  # Each conversation pays the one-off construction cost
+        pooled.append(time_conversation(pooled_turn, args.turns))
+
+    best_unpooled, best_pooled = min(unpooled), min(pooled)
+    print(f"Turns per conversation: {args.turns}")
+    print(f"Unpooled: {best_unpooled * 1000:8.2f} ms/conversation  ({best_unpooled / args.turns * 1000:.3f} ms/turn)")
+    print(f"Pooled:   {best_pooled * 1000:8.2f} ms/conversation  ({best_pooled / args.turns * 1000:.3f} ms/turn)")
+    print(f"Speed-up: {best_unpooled / best_pooled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
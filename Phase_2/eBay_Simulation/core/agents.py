@@ -2,38 +2,48 @@
 Defines the Seller and Buyer agent nodes for the LangGraph simulation.
 
 Includes:
-- LLM initialization (`get_llm`) with retry logic.
+- LLM initialization (`get_llm`) with retry logic, pooled per process so that
+  clients and prompt|llm runnables are built once rather than every turn.
 - Tool definitions (`@tool`) for eBay API interaction (search, item details).
 - System prompts for the Seller agent.
 - Agent node functions (`seller_agent_node`, `buyer_agent_node`) that invoke 
-  the LLM with appropriate prompts, tools (for seller), and conversation history.
+  the LLM with appropriate prompts, tools (for seller), and conversation history,
+  plus async variants (`aseller_agent_node`, `abuyer_agent_node`) for `app.astream`.
 - Error handling and fallback mechanisms for agent invocations.
 """
 import os
-from typing import List, Optional
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.rate_limiters import InMemoryRateLimiter
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.tools import tool
-from tools.ebay_api import search_ebay, answer_item_question
+from langchain_core.tools import StructuredTool
+from tools.ebay_api import search_ebay, answer_item_question, asearch_ebay, aanswer_item_question
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 # --- LLM Setup ---
 
-def get_llm():
-    """Initializes and returns the primary ChatGoogleGenerativeAI LLM instance.
-    
-    Reads the GOOGLE_API_KEY from environment variables.
-    Configures the model name (currently hardcoded), temperature, timeout, and retries.
-    Includes a retry mechanism for initialization errors.
-
-    Raises:
-        ValueError: If GOOGLE_API_KEY is not found in the environment.
-        RuntimeError: If the LLM fails to initialize after retries.
-        
-    Returns:
-        An initialized ChatGoogleGenerativeAI instance.
-    """
+DEFAULT_MODEL_NAME = "gemini-2.0-flash-001"
+DEFAULT_TEMPERATURE = 0.7
+
+# Process-wide client registry. Clients are keyed by (model, temperature, tool
+# names) and composed runnables (prompt | llm) by a caller-supplied key, so each
+# is constructed once per process instead of once per conversation turn.
+_llm_pool: Dict[tuple, Any] = {}
+_runnable_pool: Dict[tuple, Any] = {}
+_pool_lock = threading.RLock()
+# Optional token-bucket limiter shared by every pooled client (see set_llm_rate_limiter)
+_llm_rate_limiter: Optional[InMemoryRateLimiter] = None
+
+def _tool_key(tools: Optional[Sequence[Any]]) -> tuple:
+    """Returns a hashable key identifying a tool set by tool name."""
+    if not tools:
+        return ()
+    return tuple(sorted(getattr(t, "name", repr(t)) for t in tools))
+
+def _create_llm(model_name: str, temperature: float) -> ChatGoogleGenerativeAI:
+    """Constructs a new ChatGoogleGenerativeAI client (not pooled)."""
     google_api_key = os.getenv("GOOGLE_API_KEY")
     if not google_api_key:
         raise ValueError("ERROR: GOOGLE_API_KEY not found in environment variables.")
@@ -49,19 +59,101 @@ def get_llm():
     )
     def create_llm():
         return ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash-001", 
-            temperature=0.7, 
+            model=model_name, 
+            temperature=temperature, 
             google_api_key=google_api_key,
             timeout=60,  # Corrected parameter name
             max_retries=2,  # Built-in retry mechanism
+            rate_limiter=_llm_rate_limiter,  # Shared across all clients and threads
         )
         
     return create_llm()
 
+def get_llm(model_name: str = DEFAULT_MODEL_NAME, temperature: float = DEFAULT_TEMPERATURE, tools: Optional[Sequence[Any]] = None):
+    """Returns the pooled ChatGoogleGenerativeAI LLM instance for a configuration.
+    
+    Reads the GOOGLE_API_KEY from environment variables on first construction.
+    Clients are cached process-wide, keyed by model name, temperature and the
+    names of any bound tools, so repeated calls reuse the same instance.
+    Includes a retry mechanism for initialization errors.
+
+    Args:
+        model_name: The Gemini model to use.
+        temperature: Sampling temperature.
+        tools: Optional tools to bind; the tool-bound runnable is pooled as well.
+
+    Raises:
+        ValueError: If GOOGLE_API_KEY is not found in the environment.
+        RuntimeError: If the LLM fails to initialize after retries.
+        
+    Returns:
+        An initialized ChatGoogleGenerativeAI instance (or its tool-bound runnable).
+    """
+    key = (model_name, temperature, _tool_key(tools))
+    llm = _llm_pool.get(key)
+    if llm is not None:
+        return llm
+    with _pool_lock:
+        llm = _llm_pool.get(key)
+        if llm is None:
+            if tools:
+                llm = get_llm(model_name, temperature).bind_tools(list(tools))
+            else:
+                llm = _create_llm(model_name, temperature)
+            _llm_pool[key] = llm
+            print(f"--- LLM client pooled: model={model_name}, temperature={temperature}, tools={list(key[2])} ---")
+    return llm
+
+def get_pooled_runnable(key: tuple, factory: Callable[[], Any]):
+    """Returns a cached runnable for `key`, building it with `factory` on first use.
+
+    Use for prompt | llm compositions whose inputs (system prompt text, model,
+    temperature, tools) are fully described by `key`.
+    """
+    runnable = _runnable_pool.get(key)
+    if runnable is not None:
+        return runnable
+    with _pool_lock:
+        runnable = _runnable_pool.get(key)
+        if runnable is None:
+            runnable = factory()
+            _runnable_pool[key] = runnable
+    return runnable
+
+def set_llm_rate_limiter(requests_per_second: Optional[float]):
+    """Installs a process-wide LLM rate limiter shared by all pooled clients.
+
+    Every Gemini call made through `get_llm` (agents, sale analysis, wisdom
+    generation) draws from the same token bucket, so concurrent simulations
+    cannot exceed the provider quota. Clears the pool so clients are rebuilt
+    with the new limiter.
+
+    Args:
+        requests_per_second: Allowed request rate, or None/0 to disable limiting.
+    """
+    global _llm_rate_limiter
+    with _pool_lock:
+        if requests_per_second:
+            _llm_rate_limiter = InMemoryRateLimiter(
+                requests_per_second=requests_per_second,
+                check_every_n_seconds=0.05,
+                max_bucket_size=max(1.0, requests_per_second),
+            )
+            print(f"--- LLM rate limiter set: {requests_per_second} requests/sec ---")
+        else:
+            _llm_rate_limiter = None
+        _llm_pool.clear()
+        _runnable_pool.clear()
+
+def reset_llm_pool():
+    """Clears all pooled clients and runnables (e.g. after changing API keys)."""
+    with _pool_lock:
+        _llm_pool.clear()
+        _runnable_pool.clear()
+
 # --- Tool Definitions ---
 
-@tool
-def ebay_search_tool(
+def _ebay_search(
     query: str,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None
@@ -85,28 +177,19 @@ def ebay_search_tool(
     print(f"--- Search Tool Results ---\n{results}")
     return results
 
-@tool
-def answer_item_question_tool(item_id: str) -> str:
-    """
-    Retrieves a standardized **summary** of details for a specific eBay item using its Item ID.
-    Use this ONLY when the buyer asks for more details about a specific item identified by its ID,
-    or when you want to provide a summary after presenting search results.
-    
-    **IMPORTANT:** This tool provides a general summary (Title, Price, Condition, Description, etc.).
-    It does NOT directly answer specific questions like 'Does it come in blue?' or 'What is the warranty?'.
-    If the buyer asks a specific question not covered by the summary, state that the information isn't available in the summary.
-
-    Args:
-        item_id: The eBay Item ID (obtained from 'ebay_search_tool' results).
+async def _aebay_search(
+    query: str,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None
+) -> str:
+    """Async implementation of `ebay_search_tool` (non-blocking HTTP)."""
+    print(f"--- Calling eBay Search Tool (async) --- Query: {query}, Min: {min_price}, Max: {max_price}")
+    results = await asearch_ebay(query=query, min_price=min_price, max_price=max_price)
+    print(f"--- Search Tool Results ---\n{results}")
+    return results
 
-    Returns:
-        A markdown formatted string summarizing the item's key details, including a clearly marked 'Product Description:' section.
-    """
-    print(f"--- Calling Answer Item Question Tool --- Item ID: {item_id}")
-    # Simulate getting details - in a real scenario, this would call the ebay_api.answer_item_question
-    # We modify the *return format* here to include the description explicitly.
-    results = answer_item_question(item_id=item_id) # Assume this function returns a dict or object
-    
+def _format_item_answer(item_id: str, results) -> str:
+    """Formats item details for the seller, ensuring a 'Product Description:' section."""
     # Construct the formatted string output, ensuring description is present
     if isinstance(results, dict):
         formatted_output = f"""**Item Summary (ID: {item_id})**
@@ -131,6 +214,43 @@ def answer_item_question_tool(item_id: str) -> str:
     print(f"--- Answer Tool Results (Formatted) ---\n{formatted_output}")
     return formatted_output
 
+def _answer_item_question(item_id: str) -> str:
+    """
+    Retrieves a standardized **summary** of details for a specific eBay item using its Item ID.
+    Use this ONLY when the buyer asks for more details about a specific item identified by its ID,
+    or when you want to provide a summary after presenting search results.
+    
+    **IMPORTANT:** This tool provides a general summary (Title, Price, Condition, Description, etc.).
+    It does NOT directly answer specific questions like 'Does it come in blue?' or 'What is the warranty?'.
+    If the buyer asks a specific question not covered by the summary, state that the information isn't available in the summary.
+
+    Args:
+        item_id: The eBay Item ID (obtained from 'ebay_search_tool' results).
+
+    Returns:
+        A markdown formatted string summarizing the item's key details, including a clearly marked 'Product Description:' section.
+    """
+    print(f"--- Calling Answer Item Question Tool --- Item ID: {item_id}")
+    # Simulate getting details - in a real scenario, this would call the ebay_api.answer_item_question
+    # We modify the *return format* here to include the description explicitly.
+    results = answer_item_question(item_id=item_id) # Assume this function returns a dict or object
+    return _format_item_answer(item_id, results)
+
+async def _aanswer_item_question(item_id: str) -> str:
+    """Async implementation of `answer_item_question_tool` (non-blocking HTTP)."""
+    print(f"--- Calling Answer Item Question Tool (async) --- Item ID: {item_id}")
+    results = await aanswer_item_question(item_id=item_id)
+    return _format_item_answer(item_id, results)
+
+# Tools carry both sync and async implementations, so the same ToolNode works
+# under `app.stream` (run_simulation) and `app.astream` (arun_simulation).
+ebay_search_tool = StructuredTool.from_function(
+    func=_ebay_search, coroutine=_aebay_search, name="ebay_search_tool"
+)
+answer_item_question_tool = StructuredTool.from_function(
+    func=_answer_item_question, coroutine=_aanswer_item_question, name="answer_item_question_tool"
+)
+
 # List of tools available to the seller
 seller_tools = [ebay_search_tool, answer_item_question_tool]
 
@@ -153,6 +273,63 @@ Your primary goal is to understand the customer's needs, help them find suitable
 **Output Format:** Your response must be **EITHER** a direct message to the customer **OR** a call to **ONE** tool. Never both.
 """
 
+# --- Pooled Agent Runnables ---
+
+def get_seller_runnable(system_prompt: str, model_name: str = DEFAULT_MODEL_NAME, temperature: float = DEFAULT_TEMPERATURE):
+    """Returns the pooled seller runnable (system prompt | tool-bound LLM)."""
+    key = ("seller", system_prompt, model_name, temperature, _tool_key(seller_tools))
+
+    def build():
+        prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", system_prompt),  # Use the prompt set in state
+                MessagesPlaceholder(variable_name="messages"),
+            ]
+        )
+        return prompt | get_llm(model_name, temperature, tools=seller_tools)
+
+    return get_pooled_runnable(key, build)
+
+def get_buyer_runnable(buyer_persona_prompt: str, model_name: str = DEFAULT_MODEL_NAME, temperature: float = DEFAULT_TEMPERATURE):
+    """Returns the pooled buyer runnable for a persona prompt (no tools)."""
+    key = ("buyer", buyer_persona_prompt, model_name, temperature)
+
+    def build():
+        # Create the prompt using the loaded buyer prompt
+        buyer_system_prompt = f"""
+{buyer_persona_prompt}
+
+You are acting as the customer described above. Continue the conversation naturally based on the history provided below.
+Focus on your persona's goals and interests. Ask questions or make statements consistent with your profile.
+Your response should be just your conversational reply, without any preamble like "Buyer:".
+
+Conversation History:
+{{messages}}
+"""
+        return ChatPromptTemplate.from_template(buyer_system_prompt) | get_llm(model_name, temperature)
+
+    return get_pooled_runnable(key, build)
+
+def get_seller_fallback_runnable():
+    """Returns the pooled tool-less seller runnable used when the main call fails."""
+    return get_pooled_runnable(
+        ("seller_fallback", DEFAULT_MODEL_NAME, DEFAULT_TEMPERATURE),
+        lambda: ChatPromptTemplate.from_messages([
+            ("system", "You are a helpful salesperson. Respond briefly and professionally."),
+            MessagesPlaceholder(variable_name="messages")
+        ]) | get_llm(),
+    )
+
+def get_buyer_fallback_runnable():
+    """Returns the pooled simple buyer runnable used when the main call fails."""
+    return get_pooled_runnable(
+        ("buyer_fallback", DEFAULT_MODEL_NAME, DEFAULT_TEMPERATURE),
+        lambda: ChatPromptTemplate.from_messages([
+            ("system", "You are a customer. Ask a simple question about a product."),
+            MessagesPlaceholder(variable_name="messages")
+        ]) | get_llm(),
+    )
+
 # --- Agent Nodes ---
 
 def seller_agent_node(state):
@@ -177,18 +354,7 @@ def seller_agent_node(state):
         print("Error: initial_seller_prompt not found in state. Initialization might have failed.")
         return {"messages": [AIMessage(content="Error: Seller configuration missing.")]}
 
-    # Get the LLM
-    llm = get_llm()
-    # Bind tools to the LLM for the seller agent
-    seller_llm_with_tools = llm.bind_tools(seller_tools)
-
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", initial_seller_prompt),  # Use the prompt set in state
-            MessagesPlaceholder(variable_name="messages"),
-        ]
-    )
-    seller_runnable = prompt | seller_llm_with_tools
+    seller_runnable = get_seller_runnable(initial_seller_prompt)
     
     # Check that messages exist and are not empty
     messages = state.get("messages", [])
@@ -212,12 +378,7 @@ def seller_agent_node(state):
         # Attempt a simpler response without tools as fallback
         try:
             print("Attempting fallback response without tools...")
-            simple_llm = get_llm()  # Get a fresh LLM instance
-            simple_prompt = ChatPromptTemplate.from_messages([
-                ("system", "You are a helpful salesperson. Respond briefly and professionally."),
-                MessagesPlaceholder(variable_name="messages")
-            ])
-            simple_runnable = simple_prompt | simple_llm
+            simple_runnable = get_seller_fallback_runnable()
             fallback_response = simple_runnable.invoke({"messages": messages[-3:] if len(messages) > 3 else messages})
             print(f"Generated fallback response: {fallback_response.content[:100]}...")
             return {"messages": [fallback_response]}
@@ -248,22 +409,7 @@ def buyer_agent_node(state):
          # Return message and let the graph proceed (seller will likely error or end)
          return {"messages": [HumanMessage(content="(System: Error - Buyer configuration missing.)")]}
 
-    # Get the LLM
-    llm = get_llm()
-
-    # Create the prompt dynamically using the loaded buyer prompt
-    buyer_system_prompt = f"""
-{current_buyer_prompt}
-
-You are acting as the customer described above. Continue the conversation naturally based on the history provided below.
-Focus on your persona's goals and interests. Ask questions or make statements consistent with your profile.
-Your response should be just your conversational reply, without any preamble like "Buyer:".
-
-Conversation History:
-{{messages}}
-"""
-    buyer_prompt = ChatPromptTemplate.from_template(buyer_system_prompt)
-    buyer_runnable = buyer_prompt | llm  # Buyer doesn't have tools
+    buyer_runnable = get_buyer_runnable(current_buyer_prompt)  # Buyer doesn't have tools
 
     # Check that messages exist and are not empty
     messages = state.get("messages", [])
@@ -287,12 +433,7 @@ Conversation History:
         # Attempt a simpler response as fallback
         try:
             print("Attempting fallback buyer response...")
-            simple_llm = get_llm()  # Get a fresh LLM instance
-            simple_prompt = ChatPromptTemplate.from_messages([
-                ("system", "You are a customer. Ask a simple question about a product."),
-                MessagesPlaceholder(variable_name="messages")
-            ])
-            simple_runnable = simple_prompt | simple_llm
+            simple_runnable = get_buyer_fallback_runnable()
             fallback_response = simple_runnable.invoke({"messages": messages[-3:] if len(messages) > 3 else messages})
             print(f"Generated fallback buyer response: {fallback_response.content[:100]}...")
             return {"messages": [HumanMessage(content=fallback_response.content)]}
@@ -300,4 +441,78 @@ Conversation History:
             print(f"Buyer fallback also failed: {fallback_error}")
             error_message = HumanMessage(content=f"(System: Encountered error in buyer response generation: {str(e)[:100]}...)")
             # Return error message
-            return {"messages": [error_message]} 
\ No newline at end of file
+            return {"messages": [error_message]}
+
+
+# --- Async Agent Nodes (used by arun_simulation via app.astream) ---
+
+async def aseller_agent_node(state):
+    """Async variant of `seller_agent_node`; awaits the LLM instead of blocking a thread."""
+    print("--- Seller Node (async) ---")
+    initial_seller_prompt = state.get("initial_seller_prompt")
+    if not initial_seller_prompt:
+        print("Error: initial_seller_prompt not found in state. Initialization might have failed.")
+        return {"messages": [AIMessage(content="Error: Seller configuration missing.")]}
+
+    seller_runnable = get_seller_runnable(initial_seller_prompt)
+
+    messages = state.get("messages", [])
+    if not messages:
+        print("Warning: No messages found in state. Adding a default message.")
+        messages = [HumanMessage(content="Hello, I'd like some assistance.")]
+
+    try:
+        response = await seller_runnable.ainvoke({"messages": messages})
+        print(f"--- Seller Response --- Type: {type(response)}")
+        if response.content:
+             print(f"Content: {response.content[:100]}...")
+        if hasattr(response, 'tool_calls') and response.tool_calls:
+             print(f"Tool Calls: {response.tool_calls}")
+        return {"messages": [response]}
+    except Exception as e:
+        print(f"Error in seller_node: {e}")
+        error_message = AIMessage(content=f"Apologies, I encountered an error: {str(e)[:100]}... Let me try a simpler response.")
+        try:
+            print("Attempting fallback response without tools...")
+            fallback_response = await get_seller_fallback_runnable().ainvoke({"messages": messages[-3:] if len(messages) > 3 else messages})
+            print(f"Generated fallback response: {fallback_response.content[:100]}...")
+            return {"messages": [fallback_response]}
+        except Exception as fallback_error:
+            print(f"Fallback also failed: {fallback_error}")
+            return {"messages": [error_message]}
+
+
+async def abuyer_agent_node(state):
+    """Async variant of `buyer_agent_node`; awaits the LLM instead of blocking a thread."""
+    print("--- Buyer Node (async) ---")
+    current_buyer_prompt = state.get("current_buyer_prompt")
+    if not current_buyer_prompt:
+         print("Error: current_buyer_prompt not found in state. Initialization might have failed.")
+         return {"messages": [HumanMessage(content="(System: Error - Buyer configuration missing.)")]}
+
+    buyer_runnable = get_buyer_runnable(current_buyer_prompt)
+
+    messages = state.get("messages", [])
+    if not messages:
+        print("Warning: No messages found in state for buyer. Adding a default message.")
+        messages = [AIMessage(content="Hello, I'm a sales representative. How can I help you today?")]
+
+    try:
+        response = await buyer_runnable.ainvoke({"messages": messages})
+        buyer_response_content = response.content
+        print(f"--- Buyer Response --- Type: {type(response)}")
+        if buyer_response_content:
+             print(f"Content: {buyer_response_content[:100]}...")
+        return {"messages": [HumanMessage(content=buyer_response_content)]}
+
+    except Exception as e:
+        print(f"Error in buyer_node: {e}")
+        try:
+            print("Attempting fallback buyer response...")
+            fallback_response = await get_buyer_fallback_runnable().ainvoke({"messages": messages[-3:] if len(messages) > 3 else messages})
+            print(f"Generated fallback buyer response: {fallback_response.content[:100]}...")
+            return {"messages": [HumanMessage(content=fallback_response.content)]}
+        except Exception as fallback_error:
+            print(f"Buyer fallback also failed: {fallback_error}")
+            error_message = HumanMessage(content=f"(System: Encountered error in buyer response generation: {str(e)[:100]}...)")
+            return {"messages": [error_message]}
@@ -1,11 +1,14 @@
 """
 Handles analysis of the conversation to detect sales.
 
-Uses an LLM with structured output (Pydantic) to determine if a sale confirmation 
-occurred in the recent message history. Extracts relevant details like item ID, 
-name, and price if a sale is detected.
+Detection is staged: a cheap local purchase-intent model (weighted regex
+features over buyer turns) runs every turn, and only when its score crosses
+`SALE_SCORE_THRESHOLD` is an LLM with structured output (Pydantic) used to
+confirm the sale and extract details like item ID, name, and price.
 """
+import os
 import re
+import math
 from datetime import datetime
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
@@ -16,7 +19,7 @@ from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_excep
 
 # Import LLM setup from agents (assuming it's safe to share)
 # If not, initialize a separate LLM instance here.
-from core.agents import get_llm
+from core.agents import get_llm, get_pooled_runnable, DEFAULT_MODEL_NAME, DEFAULT_TEMPERATURE
 
 # --- Pydantic Model for Structured Output ---
 class SaleAnalysisOutput(BaseModel):
@@ -28,7 +31,53 @@ class SaleAnalysisOutput(BaseModel):
     confidence: float = Field(..., ge=0.0, le=1.0, description="Confidence score (0.0-1.0) based on clarity of intent and detail extraction.")
 
 
-# --- LLM-based Sale Analyzer ---
+# --- Local Purchase-Intent Model (stage 1) ---
+
+# Local score (0-1) a new buyer turn needs before the LLM analyzer is called
+SALE_SCORE_THRESHOLD = float(os.getenv("SALE_SCORE_THRESHOLD", "0.5"))
+
+# Weighted features of a logistic purchase-intent score for a single buyer turn
+_INTENT_BIAS = -2.0
+_INTENT_FEATURES = [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in [
+    # Explicit decisions ("I'll take it", "add it to my cart", "place the order")
+    (r"\bI(?:'ll| will) (?:take|buy|get|order|purchase|try) (?:it|that|this|them|one|the|those|these)\b", 3.0),
+    (r"\badd (?:it |that |this |them )?to (?:my |the )?(?:cart|basket)\b|\bcheck\s?out\b|\bplace (?:the |my |an |this )?order\b", 3.0),
+    (r"\b(?:I(?:'d| would) like to|I want to|ready to|going to|let me) (?:buy|purchase|order|get)\b", 2.5),
+    (r"\blet'?s go with\b|\bI(?:'ll| will) go with\b", 2.5),
+    (r"\b(?:complete|finali[sz]e|confirm|proceed with) (?:the |my |this )?(?:purchase|order|transaction|payment)\b", 2.5),
+    # Weaker signals that only matter in combination
+    (r"\b(?:deal|sounds good|that works|perfect|sold)\b", 1.0),
+    (r"\bhow (?:do|can) I (?:pay|order|buy)\b|\bpayment\b", 1.0),
+    (r"\b(?:buy|purchase|order)\b", 0.75),
+    # Hesitation, refusal and open questions
+    (r"\bnot (?:ready|sure|interested)\b|\bjust (?:looking|browsing)\b|\bmaybe later\b|\btoo (?:expensive|pricey)\b"
+     r"|\bno,? thanks\b|\bI(?:'ll| will) (?:think|pass)\b|\bdon'?t (?:want|need)\b", -3.0),
+    (r"\?\s*$", -0.75),
+]]
+
+def score_purchase_intent(text: str) -> float:
+    """Scores how strongly a buyer turn expresses a purchase decision (0-1)."""
+    logit = _INTENT_BIAS + sum(weight for pattern, weight in _INTENT_FEATURES if pattern.search(text))
+    return 1.0 / (1.0 + math.exp(-logit))
+
+def local_sale_score(messages: List[BaseMessage], start_index: int = 0) -> float:
+    """Highest purchase-intent score among buyer turns at or after `start_index`.
+
+    Only buyer (HumanMessage) turns are scored; system error notes injected as
+    buyer messages are ignored.
+    """
+    best = 0.0
+    for msg in messages[start_index:]:
+        if isinstance(msg, HumanMessage) and isinstance(msg.content, str) and not msg.content.startswith("(System:"):
+            best = max(best, score_purchase_intent(msg.content))
+    return best
+
+def needs_sale_analysis(state) -> bool:
+    """True if buyer turns not yet seen by the LLM analyzer look like a purchase decision."""
+    score = local_sale_score(state.get("messages", []), state.get("sale_analysis_cursor", 0))
+    return score >= SALE_SCORE_THRESHOLD
+
+# --- LLM-based Sale Analyzer (stage 2) ---
 
 # Updated prompt to work with Pydantic structured output
 SALE_ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
@@ -47,6 +96,13 @@ Focus ONLY on clear purchase confirmation or decision in the message history. Di
     MessagesPlaceholder(variable_name="recent_messages")
 ])
 
+def get_sale_analysis_runnable():
+    """Returns the pooled structured-output sale analysis chain (prompt | llm)."""
+    return get_pooled_runnable(
+        ("sale_analysis", DEFAULT_MODEL_NAME, DEFAULT_TEMPERATURE),
+        lambda: SALE_ANALYSIS_PROMPT | get_llm().with_structured_output(SaleAnalysisOutput),
+    )
+
 @retry( # Keep retry logic
     # Retry on Pydantic validation errors or general exceptions during the LLM call
     retry=retry_if_exception_type((ValueError, TypeError, KeyError, Exception)),
@@ -57,10 +113,8 @@ Focus ONLY on clear purchase confirmation or decision in the message history. Di
 def analyze_sale_with_llm(recent_messages: List[BaseMessage]) -> Optional[SaleAnalysisOutput]:
     """Uses an LLM with structured output to analyze messages for sale confirmation."""
     try:
-        llm = get_llm() # Reuse LLM setup
-        # Bind the Pydantic model to the LLM for structured output
-        structured_llm = llm.with_structured_output(SaleAnalysisOutput)
-        chain = SALE_ANALYSIS_PROMPT | structured_llm
+        # Reuse the pooled LLM; the structured-output chain is built once per process
+        chain = get_sale_analysis_runnable()
 
         # Invoke the chain with the messages
         result: SaleAnalysisOutput = chain.invoke({"recent_messages": recent_messages})
@@ -73,6 +127,19 @@ def analyze_sale_with_llm(recent_messages: List[BaseMessage]) -> Optional[SaleAn
         print(f"Error during structured LLM sale analysis: {e}")
         return None
 
+@retry(
+    retry=retry_if_exception_type((ValueError, TypeError, KeyError, Exception)),
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=2, max=10),
+    reraise=True
+)
+async def aanalyze_sale_with_llm(recent_messages: List[BaseMessage]) -> Optional[SaleAnalysisOutput]:
+    """Async variant of `analyze_sale_with_llm`."""
+    try:
+        return await get_sale_analysis_runnable().ainvoke({"recent_messages": recent_messages})
+    except Exception as e:
+        print(f"Error during structured LLM sale analysis: {e}")
+        return None
 
 # --- Original Regex-based Analysis (kept as fallback/initial check) ---
 # Remove the entire regex function
@@ -195,16 +262,39 @@ def analyze_sale_with_llm(recent_messages: List[BaseMessage]) -> Optional[SaleAn
 
 # --- Main Analysis Function (Combined) ---
 
+def _skip_llm_analysis(state, messages: List[BaseMessage]) -> Optional[dict]:
+    """Runs the local stage; returns the state update if the LLM call is not needed."""
+    cursor = state.get("sale_analysis_cursor", 0)
+    score = local_sale_score(messages, cursor)
+    if score >= SALE_SCORE_THRESHOLD:
+        print(f"--- Local sale score {score:.2f} >= {SALE_SCORE_THRESHOLD:.2f}, escalating to LLM analysis ---")
+        return None
+    print(f"--- Local sale score {score:.2f} below threshold {SALE_SCORE_THRESHOLD:.2f}; skipping LLM analysis ---")
+    # The scored turns hold no purchase decision, so later checks can start after them
+    return {**state, "sale_analysis_cursor": len(messages)}
+
+def _record_llm_analysis(state_update: dict, state, messages: List[BaseMessage]) -> dict:
+    """Marks the analyzed span and counts the LLM analyzer call for this conversation."""
+    return {
+        **state_update,
+        "sale_analysis_cursor": len(messages),
+        "llm_analyzer_calls": state.get("llm_analyzer_calls", 0) + 1,
+    }
+
 def analyze_conversation_for_sale(state) -> dict:
-    """Analyzes the conversation history for sale confirmation using an LLM.
+    """Analyzes the conversation history for sale confirmation.
 
     This function is typically called as a node in the LangGraph.
-    It uses `analyze_sale_with_llm` to get structured output indicating 
-    if a sale was detected and relevant details (item ID, name, price).
+    It first scores the buyer turns added since the last analysis with the
+    local purchase-intent model and only calls `analyze_sale_with_llm` (to get
+    structured output indicating if a sale was detected and relevant details
+    such as item ID, name, price) when that score reaches `SALE_SCORE_THRESHOLD`.
     It also attempts to extract the product description using regex from 
     previous messages (often ToolMessages).
     
-    Updates the provided state dictionary with sale information if detected.
+    Updates the provided state dictionary with sale information if detected,
+    the analyzed message span (`sale_analysis_cursor`) and the number of LLM
+    analyzer calls made in this conversation (`llm_analyzer_calls`).
 
     Args:
         state (dict): The current LangGraph state dictionary.
@@ -218,6 +308,10 @@ def analyze_conversation_for_sale(state) -> dict:
     if len(messages) < 3: # Keep minimum message check
         print("Not enough messages to analyze for sale.")
         return state # Return original state
+
+    skipped_state = _skip_llm_analysis(state, messages)
+    if skipped_state is not None:
+        return skipped_state
     
     # Get the recent messages list
     recent_messages = messages[-min(10, len(messages)):] # Use last 10 messages
@@ -230,6 +324,41 @@ def analyze_conversation_for_sale(state) -> dict:
         print(f"Structured LLM Sale Analysis failed: {e}.")
         # Optionally, handle specific retry errors if needed, but tenacity should handle retries
         
+    return _record_llm_analysis(_apply_sale_analysis(state, messages, llm_result), state, messages)
+
+async def aanalyze_conversation_for_sale(state) -> dict:
+    """Async variant of `analyze_conversation_for_sale` (awaits the LLM analyzer)."""
+    print("--- Analyzing Conversation For Sale (async) ---")
+    messages = state.get("messages", [])
+    
+    if len(messages) < 3:
+        print("Not enough messages to analyze for sale.")
+        return state
+
+    skipped_state = _skip_llm_analysis(state, messages)
+    if skipped_state is not None:
+        return skipped_state
+    
+    recent_messages = messages[-min(10, len(messages)):]
+
+    llm_result: Optional[SaleAnalysisOutput] = None
+    try:
+        print("--- Attempting Structured LLM Sale Analysis --- ")
+        llm_result = await aanalyze_sale_with_llm(recent_messages)
+    except Exception as e:
+        print(f"Structured LLM Sale Analysis failed: {e}.")
+
+    return _record_llm_analysis(_apply_sale_analysis(state, messages, llm_result), state, messages)
+
+def _apply_sale_analysis(state, messages: List[BaseMessage], llm_result: Optional[SaleAnalysisOutput]) -> dict:
+    """Turns an LLM sale analysis result into a state update.
+
+    Refines the item name and extracts the product description from earlier
+    messages (often ToolMessages) via regex.
+
+    Returns:
+        dict: The updated state if a sale was detected, otherwise the original state.
+    """
     # --- Update State if Sale Detected by LLM ---
     if llm_result and llm_result.sale_detected:
         print(f"--- LLM detected sale (Confidence: {llm_result.confidence:.2f}) ---")
@@ -3,20 +3,36 @@ Utilities for product embedding and semantic search within product indices.
 
 Provides functions to:
 - Lazily load embedding models (Google Generative AI) and libraries (Pandas, Scikit-learn).
-- Embed single product descriptions or lists of descriptions.
+- Embed single product descriptions or lists of descriptions, through a
+  content-addressed cache (in-memory LRU + SQLite disk tier).
+- Build a persistent embedding index (`.npy` matrix + JSON sidecar) for a CSV
+  product index, so titles are embedded once instead of on every search.
 - Search a CSV product index (containing descriptions and ranks) using a query embedding.
 - Returns the average rank of the top K most similar products found in the index.
 """
 # core/product_search.py
 import os
+import json
+import hashlib
+import sqlite3
+import threading
+import unicodedata
 import numpy as np
-from typing import List, Optional
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Dict, Any
+
+# Embedding model used for both product titles and query items
+EMBEDDING_MODEL_NAME = "models/text-embedding-004"
+# Default location of the on-disk embedding cache (see get_embedding_cache)
+DEFAULT_EMBEDDING_CACHE_PATH = Path(__file__).parents[1] / ".cache" / "embeddings.sqlite"
+# Bump when the on-disk index layout changes so old indexes are rebuilt
+INDEX_FORMAT_VERSION = 1
 
 # Lazy load expensive imports
 _faiss = None # No longer used, but keep structure
 _embed_model = None
 _pd = None # For pandas
-_cosine_similarity = None # For scikit-learn
 
 def _lazy_load_pandas():
     global _pd
@@ -29,18 +45,6 @@ def _lazy_load_pandas():
             raise ImportError("Pandas library not found. Please install it: pip install pandas")
     return _pd
     
-def _lazy_load_cosine_similarity():
-    global _cosine_similarity
-    if _cosine_similarity is None:
-        try:
-            # Requires scikit-learn
-            from sklearn.metrics.pairwise import cosine_similarity
-            _cosine_similarity = cosine_similarity
-            print("--- Scikit-learn cosine_similarity loaded successfully ---")
-        except ImportError:
-             raise ImportError("scikit-learn library not found. Please install it: pip install scikit-learn")
-    return _cosine_similarity
-
 def _lazy_load_embedding_model():
     global _embed_model
     if _embed_model is None:
@@ -50,7 +54,7 @@ def _lazy_load_embedding_model():
             if not google_api_key:
                 raise ValueError("GOOGLE_API_KEY not found in environment variables.")
             
-            _embed_model = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004", google_api_key=google_api_key)
+            _embed_model = GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL_NAME, google_api_key=google_api_key)
             print(f"--- Google Embedding Model ({_embed_model.model}) loaded ---")
         except ImportError:
             raise ImportError("langchain-google-genai not found. Please install it: pip install langchain-google-genai")
@@ -58,10 +62,186 @@ def _lazy_load_embedding_model():
             raise RuntimeError(f"Failed to initialize Google Embedding Model: {e}")
     return _embed_model
 
+# --- Embedding Cache ---
+
+class EmbeddingCache:
+    """Content-addressed two-tier cache for embedding vectors.
+
+    Vectors are keyed by (namespace, normalised text), where the namespace
+    combines the embedding model name with the embedding task ("query" or
+    "document"), since the Google model embeds the two differently. The
+    in-memory tier is an LRU bounded by a byte budget; entries are also
+    written through to an optional SQLite database so they survive across
+    simulation runs. All methods are thread-safe.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            db_path: Path of the SQLite disk tier, or None for a memory-only cache.
+            max_bytes: Byte budget of the in-memory LRU tier.
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    " namespace TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL,"
+                    " PRIMARY KEY (namespace, text_hash))"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"--- Warning: Embedding disk cache unavailable at '{db_path}': {e} ---")
+                self._db = None
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Normalises text for cache keying (Unicode NFC, collapsed whitespace)."""
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    @staticmethod
+    def _text_hash(normalized_text: str) -> str:
+        return hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: tuple, vector: np.ndarray):
+        """Inserts into the memory tier and evicts LRU entries over budget. Caller holds the lock."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = vector
+        self._memory_bytes += vector.nbytes
+        while self._memory_bytes > self.max_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def get_many(self, namespace: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Looks up vectors for `texts`, returning None for each cache miss."""
+        results: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for text in texts:
+                key = (namespace, self._text_hash(self.normalize_text(text)))
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                elif self._db is not None:
+                    row = self._db.execute(
+                        "SELECT vector FROM embeddings WHERE namespace = ? AND text_hash = ?", key
+                    ).fetchone()
+                    if row is not None:
+                        vector = np.frombuffer(row[0], dtype=np.float32)
+                        self._remember(key, vector)
+                        self.disk_hits += 1
+                if vector is None:
+                    self.misses += 1
+                results.append(vector)
+        return results
+
+    def put_many(self, namespace: str, texts: List[str], vectors: List[List[float]]):
+        """Stores vectors for `texts` in the memory tier and the disk tier."""
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = (namespace, self._text_hash(self.normalize_text(text)))
+                array = np.asarray(vector, dtype=np.float32)
+                self._remember(key, array)
+                rows.append((key[0], key[1], array.tobytes()))
+            if self._db is not None and rows:
+                try:
+                    self._db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"--- Warning: Failed to write embeddings to disk cache: {e} ---")
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss/eviction counters and the current memory footprint."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
+
+    def clear_memory(self):
+        """Drops the in-memory tier (the disk tier is kept)."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Returns the process-wide embedding cache, creating it on first use.
+
+    Configured via environment variables:
+        EMBEDDING_CACHE_PATH: SQLite file for the disk tier (default
+            `.cache/embeddings.sqlite` in the project root; empty disables it).
+        EMBEDDING_CACHE_MAX_MB: Memory budget of the LRU tier (default 64).
+    """
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                db_path = os.getenv("EMBEDDING_CACHE_PATH", str(DEFAULT_EMBEDDING_CACHE_PATH)) or None
+                max_mb = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "64"))
+                _embedding_cache = EmbeddingCache(db_path=db_path, max_bytes=int(max_mb * 1024 * 1024))
+                print(f"--- Embedding cache initialised (disk tier: {db_path or 'disabled'}, memory budget: {max_mb} MB) ---")
+    return _embedding_cache
+
+def get_embedding_cache_stats() -> Dict[str, Any]:
+    """Returns the counters of the process-wide embedding cache."""
+    return get_embedding_cache().stats()
+
+def _embed_with_cache(texts: List[str], task: str) -> List[List[float]]:
+    """Embeds `texts`, sending only cache misses (deduplicated) to the model."""
+    cache = get_embedding_cache()
+    namespace = f"{EMBEDDING_MODEL_NAME}:{task}"
+    cached = cache.get_many(namespace, texts)
+
+    # Deduplicate misses by normalised text so repeated titles are embedded once
+    missing: Dict[str, List[int]] = {}
+    for i, vector in enumerate(cached):
+        if vector is None:
+            missing.setdefault(EmbeddingCache.normalize_text(texts[i]), []).append(i)
+
+    if missing:
+        model = _lazy_load_embedding_model()
+        miss_texts = [texts[positions[0]] for positions in missing.values()]
+        if task == "query":
+            new_vectors = [model.embed_query(text) for text in miss_texts]
+        else:
+            new_vectors = model.embed_documents(miss_texts)
+        cache.put_many(namespace, miss_texts, new_vectors)
+        for positions, vector in zip(missing.values(), new_vectors):
+            for i in positions:
+                cached[i] = vector
+
+    return [np.asarray(vector, dtype=np.float32).tolist() for vector in cached]
+
 def embed_product_description(description: Optional[str]) -> Optional[List[float]]:
     """Generates a vector embedding for a single product description string.
 
-    Uses the lazily loaded GoogleGenerativeAIEmbeddings model.
+    Uses the lazily loaded GoogleGenerativeAIEmbeddings model, via the
+    embedding cache so repeated descriptions are not re-embedded.
 
     Args:
         description: The product description text.
@@ -75,9 +255,8 @@ def embed_product_description(description: Optional[str]) -> Optional[List[float
         return None
     
     try:
-        model = _lazy_load_embedding_model()
         # Embed single query
-        embedding = model.embed_query(description)
+        embedding = _embed_with_cache([description], task="query")[0]
         print(f"--- Generated embedding for description (shape: {np.array(embedding).shape}) ---")
         return embedding
     except Exception as e:
@@ -88,7 +267,8 @@ def embed_product_list(descriptions: List[str]) -> Optional[List[List[float]]]:
     """Generates vector embeddings for a list of product description strings.
     
     Uses the `embed_documents` method of the lazily loaded Google embedding model
-    for potential batching efficiency.
+    for potential batching efficiency. Only descriptions missing from the
+    embedding cache are sent to the model.
 
     Args:
         descriptions: A list of product description texts.
@@ -102,22 +282,257 @@ def embed_product_list(descriptions: List[str]) -> Optional[List[List[float]]]:
         return None
         
     try:
-        model = _lazy_load_embedding_model()
         # Use embed_documents for batching
-        embeddings = model.embed_documents(descriptions)
+        embeddings = _embed_with_cache(descriptions, task="document")
         print(f"--- Generated {len(embeddings)} embeddings for list (shape[0]: {np.array(embeddings[0]).shape}) ---")
         return embeddings
     except Exception as e:
         print(f"--- Error batch embedding product descriptions: {e} ---")
         return None
 
+# --- Persistent Embedding Index ---
+
+# In-process cache of loaded indexes, keyed by CSV path and columns.
+# Each entry remembers the CSV (mtime, size) it was validated against so the
+# content hash is only recomputed when the file on disk changes.
+_loaded_indices: Dict[tuple, Dict[str, Any]] = {}
+# Serialises index validation/builds so concurrent simulations build each index once
+_index_lock = threading.RLock()
+
+def _file_sha256(path: str) -> str:
+    """Returns the hex SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_index_artifact_paths(index_path: str, description_column: str = 'Title') -> tuple:
+    """Returns the (matrix, sidecar) paths of the embedding index for a CSV.
+
+    Artifacts are stored next to the CSV, e.g.
+    `persona_topic_0_top_purchases_nmf.Title.embeddings.npy` and `...embeddings.json`.
+    """
+    base, _ = os.path.splitext(index_path)
+    prefix = f"{base}.{description_column}.embeddings"
+    return f"{prefix}.npy", f"{prefix}.json"
+
+def _read_index_metadata(meta_path: str) -> Optional[Dict[str, Any]]:
+    """Reads an index sidecar file, returning None if missing or unreadable."""
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"--- Warning: Could not read index metadata '{meta_path}': {e} ---")
+        return None
+
+def _is_index_current(metadata: Optional[Dict[str, Any]], source_sha256: str, description_column: str, rank_column: str) -> bool:
+    """Checks whether sidecar metadata matches the current CSV, columns and model."""
+    if not metadata:
+        return False
+    return (
+        metadata.get("format_version") == INDEX_FORMAT_VERSION
+        and metadata.get("source_sha256") == source_sha256
+        and metadata.get("model") == EMBEDDING_MODEL_NAME
+        and metadata.get("description_column") == description_column
+        and metadata.get("rank_column") == rank_column
+    )
+
+def build_product_index(index_path: str, description_column: str = 'Title', rank_column: str = 'Rank', source_sha256: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Embeds a CSV product index once and persists it next to the CSV.
+
+    Writes an L2-normalised float32 matrix (`.npy`, one row per valid product)
+    and a JSON sidecar holding the ranks, the embedding model name and the
+    SHA-256 of the CSV the vectors were built from. Both files are written
+    atomically so a concurrent reader never sees a half-written index.
+
+    Args:
+        index_path: Path to the CSV file containing product descriptions and ranks.
+        description_column: The name of the column containing product descriptions (or titles).
+        rank_column: The name of the column containing the pre-calculated rank/score.
+        source_sha256: Pre-computed content hash of the CSV (computed if omitted).
+
+    Returns:
+        The sidecar metadata dictionary, or None if the index could not be built.
+    """
+    pd = _lazy_load_pandas()
+
+    if not index_path or not os.path.exists(index_path):
+        print(f"--- Cannot build index: Index path '{index_path}' is invalid or does not exist. ---")
+        return None
+
+    source_sha256 = source_sha256 or _file_sha256(index_path)
+    print(f"--- Building embedding index for CSV: {index_path} ---")
+    df = pd.read_csv(index_path)
+
+    if description_column not in df.columns:
+        print(f"--- Error: Description column '{description_column}' not found in CSV '{index_path}'. Available columns: {list(df.columns)} ---")
+        return None
+    if rank_column not in df.columns:
+        print(f"--- Error: Rank column '{rank_column}' not found in CSV '{index_path}'. Available columns: {list(df.columns)} ---")
+        return None
+
+    # Get descriptions and ranks, keeping only rows with a numeric rank
+    descriptions = df[description_column].fillna("").astype(str).tolist()
+    ranks = pd.to_numeric(df[rank_column], errors='coerce')
+    valid_indices = ranks.notna().to_numpy().nonzero()[0]
+    if len(valid_indices) == 0:
+        print(f"--- Warning: No valid descriptions or ranks found in columns '{description_column}'/'{rank_column}' of CSV '{index_path}'. ---")
+        return None
+
+    valid_descriptions = [descriptions[i] for i in valid_indices]
+    valid_ranks = ranks.iloc[valid_indices].astype(float).tolist()
+
+    print(f"--- Embedding {len(valid_descriptions)} valid descriptions from CSV... ---")
+    index_embeddings = embed_product_list(valid_descriptions)
+    if index_embeddings is None or len(index_embeddings) != len(valid_descriptions):
+        print("--- Failed to generate embeddings for index descriptions. Index build aborted. ---")
+        return None
+
+    # Normalise rows once so a search is a single dot product
+    matrix = np.asarray(index_embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix = matrix / norms
+
+    metadata = {
+        "format_version": INDEX_FORMAT_VERSION,
+        "source_path": os.path.basename(index_path),
+        "source_sha256": source_sha256,
+        "model": EMBEDDING_MODEL_NAME,
+        "description_column": description_column,
+        "rank_column": rank_column,
+        "count": int(matrix.shape[0]),
+        "dim": int(matrix.shape[1]),
+        "ranks": valid_ranks,
+    }
+
+    matrix_path, meta_path = get_index_artifact_paths(index_path, description_column)
+    tmp_suffix = f"{os.getpid()}.{threading.get_ident()}.tmp"
+    tmp_matrix_path = f"{matrix_path}.{tmp_suffix}"
+    tmp_meta_path = f"{meta_path}.{tmp_suffix}"
+    try:
+        with open(tmp_matrix_path, "wb") as f:
+            np.save(f, matrix)
+        with open(tmp_meta_path, "w") as f:
+            json.dump(metadata, f)
+        # Matrix first: the sidecar hash is what marks the pair as valid
+        os.replace(tmp_matrix_path, matrix_path)
+        os.replace(tmp_meta_path, meta_path)
+    except OSError as e:
+        print(f"--- Error writing embedding index for '{index_path}': {e} ---")
+        for tmp in (tmp_matrix_path, tmp_meta_path):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return None
+
+    # Drop any stale in-process copy so the next load maps the new matrix
+    _loaded_indices.pop((os.path.abspath(index_path), description_column, rank_column), None)
+    print(f"--- Embedding index saved: {matrix_path} ({metadata['count']} x {metadata['dim']}) ---")
+    return metadata
+
+def load_product_index(index_path: str, description_column: str = 'Title', rank_column: str = 'Rank', rebuild_if_stale: bool = True) -> Optional[Dict[str, Any]]:
+    """Loads the persisted embedding index for a CSV, rebuilding it if stale.
+
+    The index is considered stale when the CSV's content hash, the embedding
+    model, the columns or the index format no longer match the sidecar. The
+    matrix is memory-mapped read-only and cached for the life of the process.
+
+    Args:
+        index_path: Path to the CSV file containing product descriptions and ranks.
+        description_column: The name of the column containing product descriptions (or titles).
+        rank_column: The name of the column containing the pre-calculated rank/score.
+        rebuild_if_stale: Build the index if it is missing or out of date.
+
+    Returns:
+        A dict with `matrix` (normalised float32 rows), `ranks` (np.ndarray) and
+        `metadata`, or None if no usable index is available.
+    """
+    if not index_path or not os.path.exists(index_path):
+        print(f"--- Cannot load index: Index path '{index_path}' is invalid or does not exist. ---")
+        return None
+
+    cache_key = (os.path.abspath(index_path), description_column, rank_column)
+    stat = os.stat(index_path)
+    file_signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _loaded_indices.get(cache_key)
+    if cached and cached["file_signature"] == file_signature:
+        return cached
+
+    with _index_lock:
+        cached = _loaded_indices.get(cache_key)
+        if cached and cached["file_signature"] == file_signature:
+            return cached
+        return _load_or_build_index(index_path, description_column, rank_column, rebuild_if_stale, cache_key, file_signature)
+
+def _load_or_build_index(index_path: str, description_column: str, rank_column: str, rebuild_if_stale: bool, cache_key: tuple, file_signature: tuple) -> Optional[Dict[str, Any]]:
+    """Validates the persisted index against the CSV, rebuilding and mapping it. Caller holds `_index_lock`."""
+    matrix_path, meta_path = get_index_artifact_paths(index_path, description_column)
+    source_sha256 = _file_sha256(index_path)
+    metadata = _read_index_metadata(meta_path)
+
+    if not (_is_index_current(metadata, source_sha256, description_column, rank_column) and os.path.exists(matrix_path)):
+        if not rebuild_if_stale:
+            print(f"--- Embedding index for '{index_path}' is missing or stale. ---")
+            return None
+        print(f"--- Embedding index for '{index_path}' is missing or stale, rebuilding... ---")
+        metadata = build_product_index(index_path, description_column, rank_column, source_sha256=source_sha256)
+        if metadata is None:
+            return None
+
+    try:
+        matrix = np.load(matrix_path, mmap_mode="r")
+    except (OSError, ValueError) as e:
+        print(f"--- Error memory-mapping embedding index '{matrix_path}': {e} ---")
+        return None
+    if matrix.shape[0] != metadata["count"]:
+        print(f"--- Error: Embedding index '{matrix_path}' does not match its metadata. ---")
+        return None
+
+    loaded = {
+        "matrix": matrix,
+        "ranks": np.asarray(metadata["ranks"], dtype=np.float64),
+        "metadata": metadata,
+        "file_signature": file_signature,
+    }
+    _loaded_indices[cache_key] = loaded
+    print(f"--- Loaded embedding index: {matrix_path} ({matrix.shape[0]} x {matrix.shape[1]}) ---")
+    return loaded
+
+def build_product_indices(index_dir: str, pattern_suffix: str = "_top_purchases_nmf.csv", force: bool = False) -> Dict[str, bool]:
+    """Builds (or refreshes) the embedding index for every persona CSV in a directory.
+
+    Args:
+        index_dir: Directory containing `persona_topic_N_top_purchases_nmf.csv` files.
+        pattern_suffix: Filename suffix identifying product index CSVs.
+        force: Rebuild even if an up-to-date index already exists.
+
+    Returns:
+        A mapping of CSV filename to whether a usable index is now available.
+    """
+    results = {}
+    if not os.path.isdir(index_dir):
+        print(f"--- Cannot build indices: Directory '{index_dir}' does not exist. ---")
+        return results
+    for filename in sorted(os.listdir(index_dir)):
+        if not filename.endswith(pattern_suffix):
+            continue
+        csv_path = os.path.join(index_dir, filename)
+        if force:
+            results[filename] = build_product_index(csv_path) is not None
+        else:
+            results[filename] = load_product_index(csv_path) is not None
+    return results
+
 def search_product_index(query_embedding: Optional[List[float]], index_path: Optional[str], top_k: int = 3, description_column: str = 'Title', rank_column: str = 'Rank') -> Optional[float]:
     """Searches a product CSV index using a query embedding.
 
-    Loads a CSV file specified by `index_path`. Reads product descriptions 
-    (from `description_column`) and ranks (from `rank_column`). Embeds the 
-    descriptions and calculates cosine similarity between the `query_embedding` 
-    and all product description embeddings.
+    Loads the precomputed embedding index for the CSV at `index_path` (building
+    it on first use, or rebuilding it if the CSV changed) and calculates cosine
+    similarity between the `query_embedding` and every product embedding with a
+    single dot product against the normalised index matrix.
 
     Args:
         query_embedding: The embedding vector of the item to search for.
@@ -131,9 +546,6 @@ def search_product_index(query_embedding: Optional[List[float]], index_path: Opt
         the index, or None if the search fails (e.g., invalid path, missing columns, 
         embedding errors, no valid products found).
     """
-    pd = _lazy_load_pandas()
-    cosine_similarity = _lazy_load_cosine_similarity()
-    
     if query_embedding is None:
         print("--- Cannot search index: No query embedding provided. ---")
         return None
@@ -142,59 +554,35 @@ def search_product_index(query_embedding: Optional[List[float]], index_path: Opt
         return None
         
     try:
-        print(f"--- Loading CSV index from: {index_path} ---")
-        df = pd.read_csv(index_path)
-        
-        if description_column not in df.columns:
-            print(f"--- Error: Description column '{description_column}' not found in CSV '{index_path}'. Available columns: {list(df.columns)} ---")
-            return None
-        # Also check for the rank column
-        if rank_column not in df.columns:
-             print(f"--- Error: Rank column '{rank_column}' not found in CSV '{index_path}'. Available columns: {list(df.columns)} ---")
-             return None
-            
-        # Get descriptions and ranks, handle potential missing values
-        descriptions = df[description_column].fillna("").astype(str).tolist()
-        # Ensure ranks are numeric, coercing errors to NaN and then potentially filling/dropping
-        ranks = pd.to_numeric(df[rank_column], errors='coerce')
-        
-        # Keep only rows where both description and rank are valid for searching
-        valid_indices = ranks.notna().to_numpy().nonzero()[0]
-        if len(valid_indices) == 0:
-            print(f"--- Warning: No valid descriptions or ranks found in columns '{description_column}'/'{rank_column}' of CSV '{index_path}'. ---")
-            return None # Or maybe 0.0?
-            
-        valid_descriptions = [descriptions[i] for i in valid_indices]
-        valid_ranks = ranks.iloc[valid_indices].tolist()
-        df_indices_map = {i: original_idx for i, original_idx in enumerate(valid_indices)} # Map from filtered index to original df index
-            
-        print(f"--- Embedding {len(valid_descriptions)} valid descriptions from CSV... ---")
-        index_embeddings = embed_product_list(valid_descriptions)
-        
-        if index_embeddings is None or len(index_embeddings) == 0:
-            print("--- Failed to generate embeddings for index descriptions. Score calculation aborted. ---")
+        index = load_product_index(index_path, description_column, rank_column)
+        if index is None:
+            print("--- Failed to load embedding index. Score calculation aborted. ---")
             return None
 
-        # Reshape query embedding for cosine_similarity (expects 2D arrays)
-        query_vec = np.array(query_embedding).reshape(1, -1)
-        index_vecs = np.array(index_embeddings)
+        index_vecs = index["matrix"]
+        valid_ranks = index["ranks"]
 
-        # Calculate cosine similarities
-        # Result shape: (n_query_samples, n_index_samples)
-        similarities = cosine_similarity(query_vec, index_vecs)[0] # Get the similarities for the single query
+        query_vec = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        if query_vec.shape[0] != index_vecs.shape[1]:
+            print(f"--- Error: Query embedding dim {query_vec.shape[0]} does not match index dim {index_vecs.shape[1]}. ---")
+            return None
+        query_norm = np.linalg.norm(query_vec)
+        if query_norm == 0:
+            print("--- Cannot search index: Query embedding has zero norm. ---")
+            return None
+
+        # Index rows are pre-normalised, so cosine similarity is a dot product
+        similarities = index_vecs @ (query_vec / query_norm)
         
-        # Get top K indices (indices into the *filtered* list/embeddings)
+        # Get top K indices
         actual_k = min(top_k, len(similarities))
         if actual_k <= 0:
              print("--- No similarities calculated or k=0. ---")
              return None # Indicate no rank could be calculated
              
-        # Indices of top K similar items within the *filtered* list
-        top_k_filtered_indices = np.argsort(similarities)[-actual_k:][::-1]
-        top_k_similarities = similarities[top_k_filtered_indices]
-        
-        # Get the corresponding ranks from the filtered list
-        top_k_ranks = [valid_ranks[i] for i in top_k_filtered_indices]
+        top_k_indices = np.argsort(similarities)[-actual_k:][::-1]
+        top_k_similarities = similarities[top_k_indices]
+        top_k_ranks = valid_ranks[top_k_indices].tolist()
         
         # Aggregate score: Average rank of top_k results
         average_rank = float(np.mean(top_k_ranks))
@@ -208,4 +596,22 @@ def search_product_index(query_embedding: Optional[List[float]], index_path: Opt
         # Print traceback for detailed debugging
         import traceback
         traceback.print_exc()
-        return None 
\ No newline at end of file
+        return None
+
+if __name__ == "__main__":
+    # Build step: embed every persona top-purchases CSV once so that
+    # simulations only pay for the query embedding at search time.
+    import argparse
+    from pathlib import Path
+    from dotenv import load_dotenv
+
+    default_dir = Path(__file__).parents[1] / ".." / "persona_clustering" / "output_nmf_k20"
+    parser = argparse.ArgumentParser(description="Build persistent embedding indexes for persona product CSVs.")
+    parser.add_argument("--index-dir", type=str, default=str(default_dir), help="Directory containing the persona top-purchases CSVs.")
+    parser.add_argument("--force", action="store_true", help="Rebuild indexes even if they are up to date.")
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parents[1] / ".env")
+    build_results = build_product_indices(args.index_dir, force=args.force)
+    for name, ok in build_results.items():
+        print(f"{name}: {'ok' if ok else 'FAILED'}")
@@ -2,13 +2,14 @@
 Core simulation logic using LangGraph.
 
 This module defines the state graph, nodes, edges, and the main `run_simulation` 
-function that orchestrates the interaction between buyer and seller agents, 
+function (plus its async counterpart `arun_simulation`) that orchestrates the interaction between buyer and seller agents, 
 handles tool usage, analyzes conversations for sales, calculates product ranks, 
 and logs results to the database.
 """
 import os
 import sys
 import uuid
+import asyncio
 import re
 from typing import List, Optional, Literal, Dict, Any
 from pathlib import Path
@@ -22,12 +23,13 @@ from langgraph.graph.message import add_messages
 
 # Import from refactored modules
 from core.state import SimulationState
-from core.agents import seller_agent_node, buyer_agent_node, seller_tools
-from core.analysis import analyze_conversation_for_sale
+from core.agents import seller_agent_node, buyer_agent_node, aseller_agent_node, abuyer_agent_node, seller_tools
+from core.analysis import analyze_conversation_for_sale, aanalyze_conversation_for_sale, needs_sale_analysis
 from utils.persona import get_available_persona_ids, load_persona_prompt, create_persona_placeholder
-from utils.db import get_db_connection, log_message_to_db, log_sale_to_db
+from utils.db import acquire_db_connection, release_db_connection, log_sale_to_db, SimulationLogWriter
 # Import new product search functions
 from core.product_search import embed_product_description, search_product_index
+from tools.ebay_api import start_cache_run_stats, summarize_cache_run_stats
 
 # --- Constants and Configuration ---
 
@@ -166,13 +168,22 @@ def calculate_product_rank(state: SimulationState) -> dict:
     # Update the correct state field
     return { "product_avg_rank": avg_rank }
 
+async def acalculate_product_rank(state: SimulationState) -> dict:
+    """Async variant of `calculate_product_rank`.
+
+    The rank is one (usually cached) query embedding plus a local dot product
+    against the memory-mapped index, so it runs in a worker thread rather than
+    duplicating the embedding/index code path.
+    """
+    return await asyncio.to_thread(calculate_product_rank, state)
+
 # --- Conditional Edges ---
 
 def check_seller_action(state: SimulationState) -> Literal["tools", "buyer_agent_node", "analyze_sale", END]:
     """
     Determines the next step after the seller node based on:
     - If the seller called a tool, route to the tool node
-    - If there are sales indicators in the conversation, route to the analyze_sale node
+    - If new buyer turns score as a likely purchase decision (local intent model), route to the analyze_sale node
     - If we've reached message limit, route to analyze_sale before ending
     - Otherwise, route to the buyer node for their response
     """
@@ -189,26 +200,10 @@ def check_seller_action(state: SimulationState) -> Literal["tools", "buyer_agent
         print("--- Routing: Seller -> Tools ---")
         return "tools"
     
-    # 2. Check for potential sale indicators in the recent messages
+    # 2. Score buyer turns not yet analyzed with the cheap local intent model
     if len(messages) >= 3:  # Need at least a few messages for context
-        # Analyze the last few messages for sale indicators
-        recent_messages = messages[-min(5, len(messages)):]
-        conversation_text = " ".join([
-            msg.content for msg in recent_messages 
-            if hasattr(msg, "content") and msg.content
-        ])
-        
-        # Define sale indicators - words/phrases that suggest a sale might be happening
-        sale_indicators = [
-            "buy", "purchase", "order", "sold", "deal", 
-            "payment", "confirm", "agree", "accept", 
-            "checkout", "shopping cart", "add to cart", "pay",
-            "price is good", "sounds good", "I'll take it"
-        ]
-        
-        # Check if any sale indicators are present
-        if any(indicator.lower() in conversation_text.lower() for indicator in sale_indicators):
-            print("--- Sale indicators detected, routing to analyze_sale ---")
+        if needs_sale_analysis(state):
+            print("--- Purchase intent detected in new buyer turns, routing to analyze_sale ---")
             return "analyze_sale"
     
     # 3. Check message limit before proceeding to buyer
@@ -254,20 +249,25 @@ def route_after_rank_calc(state: SimulationState) -> Literal["buyer_agent_node",
 
 # --- Graph Building ---
 
-def build_simulation_graph():
-    """Builds and returns the LangGraph for the sales simulation."""
+def build_simulation_graph(use_async: bool = False):
+    """Builds and returns the LangGraph for the sales simulation.
+
+    Args:
+        use_async: Use the async node implementations (for `app.astream`), so LLM
+                   and eBay I/O are awaited instead of blocking a thread per node.
+    """
     workflow = StateGraph(SimulationState)
 
     # Add nodes
     workflow.add_node("initialize", initialize_simulation)
-    workflow.add_node("seller_agent_node", seller_agent_node)
-    workflow.add_node("buyer_agent_node", buyer_agent_node)
-    # Add the ToolNode using the seller_tools list
+    workflow.add_node("seller_agent_node", aseller_agent_node if use_async else seller_agent_node)
+    workflow.add_node("buyer_agent_node", abuyer_agent_node if use_async else buyer_agent_node)
+    # Add the ToolNode using the seller_tools list (tools carry sync and async implementations)
     tool_node = ToolNode(seller_tools)
     workflow.add_node("tools", tool_node)
-    workflow.add_node("analyze_sale", analyze_conversation_for_sale)
+    workflow.add_node("analyze_sale", aanalyze_conversation_for_sale if use_async else analyze_conversation_for_sale)
     # Add the renamed node
-    workflow.add_node("calculate_product_rank", calculate_product_rank) 
+    workflow.add_node("calculate_product_rank", acalculate_product_rank if use_async else calculate_product_rank) 
 
     # Define edges
     workflow.add_edge(START, "initialize")
@@ -319,8 +319,136 @@ def build_simulation_graph():
     print("--- Simulation graph compiled successfully ---")
     return app
 
+# Compiled graphs hold no per-run state (no checkpointer), so one compiled app
+# per node flavour is shared by every run in the process.
+_compiled_graphs: Dict[bool, Any] = {}
+
+def get_simulation_graph(use_async: bool = False):
+    """Returns the cached compiled simulation graph, building it on first use."""
+    app = _compiled_graphs.get(use_async)
+    if app is None:
+        app = build_simulation_graph(use_async=use_async)
+        _compiled_graphs[use_async] = app
+    return app
+
 # --- Main Simulation Runner ---
 
+def _check_simulation_prerequisites() -> Optional[Dict[str, Any]]:
+    """Loads the environment and checks persona data. Returns an error dict on failure."""
+    # Make sure the environment is loaded
+    if not load_environment():
+        print("--- Exiting due to environment loading failure. ---")
+        return {"error": "Failed to load environment variables"}
+    
+    # Ensure we have persona data available
+    create_persona_placeholder()
+    
+    # Validate persona availability
+    available_personas = get_available_persona_ids()
+    if not available_personas:
+        print("Error: No persona files found in the specified directory.")
+        return {"error": "No persona files found"}
+    return None
+
+def _build_run_config(persona_id: Optional[str], simulation_id: str) -> Dict[str, Any]:
+    """Builds the graph invocation config for a single simulation run."""
+    # Prepare the config with persona_id if provided
+    config = {"configurable": {}}
+    if persona_id:
+        config["configurable"]["persona_id"] = persona_id
+    # Set recursion limit during invocation
+    config["recursion_limit"] = 100
+    # Ensure a thread_id is set for state retrieval
+    if "thread_id" not in config["configurable"]:
+        config["configurable"]["thread_id"] = simulation_id # Use simulation_id as thread_id
+    return config
+
+def _extract_event_state(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Returns the state dict carried by a stream event, if it looks like SimulationState."""
+    # Events often have the node name as key, and the output/state as value
+    if len(event) == 1:
+        event_data = event[next(iter(event))]
+        # Check if the event data looks like our SimulationState structure
+        if isinstance(event_data, dict) and "messages" in event_data:
+            return event_data
+    return None
+
+def _log_event_message(log_writer: SimulationLogWriter, simulation_id: str, state_in_event: Dict[str, Any], autoflush: bool = True):
+    """Buffers the latest message of a stream event's state for logging to the DB."""
+    message_index = len(state_in_event["messages"]) - 1
+    if message_index >= 0:
+        msg = state_in_event["messages"][message_index]
+        persona_id_val = state_in_event.get("persona_id", "unknown")
+        log_writer.add(
+            simulation_id, 
+            persona_id_val, 
+            message_index, 
+            msg,
+            autoflush=autoflush
+        )
+
+def _finalize_simulation(
+    db_conn, simulation_id: str, final_state: Dict[str, Any], ebay_cache_stats: Optional[Dict[str, int]] = None
+) -> Dict[str, Any]:
+    """Logs the sale, commits the DB connection, returns it to the pool and builds the returned result."""
+    # Print captured final state for debugging
+    if final_state:
+        print(f"--- Final State Captured (Keys): {list(final_state.keys())} ---")
+        print(f"--- Final Message Count: {len(final_state.get('messages', []))} ---")
+    else:
+        print("--- Warning: No state was captured during the stream. Final state might be inaccurate. ---")
+        final_state = {} # Use empty dict to avoid downstream errors
+
+    # Log sale information if a sale was completed (using the captured final_state)
+    if db_conn and final_state.get("sale_completed", False):
+        log_sale_to_db(db_conn, simulation_id, final_state.get("persona_id", "unknown"), final_state)
+        
+    # Commit all database transactions after simulation completes
+    if db_conn:
+        db_conn.commit()
+        print("--- Database changes committed successfully. ---")
+        release_db_connection(db_conn)
+        print("--- Database connection returned to the pool. ---")
+    
+    # Print summary based on final_state
+    total_turns = len(final_state.get("messages", [])) if final_state else 0
+    print(f"--- Simulation completed with {total_turns} final messages ---")
+    
+    # Include simulation metadata in the return
+    if final_state:
+        final_state["simulation_id"] = simulation_id
+        final_state["run_timestamp"] = datetime.now().isoformat()
+        if ebay_cache_stats is not None:
+            final_state["ebay_cache_stats"] = summarize_cache_run_stats(ebay_cache_stats)
+            print(f"--- eBay Cache (this run): {final_state['ebay_cache_stats']} ---")
+        return final_state # Return the captured state
+    else:
+        # If no state was captured, return an error object
+        return {"error": "No final state captured from the simulation stream.", "simulation_id": simulation_id}
+
+def _handle_simulation_error(db_conn, simulation_id: str, e: Exception) -> Dict[str, Any]:
+    """Rolls back the DB connection, returns it to the pool and builds the error result."""
+    print(f"--- Error during simulation stream processing: {e} ---")
+    # Log the exception details
+    import traceback
+    traceback.print_exc() 
+    
+    if db_conn:
+        discard = False
+        try:
+            db_conn.rollback()
+            print("--- Database changes rolled back due to error. ---")
+        except Exception as db_err:
+            print(f"--- Error rolling back DB connection: {db_err} ---")
+            discard = True  # Don't hand a broken connection to the next simulation
+        release_db_connection(db_conn, discard=discard)
+        print("--- Database connection returned to the pool after error. ---")
+    
+    return {
+        "error": f"Simulation failed during stream processing: {str(e)}",
+        "simulation_id": simulation_id
+    }
+
 def run_simulation(persona_id: Optional[str] = None, initial_messages: Optional[List[BaseMessage]] = None) -> Dict[str, Any]:
     """Runs a single sales simulation using the LangGraph.
 
@@ -338,138 +466,124 @@ def run_simulation(persona_id: Optional[str] = None, initial_messages: Optional[
     """
     print(f"\n=== Starting Simulation Run: Persona='{persona_id or 'Default'}' ===")
     
-    # Make sure the environment is loaded
-    if not load_environment():
-        print("--- Exiting due to environment loading failure. ---")
-        return {"error": "Failed to load environment variables"}
-    
-    # Ensure we have persona data available
-    create_persona_placeholder()
-    
-    # Validate persona availability
-    available_personas = get_available_persona_ids()
-    if not available_personas:
-        print("Error: No persona files found in the specified directory.")
-        return {"error": "No persona files found"}
+    prerequisite_error = _check_simulation_prerequisites()
+    if prerequisite_error:
+        return prerequisite_error
     
     # Generate a unique ID for this simulation run
     simulation_id = str(uuid.uuid4())
     print(f"--- Simulation ID: {simulation_id} ---")
     
-    # Get DB connection if possible
-    db_conn = get_db_connection()
+    # Borrow a pooled DB connection if possible
+    db_conn = acquire_db_connection()
     if not db_conn:
         print("--- Warning: Database logging is not available for this simulation. ---")
     
     # Build the graph
     try:
-        app = build_simulation_graph()
+        app = get_simulation_graph()
     except Exception as e:
         print(f"--- Error building simulation graph: {e} ---")
-        if db_conn:
-            db_conn.close()
+        release_db_connection(db_conn)
         return {"error": f"Failed to build simulation graph: {e}"}
     
-    # Prepare the config with persona_id if provided
-    config = {"configurable": {}}
-    if persona_id:
-        config["configurable"]["persona_id"] = persona_id
-    # Set recursion limit during invocation
-    config["recursion_limit"] = 100
-    # Ensure a thread_id is set for state retrieval
-    if "thread_id" not in config["configurable"]:
-        config["configurable"]["thread_id"] = simulation_id # Use simulation_id as thread_id
+    config = _build_run_config(persona_id, simulation_id)
     
     # Prepare initial state if initial_messages provided
     initial_state = {"messages": []} if initial_messages is None else {"messages": initial_messages}
     
+    # Count eBay response cache hits for this run (tool calls inherit this context)
+    ebay_cache_stats = start_cache_run_stats()
+    
     # Run the simulation
     try:
         latest_state = {} # Keep track of the most recent known complete state
         
         # Use for_each to process events and log messages during the run
+        # (buffered and written in bulk; flushed when the stream ends)
         print("--- Starting Graph Stream ---")
-        for event in app.stream(initial_state, config):
-            # Try to find the most recent state dictionary within the event data
-            # Events often have the node name as key, and the output/state as value
-            current_state_in_event = None
-            if len(event) == 1:
-                event_data = event[next(iter(event))]
-                # Check if the event data looks like our SimulationState structure
-                if isinstance(event_data, dict) and "messages" in event_data:
-                    current_state_in_event = event_data
+        with SimulationLogWriter(db_conn) as log_writer:
+            for event in app.stream(initial_state, config):
+                # Try to find the most recent state dictionary within the event data
+                current_state_in_event = _extract_event_state(event)
+                if current_state_in_event:
                     latest_state = current_state_in_event # Update latest known state
-            
-            # Log messages to DB if connection available (using the state found in *this* event)
-            if db_conn and current_state_in_event:
-                message_index = len(current_state_in_event["messages"]) - 1
-                if message_index >= 0:
-                    msg = current_state_in_event["messages"][message_index]
-                    persona_id_val = current_state_in_event.get("persona_id", "unknown")
-                    log_message_to_db(
-                        db_conn, 
-                        simulation_id, 
-                        persona_id_val, 
-                        message_index, 
-                        msg
-                    )
+                
+                # Log messages to DB if connection available (using the state found in *this* event)
+                if db_conn and current_state_in_event:
+                    _log_event_message(log_writer, simulation_id, current_state_in_event)
         
         print("--- Finished Graph Stream ---")
         
         # Use the state captured during the stream as the final state
-        final_state = latest_state 
+        return _finalize_simulation(db_conn, simulation_id, latest_state, ebay_cache_stats)
         
-        # Print captured final state for debugging
-        if final_state:
-            print(f"--- Final State Captured (Keys): {list(final_state.keys())} ---")
-            print(f"--- Final Message Count: {len(final_state.get('messages', []))} ---")
-        else:
-            print("--- Warning: No state was captured during the stream. Final state might be inaccurate. ---")
-            final_state = {} # Use empty dict to avoid downstream errors
+    except Exception as e:
+        return _handle_simulation_error(db_conn, simulation_id, e)
 
-        # Log sale information if a sale was completed (using the captured final_state)
-        if db_conn and final_state.get("sale_completed", False):
-            log_sale_to_db(db_conn, simulation_id, final_state.get("persona_id", "unknown"), final_state)
-            
-        # Commit all database transactions after simulation completes
-        if db_conn:
-            db_conn.commit()
-            print("--- Database changes committed successfully. ---")
-            db_conn.close()
-            print("--- Database connection closed. ---")
-        
-        # Print summary based on final_state
-        total_turns = len(final_state.get("messages", [])) if final_state else 0
-        print(f"--- Simulation completed with {total_turns} final messages ---")
-        
-        # Include simulation metadata in the return
-        if final_state:
-            final_state["simulation_id"] = simulation_id
-            final_state["run_timestamp"] = datetime.now().isoformat()
-            return final_state # Return the captured state
-        else:
-            # If no state was captured, return an error object
-            return {"error": "No final state captured from the simulation stream.", "simulation_id": simulation_id}
-        
+async def arun_simulation(persona_id: Optional[str] = None, initial_messages: Optional[List[BaseMessage]] = None) -> Dict[str, Any]:
+    """Async variant of `run_simulation` driven by `app.astream`.
+
+    Uses the async agent, analysis and rank nodes and the async eBay tools, so
+    many conversations can be multiplexed on one event loop (e.g. with
+    `asyncio.gather`). Blocking database calls run in worker threads.
+
+    Args:
+        persona_id: The specific persona ID to use for the buyer. If None,
+                    defaults to the first available persona.
+        initial_messages: An optional list of messages to start the conversation with.
+
+    Returns:
+        The final simulation state, or {"error": "message"} on failure
+        (same contract as `run_simulation`).
+    """
+    print(f"\n=== Starting Async Simulation Run: Persona='{persona_id or 'Default'}' ===")
+
+    prerequisite_error = _check_simulation_prerequisites()
+    if prerequisite_error:
+        return prerequisite_error
+
+    simulation_id = str(uuid.uuid4())
+    print(f"--- Simulation ID: {simulation_id} ---")
+
+    db_conn = await asyncio.to_thread(acquire_db_connection)
+    if not db_conn:
+        print("--- Warning: Database logging is not available for this simulation. ---")
+
+    try:
+        app = get_simulation_graph(use_async=True)
     except Exception as e:
-        print(f"--- Error during simulation stream processing: {e} ---")
-        # Log the exception details
-        import traceback
-        traceback.print_exc() 
-        
-        if db_conn:
-            try:
-                db_conn.rollback()
-                print("--- Database changes rolled back due to error. ---")
-                db_conn.close()
-                print("--- Database connection closed after error. ---")
-            except Exception as db_err:
-                print(f"--- Error closing/rolling back DB connection: {db_err} ---")
-        
-        return {
-            "error": f"Simulation failed during stream processing: {str(e)}",
-            "simulation_id": simulation_id
-        }
+        print(f"--- Error building simulation graph: {e} ---")
+        release_db_connection(db_conn)
+        return {"error": f"Failed to build simulation graph: {e}"}
+
+    config = _build_run_config(persona_id, simulation_id)
+    initial_state = {"messages": []} if initial_messages is None else {"messages": initial_messages}
+    ebay_cache_stats = start_cache_run_stats()
+
+    try:
+        latest_state = {}
+
+        print("--- Starting Async Graph Stream ---")
+        with SimulationLogWriter(db_conn) as log_writer:
+            async for event in app.astream(initial_state, config):
+                current_state_in_event = _extract_event_state(event)
+                if current_state_in_event:
+                    latest_state = current_state_in_event
+
+                if db_conn and current_state_in_event:
+                    # Buffer on the loop; only bulk writes go to a worker thread
+                    _log_event_message(log_writer, simulation_id, current_state_in_event, autoflush=False)
+                    if log_writer.flush_due():
+                        await asyncio.to_thread(log_writer.flush)
+            await asyncio.to_thread(log_writer.flush)
+
+        print("--- Finished Async Graph Stream ---")
+
+        return await asyncio.to_thread(_finalize_simulation, db_conn, simulation_id, latest_state, ebay_cache_stats)
+
+    except Exception as e:
+        return await asyncio.to_thread(_handle_simulation_error, db_conn, simulation_id, e)
 
 # --- Script Execution ---
 
@@ -1,4 +1,4 @@
-from typing import Annotated, Sequence, TypedDict, Optional
+from typing import Annotated, Any, Dict, Sequence, TypedDict, Optional
 from datetime import datetime
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
@@ -20,4 +20,7 @@ class SimulationState(TypedDict):
     sold_item_description: Optional[str] = None # Extracted description for embedding
     needs_review: bool = False
     sale_details: Optional[str] = None
-    product_avg_rank: Optional[float] = None # Semantic similarity score of sold item in persona index 
\ No newline at end of file
+    product_avg_rank: Optional[float] = None # Semantic similarity score of sold item in persona index
+    sale_analysis_cursor: int = 0 # Messages before this index were already checked for a sale
+    llm_analyzer_calls: int = 0 # Number of LLM sale analyzer calls in this conversation
+    ebay_cache_stats: Optional[Dict[str, Any]] = None # eBay response cache hits/misses/hit_rate for this run 
\ No newline at end of file
@@ -7,6 +7,7 @@ calculates metrics, and produces a final report.
 import os
 import sys
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional
@@ -20,8 +21,11 @@ from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
 # Import necessary components from the project
 from core.simulation import run_simulation
-from core.agents import get_llm # To get the Gemini LLM instance
+from core.agents import get_llm, set_llm_rate_limiter # To get the Gemini LLM instance
+from core.product_search import get_embedding_cache_stats
+from tools.ebay_api import set_ebay_rate_limiter, get_response_cache_stats
 from utils.persona import get_available_persona_ids, create_persona_placeholder
+from utils.db import configure_db_pool, close_db_pool, DB_POOL_MAX_SIZE
 
 # --- Configuration ---
 # NUM_RUNS_PER_PERSONA = 1 # Number of simulations to run for each persona (set to 1 for initial testing)
@@ -59,6 +63,24 @@ def parse_args():
         default="gemini-2.5-pro-exp-03-2025",
         help="Gemini model to use for generating sales wisdom.",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of simulations to run in parallel (1 = run serially).",
+    )
+    parser.add_argument(
+        "--llm-rps",
+        type=float,
+        default=float(os.getenv("LLM_REQUESTS_PER_SECOND", "0")),
+        help="Global Gemini request rate limit shared by all runs (0 = unlimited).",
+    )
+    parser.add_argument(
+        "--ebay-rps",
+        type=float,
+        default=float(os.getenv("EBAY_REQUESTS_PER_SECOND", "0")),
+        help="Global eBay API request rate limit shared by all runs (0 = unlimited).",
+    )
     # Add a debug flag if needed later
     # parser.add_argument("--debug", action="store_true", help="Enable debug output")
     return parser.parse_args()
@@ -123,6 +145,61 @@ Extracted Sales Wisdom:
         # Consider adding more robust error handling or retries if needed
         return f"(Error during wisdom generation: {e})"
 
+def run_single_simulation(persona_id: str, run_number: int, runs_per_persona: int, wisdom_llm) -> Dict[str, Any]:
+    """Runs one simulation and generates its sales wisdom.
+
+    Safe to call from worker threads: it only reads shared inputs and returns
+    its outcome, leaving metric aggregation to the caller.
+
+    Returns:
+        A dict with the simulation result (`sim_result`) and the wisdom text (`wisdom`).
+    """
+    print(f"--- Running Simulation {run_number}/{runs_per_persona} for {persona_id} ---")
+    try:
+        # Use persona_id config for the specific persona
+        sim_result = run_simulation(persona_id=persona_id)
+    except Exception as e:
+        sim_result = {"error": f"Unhandled simulation exception: {e}"}
+
+    # Check for simulation errors
+    if "error" in sim_result:
+        print(f"Error in simulation run {run_number} for {persona_id}: {sim_result['error']}")
+        wisdom = f"(Simulation Error: {sim_result['error']})"
+    else:
+        # Generate Sales Wisdom from the conversation
+        message_text = format_messages_for_llm(sim_result.get("messages", []))
+        wisdom = get_sales_wisdom(wisdom_llm, message_text)
+
+    return {"sim_result": sim_result, "wisdom": wisdom}
+
+def run_all_simulations(personas: List[str], runs_per_persona: int, wisdom_llm, concurrency: int = 1) -> Dict[tuple, Dict[str, Any]]:
+    """Runs every persona x run simulation, optionally on a bounded thread pool.
+
+    Simulations are dominated by Gemini/eBay network I/O, so threads overlap the
+    waiting. Outcomes are keyed by (persona_id, run_number) so the report order
+    is identical to a serial run regardless of completion order.
+
+    Args:
+        personas: Persona IDs to simulate.
+        runs_per_persona: Number of runs for each persona.
+        wisdom_llm: LLM used for sales wisdom generation.
+        concurrency: Maximum number of simulations in flight (1 = serial).
+
+    Returns:
+        A mapping of (persona_id, run_number) to the run outcome.
+    """
+    jobs = [(persona_id, i + 1) for persona_id in personas for i in range(runs_per_persona)]
+    if concurrency <= 1:
+        return {job: run_single_simulation(job[0], job[1], runs_per_persona, wisdom_llm) for job in jobs}
+
+    print(f"--- Running {len(jobs)} simulations with concurrency {concurrency} ---")
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="simulation") as executor:
+        futures = {
+            job: executor.submit(run_single_simulation, job[0], job[1], runs_per_persona, wisdom_llm)
+            for job in jobs
+        }
+        return {job: future.result() for job, future in futures.items()}
+
 def generate_markdown_report(report_data: Dict[str, Any]) -> str:
     """Generates a Markdown report from the collected data."""
     print("--- Generating Markdown Report --- ")
@@ -147,15 +224,43 @@ def generate_markdown_report(report_data: Dict[str, Any]) -> str:
          lines.append(f"- Overall Average Sold Item Rank Score: {overall_avg_rank:.4f}")
     else:
          lines.append("- Overall Average Sold Item Rank Score: N/A")
+
+    # LLM sale analyzer usage (the local intent model gates these calls)
+    lines.append(f"- Total LLM Sale Analyzer Calls: {report_data.get('total_llm_analyzer_calls', 0)}")
+    if report_data.get('total_runs_overall', 0) > 0:
+        lines.append(f"- LLM Sale Analyzer Calls per Run: {report_data.get('total_llm_analyzer_calls', 0) / report_data['total_runs_overall']:.2f}")
     
     lines.append("")
 
+    # Embedding cache effectiveness over the sweep
+    cache_stats = report_data.get("embedding_cache")
+    if cache_stats:
+        lines.append("## Embedding Cache")
+        lines.append(f"- Memory Hits: {cache_stats.get('memory_hits', 0)}")
+        lines.append(f"- Disk Hits: {cache_stats.get('disk_hits', 0)}")
+        lines.append(f"- Misses (embedded remotely): {cache_stats.get('misses', 0)}")
+        lines.append(f"- Evictions: {cache_stats.get('evictions', 0)}")
+        lines.append(f"- Hit Rate: {cache_stats.get('hit_rate', 0.0):.2%}")
+        lines.append("")
+
+    # eBay response cache effectiveness over the sweep
+    ebay_cache_stats = report_data.get("ebay_cache")
+    if ebay_cache_stats:
+        lines.append("## eBay Response Cache")
+        lines.append(f"- Memory Hits: {ebay_cache_stats.get('memory_hits', 0)}")
+        lines.append(f"- Disk Hits: {ebay_cache_stats.get('disk_hits', 0)}")
+        lines.append(f"- Shared In-Flight Requests: {ebay_cache_stats.get('coalesced', 0)}")
+        lines.append(f"- Misses (sent to eBay): {ebay_cache_stats.get('misses', 0)}")
+        lines.append(f"- Hit Rate: {ebay_cache_stats.get('hit_rate', 0.0):.2%}")
+        lines.append("")
+
     # Per-Persona Results
     lines.append("## Per-Persona Results")
     for persona_id, data in report_data.get("personas", {}).items():
         lines.append(f"### Persona: {persona_id}")
         lines.append(f"- Runs Conducted: {data.get('total_runs', 0)}")
         lines.append(f"- Successful Sales: {data.get('sales_count', 0)}")
+        lines.append(f"- LLM Sale Analyzer Calls: {data.get('llm_analyzer_calls', 0)}")
         
         # Calculate Conversion Rate
         conversion_rate = data.get('conversion_rate', 0.0)
@@ -196,7 +301,7 @@ def main():
     
     # Parse command line arguments
     args = parse_args()
-    print(f"--- Configuration: Runs/Persona={args.runs_per_persona}, Report File='{args.output_file}', Wisdom Model='{args.wisdom_model}' ---")
+    print(f"--- Configuration: Runs/Persona={args.runs_per_persona}, Concurrency={args.concurrency}, Report File='{args.output_file}', Wisdom Model='{args.wisdom_model}' ---")
     
     # Load environment variables (.env file)
     if not load_dotenv():
@@ -233,6 +338,14 @@ def main():
 
     print(f"Processing {len(personas_to_process)} persona(s) for {args.runs_per_persona} run(s) each: {', '.join(personas_to_process)}")
 
+    # Shared rate limiters keep concurrent runs within provider quotas
+    set_llm_rate_limiter(args.llm_rps or None)
+    set_ebay_rate_limiter(args.ebay_rps or None)
+
+    # Keep one pooled DB connection open per concurrent simulation
+    if args.concurrency > 1:
+        configure_db_pool(min_size=args.concurrency, max_size=max(args.concurrency, DB_POOL_MAX_SIZE))
+
     # Initialize LLM for wisdom generation
     try:
         # Check if model needs adjustment (though get_llm might handle this)
@@ -246,11 +359,18 @@ def main():
         return 1
 
     # --- Data Collection ---
+    try:
+        run_outcomes = run_all_simulations(personas_to_process, args.runs_per_persona, wisdom_llm, args.concurrency)
+    finally:
+        close_db_pool()
+
+    # Aggregate in persona/run order on the main thread
     all_results = {}
     total_runs_overall = 0
     total_sales_overall = 0
     grand_total_value = 0.0 # Accumulator for overall AOV
     grand_total_rank = 0.0  # Accumulator for overall avg rank
+    total_llm_analyzer_calls = 0
 
     for persona_id in personas_to_process:
         print(f"\n=== Processing Persona: {persona_id} ===")
@@ -261,34 +381,21 @@ def main():
             "sales_count": 0,
             "total_value": 0.0,
             "total_rank": 0.0,
+            "llm_analyzer_calls": 0,
         }
 
         for i in range(args.runs_per_persona):
             run_number = i + 1
-            print(f"--- Running Simulation {run_number}/{args.runs_per_persona} for {persona_id} ---")
-            
-            # Run the simulation
-            # Use persona_id config for the specific persona
-            sim_result = run_simulation(persona_id=persona_id) 
+            outcome = run_outcomes[(persona_id, run_number)]
+            sim_result = outcome["sim_result"]
             total_runs_overall += 1
             persona_results["total_runs"] += 1
 
-            # Check for simulation errors
-            if "error" in sim_result:
-                print(f"Error in simulation run {run_number}: {sim_result['error']}")
-                # Store minimal error info or skip? For now, just log.
-                wisdom = f"(Simulation Error: {sim_result['error']})"
-            else:
+            if "error" not in sim_result:
                  # Store the full result (optional, could be large)
                 persona_results["runs"].append(sim_result) 
+                persona_results["llm_analyzer_calls"] += sim_result.get("llm_analyzer_calls", 0)
 
-                # Process successful run
-                messages = sim_result.get("messages", [])
-                message_text = format_messages_for_llm(messages)
-                
-                # Generate Sales Wisdom
-                wisdom = get_sales_wisdom(wisdom_llm, message_text)
-                
                 # Track sales metrics
                 if sim_result.get("sale_completed", False):
                     persona_results["sales_count"] += 1
@@ -300,7 +407,7 @@ def main():
                     if rank is not None:
                          persona_results["total_rank"] += rank
                          
-            persona_results["sales_wisdom"].append(wisdom)
+            persona_results["sales_wisdom"].append(outcome["wisdom"])
 
         # Calculate metrics for this persona
         if persona_results["sales_count"] > 0:
@@ -320,6 +427,7 @@ def main():
         # Accumulate totals for overall metrics
         grand_total_value += persona_results["total_value"]
         grand_total_rank += persona_results["total_rank"]
+        total_llm_analyzer_calls += persona_results["llm_analyzer_calls"]
 
     # --- Calculate Overall Metrics ---
     overall_conversion_rate = (total_sales_overall / total_runs_overall) if total_runs_overall > 0 else 0.0
@@ -333,8 +441,13 @@ def main():
         "overall_conversion_rate": overall_conversion_rate,
         "overall_aov": overall_aov,
         "overall_avg_rank": overall_avg_rank,
+        "total_llm_analyzer_calls": total_llm_analyzer_calls,
+        "embedding_cache": get_embedding_cache_stats(),
+        "ebay_cache": get_response_cache_stats(),
         "personas": all_results
     }
+    print(f"--- Embedding Cache Stats: {final_report_data['embedding_cache']} ---")
+    print(f"--- eBay Response Cache Stats: {final_report_data['ebay_cache']} ---")
 
     # Write the report to the specified file
     report_markdown = generate_markdown_report(final_report_data)
@@ -0,0 +1,34 @@
+import sys
+import pytest
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core import agents
+
+
+@pytest.fixture
+def empty_pool(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-placeholder-key")
+    agents.reset_llm_pool()
+    yield
+    agents.reset_llm_pool()
+
+
+def test_get_llm_reuses_client_per_configuration(empty_pool):
+    """Clients are built once per (model, temperature, tools) key."""
+    llm = agents.get_llm()
+    assert agents.get_llm() is llm
+    assert agents.get_llm(temperature=0.0) is not llm
+    tool_llm = agents.get_llm(tools=agents.seller_tools)
+    assert agents.get_llm(tools=list(reversed(agents.seller_tools))) is tool_llm
+
+
+def test_agent_runnables_are_pooled(empty_pool):
+    """Seller and buyer runnables are built once per prompt and reused across turns."""
+    seller = agents.get_seller_runnable(agents.DEFAULT_SELLER_SYSTEM_PROMPT)
+    assert agents.get_seller_runnable(agents.DEFAULT_SELLER_SYSTEM_PROMPT) is seller
+    buyer = agents.get_buyer_runnable("You are a thrifty shopper.")
+    assert agents.get_buyer_runnable("You are a thrifty shopper.") is buyer
+    assert agents.get_buyer_runnable("You are a collector.") is not buyer
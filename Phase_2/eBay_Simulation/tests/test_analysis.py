@@ -0,0 +1,74 @@
+import sys
+import pytest
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage
+import core.analysis as analysis
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """Replaces the LLM analyzer with a stub that records its inputs."""
+    calls = []
+
+    def fake_analyze(recent_messages):
+        calls.append(recent_messages)
+        return analysis.SaleAnalysisOutput(sale_detected=False, confidence=0.3)
+
+    monkeypatch.setattr(analysis, "analyze_sale_with_llm", fake_analyze)
+    return calls
+
+
+def conversation(*buyer_turns):
+    messages = [HumanMessage(content="Hello, I'm interested in your products.")]
+    for turn in buyer_turns:
+        messages.append(AIMessage(content="We have great options. Would you like to buy one or order today?"))
+        messages.append(HumanMessage(content=turn))
+    return messages
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Sounds good, I'll take it!", True),
+    ("Add it to my cart please", True),
+    ("Let's go with the second one.", True),
+    ("I'm not ready to buy yet.", False),
+    ("What's the best deal you can do?", False),
+    ("Is it available for order?", False),
+])
+def test_purchase_intent_score(text, expected):
+    assert (analysis.score_purchase_intent(text) >= analysis.SALE_SCORE_THRESHOLD) == expected
+
+
+def test_seller_sales_talk_does_not_trigger_analysis():
+    # The seller mentions "buy"/"order" every turn; only buyer turns are scored
+    state = {"messages": conversation("Do you have it in blue?", "What sizes are there?")}
+    assert not analysis.needs_sale_analysis(state)
+
+
+def test_llm_only_called_above_threshold(llm_calls):
+    state = {"messages": conversation("Do you have it in blue?")}
+    result = analysis.analyze_conversation_for_sale(state)
+    assert llm_calls == []
+    assert result.get("llm_analyzer_calls", 0) == 0
+
+    state = {**result, "messages": conversation("Do you have it in blue?", "Great, I'll take it.")}
+    result = analysis.analyze_conversation_for_sale(state)
+    assert len(llm_calls) == 1
+    assert result["llm_analyzer_calls"] == 1
+    assert result["sale_analysis_cursor"] == len(state["messages"])
+
+
+def test_analyzed_span_not_reanalyzed(llm_calls):
+    messages = conversation("Great, I'll take it.")
+    result = analysis.analyze_conversation_for_sale({"messages": messages})
+    assert len(llm_calls) == 1
+
+    # Same span plus an uninformative seller turn: no new LLM call
+    messages = messages + [AIMessage(content="Anything else?")]
+    result = analysis.analyze_conversation_for_sale({**result, "messages": messages})
+    assert not analysis.needs_sale_analysis(result)
+    assert len(llm_calls) == 1
+    assert result["llm_analyzer_calls"] == 1
@@ -0,0 +1,161 @@
+import sys
+import time
+import threading
+import pytest
+import psycopg2
+import psycopg2.extensions
+from types import SimpleNamespace
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+import utils.db as db
+
+
+class FakeCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    def __init__(self):
+        self.rollbacks = 0
+        self.closed = 0
+        self.info = SimpleNamespace(transaction_status=psycopg2.extensions.TRANSACTION_STATUS_IDLE)
+
+    def cursor(self):
+        return FakeCursor()
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Records the rows of each bulk insert instead of executing it."""
+    recorded = []
+    monkeypatch.setattr(db, "execute_values", lambda cur, sql, rows, page_size: recorded.append(list(rows)))
+    return recorded
+
+
+def test_writer_flushes_on_size_and_exit(batches):
+    conn = FakeConnection()
+    with db.SimulationLogWriter(conn, batch_size=3, flush_interval=3600) as log_writer:
+        for turn in range(7):
+            log_writer.add("sim", "topic_0", turn, HumanMessage(content=f"m{turn}"))
+        assert [len(batch) for batch in batches] == [3, 3]
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert log_writer.rows_written == 7
+    assert [row[2] for batch in batches for row in batch] == list(range(7))
+
+
+def test_writer_flushes_on_interval(batches):
+    log_writer = db.SimulationLogWriter(FakeConnection(), batch_size=100, flush_interval=0)
+    log_writer.add("sim", "topic_0", 0, HumanMessage(content="hi"))
+    assert len(batches) == 1
+
+
+def test_writer_discards_rows_on_error(batches):
+    with pytest.raises(RuntimeError):
+        with db.SimulationLogWriter(FakeConnection(), batch_size=100) as log_writer:
+            log_writer.add("sim", "topic_0", 0, HumanMessage(content="hi"))
+            raise RuntimeError("stream failed")
+    assert batches == []
+
+
+def test_message_log_row_roles():
+    tool_call = AIMessage(content="", tool_calls=[{"name": "ebay_search_tool", "args": {}, "id": "call_1"}])
+    tool_result = ToolMessage(content="x" * 2000, name="ebay_search_tool", tool_call_id="call_1")
+    assert db._message_log_row("sim", "p", 0, HumanMessage(content="hi"))[3] == "Buyer"
+    assert db._message_log_row("sim", "p", 1, tool_call)[3:7] == ("Seller (Tool Call)", "", "ebay_search_tool", "call_1")
+    row = db._message_log_row("sim", "p", 2, tool_result)
+    assert row[3] == "Tool" and row[4].endswith("... (truncated)") and len(row[4]) < 1100
+
+
+# --- Tests for the connection pool --- #
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Makes psycopg2.connect return fake connections and records them."""
+    opened = []
+
+    def fake_connect(*args, **kwargs):
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(psycopg2, "connect", fake_connect)
+    return opened
+
+
+def test_pool_reuses_connections(connections):
+    conn_pool = db.SimulationConnectionPool(1, 2)
+    first = conn_pool.getconn()
+    conn_pool.putconn(first)
+    assert conn_pool.getconn() is first
+    assert len(connections) == 1
+
+
+def test_pool_blocks_until_connection_returned(connections):
+    conn_pool = db.SimulationConnectionPool(1, 1, timeout=5)
+    conn = conn_pool.getconn()
+    threading.Timer(0.05, conn_pool.putconn, args=(conn,)).start()
+    start = time.monotonic()
+    assert conn_pool.getconn() is conn
+    assert time.monotonic() - start >= 0.04
+
+
+def test_pool_times_out_when_exhausted(connections):
+    conn_pool = db.SimulationConnectionPool(1, 1, timeout=0.01)
+    conn_pool.getconn()
+    with pytest.raises(psycopg2.pool.PoolError):
+        conn_pool.getconn()
+
+
+def test_pool_replaces_closed_connections(connections):
+    conn_pool = db.SimulationConnectionPool(1, 2)
+    conn = conn_pool.getconn()
+    conn.close()  # e.g. server restarted
+    conn_pool.putconn(conn)
+    replacement = conn_pool.getconn()
+    assert replacement is not conn and not replacement.closed
+
+
+def test_pool_ignores_connections_it_did_not_lend(connections):
+    conn_pool = db.SimulationConnectionPool(1, 1, timeout=0.01)
+    borrowed = conn_pool.getconn()
+    assert conn_pool.putconn(FakeConnection()) is False
+    with pytest.raises(psycopg2.pool.PoolError):
+        conn_pool.getconn()  # The stray connection did not free a slot
+    assert conn_pool.putconn(borrowed) is True
+    assert conn_pool.putconn(borrowed) is False  # Returned twice
+
+
+@pytest.fixture
+def process_pool():
+    yield
+    db.close_db_pool()
+    db.configure_db_pool()
+
+
+def test_release_after_configure_closes_old_connection(connections, process_pool):
+    db.configure_db_pool(1, 1)
+    old_conn = db.acquire_db_connection()
+    db.configure_db_pool(1, 2)
+    new_pool = db.get_db_pool()
+    new_conn = db.acquire_db_connection()
+
+    db.release_db_connection(old_conn)
+    assert old_conn.closed
+    assert new_pool.putconn(new_conn) is True
+    # The new pool still has exactly maxconn slots
+    assert db.acquire_db_connection() is not None and db.acquire_db_connection() is not None
+    new_pool.timeout = 0.01
+    assert db.acquire_db_connection() is None
@@ -0,0 +1,201 @@
+import sys
+import time
+import asyncio
+import threading
+import pytest
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import tools.ebay_api as ebay_api
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+@pytest.fixture
+def shared_api(monkeypatch):
+    monkeypatch.setenv("EBAY_CLIENT_ID", "id")
+    monkeypatch.setenv("EBAY_CLIENT_SECRET", "secret")
+    monkeypatch.setenv("EBAY_USE_SANDBOX", "false")
+    monkeypatch.setattr(ebay_api, "_response_cache", ebay_api.ResponseCache(db_path=None))
+    ebay_api.reset_ebay_api()
+    api = ebay_api.get_ebay_api()
+    api.token_posts = 0
+
+    def fake_post(url, **kwargs):
+        time.sleep(0.01)  # Widen the race window between threads
+        api.token_posts += 1
+        return FakeResponse({"access_token": f"token-{api.token_posts}", "expires_in": 7200})
+
+    monkeypatch.setattr(api.session, "post", fake_post)
+    api.gets = 0
+
+    def fake_get(url, **kwargs):
+        time.sleep(0.01)
+        api.gets += 1
+        return FakeResponse({"url": url, "headers": kwargs["headers"], "params": kwargs.get("params")})
+
+    monkeypatch.setattr(api.session, "get", fake_get)
+    yield api
+    ebay_api.reset_ebay_api()
+
+
+def test_tool_calls_share_one_client(shared_api):
+    assert ebay_api.get_ebay_api() is shared_api
+    assert ebay_api.get_ebay_api(use_sandbox=False) is shared_api
+
+    ebay_api.answer_item_question("v1|1|0")
+    ebay_api.answer_item_question("v1|2|0")
+    assert shared_api.token_posts == 1
+
+
+def test_token_fetched_once_across_threads(shared_api):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda i: shared_api.get_item_details(str(i)), range(16)))
+    assert shared_api.token_posts == 1
+    assert {r["headers"]["Authorization"] for r in results} == {"Bearer token-1"}
+
+
+def test_token_refreshed_ahead_of_expiry(shared_api):
+    assert shared_api._get_access_token() == "token-1"
+    shared_api.token_expiry = datetime.now() + ebay_api.TOKEN_REFRESH_MARGIN - timedelta(seconds=1)
+    assert shared_api._get_access_token() == "token-2"
+
+
+# --- Tests for the response cache --- #
+
+def test_search_cache_normalizes_query_and_filters(shared_api):
+    shared_api.search_items("Running  Shoes", limit=5, filters={"price": "[10..50]", "buyingOptions": "{FIXED_PRICE}"})
+    shared_api.search_items("running shoes", limit=5, filters={"buyingOptions": "{FIXED_PRICE}", "price": "[10..50]"})
+    assert shared_api.gets == 1
+    shared_api.search_items("running shoes", limit=10)
+    assert shared_api.gets == 2
+
+
+def test_item_id_stripped_for_cache_key_and_request(shared_api):
+    first = shared_api.get_item_details(" v1|1|0 ")
+    assert first["url"].endswith("/item/v1|1|0")
+    assert shared_api.get_item_details("v1|1|0") is first
+    assert shared_api.gets == 1
+
+
+def test_concurrent_identical_requests_share_one_call(shared_api):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: shared_api.get_item_details("v1|1|0"), range(8)))
+    assert shared_api.gets == 1
+    assert all(r is results[0] for r in results)
+    stats = ebay_api.get_response_cache_stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced"] + stats["memory_hits"] == 7
+
+
+def test_async_identical_requests_share_one_call():
+    cache = ebay_api.ResponseCache(db_path=None)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"itemId": "1"}
+
+    async def run():
+        return await asyncio.gather(*(cache.aget_or_fetch("item", 60, fetch) for _ in range(5)))
+
+    assert asyncio.run(run()) == [{"itemId": "1"}] * 5
+    assert len(calls) == 1
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    cache = ebay_api.ResponseCache(db_path=None)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"itemId": "1"}
+
+    async def run():
+        leader = asyncio.create_task(cache.aget_or_fetch("item", 60, fetch))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.aget_or_fetch("item", 60, fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        payload = await waiter
+        assert leader.cancelled() and not waiter.cancelled()
+        return payload
+
+    assert asyncio.run(run()) == {"itemId": "1"}
+    assert len(calls) == 1
+    assert cache.get_or_fetch("item", 60, lambda: {"itemId": "2"}) == {"itemId": "1"}
+
+
+def test_expired_entries_and_failures_are_refetched(monkeypatch):
+    cache = ebay_api.ResponseCache(db_path=None)
+    now = [1000.0]
+    monkeypatch.setattr(ebay_api.time, "time", lambda: now[0])
+
+    def failing_fetch():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("k", 60, failing_fetch)
+    assert cache.get_or_fetch("k", 60, lambda: {"v": 1}) == {"v": 1}
+    assert cache.get_or_fetch("k", 60, lambda: {"v": 2}) == {"v": 1}
+    now[0] += 61
+    assert cache.get_or_fetch("k", 60, lambda: {"v": 3}) == {"v": 3}
+    assert cache.stats()["expired"] == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / "responses.sqlite")
+    ebay_api.ResponseCache(db_path=db_path).get_or_fetch("k", 60, lambda: {"v": 1})
+
+    reopened = ebay_api.ResponseCache(db_path=db_path)
+    assert reopened.get_or_fetch("k", 60, lambda: {"v": 2}) == {"v": 1}
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_async_disk_io_runs_off_the_event_loop(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "responses.sqlite")
+    cache = ebay_api.ResponseCache(db_path=db_path)
+    assert cache._db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    disk_calls = []
+
+    def recording(method):
+        def wrapper(*args):
+            disk_calls.append((threading.current_thread() is threading.main_thread(), cache._lock.locked()))
+            return method(*args)
+        return wrapper
+
+    monkeypatch.setattr(cache, "_read_disk", recording(cache._read_disk))
+    monkeypatch.setattr(cache, "_write_disk", recording(cache._write_disk))
+
+    async def fetch():
+        return {"v": 1}
+
+    assert asyncio.run(cache.aget_or_fetch("k", 60, fetch)) == {"v": 1}
+    assert disk_calls == [(False, False), (False, False)]  # One read, one write; worker thread, memory lock free
+
+    reopened = ebay_api.ResponseCache(db_path=db_path)
+    assert asyncio.run(reopened.aget_or_fetch("k", 60, fetch)) == {"v": 1}
+    assert reopened.stats()["disk_hits"] == 1 and reopened.stats()["misses"] == 0
+
+
+def test_per_run_hit_rate(shared_api):
+    run_stats = ebay_api.start_cache_run_stats()
+    for _ in range(4):
+        ebay_api.search_ebay("desk lamp")
+    summary = ebay_api.summarize_cache_run_stats(run_stats)
+    assert summary == {"hits": 3, "misses": 1, "hit_rate": 0.75}
@@ -0,0 +1,45 @@
+import sys
+import time
+import random
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import generate_report
+from tools.ebay_api import RequestRateLimiter
+
+
+def test_concurrent_runs_match_serial_order(monkeypatch):
+    """Outcomes are keyed by (persona, run) regardless of completion order."""
+    def fake_run_simulation(persona_id=None):
+        time.sleep(random.uniform(0, 0.01))
+        return {"persona_id": persona_id, "messages": [], "sale_completed": persona_id == "topic_1"}
+
+    monkeypatch.setattr(generate_report, "run_simulation", fake_run_simulation)
+    monkeypatch.setattr(generate_report, "get_sales_wisdom", lambda llm, text: "wisdom")
+
+    personas = ["topic_0", "topic_1", "topic_2"]
+    serial = generate_report.run_all_simulations(personas, 3, None, concurrency=1)
+    concurrent = generate_report.run_all_simulations(personas, 3, None, concurrency=4)
+
+    assert list(concurrent) == list(serial)
+    assert [o["sim_result"]["persona_id"] for o in concurrent.values()] == [p for p in personas for _ in range(3)]
+
+
+def test_simulation_errors_are_captured(monkeypatch):
+    def failing_run_simulation(persona_id=None):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(generate_report, "run_simulation", failing_run_simulation)
+    outcomes = generate_report.run_all_simulations(["topic_0"], 2, None, concurrency=2)
+    assert all("boom" in o["wisdom"] for o in outcomes.values())
+
+
+def test_request_rate_limiter_spaces_requests():
+    limiter = RequestRateLimiter(requests_per_second=50, max_burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    # First token is available immediately, the remaining five wait ~20 ms each
+    assert time.monotonic() - start >= 0.08
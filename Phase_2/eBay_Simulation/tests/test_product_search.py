@@ -0,0 +1,127 @@
+import os
+import sys
+import pytest
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import core.product_search as product_search
+
+
+class FakeEmbeddings:
+    """Deterministic bag-of-letters embedding model that counts calls."""
+
+    model = product_search.EMBEDDING_MODEL_NAME
+
+    def __init__(self):
+        self.documents_embedded = 0
+        self.queries_embedded = 0
+
+    def _vector(self, text):
+        vec = [0.0] * 26
+        for ch in text.lower():
+            if "a" <= ch <= "z":
+                vec[ord(ch) - ord("a")] += 1.0
+        return vec
+
+    def embed_documents(self, texts):
+        self.documents_embedded += len(texts)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        self.queries_embedded += 1
+        return self._vector(text)
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    model = FakeEmbeddings()
+    monkeypatch.setattr(product_search, "_embed_model", model)
+    monkeypatch.setattr(product_search, "_loaded_indices", {})
+    monkeypatch.setattr(product_search, "_embedding_cache", product_search.EmbeddingCache(db_path=None))
+    return model
+
+
+@pytest.fixture
+def index_csv(tmp_path):
+    path = tmp_path / "persona_topic_0_top_purchases_nmf.csv"
+    path.write_text(
+        "Rank,ASIN_ISBN,Title,Frequency\n"
+        "1,A1,aaaa,10\n"
+        "2,A2,bbbb,8\n"
+        "3,A3,cccc,5\n"
+        "x,A4,dddd,1\n"
+    )
+    return path
+
+
+def test_index_built_once_and_reused(fake_model, index_csv):
+    """Titles are embedded on the first search only; later searches reuse the index."""
+    query = fake_model.embed_query("aaab")
+    assert product_search.search_product_index(query, str(index_csv), top_k=1) == 1.0
+    assert fake_model.documents_embedded == 3  # Row with invalid rank is skipped
+
+    matrix_path, meta_path = product_search.get_index_artifact_paths(str(index_csv))
+    assert os.path.exists(matrix_path) and os.path.exists(meta_path)
+
+    # A fresh process (empty in-memory cache) loads the persisted index
+    product_search._loaded_indices.clear()
+    assert product_search.search_product_index(query, str(index_csv), top_k=2) == 1.5
+    assert fake_model.documents_embedded == 3
+
+
+def test_stale_index_rebuilt_when_csv_changes(fake_model, index_csv):
+    """Changing the CSV content invalidates the persisted index."""
+    query = fake_model.embed_query("cccc")
+    assert product_search.search_product_index(query, str(index_csv), top_k=1) == 3.0
+
+    index_csv.write_text("Rank,ASIN_ISBN,Title,Frequency\n7,A3,cccc,5\n9,A1,aaaa,10\n8,A5,eeee,2\n")
+    assert product_search.search_product_index(query, str(index_csv), top_k=1) == 7.0
+    # Unchanged titles come from the embedding cache; only the new one is embedded
+    assert fake_model.documents_embedded == 4
+
+
+def test_search_rejects_missing_inputs(fake_model, index_csv, tmp_path):
+    assert product_search.search_product_index(None, str(index_csv)) is None
+    assert product_search.search_product_index([1.0] * 26, str(tmp_path / "missing.csv")) is None
+    assert fake_model.documents_embedded == 0
+
+
+# --- Tests for the embedding cache --- #
+
+def test_batch_embedding_only_sends_misses(fake_model):
+    first = product_search.embed_product_list(["red shoe", "blue hat"])
+    second = product_search.embed_product_list(["blue  hat", "green sock", "green sock"])
+    assert fake_model.documents_embedded == 3  # Whitespace-normalised hit, duplicate miss embedded once
+    assert second[0] == first[1]
+    stats = product_search.get_embedding_cache_stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 4
+
+
+def test_query_and_document_embeddings_cached_separately(fake_model):
+    product_search.embed_product_list(["red shoe"])
+    product_search.embed_product_description("red shoe")
+    product_search.embed_product_description("red shoe")
+    assert fake_model.documents_embedded == 1
+    assert fake_model.queries_embedded == 1
+
+
+def test_memory_tier_evicts_and_disk_tier_persists(tmp_path):
+    db_path = str(tmp_path / "embeddings.sqlite")
+    vector_bytes = 4 * 26
+    cache = product_search.EmbeddingCache(db_path=db_path, max_bytes=2 * vector_bytes)
+    cache.put_many("m:document", ["a", "b", "c"], [[1.0] * 26, [2.0] * 26, [3.0] * 26])
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["memory_entries"] == 2
+
+    # "a" was evicted from memory but is still served from disk
+    assert cache.get_many("m:document", ["a"])[0][0] == 1.0
+    assert cache.stats()["disk_hits"] == 1
+
+    reopened = product_search.EmbeddingCache(db_path=db_path)
+    vectors = reopened.get_many("m:document", ["b", "missing"])
+    assert vectors[0][0] == 2.0 and vectors[1] is None
+    assert reopened.stats()["disk_hits"] == 1
+    assert reopened.stats()["misses"] == 1
@@ -1,8 +1,19 @@
 import os
+import asyncio
+import contextvars
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+import weakref
+import httpx
 import requests
 import re # Import regex module
 import html # Import html module
-from typing import Dict, List, Optional, Union
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from pathlib import Path
@@ -12,6 +23,402 @@ project_root = Path(__file__).parents[1]  # Go up one level to reach project roo
 env_path = project_root / '.env'
 load_dotenv(env_path)
 
+# --- Request Rate Limiting ---
+
+class RequestRateLimiter:
+    """Thread-safe token bucket limiting eBay API requests per second."""
+
+    def __init__(self, requests_per_second: float, max_burst: Optional[float] = None):
+        self.requests_per_second = requests_per_second
+        self.max_burst = max_burst if max_burst is not None else max(1.0, requests_per_second)
+        self._tokens = self.max_burst
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a request token is available, then consumes it."""
+        while True:
+            wait = self._try_acquire()
+            if wait == 0.0:
+                return
+            time.sleep(wait)
+
+    def _try_acquire(self) -> float:
+        """Consumes a token if available; returns 0 on success or the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.max_burst, self._tokens + (now - self._last_refill) * self.requests_per_second)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.requests_per_second
+
+    async def aacquire(self):
+        """Async variant of `acquire` that yields to the event loop while waiting."""
+        while True:
+            wait = self._try_acquire()
+            if wait == 0.0:
+                return
+            await asyncio.sleep(wait)
+
+# Process-wide limiter shared by all EbayAPI instances (None = unlimited)
+_request_rate_limiter: Optional[RequestRateLimiter] = None
+
+def set_ebay_rate_limiter(requests_per_second: Optional[float]):
+    """Installs a process-wide eBay request rate limit (None/0 disables it)."""
+    global _request_rate_limiter
+    _request_rate_limiter = RequestRateLimiter(requests_per_second) if requests_per_second else None
+    if _request_rate_limiter:
+        print(f"--- eBay rate limiter set: {requests_per_second} requests/sec ---")
+
+def _throttle():
+    """Waits for the shared rate limiter, if one is installed."""
+    limiter = _request_rate_limiter
+    if limiter is not None:
+        limiter.acquire()
+
+async def _athrottle():
+    """Async variant of `_throttle`."""
+    limiter = _request_rate_limiter
+    if limiter is not None:
+        await limiter.aacquire()
+
+# --- Shared Async HTTP Clients ---
+
+# One AsyncClient per event loop: creating a client loads the SSL trust store
+# (tens of ms), and a shared client keeps connections alive across requests.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Returns the shared httpx.AsyncClient for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=30, limits=httpx.Limits(max_connections=100, max_keepalive_connections=20))
+        _async_clients[loop] = client
+    return client
+
+async def aclose_async_http_client():
+    """Closes the shared AsyncClient of the running event loop, if any."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+# --- Response Cache ---
+
+# Default location of the on-disk response cache (shared across generate_report.py runs)
+DEFAULT_RESPONSE_CACHE_PATH = project_root / ".cache" / "ebay_responses.sqlite"
+
+# Seconds a cached response stays valid (0 disables caching for that call type)
+SEARCH_CACHE_TTL = float(os.getenv("EBAY_SEARCH_CACHE_TTL", "900"))
+ITEM_CACHE_TTL = float(os.getenv("EBAY_ITEM_CACHE_TTL", "3600"))
+
+# Per-run hit/miss counters of the current simulation (thread- or task-local)
+_run_cache_stats: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar(
+    "ebay_run_cache_stats", default=None
+)
+
+class ResponseCache:
+    """TTL cache for eBay API JSON responses with single-flight de-duplication.
+
+    Responses live in an in-memory LRU tier bounded by entry count and are
+    written through to an optional SQLite database so they survive across
+    `generate_report.py` runs. Concurrent lookups of the same missing key share
+    one request: the first caller fetches and the others wait for its result.
+    Failed requests are not cached. All methods are thread-safe.
+
+    Disk reads and writes happen outside the memory tier's lock (the SQLite
+    connection has a lock of its own), and the async methods run them in a
+    worker thread, so a disk lookup never blocks the event loop or other
+    callers' memory hits.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = 2048):
+        """
+        Args:
+            db_path: Path of the SQLite disk tier, or None for a memory-only cache.
+            max_entries: Maximum number of responses in the in-memory LRU tier.
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._ainflight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock() # Serializes use of the SQLite connection
+        self._db = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self.expired = 0
+
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                # WAL with synchronous=NORMAL: a write does not fsync on every commit
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("PRAGMA synchronous=NORMAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    " cache_key TEXT PRIMARY KEY, expires_at REAL NOT NULL, payload TEXT NOT NULL)"
+                )
+                self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"--- Warning: eBay response disk cache unavailable at '{db_path}': {e} ---")
+                self._db = None
+
+    def _record_run(self, hit: bool):
+        """Counts a lookup against the current run, if one is being tracked. Caller holds the lock."""
+        run_stats = _run_cache_stats.get()
+        if run_stats is not None:
+            run_stats["hits" if hit else "misses"] += 1
+
+    def _lookup(self, key: str) -> Optional[Dict]:
+        """Returns an unexpired cached response from the memory tier. Caller holds the lock."""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+            del self._memory[key]
+            self.expired += 1
+        return None
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, Dict]]:
+        """Returns (expires_at, payload) of an unexpired response in the disk tier. Caller must not hold the lock."""
+        if self._db is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT expires_at, payload FROM responses WHERE cache_key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"--- Warning: Failed to read eBay response from disk cache: {e} ---")
+            return None
+        if row is None or row[0] <= time.time():
+            return None
+        return row[0], json.loads(row[1])
+
+    def _write_disk(self, key: str, expires_at: float, payload: Dict):
+        """Writes a fresh response to the disk tier. Caller must not hold the lock."""
+        if self._db is None:
+            return
+        try:
+            data = json.dumps(payload)
+            with self._db_lock:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, expires_at, data))
+                self._db.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"--- Warning: Failed to write eBay response to disk cache: {e} ---")
+
+    def _remember(self, key: str, expires_at: float, payload: Dict):
+        """Inserts into the memory tier and evicts LRU entries over capacity. Caller holds the lock."""
+        self._memory[key] = (expires_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _remember_from_disk(self, key: str, expires_at: float, payload: Dict):
+        """Promotes a disk hit to the memory tier and counts it. Caller holds the lock."""
+        self._remember(key, expires_at, payload)
+        self.disk_hits += 1
+        self._record_run(hit=True)
+
+    def get_or_fetch(self, key: str, ttl: float, fetch: Callable[[], Dict]) -> Dict:
+        """Returns the cached response for `key`, calling `fetch` at most once per miss."""
+        with self._lock:
+            payload = self._lookup(key)
+            if payload is not None:
+                self._record_run(hit=True)
+                return payload
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+                self._record_run(hit=True)
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            cached = self._read_disk(key)
+            if cached is not None:
+                expires_at, payload = cached
+                with self._lock:
+                    self._remember_from_disk(key, expires_at, payload)
+                    self._inflight.pop(key, None)
+                future.set_result(payload)
+                return payload
+            with self._lock:
+                self.misses += 1
+                self._record_run(hit=False)
+            payload = fetch()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, expires_at, payload)
+            self._inflight.pop(key, None)
+        future.set_result(payload)
+        self._write_disk(key, expires_at, payload)
+        return payload
+
+    async def aget_or_fetch(self, key: str, ttl: float, fetch: Callable[[], Awaitable[Dict]]) -> Dict:
+        """Async variant of `get_or_fetch`; de-duplicates requests within one event loop.
+
+        The first caller starts `fetch` as a task of its own that every caller
+        awaits, so cancelling one caller (e.g. a timed-out conversation) only
+        drops its own wait; the request still completes for the others and is
+        cached.
+        """
+        loop = asyncio.get_running_loop()
+        inflight_key = (loop, key)
+        with self._lock:
+            payload = self._lookup(key)
+            if payload is not None:
+                self._record_run(hit=True)
+                return payload
+            task = self._ainflight.get(inflight_key)
+            is_leader = task is None
+            if is_leader:
+                task = loop.create_task(self._afetch_and_store(key, ttl, fetch, inflight_key))
+                # Retrieve the outcome even if every caller was cancelled, so a failure is not reported as unhandled
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                self._ainflight[inflight_key] = task
+            else:
+                self.coalesced += 1
+                self._record_run(hit=True)
+
+        return await asyncio.shield(task)
+
+    async def _afetch_and_store(self, key: str, ttl: float, fetch: Callable[[], Awaitable[Dict]], inflight_key) -> Dict:
+        """The shared request behind `aget_or_fetch`: checks the disk tier, fetches and caches."""
+        try:
+            cached = await asyncio.to_thread(self._read_disk, key) if self._db is not None else None
+            if cached is not None:
+                expires_at, payload = cached
+                with self._lock:
+                    self._remember_from_disk(key, expires_at, payload)
+                return payload
+            with self._lock:
+                self.misses += 1
+                self._record_run(hit=False)
+            payload = await fetch()
+            expires_at = time.time() + ttl
+            with self._lock:
+                self._remember(key, expires_at, payload)
+        finally:
+            with self._lock:
+                self._ainflight.pop(inflight_key, None)
+        if self._db is not None:
+            await asyncio.to_thread(self._write_disk, key, expires_at, payload)
+        return payload
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and the current memory footprint."""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits + self.coalesced
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def clear(self):
+        """Drops all cached responses from both tiers."""
+        with self._lock:
+            self._memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    """Returns the process-wide eBay response cache, creating it on first use.
+
+    Configured via environment variables:
+        EBAY_CACHE_PATH: SQLite file for the disk tier (default
+            `.cache/ebay_responses.sqlite` in the project root; empty disables it).
+        EBAY_CACHE_MAX_ENTRIES: Capacity of the in-memory LRU tier (default 2048).
+        EBAY_SEARCH_CACHE_TTL / EBAY_ITEM_CACHE_TTL: Seconds search results and
+            item details stay valid (defaults 900 and 3600; 0 disables caching).
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                db_path = os.getenv("EBAY_CACHE_PATH", str(DEFAULT_RESPONSE_CACHE_PATH)) or None
+                max_entries = int(os.getenv("EBAY_CACHE_MAX_ENTRIES", "2048"))
+                _response_cache = ResponseCache(db_path=db_path, max_entries=max_entries)
+                print(f"--- eBay response cache initialised (disk tier: {db_path or 'disabled'}, max entries: {max_entries}) ---")
+    return _response_cache
+
+def get_response_cache_stats() -> Dict[str, Any]:
+    """Returns the counters of the process-wide eBay response cache."""
+    return get_response_cache().stats()
+
+def start_cache_run_stats() -> Dict[str, int]:
+    """Starts per-run cache counters for the current thread or task and returns them."""
+    run_stats = {"hits": 0, "misses": 0}
+    _run_cache_stats.set(run_stats)
+    return run_stats
+
+def summarize_cache_run_stats(run_stats: Dict[str, int]) -> Dict[str, Any]:
+    """Adds the hit rate to counters returned by `start_cache_run_stats`."""
+    lookups = run_stats["hits"] + run_stats["misses"]
+    return {**run_stats, "hit_rate": run_stats["hits"] / lookups if lookups else 0.0}
+
+def _normalize_query(query: str) -> str:
+    """Normalises a search query for cache keying (NFC, case-folded, collapsed whitespace)."""
+    return " ".join(unicodedata.normalize("NFC", query).casefold().split())
+
+def _search_cache_key(
+    base_url: str,
+    query: str,
+    limit: int,
+    category_ids: Optional[List[str]],
+    filters: Optional[Dict[str, str]],
+) -> str:
+    return json.dumps([
+        "search",
+        base_url,
+        _normalize_query(query),
+        limit,
+        sorted(category_ids or []),
+        sorted((filters or {}).items()),
+    ])
+
+def _item_cache_key(base_url: str, item_id: str) -> str:
+    return json.dumps(["item", base_url, item_id])
+
+# Refresh the OAuth token this long before eBay says it expires, so requests
+# in flight never race the expiry.
+TOKEN_REFRESH_MARGIN = timedelta(seconds=120)
+
+# Connection pool size of each EbayAPI session (roughly the max concurrent simulations)
+HTTP_POOL_MAXSIZE = int(os.getenv("EBAY_HTTP_POOL_MAXSIZE", "32"))
+
 class EbayAPI:
     """
     eBay Browse API client for searching items.
@@ -35,6 +442,13 @@ class EbayAPI:
         self.client_secret = os.getenv("EBAY_CLIENT_SECRET")
         self.access_token = None
         self.token_expiry = None
+        self._token_lock = threading.Lock()
+
+        # Keep-alive session so repeated calls reuse TCP/TLS connections
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=HTTP_POOL_MAXSIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         
         # Determine if we should use sandbox or production
         if use_sandbox is None:
@@ -59,43 +473,91 @@ class EbayAPI:
                 "EBAY_CLIENT_SECRET in your environment or .env file."
             )
     
-    def _get_access_token(self) -> str:
-        """
-        Get OAuth access token using client credentials flow.
-        Caches the token until it expires.
-        """
-        if (
+    def _token_request_args(self) -> Dict:
+        """Builds the OAuth client-credentials request (shared by sync and async paths)."""
+        return {
+            "headers": {
+                "Content-Type": "application/x-www-form-urlencoded",
+            },
+            "data": {
+                "grant_type": "client_credentials",
+                "scope": "https://api.ebay.com/oauth/api_scope"
+            },
+            "auth": (self.client_id, self.client_secret),
+        }
+
+    def _has_valid_token(self) -> bool:
+        """True if the cached token is usable and not yet due for refresh-ahead."""
+        return bool(
             self.access_token 
             and self.token_expiry 
-            and datetime.now() < self.token_expiry
-        ):
-            return self.access_token
-            
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded",
-        }
-        
-        data = {
-            "grant_type": "client_credentials",
-            "scope": "https://api.ebay.com/oauth/api_scope"
-        }
-        
-        response = requests.post(
-            self.TOKEN_URL,
-            headers=headers,
-            data=data,
-            auth=(self.client_id, self.client_secret)
+            and datetime.now() < self.token_expiry - TOKEN_REFRESH_MARGIN
         )
-        
-        response.raise_for_status()
-        token_data = response.json()
-        
+
+    def _store_token(self, token_data: Dict) -> str:
         self.access_token = token_data["access_token"]
         self.token_expiry = datetime.now() + timedelta(
             seconds=token_data["expires_in"]
         )
-        
         return self.access_token
+
+    def _get_access_token(self) -> str:
+        """
+        Get OAuth access token using client credentials flow.
+        Caches the token until shortly before it expires. Thread-safe: when
+        several threads need a new token only one of them requests it.
+        """
+        if self._has_valid_token():
+            return self.access_token
+
+        with self._token_lock:
+            # Another thread may have refreshed the token while we waited
+            if self._has_valid_token():
+                return self.access_token
+
+            _throttle()
+            response = self.session.post(self.TOKEN_URL, **self._token_request_args())
+
+            response.raise_for_status()
+            return self._store_token(response.json())
+
+    async def _aget_access_token(self) -> str:
+        """Async variant of `_get_access_token`."""
+        if self._has_valid_token():
+            return self.access_token
+        # Refreshes are rare; do them on a worker thread so the token (and its
+        # lock) stay shared with the sync path and other event loops.
+        return await asyncio.to_thread(self._get_access_token)
+
+    @staticmethod
+    def _api_headers(access_token: str) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {access_token}",
+            "X-EBAY-C-MARKETPLACE-ID": "EBAY_US",  # Default to US marketplace
+            "Content-Type": "application/json"
+        }
+
+    @staticmethod
+    def _search_params(
+        query: str,
+        limit: int,
+        category_ids: Optional[List[str]],
+        filters: Optional[Dict[str, str]],
+    ) -> Dict:
+        params = {
+            "q": query,
+            "limit": limit
+        }
+        
+        if category_ids:
+            params["category_ids"] = ",".join(category_ids)
+            
+        if filters:
+            filter_str = []
+            for key, value in filters.items():
+                filter_str.append(f"{key}:{value}")
+            params["filter"] = ",".join(filter_str)
+        return params
     
     def search_items(
         self,
@@ -114,39 +576,69 @@ class EbayAPI:
             filters: Optional dictionary of additional filters
             
         Returns:
-            Dict containing search results with item summaries
+            Dict containing search results with item summaries.
+            Responses are served from the shared TTL cache when possible.
         """
+        if SEARCH_CACHE_TTL <= 0:
+            return self._fetch_search_items(query, limit, category_ids, filters)
+        return get_response_cache().get_or_fetch(
+            _search_cache_key(self.BASE_URL, query, limit, category_ids, filters),
+            SEARCH_CACHE_TTL,
+            lambda: self._fetch_search_items(query, limit, category_ids, filters),
+        )
+
+    def _fetch_search_items(self, query, limit, category_ids, filters) -> Dict:
+        """Performs the uncached search request."""
         access_token = self._get_access_token()
         
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "X-EBAY-C-MARKETPLACE-ID": "EBAY_US",  # Default to US marketplace
-            "Content-Type": "application/json"
-        }
-        
-        params = {
-            "q": query,
-            "limit": limit
-        }
-        
-        if category_ids:
-            params["category_ids"] = ",".join(category_ids)
-            
-        if filters:
-            filter_str = []
-            for key, value in filters.items():
-                filter_str.append(f"{key}:{value}")
-            params["filter"] = ",".join(filter_str)
-            
-        response = requests.get(
+        _throttle()
+        response = self.session.get(
             f"{self.BASE_URL}/item_summary/search",
-            headers=headers,
-            params=params
+            headers=self._api_headers(access_token),
+            params=self._search_params(query, limit, category_ids, filters)
         )
         
         response.raise_for_status()
         return response.json()
 
+    async def asearch_items(
+        self,
+        query: str,
+        limit: int = 10,
+        category_ids: Optional[List[str]] = None,
+        filters: Optional[Dict[str, str]] = None,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> Dict:
+        """
+        Async variant of `search_items` using an httpx.AsyncClient.
+
+        Args:
+            client: Optional AsyncClient; defaults to the event loop's shared client.
+        """
+        if SEARCH_CACHE_TTL <= 0:
+            return await self._afetch_search_items(query, limit, category_ids, filters, client)
+        return await get_response_cache().aget_or_fetch(
+            _search_cache_key(self.BASE_URL, query, limit, category_ids, filters),
+            SEARCH_CACHE_TTL,
+            lambda: self._afetch_search_items(query, limit, category_ids, filters, client),
+        )
+
+    async def _afetch_search_items(self, query, limit, category_ids, filters, client) -> Dict:
+        """Performs the uncached search request."""
+        client = client or get_async_http_client()
+
+        access_token = await self._aget_access_token()
+
+        await _athrottle()
+        response = await client.get(
+            f"{self.BASE_URL}/item_summary/search",
+            headers=self._api_headers(access_token),
+            params=self._search_params(query, limit, category_ids, filters)
+        )
+
+        response.raise_for_status()
+        return response.json()
+
     def get_item_details(self, item_id: str) -> Dict:
         """
         Get detailed information about a specific eBay item.
@@ -155,24 +647,237 @@ class EbayAPI:
             item_id: The eBay item ID
             
         Returns:
-            Dict containing detailed item information
+            Dict containing detailed item information.
+            Responses are served from the shared TTL cache when possible.
         """
+        item_id = item_id.strip() # The same ID is used for the cache key and the request
+        if ITEM_CACHE_TTL <= 0:
+            return self._fetch_item_details(item_id)
+        return get_response_cache().get_or_fetch(
+            _item_cache_key(self.BASE_URL, item_id), ITEM_CACHE_TTL, lambda: self._fetch_item_details(item_id)
+        )
+
+    def _fetch_item_details(self, item_id: str) -> Dict:
+        """Performs the uncached item-details request."""
         access_token = self._get_access_token()
         
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "X-EBAY-C-MARKETPLACE-ID": "EBAY_US",
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.get(
+        _throttle()
+        response = self.session.get(
             f"{self.BASE_URL}/item/{item_id}",
-            headers=headers
+            headers=self._api_headers(access_token)
         )
         
         response.raise_for_status()
         return response.json()
 
+    async def aget_item_details(self, item_id: str, client: Optional[httpx.AsyncClient] = None) -> Dict:
+        """
+        Async variant of `get_item_details` using an httpx.AsyncClient.
+
+        Args:
+            client: Optional AsyncClient; defaults to the event loop's shared client.
+        """
+        item_id = item_id.strip() # The same ID is used for the cache key and the request
+        if ITEM_CACHE_TTL <= 0:
+            return await self._afetch_item_details(item_id, client)
+        return await get_response_cache().aget_or_fetch(
+            _item_cache_key(self.BASE_URL, item_id), ITEM_CACHE_TTL, lambda: self._afetch_item_details(item_id, client)
+        )
+
+    async def _afetch_item_details(self, item_id: str, client: Optional[httpx.AsyncClient]) -> Dict:
+        """Performs the uncached item-details request."""
+        client = client or get_async_http_client()
+
+        access_token = await self._aget_access_token()
+
+        await _athrottle()
+        response = await client.get(
+            f"{self.BASE_URL}/item/{item_id}",
+            headers=self._api_headers(access_token)
+        )
+
+        response.raise_for_status()
+        return response.json()
+
+# --- Shared Client ---
+
+_shared_apis: Dict[bool, EbayAPI] = {}
+_shared_apis_lock = threading.Lock()
+
+def get_ebay_api(use_sandbox: Optional[bool] = None) -> EbayAPI:
+    """
+    Returns the process-wide EbayAPI client for the selected environment.
+
+    Sharing one client keeps its OAuth token and pooled HTTP connections
+    alive across tool calls and threads.
+
+    Args:
+        use_sandbox: Override to force sandbox (True) or production (False).
+                     If None, uses EBAY_USE_SANDBOX environment variable.
+    """
+    if use_sandbox is None:
+        use_sandbox = os.getenv("EBAY_USE_SANDBOX", "").lower() in ("true", "1", "yes")
+    api = _shared_apis.get(use_sandbox)
+    if api is None:
+        with _shared_apis_lock:
+            api = _shared_apis.get(use_sandbox)
+            if api is None:
+                api = EbayAPI(use_sandbox=use_sandbox)
+                _shared_apis[use_sandbox] = api
+    return api
+
+def reset_ebay_api():
+    """Drops the shared EbayAPI clients (e.g. after changing credentials or URLs)."""
+    with _shared_apis_lock:
+        for api in _shared_apis.values():
+            api.session.close()
+        _shared_apis.clear()
+
+# --- Result Formatting (shared by sync and async tool functions) ---
+
+def _build_price_filters(min_price: Optional[float], max_price: Optional[float]) -> Dict[str, str]:
+    """Constructs the Browse API price filter if a price range is provided."""
+    filters = {}
+    if min_price is not None or max_price is not None:
+        price_filter = []
+        if min_price is not None:
+            price_filter.append(str(min_price))
+        else:
+            price_filter.append("")
+        
+        if max_price is not None:
+            price_filter.append(str(max_price))
+        
+        filters["price"] = "[" + "..".join(price_filter) + "]"
+    return filters
+
+def _format_search_results(results: Dict, query: str, min_price: Optional[float], max_price: Optional[float]) -> str:
+    """Formats a Browse API search response for the agent, including item IDs."""
+    items = results.get("itemSummaries", [])
+    
+    if not items:
+        if min_price is not None or max_price is not None:
+            price_range = ""
+            if min_price is not None and max_price is not None:
+                price_range = f" between ${min_price} and ${max_price}"
+            elif min_price is not None:
+                price_range = f" above ${min_price}"
+            elif max_price is not None:
+                price_range = f" below ${max_price}"
+            return f"No items found matching '{query}'{price_range}."
+        return f"No items found matching '{query}'."
+    
+    # Construct response with item details including item IDs
+    response_parts = [f"Found {len(items)} items matching '{query}':"]
+    
+    for item in items:
+        title = item.get("title", "Untitled")
+        price = item.get("price", {}).get("value", "N/A")
+        currency = item.get("price", {}).get("currency", "USD")
+        condition = item.get("condition", "N/A")
+        item_id = item.get("itemId", "Unknown ID")
+        
+        response_parts.append(
+            f"- {title} ({condition}): {currency} {price} [Item ID: {item_id}]"
+        )
+    
+    response_parts.append("\nNOTE: To answer buyer questions about a specific item, use the answer_item_question tool with the Item ID from the list above.")
+    
+    return "\n".join(response_parts)
+
+def _format_item_summary(item_id: str, item_details: Dict) -> str:
+    """Builds the standardized markdown summary for a Browse API item response."""
+    conclusion_message = "\n\n*This summary includes the main details available from the API.*"
+    # Extract relevant information safely using .get()
+    title = item_details.get("title", "N/A")
+    price_data = item_details.get("price", {})
+    price = price_data.get("value", "N/A")
+    currency = price_data.get("currency", "")
+    condition = item_details.get("condition", "N/A")
+    short_description = item_details.get("shortDescription", "").strip()
+    full_description_html = item_details.get("description", "").strip() # Get raw description (potentially HTML)
+    # Extract primary image URL
+    image_data = item_details.get("image")
+    primary_image_url = image_data.get("imageUrl", "N/A") if image_data else "N/A"
+    
+    # Clean HTML tags and decode entities from full description
+    if full_description_html:
+        text_description = re.sub(r'<[^>]+>', '', full_description_html) # Strip HTML tags
+        text_description = html.unescape(text_description).strip() # Decode HTML entities and strip whitespace
+    else:
+        text_description = "" # Ensure it's an empty string if no description
+
+    seller_data = item_details.get("seller", {})
+    seller = seller_data.get("username", "N/A")
+    item_url = item_details.get("itemWebUrl", "N/A")
+    location_data = item_details.get("itemLocation", {})
+    location = f"{location_data.get('city', '')}, {location_data.get('stateOrProvince', '')}, {location_data.get('country', 'N/A')}".strip(', ')
+    if location == "N/A": location = "N/A" # Clean up if only N/A
+    
+    # Get item specifics (often includes dimensions, material, etc.)
+    item_specifics = item_details.get("localizedAspects", [])
+
+    shipping_options = item_details.get("shippingOptions", [])
+    return_policy = item_details.get("returnTerms", {})
+
+    # --- Build Markdown Summary ---
+    summary = f"**Summary for Item ID: {item_id}**\n"
+    summary += f"- **Title:** {title}\n"
+    summary += f"- **Price:** {currency} {price}\n"
+    summary += f"- **Condition:** {condition}\n"
+    summary += f"- **Image URL:** {primary_image_url}\n"
+    if short_description:
+        # summary += f"- **Short Description:** {short_description}\\n" # Removed as requested
+        pass # Keep short description check for potential future use, but don't add to summary
+    if text_description:
+        # Truncate the cleaned text description to 500 chars
+        truncated_description = (text_description[:500] + '...') if len(text_description) > 500 else text_description
+        summary += f"- **Full Description (Excerpt):** {truncated_description}\\n" # Add truncated CLEANED description (500 chars)
+    # summary += f"- **Seller:** {seller}\\n" # Removed as requested
+    # summary += f"- **Location:** {location}\\n" # Removed as requested
+
+    # Item Specifics (Focus on dimensions)
+    dimension_specifics = []
+    dimension_keywords = ["dimension", "size", "height", "width", "depth", "length"]
+    if item_specifics:
+        for specific in item_specifics:
+            name = specific.get("name", "").lower()
+            value = specific.get("value", "")
+            # Check if the name contains any dimension keywords
+            if any(keyword in name for keyword in dimension_keywords):
+                dimension_specifics.append(f"- {specific.get('name', 'N/A')}: {value}")
+        
+    if dimension_specifics:
+        summary += "**Specifications (Dimensions):**\\n"
+        summary += "\\n".join(dimension_specifics) + "\\n"
+
+    # Shipping Summary
+    if shipping_options:
+        primary_shipping = shipping_options[0]
+        ship_cost_data = primary_shipping.get("shippingCost", {})
+        ship_cost = ship_cost_data.get("value", "N/A")
+        ship_curr = ship_cost_data.get("currency", currency)
+        ship_type = primary_shipping.get("shippingServiceCode", "Standard")
+        summary += f"- **Shipping (Primary):** {ship_type} - {ship_curr} {ship_cost}\\n"
+    else:
+        summary += "- **Shipping:** Info not available\\n"
+
+    # Return Policy Summary
+    if return_policy:
+        accepted = return_policy.get("returnsAccepted", False)
+        period_val = return_policy.get("returnPeriod", {}).get("value")
+        period_unit = return_policy.get("returnPeriod", {}).get("unit", "days").lower()
+        if accepted and period_val:
+            summary += f"- **Returns:** Accepted within {period_val} {period_unit}\\n"
+        elif accepted:
+             summary += f"- **Returns:** Accepted (period unspecified)\\n"
+        else:
+            summary += "- **Returns:** Not Accepted\\n"
+    else:
+        summary += "- **Returns:** Policy not specified\\n"
+
+    return summary + conclusion_message
+
 def search_ebay(query: str, min_price: Optional[float] = None, max_price: Optional[float] = None, use_sandbox: Optional[bool] = None) -> str:
     """
     Agent tool function to search eBay and find matching items. 
@@ -190,59 +895,29 @@ def search_ebay(query: str, min_price: Optional[float] = None, max_price: Option
              Use these Item IDs with the answer_item_question tool to answer buyer questions.
     """
     try:
-        api = EbayAPI(use_sandbox=use_sandbox)
-        
-        # Construct price filter if price range is provided
-        filters = {}
-        if min_price is not None or max_price is not None:
-            price_filter = []
-            if min_price is not None:
-                price_filter.append(str(min_price))
-            else:
-                price_filter.append("")
-            
-            if max_price is not None:
-                price_filter.append(str(max_price))
-            
-            filters["price"] = "[" + "..".join(price_filter) + "]"
+        api = get_ebay_api(use_sandbox)
         
         # Get up to 5 items to provide a better overview
-        results = api.search_items(query, limit=5, filters=filters)
-        items = results.get("itemSummaries", [])
-        
-        if not items:
-            if min_price is not None or max_price is not None:
-                price_range = ""
-                if min_price is not None and max_price is not None:
-                    price_range = f" between ${min_price} and ${max_price}"
-                elif min_price is not None:
-                    price_range = f" above ${min_price}"
-                elif max_price is not None:
-                    price_range = f" below ${max_price}"
-                return f"No items found matching '{query}'{price_range}."
-            return f"No items found matching '{query}'."
-        
-        # Construct response with item details including item IDs
-        response_parts = [f"Found {len(items)} items matching '{query}':"]
-        
-        for item in items:
-            title = item.get("title", "Untitled")
-            price = item.get("price", {}).get("value", "N/A")
-            currency = item.get("price", {}).get("currency", "USD")
-            condition = item.get("condition", "N/A")
-            item_id = item.get("itemId", "Unknown ID")
-            
-            response_parts.append(
-                f"- {title} ({condition}): {currency} {price} [Item ID: {item_id}]"
-            )
-        
-        response_parts.append("\nNOTE: To answer buyer questions about a specific item, use the answer_item_question tool with the Item ID from the list above.")
-        
-        return "\n".join(response_parts)
+        results = api.search_items(query, limit=5, filters=_build_price_filters(min_price, max_price))
+        return _format_search_results(results, query, min_price, max_price)
         
     except Exception as e:
         return f"Error searching eBay: {str(e)}"
 
+async def asearch_ebay(query: str, min_price: Optional[float] = None, max_price: Optional[float] = None, use_sandbox: Optional[bool] = None, client: Optional[httpx.AsyncClient] = None) -> str:
+    """
+    Async variant of `search_ebay` that performs HTTP I/O without blocking the event loop.
+
+    Args:
+        client: Optional httpx.AsyncClient; defaults to the event loop's shared client.
+    """
+    try:
+        api = get_ebay_api(use_sandbox)
+        results = await api.asearch_items(query, limit=5, filters=_build_price_filters(min_price, max_price), client=client)
+        return _format_search_results(results, query, min_price, max_price)
+    except Exception as e:
+        return f"Error searching eBay: {str(e)}"
+
 def answer_item_question(item_id: str) -> str:
     """
     Retrieves details for a specific eBay item ID and returns a standardized summary.
@@ -255,112 +930,43 @@ def answer_item_question(item_id: str) -> str:
         str: A markdown formatted summary of the item's details, or an error message.
              Includes a note about the completeness of the information based on the API response.
     """
-    conclusion_message = "\n\n*This summary includes the main details available from the API.*"
     try:
-        # Instantiate API (uses environment variable for sandbox/prod)
-        api = EbayAPI()
+        # Shared API client (uses environment variable for sandbox/prod)
+        api = get_ebay_api()
 
         # Get the item details
         item_details = api.get_item_details(item_id)
-
-        # Extract relevant information safely using .get()
-        title = item_details.get("title", "N/A")
-        price_data = item_details.get("price", {})
-        price = price_data.get("value", "N/A")
-        currency = price_data.get("currency", "")
-        condition = item_details.get("condition", "N/A")
-        short_description = item_details.get("shortDescription", "").strip()
-        full_description_html = item_details.get("description", "").strip() # Get raw description (potentially HTML)
-        # Extract primary image URL
-        image_data = item_details.get("image")
-        primary_image_url = image_data.get("imageUrl", "N/A") if image_data else "N/A"
-        
-        # Clean HTML tags and decode entities from full description
-        if full_description_html:
-            text_description = re.sub(r'<[^>]+>', '', full_description_html) # Strip HTML tags
-            text_description = html.unescape(text_description).strip() # Decode HTML entities and strip whitespace
-        else:
-            text_description = "" # Ensure it's an empty string if no description
-
-        seller_data = item_details.get("seller", {})
-        seller = seller_data.get("username", "N/A")
-        item_url = item_details.get("itemWebUrl", "N/A")
-        location_data = item_details.get("itemLocation", {})
-        location = f"{location_data.get('city', '')}, {location_data.get('stateOrProvince', '')}, {location_data.get('country', 'N/A')}".strip(', ')
-        if location == "N/A": location = "N/A" # Clean up if only N/A
-        
-        # Get item specifics (often includes dimensions, material, etc.)
-        item_specifics = item_details.get("localizedAspects", [])
-
-        shipping_options = item_details.get("shippingOptions", [])
-        return_policy = item_details.get("returnTerms", {})
-
-        # --- Build Markdown Summary ---
-        summary = f"**Summary for Item ID: {item_id}**\n"
-        summary += f"- **Title:** {title}\n"
-        summary += f"- **Price:** {currency} {price}\n"
-        summary += f"- **Condition:** {condition}\n"
-        summary += f"- **Image URL:** {primary_image_url}\n"
-        if short_description:
-            # summary += f"- **Short Description:** {short_description}\\n" # Removed as requested
-            pass # Keep short description check for potential future use, but don't add to summary
-        if text_description:
-            # Truncate the cleaned text description to 500 chars
-            truncated_description = (text_description[:500] + '...') if len(text_description) > 500 else text_description
-            summary += f"- **Full Description (Excerpt):** {truncated_description}\\n" # Add truncated CLEANED description (500 chars)
-        # summary += f"- **Seller:** {seller}\\n" # Removed as requested
-        # summary += f"- **Location:** {location}\\n" # Removed as requested
-
-        # Item Specifics (Focus on dimensions)
-        dimension_specifics = []
-        dimension_keywords = ["dimension", "size", "height", "width", "depth", "length"]
-        if item_specifics:
-            for specific in item_specifics:
-                name = specific.get("name", "").lower()
-                value = specific.get("value", "")
-                # Check if the name contains any dimension keywords
-                if any(keyword in name for keyword in dimension_keywords):
-                    dimension_specifics.append(f"- {specific.get('name', 'N/A')}: {value}")
-            
-        if dimension_specifics:
-            summary += "**Specifications (Dimensions):**\\n"
-            summary += "\\n".join(dimension_specifics) + "\\n"
-
-        # Shipping Summary
-        if shipping_options:
-            primary_shipping = shipping_options[0]
-            ship_cost_data = primary_shipping.get("shippingCost", {})
-            ship_cost = ship_cost_data.get("value", "N/A")
-            ship_curr = ship_cost_data.get("currency", currency)
-            ship_type = primary_shipping.get("shippingServiceCode", "Standard")
-            summary += f"- **Shipping (Primary):** {ship_type} - {ship_curr} {ship_cost}\\n"
-        else:
-            summary += "- **Shipping:** Info not available\\n"
-
-        # Return Policy Summary
-        if return_policy:
-            accepted = return_policy.get("returnsAccepted", False)
-            period_val = return_policy.get("returnPeriod", {}).get("value")
-            period_unit = return_policy.get("returnPeriod", {}).get("unit", "days").lower()
-            if accepted and period_val:
-                summary += f"- **Returns:** Accepted within {period_val} {period_unit}\\n"
-            elif accepted:
-                 summary += f"- **Returns:** Accepted (period unspecified)\\n"
-            else:
-                summary += "- **Returns:** Not Accepted\\n"
-        else:
-            summary += "- **Returns:** Policy not specified\\n"
-
-        return summary + conclusion_message
+        return _format_item_summary(item_id, item_details)
 
     except requests.exceptions.HTTPError as http_err:
-        # Handle specific API errors (like 404 Not Found)
-        status_code = http_err.response.status_code
-        if status_code == 404:
-            return f"Error: Item with ID '{item_id}' not found. Please check the Item ID."
-        else:
-            return f"Error retrieving item details: The eBay API returned an error (Status Code: {status_code}). Please try again later."
+        return _item_http_error_message(item_id, http_err.response.status_code)
     except Exception as e:
         # Catch other potential errors (network issues, parsing errors, etc.)
         print(f"Error in answer_item_question for ID {item_id}: {type(e).__name__} - {e}")
-        return f"Error retrieving item details: An unexpected error occurred ({type(e).__name__}). Please try again."
\ No newline at end of file
+        return f"Error retrieving item details: An unexpected error occurred ({type(e).__name__}). Please try again."
+
+async def aanswer_item_question(item_id: str, client: Optional[httpx.AsyncClient] = None) -> str:
+    """
+    Async variant of `answer_item_question` that performs HTTP I/O without blocking the event loop.
+
+    Args:
+        client: Optional httpx.AsyncClient; defaults to the event loop's shared client.
+    """
+    try:
+        api = get_ebay_api()
+        item_details = await api.aget_item_details(item_id, client=client)
+        return _format_item_summary(item_id, item_details)
+
+    except httpx.HTTPStatusError as http_err:
+        return _item_http_error_message(item_id, http_err.response.status_code)
+    except Exception as e:
+        print(f"Error in aanswer_item_question for ID {item_id}: {type(e).__name__} - {e}")
+        return f"Error retrieving item details: An unexpected error occurred ({type(e).__name__}). Please try again."
+
+def _item_http_error_message(item_id: str, status_code: int) -> str:
+    """Maps an item-details HTTP error status to an agent-facing message."""
+    # Handle specific API errors (like 404 Not Found)
+    if status_code == 404:
+        return f"Error: Item with ID '{item_id}' not found. Please check the Item ID."
+    else:
+        return f"Error retrieving item details: The eBay API returned an error (Status Code: {status_code}). Please try again later."
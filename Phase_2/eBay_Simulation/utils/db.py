@@ -3,12 +3,45 @@ Database utility functions for the sales simulation.
 
 Handles connecting to the PostgreSQL database using environment variables
 and provides functions to log simulation messages and completed sales records.
+Messages can be logged one at a time (`log_message_to_db`) or buffered and
+written in bulk with `SimulationLogWriter`. Simulations borrow connections from
+a process-wide pool (`acquire_db_connection` / `release_db_connection`).
 """
 import os
+import time
+import threading
+from contextlib import contextmanager
 import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2.extras import execute_values
 from datetime import datetime
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
-from typing import Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+# Connection pool defaults (overridable via environment variables)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_HEALTHCHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTHCHECK_INTERVAL", "30"))
+
+# Buffered log writer defaults (overridable via environment variables)
+DEFAULT_LOG_BATCH_SIZE = int(os.getenv("DB_LOG_BATCH_SIZE", "100"))
+DEFAULT_LOG_FLUSH_INTERVAL = float(os.getenv("DB_LOG_FLUSH_INTERVAL", "5.0"))
+
+INSERT_LOG_SQL = """
+    INSERT INTO simulation_logs (simulation_id, persona_id, turn_number, role, content, tool_name, tool_call_id, timestamp)
+    VALUES %s
+"""
+
+def _connection_params() -> Dict[str, Optional[str]]:
+    """Reads the psycopg2 connection parameters from environment variables."""
+    return {
+        "dbname": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "host": os.getenv("DB_HOST"),
+        "port": os.getenv("DB_PORT"),
+    }
 
 def get_db_connection():
     """Establishes and returns a connection to the PostgreSQL database.
@@ -20,13 +53,7 @@ def get_db_connection():
         A psycopg2 connection object, or None if the connection fails.
     """
     try:
-        conn = psycopg2.connect(
-            dbname=os.getenv("DB_NAME"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            host=os.getenv("DB_HOST"),
-            port=os.getenv("DB_PORT")
-        )
+        conn = psycopg2.connect(**_connection_params())
         print("--- Database connection established successfully. ---")
         return conn
     except psycopg2.OperationalError as e:
@@ -37,6 +64,211 @@ def get_db_connection():
         print(f"--- FATAL: An unexpected error occurred during DB connection: {e} ---")
         return None
 
+# --- Connection Pool ---
+
+class SimulationConnectionPool:
+    """Blocking, health-checked wrapper around psycopg2's ThreadedConnectionPool.
+
+    `ThreadedConnectionPool` raises as soon as `maxconn` connections are in use;
+    this wrapper makes borrowers wait (up to `timeout` seconds) instead. A
+    connection that has been idle for longer than `healthcheck_interval` is
+    pinged with `SELECT 1` before it is handed out, and closed or broken
+    connections are replaced. Up to `minconn` idle connections are kept open.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, timeout: float = DB_POOL_TIMEOUT,
+                 healthcheck_interval: float = DB_POOL_HEALTHCHECK_INTERVAL, **connect_kwargs):
+        """
+        Args:
+            minconn: Connections opened up front and kept open while idle.
+            maxconn: Maximum connections open at once.
+            timeout: Seconds to wait for a free connection before giving up.
+            healthcheck_interval: Idle seconds after which a connection is pinged before reuse.
+            **connect_kwargs: Passed to `psycopg2.connect`.
+        """
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **connect_kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used: Dict[int, float] = {}
+        self._borrowed: Set[int] = set() # id() of connections handed out and not yet returned
+        self._lock = threading.Lock()
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        with self._lock:
+            last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self.healthcheck_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Borrows a healthy connection, waiting for a free slot if the pool is busy.
+
+        Raises:
+            psycopg2.pool.PoolError: If no connection became free within `timeout`.
+            psycopg2.OperationalError: If a new connection could not be opened.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise pg_pool.PoolError(f"no database connection became free within {self.timeout}s")
+        try:
+            # Each iteration discards one dead connection, so this terminates
+            for _ in range(self.maxconn + 1):
+                conn = self._pool.getconn()
+                if self._is_healthy(conn):
+                    with self._lock:
+                        self._borrowed.add(id(conn))
+                    return conn
+                self._discard(conn)
+            raise psycopg2.OperationalError("could not obtain a healthy database connection")
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _discard(self, conn):
+        with self._lock:
+            self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+
+    def putconn(self, conn, discard: bool = False) -> bool:
+        """Returns a borrowed connection; open transactions are rolled back by the pool.
+
+        Connections this pool did not hand out (e.g. borrowed from a pool that
+        has since been replaced) are left alone, and do not free a slot.
+
+        Args:
+            discard: Close the connection instead of keeping it for reuse.
+
+        Returns:
+            False if `conn` was not borrowed from this pool.
+        """
+        with self._lock:
+            if id(conn) not in self._borrowed:
+                return False
+            self._borrowed.discard(id(conn))
+        try:
+            if discard or conn.closed:
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn)
+        finally:
+            self._slots.release()
+        return True
+
+    def closeall(self):
+        """Closes every connection; borrowed connections become unusable."""
+        with self._lock:
+            self._borrowed.clear()
+        self._pool.closeall()
+
+_db_pool: Optional[SimulationConnectionPool] = None
+_db_pool_lock = threading.Lock()
+_db_pool_config = {"min_size": DB_POOL_MIN_SIZE, "max_size": DB_POOL_MAX_SIZE}
+
+def configure_db_pool(min_size: Optional[int] = None, max_size: Optional[int] = None):
+    """Sets the pool size used from now on, closing the current pool if there is one.
+
+    Args:
+        min_size: Connections kept open while idle (default DB_POOL_MIN_SIZE).
+        max_size: Maximum connections open at once (default DB_POOL_MAX_SIZE).
+    """
+    close_db_pool()
+    with _db_pool_lock:
+        _db_pool_config["min_size"] = min_size if min_size is not None else DB_POOL_MIN_SIZE
+        _db_pool_config["max_size"] = max(max_size if max_size is not None else DB_POOL_MAX_SIZE, _db_pool_config["min_size"])
+
+def get_db_pool() -> Optional[SimulationConnectionPool]:
+    """Returns the process-wide connection pool, creating it on first use.
+
+    Returns:
+        The pool, or None if the database is unreachable (creation is retried
+        on the next call).
+    """
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                try:
+                    _db_pool = SimulationConnectionPool(
+                        _db_pool_config["min_size"], _db_pool_config["max_size"], **_connection_params()
+                    )
+                    print(f"--- Database connection pool created (min {_db_pool.minconn}, max {_db_pool.maxconn}). ---")
+                except psycopg2.OperationalError as e:
+                    print(f"--- FATAL: Could not connect to database: {e} ---")
+                    print("--- Please check your .env file and PostgreSQL server status. ---")
+                    return None
+                except Exception as e:
+                    print(f"--- FATAL: An unexpected error occurred while creating the DB pool: {e} ---")
+                    return None
+    return _db_pool
+
+def acquire_db_connection():
+    """Borrows a connection from the process-wide pool.
+
+    Return it with `release_db_connection` (not `conn.close()`) when done.
+
+    Returns:
+        A psycopg2 connection object, or None if no connection is available.
+    """
+    db_pool = get_db_pool()
+    if db_pool is None:
+        return None
+    try:
+        return db_pool.getconn()
+    except (pg_pool.PoolError, psycopg2.Error) as e:
+        print(f"--- Error borrowing a database connection from the pool: {e} ---")
+        return None
+
+def release_db_connection(conn, discard: bool = False):
+    """Returns a connection obtained from `acquire_db_connection` to the pool.
+
+    Args:
+        conn: The borrowed connection (None is ignored).
+        discard: Close the connection instead of reusing it (e.g. after an error).
+    """
+    if conn is None:
+        return
+    db_pool = _db_pool
+    try:
+        if db_pool is None or not db_pool.putconn(conn, discard=discard):
+            # The pool was closed or replaced while the connection was borrowed
+            conn.close()
+    except pg_pool.PoolError as e:
+        print(f"--- Warning: Could not return connection to the pool: {e} ---")
+        conn.close()
+
+@contextmanager
+def pooled_db_connection() -> Iterator:
+    """Context manager that borrows a pooled connection and always returns it.
+
+    Yields None if no connection is available.
+    """
+    conn = acquire_db_connection()
+    try:
+        yield conn
+    finally:
+        release_db_connection(conn)
+
+def close_db_pool():
+    """Closes the process-wide pool and all of its connections."""
+    global _db_pool
+    with _db_pool_lock:
+        db_pool, _db_pool = _db_pool, None
+    if db_pool is not None:
+        db_pool.closeall()
+        print("--- Database connection pool closed. ---")
+
 def log_message_to_db(conn, simulation_id: str, persona_id: str, turn_number: int, msg: BaseMessage):
     """Logs a single message from the simulation to the 'simulation_logs' table.
 
@@ -55,6 +287,26 @@ def log_message_to_db(conn, simulation_id: str, persona_id: str, turn_number: in
         print("--- Warning: Database connection not available. Skipping log. ---")
         return
 
+    sql = """
+        INSERT INTO simulation_logs (simulation_id, persona_id, turn_number, role, content, tool_name, tool_call_id, timestamp)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    params = _message_log_row(simulation_id, persona_id, turn_number, msg)
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+        # conn.commit() is handled after the loop in main
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"--- Error logging message turn {turn_number} to DB: {error} ---")
+        conn.rollback()  # Rollback on error for this specific message
+
+def _message_log_row(simulation_id: str, persona_id: str, turn_number: int, msg: BaseMessage) -> Tuple:
+    """Builds the `simulation_logs` row for a message.
+
+    Determines the role (Seller, Buyer, Tool, System) based on the message type,
+    extracts the tool name and tool call ID, and truncates long tool content.
+    """
     role = "System"  # Default
     content = msg.content
     tool_name = None
@@ -80,11 +332,7 @@ def log_message_to_db(conn, simulation_id: str, persona_id: str, turn_number: in
         if isinstance(content, str) and len(content) > 1000:
              content = content[:1000] + "... (truncated)"
 
-    sql = """
-        INSERT INTO simulation_logs (simulation_id, persona_id, turn_number, role, content, tool_name, tool_call_id, timestamp)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-    """
-    params = (
+    return (
         simulation_id,
         persona_id,
         turn_number,
@@ -95,13 +343,82 @@ def log_message_to_db(conn, simulation_id: str, persona_id: str, turn_number: in
         datetime.now()  # Use current time for logging timestamp
     )
 
-    try:
-        with conn.cursor() as cur:
-            cur.execute(sql, params)
-        # conn.commit() is handled after the loop in main
-    except (Exception, psycopg2.DatabaseError) as error:
-        print(f"--- Error logging message turn {turn_number} to DB: {error} ---")
-        conn.rollback()  # Rollback on error for this specific message
+class SimulationLogWriter:
+    """Buffers `simulation_logs` rows and writes them in bulk with `execute_values`.
+
+    Rows are flushed when the buffer reaches `batch_size`, when `flush_interval`
+    seconds have passed since the last flush (checked as rows are added), and
+    when the writer is closed. Like `log_message_to_db`, it never commits; the
+    caller commits at the end of the simulation.
+
+    Use it as a context manager so buffered rows are written on normal exit
+    and discarded if the block raises (the caller rolls back anyway):
+
+        with SimulationLogWriter(conn) as log_writer:
+            log_writer.add(simulation_id, persona_id, turn_number, msg)
+    """
+
+    def __init__(self, conn, batch_size: int = DEFAULT_LOG_BATCH_SIZE, flush_interval: float = DEFAULT_LOG_FLUSH_INTERVAL):
+        """
+        Args:
+            conn: The active psycopg2 database connection (None disables logging).
+            batch_size: Number of buffered rows that triggers a flush.
+            flush_interval: Maximum seconds rows stay buffered while messages keep arriving.
+        """
+        self.conn = conn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._rows: List[Tuple] = []
+        self._last_flush = time.monotonic()
+        self.rows_written = 0
+        self.flush_count = 0
+
+    def __enter__(self) -> "SimulationLogWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        else:
+            self._rows.clear()
+        return False
+
+    def flush_due(self) -> bool:
+        """True if the buffer is over its size or age limit."""
+        return bool(self._rows) and (
+            len(self._rows) >= self.batch_size
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    def add(self, simulation_id: str, persona_id: str, turn_number: int, msg: BaseMessage, autoflush: bool = True):
+        """Buffers a message for logging, flushing if a size or time limit is reached.
+
+        Args:
+            autoflush: If False, never flush here; callers that must not block
+                       (e.g. an event loop) check `flush_due()` and flush elsewhere.
+        """
+        if not self.conn:
+            return
+        self._rows.append(_message_log_row(simulation_id, persona_id, turn_number, msg))
+        if autoflush and self.flush_due():
+            self.flush()
+
+    def flush(self) -> int:
+        """Writes all buffered rows in one statement. Returns the number of rows written."""
+        self._last_flush = time.monotonic()
+        if not self.conn or not self._rows:
+            return 0
+        rows, self._rows = self._rows, []
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, INSERT_LOG_SQL, rows, page_size=max(len(rows), 1))
+            self.rows_written += len(rows)
+            self.flush_count += 1
+            return len(rows)
+        except (Exception, psycopg2.DatabaseError) as error:
+            print(f"--- Error bulk logging {len(rows)} messages to DB: {error} ---")
+            self.conn.rollback()  # Rollback the failed batch
+            return 0
 
 def log_sale_to_db(conn, simulation_id: str, persona_id: str, state):
     """Logs the details of a completed sale to the 'sales_records' table.
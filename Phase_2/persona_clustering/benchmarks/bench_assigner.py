@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: scoring new customers with PersonaAssigner.
+
+Fits the pipeline's vectorizer and NMF model (constants.py settings) on
+--train synthetic customer documents with topic structure, saves them with
+save_model_and_vectorizer, loads a PersonaAssigner from the saved files and
+times assign_documents on --customers new documents for each batch size.
+
+Usage:
+    python benchmarks/bench_assigner.py [--train 5000] [--customers 20000] [--batch-sizes 1000 10000]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from persona_generator_refactored.constants import WHITELIST_BIGRAMS
+from persona_generator_refactored.modeling import save_model_and_vectorizer, train_nmf_model, vectorize_text
+from persona_generator_refactored.persona_assigner import PersonaAssigner
+
+VOCABULARY_SIZE = 20000
+WORDS_PER_TOPIC = 3000 # Each synthetic topic draws from its own overlapping slice of the vocabulary
+N_SYNTHETIC_TOPICS = 20
+
+
+def synthetic_docs(n, seed, min_tokens=20, max_tokens=400):
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"w{i}" for i in range(VOCABULARY_SIZE)], dtype=object)
+    docs = []
+    for _ in range(n):
+        offset = rng.integers(0, N_SYNTHETIC_TOPICS) * (VOCABULARY_SIZE // N_SYNTHETIC_TOPICS)
+        words = (offset + rng.integers(0, WORDS_PER_TOPIC, rng.integers(min_tokens, max_tokens))) % VOCABULARY_SIZE
+        docs.append(' '.join(vocabulary[words]))
+    return docs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--train", type=int, default=5000, help="Training documents.")
+    parser.add_argument("--customers", type=int, default=20000, help="New documents to score.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    dtm, vectorizer, _ = vectorize_text(pd.Series(synthetic_docs(args.train, seed=0)), set(WHITELIST_BIGRAMS))
+    start = time.perf_counter()
+    nmf_model, _, _ = train_nmf_model(dtm)
+    print(f"trained on {dtm.shape[0]:,} documents x {dtm.shape[1]:,} terms in {time.perf_counter() - start:.1f} s")
+
+    docs = synthetic_docs(args.customers, seed=1)
+    with tempfile.TemporaryDirectory() as model_dir:
+        save_model_and_vectorizer(nmf_model, vectorizer, model_dir)
+        start = time.perf_counter()
+        assigner = PersonaAssigner.load(model_dir)
+        print(f"loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    for batch_size in args.batch_sizes:
+        assigner.batch_size = batch_size
+        start = time.perf_counter()
+        assigner.assign_documents(range(len(docs)), docs)
+        seconds = time.perf_counter() - start
+        print(f"batch size {batch_size:>6,}: {len(docs):,} customers in {seconds:.2f} s ({len(docs) / seconds:,.0f} customers/s)")
+
+
+if __name__ == "__main__":
+    main()
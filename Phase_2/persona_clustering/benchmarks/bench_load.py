@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: purchase CSV ingestion time and peak RSS per parser.
+
+Writes a synthetic purchases file (same columns as the Amazon purchases CSV,
+with a sprinkling of malformed lines), then, each in a fresh interpreter so
+peak RSS is per run:
+1. read_purchases_csv with each engine (parse only).
+2. load_and_preprocess_data with the pyarrow engine: a cold run (parses,
+   filters and writes the Parquet cache) and a warm run (cache hit).
+3. The same in streaming mode (--chunk-size), whose peak RSS should stay
+   roughly flat as --rows grows.
+
+Usage:
+    python benchmarks/bench_load.py [--rows 3000000] [--engines pyarrow c python] [--chunk-size 250000] [--keep]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BAD_LINE_EVERY = 100000
+CHILD = """
+import json, logging, resource, sys, time
+sys.path.insert(0, {project_dir!r})
+logging.disable(logging.WARNING)
+from persona_generator_refactored.data_processing import load_and_preprocess_data, read_purchases_csv
+start = time.perf_counter()
+if {mode!r} == "read":
+    rows = len(read_purchases_csv({path!r}, engine={engine!r}))
+else:
+    rows = len(load_and_preprocess_data({path!r}, engine={engine!r}, cache_dir={cache_dir!r}, chunk_size={chunk_size!r})[1])
+elapsed = time.perf_counter() - start
+try: # ru_maxrss survives exec, so it would report the parent's peak if that was higher
+    peak_kib = next(int(line.split()[1]) for line in open("/proc/self/status") if line.startswith("VmHWM:"))
+except OSError:
+    peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"rows": rows, "seconds": elapsed, "peak_rss_mb": peak_kib / 1024}}))
+"""
+
+WORDS = ("organic stainless steel wireless bluetooth kitchen storage premium cotton shirt soft "
+         "pack tea coffee charger cable phone case book novel paperback toy kids dog cat food "
+         "vitamin supplement lamp led bulb towel bath yoga mat water bottle notebook pen").split()
+CATEGORIES = ["ABIS_BOOK", "PET_FOOD", "SHIRT", "CELLULAR_PHONE_CASE", "TEA", "COFFEE", "TOY_FIGURE",
+              "NUTRITIONAL_SUPPLEMENT", "LIGHT_BULB", "TOWEL", "YOGA_MAT", "GIFT_CARD", "KITCHEN", "BOOK"]
+STATES = ["CA", "NY", "TX", "FL", "WA", "IL", "PA", "OH", "GA", "NC", ""]
+
+
+def write_synthetic_csv(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS, dtype=object)
+    titles = words[rng.integers(0, len(words), rows)]
+    for _ in range(4):
+        titles = titles + " " + words[rng.integers(0, len(words), rows)]
+    df = pd.DataFrame({
+        "Order Date": pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365, rows), unit="D"),
+        "Purchase Price Per Unit": np.round(rng.gamma(2.0, 12.0, rows), 2),
+        "Quantity": rng.integers(1, 4, rows),
+        "Shipping Address State": np.array(STATES, dtype=object)[rng.integers(0, len(STATES), rows)],
+        "Title": titles,
+        "ASIN/ISBN (Product Code)": np.char.add("B0", rng.integers(0, 200000, rows).astype(str)),
+        "Category": np.array(CATEGORIES, dtype=object)[rng.integers(0, len(CATEGORIES), rows)],
+        "Survey ResponseID": np.char.add("R_", rng.integers(0, 5000, rows).astype(str)),
+    })
+    df.to_csv(path, index=False, date_format="%Y-%m-%d")
+    with open(path, "a", encoding="utf-8") as f: # Malformed lines: too many fields
+        for i in range(rows // BAD_LINE_EVERY):
+            f.write(f"2020-01-01,1.00,1,CA,Broken,Row,{i},With,Extra,R_1\n")
+
+
+def run_child(mode, path, engine, cache_dir=None, chunk_size=None):
+    code = CHILD.format(project_dir=PROJECT_DIR, mode=mode, path=path, engine=engine, cache_dir=cache_dir, chunk_size=chunk_size)
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=3_000_000, help="Rows in the synthetic file.")
+    parser.add_argument("--engines", nargs="+", default=["pyarrow", "c", "python"], help="Parsers to time.")
+    parser.add_argument("--chunk-size", type=int, default=250_000, help="Rows per chunk in streaming mode.")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic file and cache.")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_load_")
+    path = os.path.join(workdir, "purchases.csv")
+    write_synthetic_csv(path, args.rows)
+    print(f"synthetic file: {args.rows:,} rows, {os.path.getsize(path) / 2**20:.0f} MiB")
+    print(f"{'run':<28} {'rows':>10} {'seconds':>9} {'peak RSS MiB':>13}")
+
+    def report(label, result):
+        print(f"{label:<28} {result['rows']:>10,} {result['seconds']:>9.2f} {result['peak_rss_mb']:>13.0f}")
+
+    for engine in args.engines:
+        report(f"read, {engine}", run_child("read", path, engine))
+    cache_dir = os.path.join(workdir, "cache")
+    report("load, pyarrow, cold cache", run_child("load", path, "pyarrow", cache_dir))
+    report("load, pyarrow, warm cache", run_child("load", path, "pyarrow", cache_dir))
+    stream_cache_dir = os.path.join(workdir, "stream_cache")
+    report("stream, pyarrow, cold cache", run_child("load", path, "pyarrow", stream_cache_dir, args.chunk_size))
+    report("stream, pyarrow, warm cache", run_child("load", path, "pyarrow", stream_cache_dir, args.chunk_size))
+
+    if args.keep:
+        print(f"kept {workdir}")
+    else:
+        import shutil
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Benchmark: parallel NMF sweep over topic counts and seeds.
+
+Vectorizes --docs synthetic customer documents with topic structure (constants.py
+settings), then times run_nmf_sweep over --k x --seeds with each --workers count
+(1 runs the fits in-process, without the pool or the memory-mapped DTM).
+
+Usage:
+    python benchmarks/bench_sweep.py [--docs 5000] [--k 10 20 30] [--seeds 0 1] [--workers 1 4]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_assigner import synthetic_docs
+from persona_generator_refactored.constants import WHITELIST_BIGRAMS
+from persona_generator_refactored.modeling import vectorize_text
+from persona_generator_refactored.nmf_sweep import default_sweep_workers, run_nmf_sweep, summarize_sweep
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=5000, help="Documents in the DTM.")
+    parser.add_argument("--k", type=int, nargs="+", default=[10, 20, 30], help="Topic counts to sweep.")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1])
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, default_sweep_workers()}))
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    dtm, _, feature_names = vectorize_text(pd.Series(synthetic_docs(args.docs, seed=0)), set(WHITELIST_BIGRAMS))
+    print(f"DTM: {dtm.shape[0]:,} documents x {dtm.shape[1]:,} terms, {dtm.nnz:,} non-zeros; {default_sweep_workers()} core(s) available")
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        results = run_nmf_sweep(dtm, feature_names, args.k, seeds=args.seeds, max_workers=workers)
+        seconds = time.perf_counter() - start
+        print(f"{workers:>3} worker(s): {len(results)} fits in {seconds:.1f} s (sum of fit times {results['fit_seconds'].sum():.1f} s)")
+    print(summarize_sweep(results).to_string(float_format=lambda value: f"{value:.4f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: title cleaning and category standardization, row by row vs. vectorized.
+
+Builds N synthetic purchase titles and raw categories (drawn from K distinct
+category names) and times:
+1. clean_text through Series.apply vs. clean_text_series.
+2. standardize_category (unmemoized) through Series.apply vs.
+   standardize_categories, which standardizes each distinct category once.
+
+Row-by-row timings are measured on a sample of --sample rows and scaled to N.
+
+Usage:
+    python benchmarks/bench_text.py [--rows 3000000] [--categories 3000] [--sample 200000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from persona_generator_refactored import text_utils
+from persona_generator_refactored.text_utils import clean_text, clean_text_series, standardize_categories
+
+WORDS = ("Organic Stainless Steel Wireless Bluetooth Kitchen Storage Premium Cotton Shirt Soft 12-Pack "
+         "Tea Coffee Charger Cable Phone Case Book Novel Toy Kids Dog Cat Food Vitamin Supplement Lamp "
+         "LED Bulb Towel Bath Yoga Mat Water Bottle Notebook Pen Garden Tools Outdoor Health Beauty").split()
+
+
+def synthetic_data(rows, categories, seed=0):
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS, dtype=object)
+    titles = words[rng.integers(0, len(words), rows)]
+    for _ in range(5):
+        titles = titles + " " + words[rng.integers(0, len(words), rows)]
+    names = [f"{' & '.join(rng.choice(WORDS, size=2))} {i}" for i in range(categories - 50)]
+    names += [f"ABIS_{word.upper()}" for word in WORDS[:50]]
+    raw_categories = np.array(names, dtype=object)[rng.integers(0, len(names), rows)]
+    return pd.Series(titles, dtype="str"), pd.Series(raw_categories, dtype="str")
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--categories", type=int, default=3000, help="Distinct raw categories.")
+    parser.add_argument("--sample", type=int, default=200_000, help="Rows timed for the row-by-row baselines.")
+    args = parser.parse_args()
+
+    titles, categories = synthetic_data(args.rows, args.categories)
+    sample = min(args.sample, args.rows)
+    scale = args.rows / sample
+    uncached = text_utils._standardize_category_cached.__wrapped__
+
+    print(f"{args.rows:,} rows, {categories.nunique():,} distinct categories")
+    row_clean = timed(lambda: titles[:sample].apply(clean_text)) * scale
+    vec_clean = timed(lambda: clean_text_series(titles))
+    print(f"clean titles:         row by row {row_clean:8.2f} s   vectorized {vec_clean:6.2f} s   ({row_clean / vec_clean:.0f}x)")
+    row_std = timed(lambda: categories[:sample].apply(uncached)) * scale
+    text_utils._standardize_category_cached.cache_clear()
+    vec_std = timed(lambda: standardize_categories(categories))
+    print(f"standardize category: row by row {row_std:8.2f} s   per distinct {vec_std:6.2f} s   ({row_std / vec_std:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
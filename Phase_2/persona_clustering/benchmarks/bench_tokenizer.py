@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bigram tokenizer, original closure vs. BigramTokenizer.
+
+Builds N synthetic customer documents (cleaned titles plus category tokens,
+with whitelisted bigrams mixed in) and times:
+1. Tokenizing every document with each tokenizer (outputs are compared on
+   the first --check-docs documents).
+2. TfidfVectorizer.fit_transform with each tokenizer on the first --fit-docs
+   documents, using the pipeline's vectorizer settings.
+
+Usage:
+    python benchmarks/bench_tokenizer.py [--docs 1000000] [--tokens 60] [--fit-docs 200000]
+"""
+import argparse
+import collections
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from persona_generator_refactored.bigram_utils import BigramTokenizer
+from persona_generator_refactored.constants import CUSTOM_STOP_WORDS, MAX_DF, MAX_FEATURES, MIN_DF, WHITELIST_BIGRAMS
+
+WORDS = ("organic stainless steel wireless bluetooth kitchen storage premium cotton shirt soft pack "
+         "tea coffee charger cable case book novel toy kids dog cat food vitamin supplement lamp "
+         "led towel bath yoga mat water bottle notebook pen garden tools outdoor health beauty").split()
+CATEGORY_TOKENS = ["category_books", "category_pet_supplies", "category_clothing", "category_electronics",
+                   "category_grocery", "category_toys_and_games", "category_home_and_kitchen"]
+
+
+def closure_tokenizer(significant_bigrams_set):
+    """The original create_bigram_tokenizer."""
+    def tokenizer(text):
+        tokens = str(text).split()
+        if not tokens:
+            return []
+        processed_tokens = []
+        i = 0
+        while i < len(tokens):
+            if i < len(tokens) - 1:
+                potential_bigram = f"{tokens[i]}_{tokens[i+1]}"
+                if potential_bigram in significant_bigrams_set:
+                    processed_tokens.append(potential_bigram)
+                    i += 2
+                    continue
+            processed_tokens.append(tokens[i])
+            i += 1
+        return processed_tokens
+    return tokenizer
+
+
+def synthetic_docs(docs, tokens, seed=0):
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(WORDS + CATEGORY_TOKENS + [word for bigram in WHITELIST_BIGRAMS for word in bigram.split('_')], dtype=object)
+    lengths = rng.integers(tokens // 2, tokens * 3 // 2, docs)
+    words = vocabulary[rng.integers(0, len(vocabulary), int(lengths.sum()))]
+    ends = np.cumsum(lengths)
+    return [' '.join(words[end - length:end]) for end, length in zip(ends, lengths)]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=1_000_000)
+    parser.add_argument("--tokens", type=int, default=60, help="Mean tokens per document.")
+    parser.add_argument("--check-docs", type=int, default=100_000, help="Documents on which the outputs are compared.")
+    parser.add_argument("--fit-docs", type=int, default=200_000, help="Documents used for the fit_transform timing.")
+    args = parser.parse_args()
+
+    docs = synthetic_docs(args.docs, args.tokens)
+    bigrams = set(WHITELIST_BIGRAMS)
+    tokenizers = [("closure", closure_tokenizer(bigrams)), ("BigramTokenizer", BigramTokenizer(bigrams))]
+    print(f"{len(docs):,} documents, {sum(len(doc.split()) for doc in docs):,} tokens, {len(bigrams)} bigrams")
+
+    (_, closure), (_, fast) = tokenizers
+    assert all(closure(doc) == fast(doc) for doc in docs[:args.check_docs]), "tokenizers disagree"
+    for label, tokenizer in tokenizers:
+        seconds, _ = timed(lambda: collections.deque(map(tokenizer, docs), maxlen=0)) # Outputs are discarded
+        print(f"tokenize, {label:<16} {seconds:7.2f} s  ({len(docs) / seconds:,.0f} docs/s)")
+
+    fit_docs = docs[:args.fit_docs]
+    for label, tokenizer in tokenizers:
+        vectorizer = TfidfVectorizer(max_df=MAX_DF, min_df=MIN_DF, max_features=MAX_FEATURES,
+                                     stop_words=list(CUSTOM_STOP_WORDS), tokenizer=tokenizer, token_pattern=None)
+        seconds, _ = timed(lambda: vectorizer.fit_transform(fit_docs))
+        print(f"fit_transform {len(fit_docs):,} docs, {label:<16} {seconds:7.2f} s")
+
+
+if __name__ == "__main__":
+    main()
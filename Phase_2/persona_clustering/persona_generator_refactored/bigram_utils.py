@@ -3,6 +3,7 @@ import nltk
 import pandas as pd
 from nltk.collocations import BigramAssocMeasures, BigramCollocationFinder
 import os # For saving bigrams file
+from itertools import compress
 import logging # Add logging import
 
 # Set up logger for this module
@@ -101,6 +102,53 @@ def find_significant_bigrams(documents, output_dir, min_freq=BIGRAM_MIN_FREQ, to
 
     return combined_bigrams_set
 
+class BigramTokenizer:
+    """Whitespace tokenizer that merges significant bigrams into single `w1_w2` tokens.
+
+    Tokens are scanned left to right and a pair is merged whenever
+    f"{w1}_{w2}" is in the set, then scanning resumes after the pair. The set is
+    indexed by first token (every way of splitting each bigram at an underscore,
+    so 'a_b_c' matches both ('a', 'b_c') and ('a_b', 'c')), which finds the
+    candidate positions with one C-level pass over the tokens. Python code only
+    runs at those positions, and no string is built unless a pair matches.
+
+    A class rather than a closure so that fitted vectorizers can be pickled.
+
+    Args:
+        significant_bigrams (Iterable[str]): Bigrams joined by underscore (e.g. 'video_game').
+    """
+
+    def __init__(self, significant_bigrams):
+        self.significant_bigrams = frozenset(significant_bigrams)
+        second_tokens = {}
+        for bigram in self.significant_bigrams:
+            for i, char in enumerate(bigram):
+                if char == '_' and 0 < i < len(bigram) - 1:
+                    second_tokens.setdefault(bigram[:i], set()).add(bigram[i + 1:])
+        self._second_tokens = {first: frozenset(seconds) for first, seconds in second_tokens.items()}
+
+    def __call__(self, text):
+        tokens = str(text).split() # Simple split, assumes pre-cleaned text
+        second_tokens = self._second_tokens
+        processed_tokens = None # Only built once a pair matches
+        start = 0 # First token not yet copied to processed_tokens
+        for i in compress(range(len(tokens) - 1), map(second_tokens.__contains__, tokens)):
+            if i < start: # Second token of a pair merged just before
+                continue
+            if tokens[i + 1] in second_tokens[tokens[i]]:
+                if processed_tokens is None:
+                    processed_tokens = []
+                processed_tokens += tokens[start:i]
+                processed_tokens.append(f"{tokens[i]}_{tokens[i + 1]}")
+                start = i + 2
+        if processed_tokens is None:
+            return tokens
+        processed_tokens += tokens[start:]
+        return processed_tokens
+
+    def __repr__(self):
+        return f"{type(self).__name__}(<{len(self.significant_bigrams)} bigrams>)"
+
 def create_bigram_tokenizer(significant_bigrams_set):
     """Factory function to create a custom tokenizer that preserves significant bigrams.
 
@@ -108,28 +156,6 @@ def create_bigram_tokenizer(significant_bigrams_set):
         significant_bigrams_set (set[str]): Set of bigrams joined by underscore.
 
     Returns:
-        callable: A tokenizer function for scikit-learn vectorizers.
+        BigramTokenizer: A picklable tokenizer for scikit-learn vectorizers.
     """
-    def tokenizer(text):
-        tokens = str(text).split() # Simple split, assumes pre-cleaned text
-        if not tokens:
-            return []
-
-        processed_tokens = []
-        i = 0
-        while i < len(tokens):
-            # Check for bigram at current position
-            if i < len(tokens) - 1:
-                potential_bigram = f"{tokens[i]}_{tokens[i+1]}"
-                if potential_bigram in significant_bigrams_set:
-                    processed_tokens.append(potential_bigram)
-                    i += 2 # Skip next token
-                    continue
-
-            # If not a significant bigram, add the single token
-            processed_tokens.append(tokens[i])
-            i += 1
-
-        return processed_tokens
-
-    return tokenizer 
\ No newline at end of file
+    return BigramTokenizer(significant_bigrams_set)
@@ -12,6 +12,72 @@ logger = logging.getLogger(__name__)
 # Import constants
 from .constants import N_TOP_WORDS_COHERENCE, OUTPUT_FILES
 
+def calculate_umass_coherence(top_words_per_topic, dtm, feature_names, n_top_words=N_TOP_WORDS_COHERENCE):
+    """Calculates UMass coherence from document co-occurrence counts in the DTM.
+
+    Only the columns of the topics' top words are binarized, and all pairwise
+    co-occurrence counts come from one sparse product of that submatrix.
+
+    Args:
+        top_words_per_topic (dict): Map of topic_id to list of top words/ngrams.
+        dtm (scipy.sparse.csr_matrix): Document-Term Matrix (TF-IDF or count).
+        feature_names (list): Feature names corresponding to dtm columns.
+        n_top_words (int): Number of top words per topic for coherence calculation.
+
+    Returns:
+        tuple: Contains:
+            - float: Average UMass over the topics it could be calculated for (None if none).
+            - dict: Map of topic_id to its UMass score (None where not calculated).
+    """
+    epsilon = 1e-12 # Avoid log(0)
+    feature_to_index = {name: i for i, name in enumerate(feature_names)}
+
+    topic_words = {}
+    for topic_id, words in top_words_per_topic.items():
+        topic_words[topic_id] = [word for word in words[:n_top_words] if word in feature_to_index]
+    columns = sorted({feature_to_index[word] for words in topic_words.values() for word in words})
+    column_position = {column: position for position, column in enumerate(columns)}
+
+    # Document (co-)occurrence counts of the top words; the diagonal holds document frequencies
+    dtm_binary = (dtm[:, columns] > 0).astype(np.int64)
+    co_occurrence = (dtm_binary.T @ dtm_binary).toarray()
+    logger.info(f"Calculated document co-occurrence counts for {len(columns)} top terms.")
+
+    umass_per_topic = {}
+    total_umass_score = 0
+    valid_topics_for_umass = 0
+
+    for topic_id, words in topic_words.items():
+        if len(words) < 2:
+            logger.warning(f"Topic {topic_id} has < 2 valid words in DTM for UMass. Skipping.")
+            umass_per_topic[topic_id] = None # Mark as not calculated
+            continue
+
+        positions = [column_position[feature_to_index[word]] for word in words]
+        topic_umass = 0
+        word_pairs = 0
+        for i, pos_i in enumerate(positions):
+            n_docs_word_i = co_occurrence[pos_i, pos_i]
+            if n_docs_word_i == 0:
+                continue
+            for pos_j in positions[i + 1:]:
+                topic_umass += np.log((co_occurrence[pos_i, pos_j] + epsilon) / n_docs_word_i)
+                word_pairs += 1
+
+        if word_pairs > 0:
+            umass_per_topic[topic_id] = topic_umass / word_pairs
+            total_umass_score += umass_per_topic[topic_id]
+            valid_topics_for_umass += 1
+        else:
+            logger.warning(f"Topic {topic_id} resulted in 0 valid word pairs for UMass.")
+            umass_per_topic[topic_id] = None
+
+    if valid_topics_for_umass == 0:
+        return None, umass_per_topic
+    average_umass = total_umass_score / valid_topics_for_umass
+    logger.info(f"Average UMass Coherence (over {valid_topics_for_umass} topics): {average_umass:.4f}")
+    return average_umass, umass_per_topic
+
 def calculate_topic_coherence(top_words_per_topic, documents, dtm, feature_names, output_dir, n_top_words=N_TOP_WORDS_COHERENCE):
     """Calculates C_v and UMass topic coherence scores and saves a report.
 
@@ -29,7 +95,6 @@ def calculate_topic_coherence(top_words_per_topic, documents, dtm, feature_names
     """
     logger.info(f"\n--- Calculating Topic Coherence (Top {n_top_words} words) ---")
     coherence_scores = {'c_v': None, 'u_mass': None, 'u_mass_per_topic': None}
-    umass_per_topic_details = {}
 
     # --- C_v Coherence (Gensim) ---
     try:
@@ -69,59 +134,8 @@ def calculate_topic_coherence(top_words_per_topic, documents, dtm, feature_names
     # --- UMass Coherence --- #
     try:
         logger.info("\nCalculating UMass coherence...")
-        epsilon = 1e-12 # Avoid log(0)
-
-        feature_to_index = {name: i for i, name in enumerate(feature_names)}
-        dtm_binary = (dtm > 0).astype(int)
-        doc_counts_array = np.array(dtm_binary.sum(axis=0)).flatten()
-        word_document_counts = {feature_names[i]: doc_counts_array[i]
-                                for i in range(len(feature_names))
-                                if i < len(doc_counts_array)} # Ensure index exists
-        logger.info(f"Calculated document frequencies for {len(word_document_counts)} terms.")
-
-        total_umass_score = 0
-        valid_topics_for_umass = 0
-
-        for topic_id, words in top_words_per_topic.items():
-            topic_words = words[:n_top_words]
-            topic_umass = 0
-            word_pairs = 0
-
-            valid_topic_words = [word for word in topic_words if word in feature_to_index]
-            if len(valid_topic_words) < 2:
-                logger.warning(f"Topic {topic_id} has < 2 valid words in DTM for UMass. Skipping.")
-                umass_per_topic_details[topic_id] = None # Mark as not calculated
-                continue
-
-            for i, word_i in enumerate(valid_topic_words):
-                idx_i = feature_to_index[word_i]
-                n_docs_word_i = word_document_counts.get(word_i, 0)
-
-                if n_docs_word_i == 0:
-                    continue
-
-                for j in range(i + 1, len(valid_topic_words)):
-                    word_j = valid_topic_words[j]
-                    idx_j = feature_to_index[word_j]
-
-                    # Calculate co-occurrence efficiently
-                    co_occurrence_count = dtm_binary[:, idx_i].multiply(dtm_binary[:, idx_j]).sum()
-
-                    topic_umass += np.log((co_occurrence_count + epsilon) / n_docs_word_i)
-                    word_pairs += 1
-
-            if word_pairs > 0:
-                avg_topic_umass = topic_umass / word_pairs
-                umass_per_topic_details[topic_id] = avg_topic_umass
-                total_umass_score += avg_topic_umass
-                valid_topics_for_umass += 1
-            else:
-                logger.warning(f"Topic {topic_id} resulted in 0 valid word pairs for UMass.")
-                umass_per_topic_details[topic_id] = None
-
-        if valid_topics_for_umass > 0:
-            average_umass = total_umass_score / valid_topics_for_umass
-            logger.info(f"Average UMass Coherence (over {valid_topics_for_umass} topics): {average_umass:.4f}")
+        average_umass, umass_per_topic_details = calculate_umass_coherence(top_words_per_topic, dtm, feature_names, n_top_words)
+        if average_umass is not None:
             coherence_scores['u_mass'] = average_umass
             coherence_scores['u_mass_per_topic'] = umass_per_topic_details
         else:
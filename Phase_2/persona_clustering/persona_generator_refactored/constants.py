@@ -17,6 +17,8 @@ DEFAULT_DATA_FILE = os.path.join(_script_dir, "data", "amazon-purchases.csv")
 DEFAULT_OUTPUT_DIR = os.path.join(_script_dir, "output_nmf_k20")
 # Default survey file path (relative to the script's parent directory)
 DEFAULT_SURVEY_FILE = os.path.join(_script_dir, "data", "survey.csv")
+# Parsed, filtered purchase data cached as Parquet, keyed by the source file's hash (set to None to disable)
+DEFAULT_CACHE_DIR = os.path.join(_script_dir, "data", "cache")
 
 # --- Model Parameters ---
 N_TOPICS = 20 # Number of personas/topics
@@ -35,9 +37,24 @@ N_TOP_WORDS_DISPLAY = 15 # Number of top words to display per topic in logs/outp
 N_WORDS_FOR_PROMPT = 25 # Number of top words/ngrams to use for prompt generation
 N_TOP_WORDS_COHERENCE = 10 # Number of top words to use for coherence calculation
 
+# --- Topic Assignment for New Customers ---
+ASSIGNMENT_BATCH_SIZE = 10000 # Customers vectorized and passed to NMF.transform at a time
+
+# --- Purchase Data Format ---
+# Columns of the purchases CSV, in file order (the file's own header row is skipped)
+PURCHASE_COLUMNS = ['Order_Date', 'Purchase_Price', 'Quantity', 'Shipping_State', 'Title', 'ASIN_ISBN', 'Category', 'Survey_ResponseID']
+PURCHASE_NUMERIC_COLUMNS = ('Purchase_Price', 'Quantity')
+PURCHASE_CATEGORICAL_COLUMNS = ('Shipping_State', 'ASIN_ISBN', 'Category') # Low-cardinality relative to row count
+DEFAULT_CSV_ENGINE = 'pyarrow' # 'pyarrow', 'c' or 'python' (slowest; the original parser)
+PURCHASE_CACHE_VERSION = 1 # Bump when the cached preprocessing (cleaning/filtering) changes
+# Filtered purchase columns kept in memory in streaming mode (all that the topic value/top purchase reports use)
+PURCHASE_SUMMARY_COLUMNS = ['Survey_ResponseID', 'ASIN_ISBN', 'Title', 'PurchaseValue']
+CSV_BYTES_PER_ROW_ESTIMATE = 160 # Sizes pyarrow's streaming read blocks to roughly `chunk_size` rows
+
 # --- Data Cleaning & Filtering ---
 MIN_PURCHASE_VALUE = 1.00 # Minimum purchase value to include
 MIN_TITLE_LENGTH = 4      # Minimum character length for cleaned titles
+GIFT_CARD_TITLE_PATTERN = r'gift card|reload' # Matched against cleaned titles (spaces, not underscores)
 EXCLUDE_RAW_CATEGORY_PREFIXES = ('abis_',) # Raw category prefixes to handle/map
 EXCLUDE_STD_CATEGORIES = { # Set of standardized category tokens to exclude entirely
     'category_gift_card',
@@ -211,6 +228,7 @@ CUSTOM_STOP_WORDS = set(ENGLISH_STOP_WORDS).union({
 OUTPUT_FILES = {
     "model": "nmf_model.pkl",
     "vectorizer": "tfidf_vectorizer.pkl",
+    "vectorizer_arrays": "tfidf_vectorizer.npz", # Vocabulary, IDF weights and bigrams, loadable without pickle
     "customer_topics": "customer_topic_assignments_nmf.csv",
     "significant_bigrams": "significant_bigrams.txt",
     "category_audit_report": "category_mapping_audit.txt",
@@ -218,4 +236,6 @@ OUTPUT_FILES = {
     "persona_prompt_template": "persona_topic_{}_prompt_nmf.txt",
     "persona_top_purchases_template": "persona_topic_{}_top_purchases_nmf.csv",
     "coherence_report": "coherence_report.txt", # File for coherence scores
+    "nmf_sweep_results": "nmf_sweep_results.csv", # One row per (n_topics, seed) fit of a sweep
+    "nmf_sweep_report": "nmf_sweep_report.txt", # Sweep results averaged over seeds, per n_topics
 } 
\ No newline at end of file
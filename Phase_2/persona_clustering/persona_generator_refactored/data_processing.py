@@ -1,7 +1,13 @@
 # Data loading and preprocessing functions
 import pandas as pd
 import os
+import hashlib
+import itertools
+import json
+import sqlite3
+import tempfile
 import logging # Add logging import
+from operator import itemgetter
 
 # Set up logger for this module
 logger = logging.getLogger(__name__)
@@ -10,108 +16,269 @@ logger = logging.getLogger(__name__)
 from .constants import (
     MIN_PURCHASE_VALUE,
     MIN_TITLE_LENGTH,
+    GIFT_CARD_TITLE_PATTERN,
     EXCLUDE_STD_CATEGORIES,
     DEFAULT_OUTPUT_DIR,
-    OUTPUT_FILES
+    DEFAULT_CACHE_DIR,
+    OUTPUT_FILES,
+    PURCHASE_COLUMNS,
+    PURCHASE_NUMERIC_COLUMNS,
+    PURCHASE_CATEGORICAL_COLUMNS,
+    DEFAULT_CSV_ENGINE,
+    PURCHASE_CACHE_VERSION,
+    PURCHASE_SUMMARY_COLUMNS,
+    CSV_BYTES_PER_ROW_ESTIMATE
 )
 # Import text utilities
-from .text_utils import clean_text, standardize_category
+from .text_utils import clean_text_series, standardize_categories
 
-def load_and_preprocess_data(filepath):
-    """Loads and preprocesses the Amazon purchase data.
+HASH_CHUNK_SIZE = 1 << 20 # Bytes read at a time when hashing the source file
+MAX_LOGGED_BAD_LINES = 5 # Individual bad lines logged before only counting them
+SQLITE_CACHE_KIB = 64 * 1024 # Page cache of the streaming customer-row store
+
+# --- CSV Parsing --- #
+
+def _arrow_csv_options(categorical=True, block_size=None):
+    """pyarrow CSV read/parse/convert options for the purchases file.
+
+    Rows with the wrong number of fields are skipped by an invalid-row handler
+    (and counted in the returned one-item list), so malformed lines never abort
+    the read.
+    """
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    bad_lines = [0]
+    def skip_bad_line(row):
+        if bad_lines[0] < MAX_LOGGED_BAD_LINES:
+            # Line numbers are not tracked when values may contain newlines, so log the text
+            logger.warning(f"Skipping bad line: expected {row.expected_columns} fields, saw {row.actual_columns}: {row.text[:100]!r}")
+        bad_lines[0] += 1
+        return 'skip'
+
+    string_type = pa.dictionary(pa.int32(), pa.string()) if categorical else pa.string()
+    column_types = {col: pa.string() for col in PURCHASE_COLUMNS}
+    column_types.update({col: pa.float64() for col in PURCHASE_NUMERIC_COLUMNS})
+    column_types.update({col: string_type for col in PURCHASE_CATEGORICAL_COLUMNS})
+    read_options = pa_csv.ReadOptions(skip_rows=1, column_names=PURCHASE_COLUMNS)
+    if block_size:
+        read_options.block_size = block_size
+    parse_options = pa_csv.ParseOptions(newlines_in_values=True, invalid_row_handler=skip_bad_line)
+    convert_options = pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True)
+    return read_options, parse_options, convert_options, bad_lines
+
+def _read_purchases_arrow(filepath, categorical=True):
+    """Parses the purchases CSV with pyarrow's multi-threaded reader.
+
+    Raises pyarrow.ArrowInvalid for input it cannot convert (e.g. a non-numeric
+    price), in which case the caller falls back to the C engine.
+    """
+    from pyarrow import csv as pa_csv
+
+    read_options, parse_options, convert_options, bad_lines = _arrow_csv_options(categorical)
+    table = pa_csv.read_csv(filepath, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+    if bad_lines[0]:
+        logger.warning(f"Skipped {bad_lines[0]} bad line(s) in {filepath}")
+    return table.to_pandas()
+
+def _coerce_numeric_columns(df):
+    for col in PURCHASE_NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+def _read_purchases_pandas(filepath, engine, categorical=True, chunksize=None):
+    """Parses the purchases CSV with pandas' C or python engine, tolerating bad lines and bytes.
+
+    With `chunksize`, returns an iterator of DataFrames of that many rows instead.
+    """
+    dtypes = {col: str for col in PURCHASE_COLUMNS}
+    if categorical:
+        dtypes.update({col: 'category' for col in PURCHASE_CATEGORICAL_COLUMNS})
+    reader = pd.read_csv(
+        filepath,
+        header=None,
+        skiprows=1,
+        names=PURCHASE_COLUMNS,
+        dtype=dtypes,
+        on_bad_lines='warn',
+        encoding='utf-8',
+        encoding_errors='replace',
+        engine=engine,
+        chunksize=chunksize
+    )
+    if chunksize:
+        return (_coerce_numeric_columns(chunk) for chunk in reader)
+    return _coerce_numeric_columns(reader)
+
+def _iter_purchases_arrow(filepath, chunksize):
+    """Streams the purchases CSV with pyarrow, one block of roughly `chunksize` rows at a time."""
+    from pyarrow import csv as pa_csv
+
+    read_options, parse_options, convert_options, bad_lines = _arrow_csv_options(
+        block_size=chunksize * CSV_BYTES_PER_ROW_ESTIMATE
+    )
+    # The reader parses a bounded number of blocks ahead of the consumer, so memory scales with the block size
+    reader = pa_csv.open_csv(filepath, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+    for batch in reader:
+        yield batch.to_pandas()
+    if bad_lines[0]:
+        logger.warning(f"Skipped {bad_lines[0]} bad line(s) in {filepath}")
+
+def iter_purchases_csv(filepath, chunksize, engine=DEFAULT_CSV_ENGINE):
+    """Reads the raw purchases CSV in chunks; the streaming counterpart of `read_purchases_csv`.
 
     Args:
         filepath (str): Path to the CSV data file.
+        chunksize (int): Rows per chunk. The 'pyarrow' engine reads blocks of
+            about `chunksize` rows (sized with CSV_BYTES_PER_ROW_ESTIMATE).
+        engine (str): 'pyarrow', 'c' or 'python'. Unlike `read_purchases_csv`,
+            errors raised mid-stream are not caught: the caller decides whether
+            to restart with another engine.
+
+    Yields:
+        pd.DataFrame: Chunks with the same columns and dtypes as `read_purchases_csv`.
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(filepath)
+    if engine == 'pyarrow':
+        return _iter_purchases_arrow(filepath, chunksize)
+    return _read_purchases_pandas(filepath, engine, chunksize=chunksize)
+
+def read_purchases_csv(filepath, engine=DEFAULT_CSV_ENGINE, categorical=True):
+    """Reads the raw Amazon purchases CSV into a DataFrame with standardized columns.
+
+    Args:
+        filepath (str): Path to the CSV data file.
+        engine (str): 'pyarrow' (fastest), 'c', or 'python'. 'pyarrow' falls back
+            to 'c' if pyarrow is not installed or cannot convert the file.
+        categorical (bool): Read Shipping_State, ASIN_ISBN and Category as categoricals.
 
     Returns:
-        tuple: A tuple containing:
-            - pd.DataFrame: Aggregated data per customer (Survey_ResponseID, Purchase_Doc, Purchased_ASINs).
-            - pd.DataFrame: Original purchase data filtered by value/title length, but before category exclusion.
-            Returns (None, None) if loading or processing fails.
-    """
-    logger.info(f"Loading data from: {filepath}...")
-    original_df_filtered = None # Initialize
+        pd.DataFrame: One row per purchase with PURCHASE_COLUMNS. Prices and
+        quantities are floats (NaN where missing or non-numeric).
 
+    Raises:
+        FileNotFoundError: If `filepath` does not exist.
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(filepath)
+    if engine == 'pyarrow':
+        try:
+            return _read_purchases_arrow(filepath, categorical)
+        except ImportError:
+            logger.warning("pyarrow not found. Install it (`pip install pyarrow`) for faster loading. Using the C parser.")
+        except Exception as e: # pyarrow.ArrowInvalid and friends
+            logger.warning(f"pyarrow could not parse {filepath} ({e}). Falling back to the C parser.")
+        engine = 'c'
+    return _read_purchases_pandas(filepath, engine, categorical)
+
+# --- Parquet Cache --- #
+
+def _purchase_cache_path(filepath, cache_dir):
+    """Cache file for `filepath`: keyed by a hash of its contents and of the filtering settings."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    settings = json.dumps({
+        'version': PURCHASE_CACHE_VERSION,
+        'min_purchase_value': MIN_PURCHASE_VALUE,
+        'min_title_length': MIN_TITLE_LENGTH,
+        'gift_card_pattern': GIFT_CARD_TITLE_PATTERN,
+    }, sort_keys=True)
+    digest.update(settings.encode('utf-8'))
+    stem = os.path.splitext(os.path.basename(filepath))[0]
+    return os.path.join(cache_dir, f"{stem}.{digest.hexdigest()[:16]}.parquet")
+
+def _read_purchase_cache(cache_path):
+    if not os.path.exists(cache_path):
+        return None
     try:
-        df = pd.read_csv(
-            filepath,
-            skiprows=1,
-            on_bad_lines='warn',
-            encoding='utf-8',
-            engine='python'
-        )
-        # Standardize column names (assuming original order)
-        df.columns = ['Order_Date', 'Purchase_Price', 'Quantity', 'Shipping_State', 'Title', 'ASIN_ISBN', 'Category', 'Survey_ResponseID']
-        logger.info(f"Initial rows loaded: {len(df)}")
-
-    except FileNotFoundError:
-        logger.error(f"Data file not found at {filepath}")
-        return None, None
+        df = pd.read_parquet(cache_path)
+        logger.info(f"Loaded {len(df)} filtered purchase rows from cache {cache_path}")
+        return df
     except Exception as e:
-        logger.error(f"Error loading CSV: {e}")
-        return None, None
+        logger.warning(f"Could not read cached purchases from {cache_path}: {e}. Re-parsing the CSV.")
+        return None
 
-    logger.info("Dropping rows with missing essential data (Survey_ResponseID or Title)...")
+def _write_purchase_cache(df, cache_path):
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path) # Readers never see a partial file
+        logger.info(f"Cached filtered purchase rows to {cache_path}")
+    except Exception as e: # e.g. no Parquet engine installed
+        logger.warning(f"Could not cache filtered purchases to {cache_path}: {e}")
+
+# --- Preprocessing --- #
+
+def _filter_purchases(df, verbose=True):
+    """Drops incomplete, low-value, short-title and gift-card rows and adds PurchaseValue/Clean_Title.
+
+    Each filter is a boolean mask, so the frame is only materialized twice
+    (before and after title cleaning) instead of once per filter. With
+    `verbose=False` (per-chunk calls) the row counts are logged at DEBUG level.
+    """
+    log = logger.info if verbose else logger.debug
+    log("Dropping rows with missing essential data (Survey_ResponseID or Title)...")
     initial_rows_count = len(df)
-    df.dropna(subset=['Survey_ResponseID', 'Title'], inplace=True)
-    logger.info(f"Rows after dropping NAs: {len(df)} (dropped {initial_rows_count - len(df)}) ")
+    keep = df['Survey_ResponseID'].notna() & df['Title'].notna()
+    rows_after_na = int(keep.sum())
+    log(f"Rows after dropping NAs: {rows_after_na} (dropped {initial_rows_count - rows_after_na}) ")
 
     # --- Convert Price and Quantity --- #
-    logger.info("Converting price and quantity to numeric...")
-    df['Purchase_Price'] = pd.to_numeric(df['Purchase_Price'], errors='coerce')
-    df['Quantity'] = pd.to_numeric(df['Quantity'], errors='coerce')
-    # Fill NaNs introduced by coercion with 0, assuming non-numeric means zero value/quantity
-    # df['Purchase_Price'].fillna(0, inplace=True)
-    # df['Quantity'].fillna(0, inplace=True)
+    # Non-numeric values were parsed as NaN; treat them as zero value/quantity
     df['Purchase_Price'] = df['Purchase_Price'].fillna(0)
     df['Quantity'] = df['Quantity'].fillna(0)
     df['PurchaseValue'] = df['Purchase_Price'] * df['Quantity']
-    logger.info("Calculated PurchaseValue.")
+    log("Calculated PurchaseValue.")
 
     # --- Filtering Step 1: Value --- #
-    initial_rows_count = len(df)
-    df = df[df['PurchaseValue'] >= MIN_PURCHASE_VALUE]
-    logger.info(f"Rows after filtering by PurchaseValue >= ${MIN_PURCHASE_VALUE:.2f}: {len(df)} (dropped {initial_rows_count - len(df)}) ")
+    keep &= df['PurchaseValue'] >= MIN_PURCHASE_VALUE
+    df = df[keep]
+    log(f"Rows after filtering by PurchaseValue >= ${MIN_PURCHASE_VALUE:.2f}: {len(df)} (dropped {rows_after_na - len(df)}) ")
 
     # --- Clean Titles --- #
-    logger.info("Cleaning product titles...")
-    df['Clean_Title'] = df['Title'].apply(clean_text)
+    log("Cleaning product titles...")
+    clean_titles = clean_text_series(df['Title'])
 
     # --- Filtering Step 2: Title Length --- #
     initial_rows_count = len(df)
-    df = df[df['Clean_Title'].str.len() >= MIN_TITLE_LENGTH]
-    logger.info(f"Rows after filtering by Clean_Title length >= {MIN_TITLE_LENGTH}: {len(df)} (dropped {initial_rows_count - len(df)}) ")
+    keep = clean_titles.str.len() >= MIN_TITLE_LENGTH
+    rows_after_length = int(keep.sum())
+    log(f"Rows after filtering by Clean_Title length >= {MIN_TITLE_LENGTH}: {rows_after_length} (dropped {initial_rows_count - rows_after_length}) ")
 
-    # --- NEW Filtering Step: Exclude Gift Cards/Reloads by Title --- #
-    initial_rows_count = len(df)
-    # Correct pattern to match cleaned title (spaces, not underscores)
-    gift_card_pattern = r'gift card|reload' # Use raw string for regex clarity
-    df = df[~df['Clean_Title'].str.contains(gift_card_pattern, case=False, na=False, regex=True)]
-    logger.info(f"Rows after filtering gift cards/reloads by title: {len(df)} (dropped {initial_rows_count - len(df)}) ")
+    # --- Filtering Step 3: Exclude Gift Cards/Reloads by Title --- #
+    keep &= ~clean_titles.str.contains(GIFT_CARD_TITLE_PATTERN, case=False, na=False, regex=True)
+    df = df[keep].assign(Clean_Title=clean_titles[keep])
+    log(f"Rows after filtering gift cards/reloads by title: {len(df)} (dropped {rows_after_length - len(df)}) ")
+    return df
 
-    # --- Standardize Categories --- #
-    logger.info("Standardizing categories...")
-    df['Category_Token'] = df['Category'].apply(standardize_category)
+def _customer_rows(df, verbose=True):
+    """Drops excluded categories and returns the (Survey_ResponseID, ASIN_ISBN, Text_Input) rows to group.
 
-    # Keep a copy of the DF *after* value/title filtering but *before* category exclusion
-    # This is used for calculating average purchase value later
-    original_df_filtered = df.copy()
+    `df` must already have a Category_Token column.
+    """
+    log = logger.info if verbose else logger.debug
 
-    # --- Filtering Step 3: Excluded Categories --- #
+    # --- Filtering Step 4: Excluded Categories --- #
     initial_rows_count = len(df)
     # Filter based on the standardized token being in the exclusion list OR being None
-    df = df[~df['Category_Token'].isin(EXCLUDE_STD_CATEGORIES)]
-    df = df[df['Category_Token'].notna()]
-    logger.info(f"Rows after filtering excluded/failed category tokens: {len(df)} (dropped {initial_rows_count - len(df)}) ")
+    df = df[~df['Category_Token'].isin(EXCLUDE_STD_CATEGORIES) & df['Category_Token'].notna()]
+    log(f"Rows after filtering excluded/failed category tokens: {len(df)} (dropped {initial_rows_count - len(df)}) ")
 
-    logger.info("Ensuring ASIN/ISBN are strings...")
-    df['ASIN_ISBN'] = df['ASIN_ISBN'].astype(str).fillna('MISSING_ASIN')
+    log("Ensuring ASIN/ISBN are strings...")
+    asins = df['ASIN_ISBN'].astype(str).fillna('MISSING_ASIN')
 
     # --- Combine Title and Category Token for Text Input --- #
     # Ensure Category_Token is string before combining (it shouldn't be None here)
-    df['Text_Input'] = df['Clean_Title'] + ' ' + df['Category_Token'].astype(str)
-    logger.info("Finished combining title and category tokens.")
+    text_input = df['Clean_Title'] + ' ' + df['Category_Token'].astype(str)
+    log("Finished combining title and category tokens.")
+    return pd.DataFrame({'Survey_ResponseID': df['Survey_ResponseID'], 'ASIN_ISBN': asins, 'Text_Input': text_input})
 
+def _group_customer_docs(df):
+    """Joins the `_customer_rows` of each customer into one document and a list of ASINs."""
     # --- Group by Customer --- #
     logger.info("Grouping purchases by customer...")
     # Group text input
@@ -123,23 +290,237 @@ def load_and_preprocess_data(filepath):
     logger.info("Finished grouping data by customer.")
 
     # Merge docs and ASINs
-    customer_data = pd.merge(customer_docs, customer_asins, on='Survey_ResponseID')
+    return pd.merge(customer_docs, customer_asins, on='Survey_ResponseID')
 
+def _drop_empty_docs(customer_data):
     # --- Final Filtering: Ensure customers have non-empty purchase docs --- #
     initial_cust_count = len(customer_data)
     customer_data = customer_data[customer_data['Purchase_Doc'].str.strip() != '']
     logger.info(f"Final customer count after ensuring non-empty docs: {len(customer_data)} (removed {initial_cust_count - len(customer_data)} customers)")
-
     logger.info(f"Processed {len(customer_data)} unique customers with filtered data.")
-    return customer_data, original_df_filtered
+    return customer_data
 
+def load_and_preprocess_data(filepath, engine=DEFAULT_CSV_ENGINE, cache_dir=DEFAULT_CACHE_DIR, chunk_size=None):
+    """Loads and preprocesses the Amazon purchase data.
+
+    The parsed rows that pass the value and title filters are cached as Parquet
+    in `cache_dir`, keyed by a hash of the source file, so reruns on an
+    unchanged file skip CSV parsing and title cleaning.
+
+    With `chunk_size`, the file is processed in streaming mode (see
+    `_load_and_preprocess_streaming`): memory used while preprocessing is
+    bounded by the chunk size rather than the file size, and only the
+    PURCHASE_SUMMARY_COLUMNS of the filtered purchases are returned.
+
+    Args:
+        filepath (str): Path to the CSV data file.
+        engine (str): CSV parser, see `read_purchases_csv`.
+        cache_dir (str or None): Directory for the Parquet cache; None disables it.
+        chunk_size (int or None): Rows per chunk in streaming mode; None loads the whole file.
 
-def audit_category_mappings(filepath, output_dir=DEFAULT_OUTPUT_DIR):
+    Returns:
+        tuple: A tuple containing:
+            - pd.DataFrame: Aggregated data per customer (Survey_ResponseID, Purchase_Doc, Purchased_ASINs).
+            - pd.DataFrame: Original purchase data filtered by value/title length, but before category exclusion.
+            Returns (None, None) if loading or processing fails.
+    """
+    logger.info(f"Loading data from: {filepath}...")
+    original_df_filtered = None # Initialize
+
+    if chunk_size:
+        try:
+            return _load_and_preprocess_streaming(filepath, engine, cache_dir, chunk_size)
+        except FileNotFoundError:
+            logger.error(f"Data file not found at {filepath}")
+            return None, None
+        except Exception as e:
+            logger.error(f"Error preprocessing {filepath} in chunks: {e}")
+            return None, None
+
+    try:
+        cache_path = _purchase_cache_path(filepath, cache_dir) if cache_dir else None
+        df = _read_purchase_cache(cache_path) if cache_path else None
+        if df is None:
+            df = read_purchases_csv(filepath, engine=engine)
+            logger.info(f"Initial rows loaded: {len(df)}")
+            df = _filter_purchases(df)
+            if cache_path:
+                _write_purchase_cache(df, cache_path)
+
+    except FileNotFoundError:
+        logger.error(f"Data file not found at {filepath}")
+        return None, None
+    except Exception as e:
+        logger.error(f"Error loading CSV: {e}")
+        return None, None
+
+    # --- Standardize Categories --- #
+    logger.info("Standardizing categories...")
+    df['Category_Token'] = standardize_categories(df['Category'])
+
+    # Keep a copy of the DF *after* value/title filtering but *before* category exclusion
+    # This is used for calculating average purchase value later
+    original_df_filtered = df.copy()
+
+    customer_data = _group_customer_docs(_customer_rows(df))
+    return _drop_empty_docs(customer_data), original_df_filtered
+
+def build_customer_documents(purchases):
+    """Builds per-customer documents from raw purchase rows, e.g. to score new customers.
+
+    Applies the same cleaning, filtering and category standardization as
+    `load_and_preprocess_data`.
+
+    Args:
+        purchases (pd.DataFrame): Purchase rows with PURCHASE_COLUMNS, as returned by `read_purchases_csv`.
+
+    Returns:
+        pd.DataFrame: Aggregated data per customer (Survey_ResponseID, Purchase_Doc, Purchased_ASINs).
+    """
+    df = _filter_purchases(_coerce_numeric_columns(purchases.copy()), verbose=False)
+    df['Category_Token'] = standardize_categories(df['Category'])
+    return _drop_empty_docs(_group_customer_docs(_customer_rows(df, verbose=False)))
+
+# --- Streaming Preprocessing --- #
+# Chunks are filtered one at a time. Filtered purchases are appended to a
+# Parquet file (the cache file when caching is on) and each customer's
+# (ASIN, text) rows to a SQLite table, which is then read back sorted by
+# customer to build the per-customer documents.
+
+def _filtered_purchase_schema():
+    """Arrow schema of the filtered purchase rows, fixed so every chunk is written with the same types."""
+    import pyarrow as pa
+    types = {col: pa.string() for col in PURCHASE_COLUMNS}
+    types.update({col: pa.float64() for col in PURCHASE_NUMERIC_COLUMNS})
+    types.update({col: pa.dictionary(pa.int32(), pa.string()) for col in PURCHASE_CATEGORICAL_COLUMNS})
+    return pa.schema([(col, types[col]) for col in PURCHASE_COLUMNS] + [('PurchaseValue', pa.float64()), ('Clean_Title', pa.string())])
+
+def _open_customer_row_store(path):
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode = OFF") # Scratch data: no rollback journal or fsyncs needed
+    db.execute("PRAGMA synchronous = OFF")
+    db.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_KIB}")
+    db.execute("CREATE TABLE customer_rows (customer TEXT NOT NULL, asin TEXT, text TEXT NOT NULL)")
+    return db
+
+def _append_customer_rows(db, df):
+    """Adds the category tokens to a chunk of filtered purchases and stores its customer rows.
+
+    Rows are inserted in file order, so SQLite's rowid preserves each customer's purchase order.
+    """
+    df = df.assign(Category_Token=standardize_categories(df['Category']))
+    rows = _customer_rows(df, verbose=False)
+    db.executemany(
+        "INSERT INTO customer_rows (customer, asin, text) VALUES (?, ?, ?)",
+        zip(rows['Survey_ResponseID'], rows['ASIN_ISBN'], rows['Text_Input'])
+    )
+
+def _write_filtered_chunks(chunks, db, parquet_path):
+    """Filters raw chunks, appending them to `parquet_path` and their customer rows to `db`.
+
+    Returns:
+        tuple: (rows read, rows kept).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _filtered_purchase_schema()
+    rows_read = rows_kept = 0
+    db.execute("DELETE FROM customer_rows") # A restart with another engine begins from scratch
+    with pq.ParquetWriter(parquet_path, schema) as writer:
+        for chunk in chunks:
+            rows_read += len(chunk)
+            chunk = _filter_purchases(chunk, verbose=False)
+            rows_kept += len(chunk)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            _append_customer_rows(db, chunk)
+            logger.debug(f"Processed {rows_read} rows ({rows_kept} kept)")
+    return rows_read, rows_kept
+
+def _iter_purchase_cache(cache_path, chunk_size):
+    """Yields a Parquet cache file's rows in chunks, or returns None if it is missing or unreadable."""
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(cache_path)
+    except Exception as e:
+        logger.warning(f"Could not read cached purchases from {cache_path}: {e}. Re-parsing the CSV.")
+        return None
+    logger.info(f"Streaming {parquet_file.metadata.num_rows} filtered purchase rows from cache {cache_path}")
+    return (batch.to_pandas() for batch in parquet_file.iter_batches(batch_size=chunk_size))
+
+def _group_customer_rows(db):
+    """Builds `customer_data` from the customer-row store, one customer at a time."""
+    logger.info("Grouping purchases by customer...")
+    db.execute("CREATE INDEX customer_rows_by_customer ON customer_rows (customer)")
+    cursor = db.execute("SELECT customer, asin, text FROM customer_rows ORDER BY customer, rowid")
+    customer_ids, docs, asins = [], [], []
+    for customer, rows in itertools.groupby(cursor, key=itemgetter(0)):
+        rows = list(rows)
+        customer_ids.append(customer)
+        asins.append([row[1] for row in rows])
+        docs.append(' '.join(row[2] for row in rows))
+    logger.info("Finished grouping data by customer.")
+    return pd.DataFrame({'Survey_ResponseID': customer_ids, 'Purchase_Doc': docs, 'Purchased_ASINs': asins})
+
+def _load_and_preprocess_streaming(filepath, engine, cache_dir, chunk_size):
+    """Streaming mode of `load_and_preprocess_data`.
+
+    Peak memory is a few chunks plus the SQLite page cache (SQLITE_CACHE_KIB),
+    and the results themselves: `customer_data` and the PURCHASE_SUMMARY_COLUMNS
+    of the filtered purchases (Title read back dictionary-encoded). The other
+    filtered columns stay on disk, in the Parquet cache if `cache_dir` is set.
+    A valid cache from either mode is streamed instead of the CSV.
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(filepath)
+    cache_path = _purchase_cache_path(filepath, cache_dir) if cache_dir else None
+
+    with tempfile.TemporaryDirectory(prefix='purchase_chunks_') as work_dir:
+        db = _open_customer_row_store(os.path.join(work_dir, 'customer_rows.sqlite'))
+        try:
+            cached_chunks = _iter_purchase_cache(cache_path, chunk_size) if cache_path else None
+            if cached_chunks is not None:
+                for chunk in cached_chunks:
+                    _append_customer_rows(db, chunk)
+                purchases_path = cache_path
+            else:
+                purchases_path = os.path.join(work_dir, 'filtered_purchases.parquet')
+                if cache_path:
+                    try:
+                        os.makedirs(cache_dir, exist_ok=True)
+                        purchases_path = f"{cache_path}.tmp" # Written in place of a scratch file, then published
+                    except OSError as e:
+                        logger.warning(f"Could not create cache directory {cache_dir}: {e}")
+                        cache_path = None
+                try:
+                    rows_read, rows_kept = _write_filtered_chunks(iter_purchases_csv(filepath, chunk_size, engine), db, purchases_path)
+                except Exception as e:
+                    if engine != 'pyarrow':
+                        raise
+                    logger.warning(f"pyarrow could not stream {filepath} ({e}). Restarting with the C parser.")
+                    rows_read, rows_kept = _write_filtered_chunks(iter_purchases_csv(filepath, chunk_size, 'c'), db, purchases_path)
+                logger.info(f"Rows loaded: {rows_read}; after value/title filtering: {rows_kept}")
+                if cache_path:
+                    os.replace(purchases_path, cache_path) # Readers never see a partial file
+                    purchases_path = cache_path
+                    logger.info(f"Cached filtered purchase rows to {cache_path}")
+            customer_data = _group_customer_rows(db)
+        finally:
+            db.close()
+
+        original_df_filtered = pd.read_parquet(purchases_path, columns=PURCHASE_SUMMARY_COLUMNS)
+    return _drop_empty_docs(customer_data), original_df_filtered
+
+
+def audit_category_mappings(filepath, output_dir=DEFAULT_OUTPUT_DIR, engine=DEFAULT_CSV_ENGINE):
     """Analyzes category standardization and saves reports.
 
     Args:
         filepath (str): Path to the CSV data file.
         output_dir (str): Directory to save audit reports.
+        engine (str): CSV parser, see `read_purchases_csv`.
 
     Returns:
         dict or None: Dictionary with audit statistics or None on failure.
@@ -148,14 +529,8 @@ def audit_category_mappings(filepath, output_dir=DEFAULT_OUTPUT_DIR):
     os.makedirs(output_dir, exist_ok=True)
 
     try:
-        df = pd.read_csv(
-            filepath,
-            skiprows=1,
-            on_bad_lines='warn',
-            encoding='utf-8',
-            engine='python'
-        )
-        df.columns = ['Order_Date', 'Purchase_Price', 'Quantity', 'Shipping_State', 'Title', 'ASIN_ISBN', 'Category', 'Survey_ResponseID']
+        # Plain strings: value_counts/groupby on a categorical would also list unused categories
+        df = read_purchases_csv(filepath, engine=engine, categorical=False)
     except FileNotFoundError:
         logger.error(f"Data file not found at {filepath}")
         return None
@@ -171,7 +546,7 @@ def audit_category_mappings(filepath, output_dir=DEFAULT_OUTPUT_DIR):
     total_raw_categories = len(raw_category_counts)
     logger.info(f"Found {total_raw_categories} unique raw category values")
 
-    df['Standardized_Category'] = df['Category'].apply(standardize_category)
+    df['Standardized_Category'] = standardize_categories(df['Category'])
 
     unmapped_mask = df['Standardized_Category'].isna()
     unmapped_df = df[unmapped_mask]
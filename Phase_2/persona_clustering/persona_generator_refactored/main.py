@@ -17,7 +17,7 @@ logging.basicConfig(level=logging.INFO,
 # sys.path.append(os.path.dirname(os.path.realpath(__file__)))
 
 # Import constants and utility functions from sibling modules
-from .constants import DEFAULT_DATA_FILE, DEFAULT_OUTPUT_DIR, N_TOPICS, N_WORDS_FOR_PROMPT, DEFAULT_SURVEY_FILE
+from .constants import DEFAULT_DATA_FILE, DEFAULT_OUTPUT_DIR, N_TOPICS, N_WORDS_FOR_PROMPT, DEFAULT_SURVEY_FILE, DEFAULT_CACHE_DIR, DEFAULT_CSV_ENGINE, NMF_RANDOM_STATE
 from .data_processing import load_and_preprocess_data, audit_category_mappings
 from .bigram_utils import find_significant_bigrams
 from .modeling import (
@@ -29,6 +29,7 @@ from .modeling import (
     get_top_words_per_topic
 )
 from .coherence_utils import calculate_topic_coherence
+from .nmf_sweep import run_nmf_sweep
 from .persona_utils import (
     generate_persona_prompt,
     aggregate_top_purchases_by_frequency,
@@ -51,6 +52,18 @@ def main():
                         help='Path to survey data file containing demographics (default based on script location)')
     parser.add_argument('--output-dir', type=str, default=DEFAULT_OUTPUT_DIR,
                         help=f'Directory for output files (default based on script location)')
+    parser.add_argument('--csv-engine', choices=['pyarrow', 'c', 'python'], default=DEFAULT_CSV_ENGINE,
+                        help=f'CSV parser for the purchase data (default: {DEFAULT_CSV_ENGINE})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always re-parse the purchase CSV instead of using the Parquet cache')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Preprocess the purchase CSV in chunks of this many rows, for files larger than memory')
+    parser.add_argument('--sweep-k', type=int, nargs='+', default=None, metavar='K',
+                        help='Instead of the full run, fit NMF for each of these topic counts in parallel and write a coherence comparison')
+    parser.add_argument('--sweep-seeds', type=int, nargs='+', default=[NMF_RANDOM_STATE], metavar='SEED',
+                        help=f'NMF random states to fit for each --sweep-k value (default: {NMF_RANDOM_STATE})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes for --sweep-k (default: available cores)')
 
     args = parser.parse_args()
 
@@ -63,6 +76,8 @@ def main():
     logging.info(f"Survey Data File: {survey_file}") # Print survey file path
     logging.info(f"Output Directory: {output_dir}")
     mode = 'Audit Only' if args.audit_only else ('Full Run' if args.full else 'Model Training Only')
+    if args.sweep_k and not args.audit_only:
+        mode = f"{'Category Audit + ' if args.full else ''}NMF Sweep (k={args.sweep_k}, seeds={args.sweep_seeds})"
     logging.info(f"Mode: {mode}")
     logging.info("-----------------------------------")
 
@@ -104,7 +119,7 @@ def main():
     # 1. Category Audit (Optional)
     if args.audit_only or args.full:
         logging.info("\nRunning category mapping audit...")
-        audit_results = audit_category_mappings(data_file, output_dir)
+        audit_results = audit_category_mappings(data_file, output_dir, engine=args.csv_engine)
         if not audit_results:
             logging.error("Category audit failed. Check data file path and format.")
             if args.audit_only:
@@ -119,7 +134,10 @@ def main():
         return
 
     # 2. Load and Preprocess Data
-    customer_data, original_purchase_df = load_and_preprocess_data(data_file)
+    customer_data, original_purchase_df = load_and_preprocess_data(
+        data_file, engine=args.csv_engine, cache_dir=None if args.no_cache else DEFAULT_CACHE_DIR,
+        chunk_size=args.chunk_size
+    )
     if customer_data is None or customer_data.empty:
         logging.error("\nError: Failed to load or preprocess data. Exiting.")
         sys.exit(1)
@@ -137,6 +155,16 @@ def main():
         logging.error("\nError: Text vectorization failed. Exiting.")
         sys.exit(1)
 
+    # 4b. NMF Sweep (Optional): compare topic counts/seeds on this DTM instead of training one model
+    if args.sweep_k:
+        sweep_results = run_nmf_sweep(dtm, feature_names, args.sweep_k, seeds=args.sweep_seeds,
+                                      output_dir=output_dir, max_workers=args.workers)
+        best = sweep_results.loc[sweep_results['u_mass'].idxmax()] if sweep_results['u_mass'].notna().any() else None
+        if best is not None:
+            logging.info(f"\nMost coherent fit: k={int(best['n_topics'])}, seed={int(best['seed'])} (UMass {best['u_mass']:.4f}).")
+        logging.info(f"\n--- NMF Sweep Finished --- Results saved in '{output_dir}'.")
+        return
+
     # 5. Train NMF Model
     nmf_model, W, H = train_nmf_model(dtm)
     if nmf_model is None:
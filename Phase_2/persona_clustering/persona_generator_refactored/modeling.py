@@ -19,6 +19,7 @@ from .constants import (
 )
 # Import bigram utilities
 from .bigram_utils import create_bigram_tokenizer
+from .persona_assigner import save_vectorizer_arrays
 
 def vectorize_text(documents, combined_bigrams_set):
     """Vectorizes text documents using TF-IDF with a custom bigram tokenizer.
@@ -59,11 +60,13 @@ def vectorize_text(documents, combined_bigrams_set):
         logger.error(f"Error during TF-IDF vectorization: {e}")
         return None, None, None
 
-def train_nmf_model(dtm):
+def train_nmf_model(dtm, n_topics=N_TOPICS, random_state=NMF_RANDOM_STATE):
     """Trains an NMF model on the Document-Term Matrix.
 
     Args:
         dtm (scipy.sparse.csr_matrix): Document-Term Matrix (TF-IDF).
+        n_topics (int): Number of topics (NMF components).
+        random_state (int): Seed for the NMF initialization.
 
     Returns:
         tuple: Contains:
@@ -72,10 +75,10 @@ def train_nmf_model(dtm):
             - np.ndarray: Topic-term matrix (H).
         Returns (None, None, None) if training fails.
     """
-    logger.info(f"\nTraining NMF model (n_components={N_TOPICS})...")
+    logger.info(f"\nTraining NMF model (n_components={n_topics})...")
     nmf = NMF(
-        n_components=N_TOPICS,
-        random_state=NMF_RANDOM_STATE,
+        n_components=n_topics,
+        random_state=random_state,
         solver=NMF_SOLVER,
         beta_loss=NMF_BETA_LOSS,
         l1_ratio=NMF_L1_RATIO,
@@ -93,27 +96,30 @@ def train_nmf_model(dtm):
         return None, None, None
 
 def save_model_and_vectorizer(nmf_model, vectorizer, output_dir):
-    """Saves the trained NMF model.
+    """Saves the trained NMF model and the fitted vectorizer.
 
-    Note: The vectorizer is NOT saved due to pickling issues with custom tokenizers.
-          It can be recreated using the parameters in constants.py and the vocabulary.
+    The vectorizer is saved twice: as a pickle (its tokenizer is a picklable
+    `BigramTokenizer`), and as compact arrays (vocabulary, IDF weights, bigrams)
+    that `PersonaAssigner.load` reads to score new customers.
 
     Args:
         nmf_model (NMF): Trained NMF model.
-        vectorizer (TfidfVectorizer): Fitted vectorizer (used to get info, but not saved).
-        output_dir (str): Directory to save the model file.
+        vectorizer (TfidfVectorizer): Fitted vectorizer.
+        output_dir (str): Directory to save the model files.
     """
     os.makedirs(output_dir, exist_ok=True)
     model_path = os.path.join(output_dir, OUTPUT_FILES["model"])
-    # vectorizer_path = os.path.join(output_dir, OUTPUT_FILES["vectorizer"])
+    vectorizer_path = os.path.join(output_dir, OUTPUT_FILES["vectorizer"])
     try:
         joblib.dump(nmf_model, model_path)
-        # joblib.dump(vectorizer, vectorizer_path) # Cannot pickle custom tokenizer
         logger.info(f"NMF model saved to {model_path}")
-        # print(f"TF-IDF vectorizer saved to {vectorizer_path}")
-        logger.info("Vectorizer not saved due to pickling limitations with custom tokenizer.")
+        joblib.dump(vectorizer, vectorizer_path)
+        logger.info(f"TF-IDF vectorizer saved to {vectorizer_path}")
+        vectorizer_arrays_path = os.path.join(output_dir, OUTPUT_FILES["vectorizer_arrays"])
+        save_vectorizer_arrays(vectorizer, vectorizer_arrays_path)
+        logger.info(f"TF-IDF vocabulary and IDF weights saved to {vectorizer_arrays_path}")
     except Exception as e:
-        logger.error(f"Error saving NMF model: {e}")
+        logger.error(f"Error saving NMF model or vectorizer: {e}")
 
 def assign_topics_to_customers(W, customer_data, output_dir):
     """Assigns the most likely topic to each customer based on NMF weights.
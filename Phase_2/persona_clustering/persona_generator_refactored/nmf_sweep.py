@@ -0,0 +1,161 @@
+# Parallel NMF hyper-parameter sweep over topic counts and seeds on one shared DTM
+import os
+import time
+import tempfile
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from threadpoolctl import threadpool_limits
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
+
+# Import constants
+from .constants import N_TOP_WORDS_COHERENCE, NMF_RANDOM_STATE, OUTPUT_FILES
+from .modeling import train_nmf_model, get_top_words_per_topic
+from .coherence_utils import calculate_umass_coherence
+
+# --- Shared DTM --- #
+
+def save_shared_dtm(dtm, directory):
+    """Writes a CSR matrix's arrays to `directory` as .npy files for `load_shared_dtm`."""
+    dtm = sparse.csr_matrix(dtm)
+    for name in ('data', 'indices', 'indptr'):
+        np.save(os.path.join(directory, f"{name}.npy"), getattr(dtm, name))
+    np.save(os.path.join(directory, "shape.npy"), np.array(dtm.shape))
+
+def load_shared_dtm(directory):
+    """Opens the DTM saved by `save_shared_dtm` as a read-only, memory-mapped CSR matrix.
+
+    The arrays are not copied, so every process that opens the same files shares
+    one copy of the matrix through the page cache.
+    """
+    arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r') for name in ('data', 'indices', 'indptr')]
+    shape = tuple(np.load(os.path.join(directory, "shape.npy")))
+    return sparse.csr_matrix(tuple(arrays), shape=shape, copy=False)
+
+# --- Sweep Workers --- #
+# Each worker process opens the shared DTM once, in its initializer.
+_worker_dtm = None
+_worker_feature_names = None
+_worker_thread_limits = None
+
+def _init_worker(dtm_dir, feature_names):
+    global _worker_dtm, _worker_feature_names, _worker_thread_limits
+    # One BLAS thread per process: the pool already has a process per core
+    _worker_thread_limits = threadpool_limits(limits=1)
+    _worker_dtm = load_shared_dtm(dtm_dir)
+    _worker_feature_names = feature_names
+
+def _fit_and_score(dtm, feature_names, n_topics, seed, n_top_words):
+    """Fits one NMF model and scores its topics; returns one row of the sweep results."""
+    start = time.perf_counter()
+    nmf, _, H = train_nmf_model(dtm, n_topics=n_topics, random_state=seed)
+    fit_seconds = time.perf_counter() - start
+    row = {'n_topics': n_topics, 'seed': seed, 'reconstruction_error': np.nan, 'n_iter': np.nan,
+           'u_mass': np.nan, 'u_mass_min': np.nan, 'fit_seconds': fit_seconds}
+    if nmf is None:
+        return row
+
+    top_words = get_top_words_per_topic(H, feature_names, n_top_words=n_top_words)
+    average_umass, umass_per_topic = calculate_umass_coherence(top_words, dtm, feature_names, n_top_words)
+    topic_scores = [score for score in umass_per_topic.values() if score is not None]
+    row.update({
+        'reconstruction_error': nmf.reconstruction_err_,
+        'n_iter': nmf.n_iter_,
+        'u_mass': np.nan if average_umass is None else average_umass,
+        'u_mass_min': min(topic_scores) if topic_scores else np.nan
+    })
+    return row
+
+def _worker_fit_and_score(n_topics, seed, n_top_words):
+    return _fit_and_score(_worker_dtm, _worker_feature_names, n_topics, seed, n_top_words)
+
+def default_sweep_workers():
+    """Number of CPUs this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError: # Not available on macOS/Windows
+        return os.cpu_count() or 1
+
+# --- Sweep --- #
+
+def run_nmf_sweep(dtm, feature_names, topic_counts, seeds=(NMF_RANDOM_STATE,), output_dir=None,
+                  max_workers=None, n_top_words=N_TOP_WORDS_COHERENCE):
+    """Fits NMF for every (topic count, seed) pair in parallel and compares their coherence.
+
+    The DTM is written once to a temporary directory and memory-mapped read-only
+    by a pool of worker processes, one per available core by default, so the
+    matrix is neither pickled per task nor copied per worker. Each fit uses the
+    pipeline's NMF settings (constants.py) and is scored with UMass coherence
+    over its top `n_top_words` words.
+
+    Args:
+        dtm (scipy.sparse.csr_matrix): Document-Term Matrix (TF-IDF).
+        feature_names (list): Feature names corresponding to dtm columns.
+        topic_counts (Iterable[int]): Numbers of topics (k) to try.
+        seeds (Iterable[int]): NMF random states to try for each k.
+        output_dir (str): If given, directory for the results CSV and summary report.
+        max_workers (int): Worker processes (default: available cores). With 1,
+            the fits run in this process.
+        n_top_words (int): Number of top words per topic for coherence calculation.
+
+    Returns:
+        pd.DataFrame: One row per fit, sorted by n_topics and seed, with columns
+        'n_topics', 'seed', 'reconstruction_error', 'n_iter', 'u_mass',
+        'u_mass_min' (least coherent topic) and 'fit_seconds'.
+    """
+    # Largest k first: the slowest fits start early, so workers finish together
+    tasks = sorted({(int(k), int(seed)) for k in topic_counts for seed in seeds}, key=lambda task: (-task[0], task[1]))
+    if not tasks:
+        raise ValueError("NMF sweep needs at least one topic count and one seed")
+    max_workers = min(max_workers or default_sweep_workers(), len(tasks))
+    feature_names = list(feature_names)
+    logger.info(f"\n--- NMF Sweep: {len(tasks)} fits (k={sorted({k for k, _ in tasks})}, seeds={sorted({s for _, s in tasks})}) on {max_workers} worker(s) ---")
+
+    start = time.perf_counter()
+    if max_workers == 1:
+        rows = [_fit_and_score(dtm, feature_names, k, seed, n_top_words) for k, seed in tasks]
+    else:
+        with tempfile.TemporaryDirectory(prefix="nmf_sweep_") as dtm_dir:
+            save_shared_dtm(dtm, dtm_dir)
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                     initargs=(dtm_dir, feature_names)) as executor:
+                futures = [executor.submit(_worker_fit_and_score, k, seed, n_top_words) for k, seed in tasks]
+                rows = [future.result() for future in futures]
+    logger.info(f"NMF sweep finished in {time.perf_counter() - start:.1f}s.")
+
+    results = pd.DataFrame(rows).sort_values(['n_topics', 'seed']).reset_index(drop=True)
+    if output_dir is not None:
+        save_sweep_results(results, output_dir, n_top_words)
+    return results
+
+def summarize_sweep(results):
+    """Averages sweep results over seeds: one row per topic count, most coherent first."""
+    summary = results.groupby('n_topics').agg(
+        runs=('seed', 'size'),
+        u_mass_mean=('u_mass', 'mean'),
+        u_mass_std=('u_mass', 'std'),
+        u_mass_min=('u_mass_min', 'min'),
+        reconstruction_error_mean=('reconstruction_error', 'mean'),
+        fit_seconds_mean=('fit_seconds', 'mean')
+    )
+    return summary.sort_values('u_mass_mean', ascending=False)
+
+def save_sweep_results(results, output_dir, n_top_words=N_TOP_WORDS_COHERENCE):
+    """Saves the per-fit results as CSV and a per-k comparison table as a text report."""
+    os.makedirs(output_dir, exist_ok=True)
+    results_path = os.path.join(output_dir, OUTPUT_FILES["nmf_sweep_results"])
+    results.to_csv(results_path, index=False)
+
+    summary = summarize_sweep(results)
+    report_path = os.path.join(output_dir, OUTPUT_FILES["nmf_sweep_report"])
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write("=== NMF Sweep Report ===\n\n")
+        f.write("Averaged over seeds, most coherent (highest mean UMass) first:\n\n")
+        f.write(summary.to_string(float_format=lambda value: f"{value:.4f}"))
+        f.write(f"\n\n(UMass calculated using top {n_top_words} words per topic; per-fit results in {OUTPUT_FILES['nmf_sweep_results']})\n")
+    logger.info(f"NMF sweep comparison:\n{summary.to_string(float_format=lambda value: f'{value:.4f}')}")
+    logger.info(f"NMF sweep results saved to {results_path} and {report_path}")
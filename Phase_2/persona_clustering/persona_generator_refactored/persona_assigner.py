@@ -0,0 +1,168 @@
+# Topic (persona) assignment for new customers from a fitted pipeline's saved artifacts
+import argparse
+import os
+import sys
+import logging
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
+
+# Import constants
+from .constants import OUTPUT_FILES, DEFAULT_OUTPUT_DIR, DEFAULT_CSV_ENGINE, ASSIGNMENT_BATCH_SIZE
+from .bigram_utils import BigramTokenizer
+from .data_processing import build_customer_documents, read_purchases_csv
+
+UNASSIGNED_TOPIC = -1 # Customers with no words in the model's vocabulary
+
+# --- Vectorizer Arrays --- #
+
+def save_vectorizer_arrays(vectorizer, path):
+    """Saves a fitted TF-IDF vectorizer's vocabulary, IDF weights and bigram set as a compressed .npz.
+
+    Unlike a pickle, the file holds only arrays and settings, loads with
+    `allow_pickle=False` and does not depend on scikit-learn's internals.
+
+    Args:
+        vectorizer (TfidfVectorizer): Vectorizer fitted with a `BigramTokenizer`.
+        path (str): Destination .npz file.
+    """
+    if not isinstance(vectorizer.tokenizer, BigramTokenizer):
+        raise ValueError(f"Expected a vectorizer with a BigramTokenizer, got tokenizer {vectorizer.tokenizer!r}")
+    np.savez_compressed(
+        path,
+        terms=np.asarray(vectorizer.get_feature_names_out(), dtype=str),
+        idf=vectorizer.idf_,
+        bigrams=np.array(sorted(vectorizer.tokenizer.significant_bigrams), dtype=str),
+        lowercase=vectorizer.lowercase,
+        norm=str(vectorizer.norm),
+        sublinear_tf=vectorizer.sublinear_tf
+    )
+
+def load_vectorizer_arrays(path):
+    """Rebuilds the vectorizer saved by `save_vectorizer_arrays`, ready for `transform`.
+
+    Args:
+        path (str): The .npz file.
+
+    Returns:
+        TfidfVectorizer: Vectorizer with the saved vocabulary, IDF weights and bigram tokenizer.
+    """
+    with np.load(path, allow_pickle=False) as arrays:
+        terms = arrays['terms'].tolist()
+        norm = str(arrays['norm'])
+        vectorizer = TfidfVectorizer(
+            vocabulary={term: i for i, term in enumerate(terms)},
+            tokenizer=BigramTokenizer(arrays['bigrams'].tolist()),
+            token_pattern=None,
+            lowercase=bool(arrays['lowercase']),
+            norm=None if norm == 'None' else norm,
+            sublinear_tf=bool(arrays['sublinear_tf'])
+        )
+        vectorizer.idf_ = arrays['idf']
+    return vectorizer
+
+# --- Assignment --- #
+
+class PersonaAssigner:
+    """Assigns NMF topics (personas) to new customers.
+
+    The vectorizer and NMF model are loaded once; documents are then vectorized
+    and passed to `NMF.transform` in batches of `batch_size`, so memory stays
+    bounded however many customers are scored.
+
+    Args:
+        vectorizer (TfidfVectorizer): Fitted vectorizer (see `load_vectorizer_arrays`).
+        nmf_model (NMF): Fitted NMF model over the vectorizer's vocabulary.
+        batch_size (int): Customers per batch.
+    """
+
+    def __init__(self, vectorizer, nmf_model, batch_size=ASSIGNMENT_BATCH_SIZE):
+        if nmf_model.components_.shape[1] != len(vectorizer.vocabulary_):
+            raise ValueError(f"NMF model has {nmf_model.components_.shape[1]} features but the vectorizer has {len(vectorizer.vocabulary_)} terms")
+        self.vectorizer = vectorizer
+        self.nmf_model = nmf_model
+        self.batch_size = batch_size
+
+    @classmethod
+    def load(cls, output_dir=DEFAULT_OUTPUT_DIR, batch_size=ASSIGNMENT_BATCH_SIZE):
+        """Loads the artifacts written by `save_model_and_vectorizer` to `output_dir`."""
+        vectorizer = load_vectorizer_arrays(os.path.join(output_dir, OUTPUT_FILES["vectorizer_arrays"]))
+        nmf_model = joblib.load(os.path.join(output_dir, OUTPUT_FILES["model"]))
+        logger.info(f"Loaded {nmf_model.n_components_} topics over {len(vectorizer.vocabulary_)} terms from {output_dir}")
+        return cls(vectorizer, nmf_model, batch_size)
+
+    @property
+    def n_topics(self):
+        return self.nmf_model.n_components_
+
+    def topic_weights(self, documents):
+        """Document-topic weights (W) for purchase documents.
+
+        Args:
+            documents (Sequence[str]): Documents built like `Purchase_Doc`.
+
+        Returns:
+            np.ndarray: Array of shape (len(documents), n_topics).
+        """
+        documents = list(documents)
+        weights = np.zeros((len(documents), self.n_topics))
+        for start in range(0, len(documents), self.batch_size):
+            dtm = self.vectorizer.transform(documents[start:start + self.batch_size])
+            weights[start:start + dtm.shape[0]] = self.nmf_model.transform(dtm)
+        return weights
+
+    def assign_documents(self, customer_ids, documents):
+        """Assigns each customer the topic with the highest weight.
+
+        Args:
+            customer_ids (Sequence): One ID per document.
+            documents (Sequence[str]): Documents built like `Purchase_Doc`.
+
+        Returns:
+            pd.DataFrame: 'Survey_ResponseID', 'Topic' and 'Topic_Weight'. Customers
+            whose documents contain no vocabulary terms get UNASSIGNED_TOPIC.
+        """
+        weights = self.topic_weights(documents)
+        topics = np.argmax(weights, axis=1)
+        topic_weights = weights[np.arange(len(weights)), topics]
+        topics[topic_weights <= 0] = UNASSIGNED_TOPIC
+        unassigned = int((topics == UNASSIGNED_TOPIC).sum())
+        if unassigned:
+            logger.warning(f"{unassigned} customer(s) have no terms in the model's vocabulary; assigned topic {UNASSIGNED_TOPIC}.")
+        return pd.DataFrame({'Survey_ResponseID': list(customer_ids), 'Topic': topics, 'Topic_Weight': topic_weights})
+
+    def assign_purchases(self, purchases):
+        """Assigns topics to customers from raw purchase rows.
+
+        Args:
+            purchases (pd.DataFrame): Purchase rows as returned by `read_purchases_csv`.
+
+        Returns:
+            pd.DataFrame: See `assign_documents`. Customers left with no purchases
+            after filtering are not included.
+        """
+        customer_data = build_customer_documents(purchases)
+        return self.assign_documents(customer_data['Survey_ResponseID'], customer_data['Purchase_Doc'])
+
+def main():
+    """Assigns personas to the customers in a purchases CSV using a trained model."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[logging.StreamHandler(sys.stdout)])
+    parser = argparse.ArgumentParser(description='Assign NMF personas to new customers')
+    parser.add_argument('purchases_file', help='Purchases CSV in the same format as the training data')
+    parser.add_argument('--model-dir', default=DEFAULT_OUTPUT_DIR, help='Output directory of the training run')
+    parser.add_argument('--output', required=True, help='CSV file for the assignments')
+    parser.add_argument('--csv-engine', choices=['pyarrow', 'c', 'python'], default=DEFAULT_CSV_ENGINE)
+    parser.add_argument('--batch-size', type=int, default=ASSIGNMENT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    assigner = PersonaAssigner.load(args.model_dir, batch_size=args.batch_size)
+    assignments = assigner.assign_purchases(read_purchases_csv(args.purchases_file, engine=args.csv_engine))
+    assignments.to_csv(args.output, index=False)
+    logger.info(f"Assigned topics to {len(assignments)} customers; saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
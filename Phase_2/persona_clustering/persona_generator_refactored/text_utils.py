@@ -1,5 +1,7 @@
 # Text cleaning and standardization utilities
 import re
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 
 # Import constants for category mapping
@@ -10,22 +12,76 @@ from .constants import (
     CATEGORY_CONSOLIDATION_KEYWORDS
 )
 
+CATEGORY_CACHE_SIZE = 1 << 16 # Distinct raw categories number in the thousands
+
+# --- Precompiled Patterns --- #
+_NON_TEXT_CHARS = re.compile(r'[^a-z\s_]')
+_DIGITS = re.compile(r'\d+')
+_WHITESPACE_RUN = re.compile(r'\s+')
+_CATEGORY_SEPARATORS = re.compile(r'\s*&\s*|\s*/\s*|\s*-\s*')
+_CATEGORY_INVALID_CHARS = re.compile(r'[^a-z\s_]+')
+_REPEATED_UNDERSCORES = re.compile(r'_{2,}')
+# One alternation per consolidation group, tried in the mapping's order
+_CONSOLIDATION_PATTERNS = [
+    (std_cat, re.compile(r'\b(?:' + '|'.join(keywords) + r')\b'))
+    for std_cat, keywords in CATEGORY_CONSOLIDATION_KEYWORDS.items()
+]
+
+# For pandas .str methods, which may run on pyarrow (RE2) rather than Python's re:
+# Python's \s spelled out, since RE2's \s only covers ASCII whitespace
+_WHITESPACE_CHARS = r'\t\n\x0b\x0c\r\x1c-\x1f \x85\xa0' + '\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000'
+_NON_TEXT_CHARS_STR = f'[^a-z_{_WHITESPACE_CHARS}]'
+_WHITESPACE_RUN_STR = f'[{_WHITESPACE_CHARS}]+'
+
 def clean_text(text):
     """Simple text cleaning: lowercase, remove non-alphanumeric, remove numbers."""
     if not isinstance(text, str):
         return ""
     text = text.lower()
     # Keep a-z, spaces, and underscores (often used in category names)
-    text = re.sub(r'[^a-z\s_]', '', text) # Allows underscores
-    text = re.sub(r'\d+', '', text)      # Remove digits
-    text = re.sub(r'\s+', ' ', text) # Normalize whitespace
+    text = _NON_TEXT_CHARS.sub('', text) # Allows underscores
+    text = _DIGITS.sub('', text)      # Remove digits
+    text = _WHITESPACE_RUN.sub(' ', text) # Normalize whitespace
     return text
 
+def clean_text_series(texts):
+    """Vectorized `clean_text` for a pandas Series: same result for every element.
+
+    Uses pandas .str operations (pyarrow compute kernels for pyarrow-backed
+    strings) instead of three Python regex calls per row. Digits need no
+    separate pass here: the first replacement already removes them.
+    """
+    if isinstance(texts.dtype, pd.CategoricalDtype):
+        texts = texts.astype(object)
+    if texts.dtype == object:
+        # Non-string values (numbers, None) clean to "", as in clean_text
+        texts = texts.where(texts.map(lambda value: isinstance(value, str)).astype(bool), '')
+    return (texts.fillna('')
+                 .str.lower()
+                 .str.replace(_NON_TEXT_CHARS_STR, '', regex=True)
+                 .str.replace(_WHITESPACE_RUN_STR, ' ', regex=True))
+
 def standardize_category(category):
-    """Cleans and standardizes category names for use as tokens."""
-    if not isinstance(category, str) or pd.isna(category):
+    """Cleans and standardizes category names for use as tokens.
+
+    Memoized per raw category; see `standardize_categories` for whole Series.
+    """
+    if not isinstance(category, str):
         return None
+    return _standardize_category_cached(category)
+
+def standardize_categories(categories):
+    """Vectorized `standardize_category`: computed once per distinct raw category and mapped back.
+
+    Returns:
+        pd.Series: Object Series aligned with `categories`, None where unmapped or missing.
+    """
+    codes, uniques = pd.factorize(categories) # Missing values get code -1
+    tokens = np.array([standardize_category(category) for category in uniques] + [None], dtype=object)
+    return pd.Series(tokens[codes], index=categories.index, name=categories.name, dtype=object)
 
+@lru_cache(maxsize=CATEGORY_CACHE_SIZE)
+def _standardize_category_cached(category):
     category_raw = category # Keep original for ABIS mapping
     category_lower = category.lower()
 
@@ -41,15 +97,15 @@ def standardize_category(category):
 
     # 2. Basic Cleaning (apply after ABIS check)
     # Replace common separators with underscores
-    category = re.sub(r'\s*&\s*|\s*/\s*|\s*-\s*', '_', category_lower)
+    category = _CATEGORY_SEPARATORS.sub('_', category_lower)
     # Remove special characters except underscore AND remove digits
-    category = re.sub(r'[^a-z\s_]+', '', category)
-    category = re.sub(r'\d+', '', category) # Remove digits
+    category = _CATEGORY_INVALID_CHARS.sub('', category)
+    category = _DIGITS.sub('', category) # Remove digits
     # Replace spaces with underscores and strip leading/trailing underscores
-    category = re.sub(r'\s+', '_', category).strip('_')
+    category = _WHITESPACE_RUN.sub('_', category).strip('_')
 
     # Remove redundant underscores
-    category = re.sub(r'_{2,}', '_', category)
+    category = _REPEATED_UNDERSCORES.sub('_', category)
 
     if not category: return None # Return None if cleaning results in empty string
 
@@ -61,10 +117,10 @@ def standardize_category(category):
     # Create a space-separated version for robust keyword matching
     category_for_keyword_search = category.replace('_', ' ')
     # Iterate through standardized target categories
-    for std_cat, keywords in CATEGORY_CONSOLIDATION_KEYWORDS.items():
+    for std_cat, keyword_pattern in _CONSOLIDATION_PATTERNS:
         # Check if any keyword is present in the space-separated version
         # Use word boundaries for more precise matching
-        if any(re.search(rf'\b{kw}\b', category_for_keyword_search) for kw in keywords):
+        if keyword_pattern.search(category_for_keyword_search):
             # Prepend 'category_' prefix here after finding a match
             return f"category_{std_cat}"
 
@@ -0,0 +1,70 @@
+import pytest
+import sys
+import os
+import pickle
+import random
+
+# Adjust path to import from the parent directory's sibling 'persona_generator_refactored'
+# This assumes tests are run from the 'persona_clustering' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from persona_generator_refactored.bigram_utils import BigramTokenizer, create_bigram_tokenizer
+from persona_generator_refactored.constants import WHITELIST_BIGRAMS
+
+BIGRAMS = set(WHITELIST_BIGRAMS) | {'a_b', 'b_c', 'a_b_c', 'a_a', 'category_books_kindle'}
+
+
+def reference_tokenizer(significant_bigrams_set):
+    """The original closure-based tokenizer, kept as the specification."""
+    def tokenizer(text):
+        tokens = str(text).split()
+        processed_tokens = []
+        i = 0
+        while i < len(tokens):
+            if i < len(tokens) - 1:
+                potential_bigram = f"{tokens[i]}_{tokens[i+1]}"
+                if potential_bigram in significant_bigrams_set:
+                    processed_tokens.append(potential_bigram)
+                    i += 2
+                    continue
+            processed_tokens.append(tokens[i])
+            i += 1
+        return processed_tokens
+    return tokenizer
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("new video game console", ['new', 'video_game', 'console']),
+    ("a a a", ['a_a', 'a']), # Pairs are merged left to right without overlap
+    ("a b c", ['a_b', 'c']),
+    ("a_b c", ['a_b_c']), # A bigram may itself contain underscores
+    ("a b_c", ['a_b_c']),
+    ("category_books kindle", ['category_books_kindle']),
+    ("  a \t b\n", ['a_b']),
+    ("", []),
+    (None, ['None']),
+])
+def test_bigram_tokenizer_examples(text, expected):
+    assert BigramTokenizer(BIGRAMS)(text) == expected
+    assert reference_tokenizer(BIGRAMS)(text) == expected
+
+
+def test_bigram_tokenizer_matches_reference():
+    rng = random.Random(0)
+    words = sorted({word for bigram in BIGRAMS for word in bigram.split('_')}) + ['a_b', 'b_c', 'category_books', 'other', 'words']
+    bigrams = BIGRAMS | {f"{rng.choice(words)}_{rng.choice(words)}" for _ in range(100)}
+    tokenizer, reference = create_bigram_tokenizer(bigrams), reference_tokenizer(bigrams)
+    for _ in range(2000):
+        doc = ' '.join(rng.choice(words) for _ in range(rng.randint(0, 40)))
+        assert tokenizer(doc) == reference(doc), doc
+
+
+def test_fitted_vectorizer_pickles():
+    docs = ["new video game console", "cell phone case", "video game controller", "phone case"]
+    vectorizer = TfidfVectorizer(tokenizer=create_bigram_tokenizer(BIGRAMS), token_pattern=None)
+    dtm = vectorizer.fit_transform(docs)
+    restored = pickle.loads(pickle.dumps(vectorizer))
+    assert 'video_game' in restored.vocabulary_
+    assert (restored.transform(docs) != dtm).nnz == 0
@@ -0,0 +1,117 @@
+import pytest
+import sys
+import os
+import pandas as pd
+
+# Adjust path to import from the parent directory's sibling 'persona_generator_refactored'
+# This assumes tests are run from the 'persona_clustering' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from persona_generator_refactored import data_processing
+from persona_generator_refactored.data_processing import load_and_preprocess_data, read_purchases_csv
+from persona_generator_refactored.constants import PURCHASE_SUMMARY_COLUMNS
+
+HEADER = "Order Date,Purchase Price Per Unit,Quantity,Shipping Address State,Title,ASIN/ISBN (Product Code),Category,Survey ResponseID\n"
+ROWS = [
+    '2020-01-05,12.99,1,CA,Stainless Steel Water Bottle,B001,WATER_BOTTLE,R_1\n', # First data row must not be lost
+    '2020-01-06,5.50,2,CA,"Organic Green Tea, 100 Bags",B002,TEA,R_1\n',
+    '2020-02-01,25.00,1,NY,"Wireless Mouse\nwith USB receiver",B003,COMPUTER_INPUT_DEVICE,R_2\n', # Quoted newline
+    '2020-02-03,0.50,1,NY,Cheap Sticker Pack,B004,STICKER_DECAL,R_2\n', # Below MIN_PURCHASE_VALUE
+    '2020-02-04,50.00,1,NY,Amazon Gift Card Reload,B005,GIFT_CARD,R_2\n', # Gift card title
+    '2020-03-01,9.99,1,TX,Paperback Novel,B006,ABIS_BOOK,\n', # Missing Survey_ResponseID
+    '2020-03-02,9.99,1,TX,Bad,Row,With,Extra,Fields,R_3\n', # Too many fields
+    '2020-03-03,15.00,3,TX,Yoga Mat Extra Thick,B007,YOGA_MAT,R_3\n',
+]
+
+
+def write_csv(path, rows):
+    path.write_text(HEADER + "".join(rows), encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def purchases_csv(tmp_path):
+    return write_csv(tmp_path / "purchases.csv", ROWS)
+
+
+@pytest.mark.parametrize("engine", ["pyarrow", "c", "python"])
+def test_read_purchases_csv_skips_bad_lines(purchases_csv, engine):
+    df = read_purchases_csv(purchases_csv, engine=engine)
+    assert list(df['ASIN_ISBN'].astype(str)) == ['B001', 'B002', 'B003', 'B004', 'B005', 'B006', 'B007']
+    assert df['Title'].iloc[2] == "Wireless Mouse\nwith USB receiver"
+    assert df['Purchase_Price'].dtype == 'float64'
+    assert isinstance(df['Category'].dtype, pd.CategoricalDtype)
+
+
+def test_engines_produce_identical_results(purchases_csv):
+    results = [load_and_preprocess_data(purchases_csv, engine=engine, cache_dir=None) for engine in ("pyarrow", "c", "python")]
+    customer_data, filtered = results[0]
+    assert list(customer_data['Survey_ResponseID']) == ['R_1', 'R_2', 'R_3']
+    assert customer_data['Purchased_ASINs'].tolist() == [['B001', 'B002'], ['B003'], ['B007']]
+    for other_customers, other_filtered in results[1:]:
+        pd.testing.assert_frame_equal(customer_data, other_customers)
+        pd.testing.assert_frame_equal(filtered.reset_index(drop=True), other_filtered.reset_index(drop=True),
+                                      check_dtype=False, check_categorical=False)
+
+
+def test_non_numeric_values_fall_back_and_coerce(tmp_path):
+    path = write_csv(tmp_path / "purchases.csv", ROWS + ['2020-04-01,n/a-price,1,WA,Hiking Boots Waterproof,B008,BOOT,R_4\n'])
+    df = read_purchases_csv(path, engine='pyarrow')
+    assert df['Purchase_Price'].isna().sum() == 1
+    assert df['Purchase_Price'].iloc[0] == 12.99
+
+
+def test_filtered_frame_is_cached_by_file_hash(purchases_csv, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    first = load_and_preprocess_data(purchases_csv, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("CSV should not be re-parsed on a cache hit")
+    monkeypatch.setattr(data_processing, "read_purchases_csv", fail)
+    second = load_and_preprocess_data(purchases_csv, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(first[0], second[0])
+    pd.testing.assert_frame_equal(first[1].reset_index(drop=True), second[1].reset_index(drop=True))
+
+    # A changed file gets a new cache entry
+    monkeypatch.undo()
+    write_csv(tmp_path / "purchases.csv", ROWS[:3])
+    customer_data, _ = load_and_preprocess_data(purchases_csv, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 2
+    assert list(customer_data['Survey_ResponseID']) == ['R_1', 'R_2']
+
+
+def test_missing_file_returns_none(tmp_path):
+    assert load_and_preprocess_data(str(tmp_path / "missing.csv")) == (None, None)
+
+
+@pytest.mark.parametrize("engine", ["pyarrow", "c", "python"])
+def test_streaming_matches_in_memory(purchases_csv, engine):
+    customer_data, filtered = load_and_preprocess_data(purchases_csv, engine=engine, cache_dir=None)
+    streamed_customers, streamed_filtered = load_and_preprocess_data(purchases_csv, engine=engine, cache_dir=None, chunk_size=2)
+    pd.testing.assert_frame_equal(customer_data, streamed_customers)
+    assert list(streamed_filtered.columns) == PURCHASE_SUMMARY_COLUMNS
+    pd.testing.assert_frame_equal(filtered[PURCHASE_SUMMARY_COLUMNS].reset_index(drop=True), streamed_filtered,
+                                  check_dtype=False, check_categorical=False)
+
+
+def test_streaming_shares_the_parquet_cache(purchases_csv, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    streamed = load_and_preprocess_data(purchases_csv, cache_dir=cache_dir, chunk_size=3)
+    assert len(os.listdir(cache_dir)) == 1 # No leftover .tmp file
+
+    def fail(*args, **kwargs):
+        raise AssertionError("CSV should not be re-parsed on a cache hit")
+    monkeypatch.setattr(data_processing, "read_purchases_csv", fail)
+    monkeypatch.setattr(data_processing, "iter_purchases_csv", fail)
+    in_memory = load_and_preprocess_data(purchases_csv, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(streamed[0], in_memory[0])
+    restreamed = load_and_preprocess_data(purchases_csv, cache_dir=cache_dir, chunk_size=1)
+    pd.testing.assert_frame_equal(streamed[0], restreamed[0])
+
+
+def test_streaming_restarts_with_c_parser(tmp_path):
+    path = write_csv(tmp_path / "purchases.csv", ROWS + ['2020-04-01,n/a-price,1,WA,Hiking Boots Waterproof,B008,BOOT,R_4\n'])
+    customer_data, filtered = load_and_preprocess_data(path, cache_dir=None, chunk_size=2)
+    assert list(customer_data['Survey_ResponseID']) == ['R_1', 'R_2', 'R_3']
+    assert len(filtered) == 4
@@ -0,0 +1,86 @@
+import pytest
+import sys
+import os
+
+# Adjust path to import from the parent directory's sibling 'persona_generator_refactored'
+# This assumes tests are run from the 'persona_clustering' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from scipy import sparse
+
+from persona_generator_refactored.coherence_utils import calculate_umass_coherence
+from persona_generator_refactored.constants import OUTPUT_FILES
+from persona_generator_refactored.nmf_sweep import load_shared_dtm, run_nmf_sweep, save_shared_dtm
+
+N_DOCS = 120
+N_TERMS = 60
+
+
+@pytest.fixture
+def dtm_and_features():
+    # Three blocks of 20 terms, one per synthetic topic
+    rng = np.random.default_rng(0)
+    dense = np.zeros((N_DOCS, N_TERMS))
+    for doc in range(N_DOCS):
+        block = doc % 3
+        terms = rng.choice(np.arange(block * 20, block * 20 + 20), size=8, replace=False)
+        dense[doc, terms] = rng.random(8) + 0.1
+    return sparse.csr_matrix(dense), [f"term{i}" for i in range(N_TERMS)]
+
+
+def reference_umass(top_words_per_topic, dtm, feature_names, n_top_words):
+    """The original pair-by-pair UMass calculation, for comparison."""
+    feature_to_index = {name: i for i, name in enumerate(feature_names)}
+    dtm_binary = (dtm > 0).astype(int)
+    doc_counts = np.asarray(dtm_binary.sum(axis=0)).ravel()
+    scores = {}
+    for topic_id, words in top_words_per_topic.items():
+        valid = [word for word in words[:n_top_words] if word in feature_to_index]
+        total, pairs = 0, 0
+        for i, word_i in enumerate(valid):
+            idx_i = feature_to_index[word_i]
+            if doc_counts[idx_i] == 0:
+                continue
+            for word_j in valid[i + 1:]:
+                co_occurrence = dtm_binary[:, idx_i].multiply(dtm_binary[:, feature_to_index[word_j]]).sum()
+                total += np.log((co_occurrence + 1e-12) / doc_counts[idx_i])
+                pairs += 1
+        scores[topic_id] = total / pairs if len(valid) >= 2 and pairs else None
+    return scores
+
+
+def test_umass_matches_pairwise_reference(dtm_and_features):
+    dtm, feature_names = dtm_and_features
+    top_words = {0: ['term0', 'term1', 'term5', 'term21'], 1: ['term40', 'missing', 'term41'], 2: ['term3', 'missing']}
+    average, per_topic = calculate_umass_coherence(top_words, dtm, feature_names, n_top_words=10)
+    expected = reference_umass(top_words, dtm, feature_names, n_top_words=10)
+    assert per_topic[2] is None
+    assert per_topic[0] == pytest.approx(expected[0])
+    assert per_topic[1] == pytest.approx(expected[1])
+    assert average == pytest.approx((expected[0] + expected[1]) / 2)
+
+
+def test_shared_dtm_is_memory_mapped(dtm_and_features, tmp_path):
+    dtm, _ = dtm_and_features
+    save_shared_dtm(dtm, str(tmp_path))
+    shared = load_shared_dtm(str(tmp_path))
+    assert not shared.data.flags.writeable
+    assert shared.shape == dtm.shape
+    assert (shared != dtm).nnz == 0
+
+
+def test_sweep_in_pool_matches_in_process(dtm_and_features, tmp_path):
+    dtm, feature_names = dtm_and_features
+    in_process = run_nmf_sweep(dtm, feature_names, [2, 3], seeds=[0, 1], max_workers=1)
+    pooled = run_nmf_sweep(dtm, feature_names, [3, 2], seeds=[1, 0], output_dir=str(tmp_path), max_workers=2)
+
+    assert list(pooled[['n_topics', 'seed']].itertuples(index=False, name=None)) == [(2, 0), (2, 1), (3, 0), (3, 1)]
+    for column in ('reconstruction_error', 'u_mass', 'u_mass_min'):
+        np.testing.assert_allclose(pooled[column], in_process[column])
+    # Three planted topics: k=3 should be at least as coherent as k=2
+    assert pooled.groupby('n_topics')['u_mass'].mean()[3] >= pooled.groupby('n_topics')['u_mass'].mean()[2]
+
+    assert (tmp_path / OUTPUT_FILES["nmf_sweep_results"]).exists()
+    report = (tmp_path / OUTPUT_FILES["nmf_sweep_report"]).read_text()
+    assert report.startswith("=== NMF Sweep Report ===")
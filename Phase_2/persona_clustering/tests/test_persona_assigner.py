@@ -0,0 +1,92 @@
+import pytest
+import sys
+import os
+
+# Adjust path to import from the parent directory's sibling 'persona_generator_refactored'
+# This assumes tests are run from the 'persona_clustering' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import NMF
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from persona_generator_refactored.bigram_utils import BigramTokenizer
+from persona_generator_refactored.constants import OUTPUT_FILES
+from persona_generator_refactored.modeling import save_model_and_vectorizer
+from persona_generator_refactored.persona_assigner import (
+    PersonaAssigner,
+    UNASSIGNED_TOPIC,
+    load_vectorizer_arrays,
+    save_vectorizer_arrays
+)
+
+DOCS = [
+    "video game console controller category_video_games",
+    "video game headset category_video_games",
+    "gaming mouse video game category_video_games",
+    "dog food chew toy category_pet_supplies",
+    "cat litter dog food category_pet_supplies",
+    "dog leash cat toy category_pet_supplies",
+]
+
+
+@pytest.fixture
+def fitted():
+    vectorizer = TfidfVectorizer(tokenizer=BigramTokenizer({'video_game', 'dog_food'}), token_pattern=None)
+    dtm = vectorizer.fit_transform(DOCS)
+    nmf_model = NMF(n_components=2, init='nndsvda', solver='mu', beta_loss='kullback-leibler', max_iter=500, random_state=0)
+    nmf_model.fit(dtm)
+    return vectorizer, nmf_model
+
+
+def test_vectorizer_arrays_round_trip(fitted, tmp_path):
+    vectorizer, _ = fitted
+    path = str(tmp_path / "vectorizer.npz")
+    save_vectorizer_arrays(vectorizer, path)
+    restored = load_vectorizer_arrays(path)
+    assert 'video_game' in restored.vocabulary_
+    np.testing.assert_allclose(restored.transform(DOCS).toarray(), vectorizer.transform(DOCS).toarray())
+
+
+def test_assigner_loads_saved_pipeline_and_batches(fitted, tmp_path):
+    vectorizer, nmf_model = fitted
+    save_model_and_vectorizer(nmf_model, vectorizer, str(tmp_path))
+    assert (tmp_path / OUTPUT_FILES["vectorizer_arrays"]).exists()
+
+    expected = np.argmax(nmf_model.transform(vectorizer.transform(DOCS)), axis=1)
+    for batch_size in (2, 100):
+        assignments = PersonaAssigner.load(str(tmp_path), batch_size=batch_size).assign_documents(range(len(DOCS)), DOCS)
+        assert list(assignments.columns) == ['Survey_ResponseID', 'Topic', 'Topic_Weight']
+        assert assignments['Topic'].tolist() == expected.tolist()
+    assert expected[0] != expected[3] # The two groups get different topics
+
+
+def test_documents_without_vocabulary_terms_are_unassigned(fitted):
+    assigner = PersonaAssigner(*fitted)
+    assignments = assigner.assign_documents(['R_1', 'R_2'], ["unknown words only", "dog food"])
+    assert assignments['Topic'].tolist()[0] == UNASSIGNED_TOPIC
+    assert assignments['Topic'].tolist()[1] != UNASSIGNED_TOPIC
+
+
+def test_assign_purchases_builds_documents_like_training(fitted):
+    purchases = pd.DataFrame({
+        'Order_Date': ['2020-01-01'] * 3,
+        'Purchase_Price': ['29.99', '12.50', '0.10'],
+        'Quantity': ['1', '2', '1'],
+        'Shipping_State': ['CA'] * 3,
+        'Title': ['Video Game Headset', 'Dog Food Chicken', 'Sticker'],
+        'ASIN_ISBN': ['B001', 'B002', 'B003'],
+        'Category': ['VIDEO_GAME_ACCESSORIES', 'PET_FOOD', 'STICKER_DECAL'],
+        'Survey_ResponseID': ['R_1', 'R_2', 'R_3'], # R_3's only purchase is below the minimum value
+    })
+    assignments = PersonaAssigner(*fitted).assign_purchases(purchases)
+    assert assignments['Survey_ResponseID'].tolist() == ['R_1', 'R_2']
+    assert assignments['Topic'].nunique() == 2
+
+
+def test_mismatched_model_is_rejected(fitted):
+    vectorizer, _ = fitted
+    other = NMF(n_components=2, max_iter=50).fit(np.random.default_rng(0).random((4, 3)))
+    with pytest.raises(ValueError):
+        PersonaAssigner(vectorizer, other)
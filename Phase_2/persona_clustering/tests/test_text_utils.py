@@ -6,7 +6,10 @@ import os
 # This assumes tests are run from the 'persona_clustering' directory
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from persona_generator_refactored.text_utils import clean_text, standardize_category
+import pandas as pd
+
+from persona_generator_refactored import text_utils
+from persona_generator_refactored.text_utils import clean_text, clean_text_series, standardize_category, standardize_categories
 from persona_generator_refactored.constants import (
     ABIS_CATEGORY_MAPPINGS,
     SPECIFIC_CATEGORY_MAPPINGS,
@@ -27,6 +30,17 @@ from persona_generator_refactored.constants import (
 def test_clean_text(input_text, expected_output):
     assert clean_text(input_text) == expected_output
 
+TITLES = ["Hello World! 123", "  Extra   Spaces  ", "Special_Chars&$*", None, "", "Café Crème 2½ cups",
+          "tab\tnew\nline\x0bvt\x1cfs\x85nel\xa0nbsp", "\u3000wide\u2009thin space", "İstanbul KELVIN \u212a"]
+
+@pytest.mark.parametrize("dtype", [object, "str", "string[python]", "category"])
+def test_clean_text_series_matches_clean_text(dtype):
+    texts = pd.Series(TITLES, dtype=dtype)
+    assert clean_text_series(texts).tolist() == [clean_text(text) for text in TITLES]
+
+def test_clean_text_series_handles_non_strings():
+    assert clean_text_series(pd.Series(["Mug 12oz", 123, None], dtype=object)).tolist() == ["mug oz", "", ""]
+
 # --- Tests for standardize_category --- #
 
 @pytest.mark.parametrize("input_category, expected_output", [
@@ -81,4 +95,20 @@ def test_keyword_consolidation_examples():
     # Test some examples for keyword consolidation
     assert standardize_category("Vitamin C Supplement") == "category_health_supplements"
     assert standardize_category("Kitchen Utensils") == "category_home_and_kitchen"
-    assert standardize_category("Laptop Accessories") == "category_computers_and_accessories" 
\ No newline at end of file
+    assert standardize_category("Laptop Accessories") == "category_computers_and_accessories" 
+# --- Tests for standardize_categories --- #
+
+def test_standardize_categories_matches_standardize_category():
+    raw = ["ABIS_BOOK", "Shampoo", None, "Tools & Home Improvement", "ABIS_BOOK", "Some Unique Category", "", "ABIS_UNKNOWN"]
+    for dtype in (object, "category"):
+        tokens = standardize_categories(pd.Series(raw, dtype=dtype, index=range(10, 18)))
+        assert tokens.tolist() == [standardize_category(category) for category in raw]
+        assert list(tokens.index) == list(range(10, 18))
+
+def test_standardize_category_is_computed_once_per_raw_category():
+    text_utils._standardize_category_cached.cache_clear()
+    standardize_categories(pd.Series(["Garden Supplies", "Baby Toys"] * 1000))
+    info = text_utils._standardize_category_cached.cache_info()
+    assert (info.misses, info.hits) == (2, 0)
+    standardize_category("Garden Supplies")
+    assert text_utils._standardize_category_cached.cache_info().hits == 1